@@ -4,7 +4,7 @@ from fasthtml.common import *
 from models import (
     setup_database, can_view_bookshelf, can_edit_bookshelf,
     get_public_shelves_with_stats, get_user_shelves, get_shelf_by_slug,
-    get_public_shelves, get_recent_community_books, get_public_shelves_count
+    get_public_shelves, get_recent_community_books
 )
 from api_clients import BookAPIClient
 from static_utils import get_cached_css_url
@@ -19,9 +19,14 @@ from components import (
 from meta_utils import create_homepage_meta_tags, create_explore_meta_tags, create_bookshelf_meta_tags, create_user_profile_meta_tags, get_sample_book_titles
 import os
 import logging
+import random
 from datetime import datetime
+from functools import partial
 from dotenv import load_dotenv
 from auth import BlueskyAuth, get_current_user_did, auth_beforeware, is_admin, require_admin
+from bibliome.auth.bluesky import following_cache, following_fetches
+from bibliome.clients.books import book_search_cache, book_isbn_cache, book_lookups
+from bibliome.clients.pds import repo_fetches
 from atproto_oauth import OAuthClient, ATProtoOAuthError, generate_state, get_client_metadata
 import json
 import asyncio
@@ -33,7 +38,12 @@ from process_monitor import init_process_monitoring, get_process_monitor
 from dependency_graph import get_dependencies
 from database_cleanup import init_database_cleanup, get_cleanup_monitor
 from performance_monitor import init_performance_monitoring, get_performance_monitor
-from models import get_book_by_id, get_book_comments, get_book_activity, get_book_shelves
+from models import (get_book_by_id, get_book_comments, get_book_activity, get_book_shelves, get_shelf_version,
+                    get_book_version, get_user_profile_version, get_explore_version, shelf_mix_refreshes)
+from bibliome.infrastructure import FragmentCache, StaleWhileRevalidateCache, page_etag, etag_matches, validator_headers
+from bibliome.infrastructure.http_clients import close_http_clients
+from bibliome.infrastructure.identity_cache import identity_cache
+from typing import NamedTuple
 
 load_dotenv()
 
@@ -51,6 +61,24 @@ process_monitor = None
 # Initialize performance monitoring
 perf_monitor = None
 
+# Rendered shelf header + books section for viewers without per-viewer state,
+# keyed by (shelf id, shelf version, view, permission tier); see view_shelf
+shelf_fragments = FragmentCache("shelf_fragments", max_entries=int(os.getenv('SHELF_FRAGMENT_CACHE_SIZE', 2000)))
+SHARED_SHELF_TIERS = ('anonymous', 'reader')
+
+# Whole pages that are identical for every anonymous visitor: the landing
+# page, and explore page 1 per anonymous smart-mix seed; see anonymous_page
+anonymous_pages = StaleWhileRevalidateCache("anonymous_pages",
+                                            ttl=int(os.getenv('ANONYMOUS_PAGE_CACHE_TTL', 60)),
+                                            max_stale=int(os.getenv('ANONYMOUS_PAGE_CACHE_MAX_STALE', 600)))
+# Anonymous sessions draw their smart-mix seed from this many values, so
+# their first explore page is one of a few cacheable pages
+ANONYMOUS_MIX_SEEDS = int(os.getenv('ANONYMOUS_MIX_SEEDS', 8))
+
+# In-process caches reported on /admin/performance
+page_caches = [shelf_fragments, anonymous_pages, following_cache, book_search_cache, book_isbn_cache, identity_cache,
+               following_fetches, book_lookups, repo_fetches, shelf_mix_refreshes]
+
 # Initialize external services
 bluesky_auth = BlueskyAuth()
 book_api = BookAPIClient()
@@ -88,6 +116,11 @@ async def before_handler(req, sess):
             perf_monitor = init_performance_monitoring(db_tables)
     return auth_beforeware(req, sess, db_tables, oauth_client)
 
+async def get_repository():
+    """The AsyncRepository over db_tables; async routes use it instead of blocking on SQLite."""
+    from database_manager import db_manager
+    return await db_manager.get_repository()
+
 # Initialize FastHTML app with persistent sessions
 # Use HTTPS-only cookies in production (controlled by environment variable)
 sess_https_only = os.getenv('SESSION_HTTPS_ONLY', 'true').lower() == 'true'
@@ -99,6 +132,7 @@ app, rt = fast_app(
     session_cookie='bibliome_session',
     same_site='lax',  # Good balance of security and functionality
     sess_https_only=sess_https_only,  # Defaults to True for production security
+    on_shutdown=[close_http_clients],  # Drain pooled book API / cover connections
     hdrs=(
         picolink,
         Link(rel="preconnect", href="https://fonts.googleapis.com"),
@@ -203,48 +237,61 @@ def serve_cached_cover(filename: str):
     
     return FileResponse(str(cover_path), headers=headers)
 
+def anonymous_page(key, render):
+    """Cached rendering of a page body shared by anonymous visitors, and the BackgroundTask refreshing it if stale.
+
+    render returns the page body as an XML string. A stale body is served at
+    once and refreshed after the response; only a cold or expired cache
+    renders inline. Returns (body, task), task None when nothing needs refreshing.
+    """
+    page, refresh = anonymous_pages.get_or_compute(key, render)
+    return page.value, BackgroundTask(refresh) if refresh else None
+
+def render_landing_body() -> str:
+    """Render the anonymous landing page below the head."""
+    public_shelves = get_public_shelves_with_stats(db_tables, limit=6)
+    recent_books = get_recent_community_books(db_tables, limit=15)
+    return "".join(to_xml(part) for part in (
+        NavBar(None),
+        LandingPageHero(),
+        FeaturesSection(),
+        CommunityReadingSection(recent_books),
+        HowItWorksSection(),
+        PublicShelvesPreview(public_shelves),
+        UniversalFooter()
+    ))
+
 # Home page
 @rt("/")
-def index(auth, req, page: int = 1):
+def index(auth, req, page: int = 1, cursor: str = ""):
     """Homepage - beautiful landing page for visitors, dashboard for logged-in users."""
     if not auth:
-        # Show beautiful landing page for anonymous users
-        public_shelves = get_public_shelves_with_stats(db_tables, limit=6)
-        recent_books = get_recent_community_books(db_tables, limit=15)
+        # Show beautiful landing page for anonymous users, the same for every visitor
+        body, refresh_task = anonymous_page(('landing',), render_landing_body)
 
         # Generate meta tags for homepage
         meta_tags = create_homepage_meta_tags(req)
 
-        return (
+        page_parts = (
             Title("Bibliome - Building the very best reading lists, together"),
             *meta_tags,
             Favicon(light_icon='/static/bibliome.ico', dark_icon='/static/bibliome.ico'),
-            NavBar(auth),
-            LandingPageHero(),
-            FeaturesSection(),
-            CommunityReadingSection(recent_books),
-            HowItWorksSection(),
-            PublicShelvesPreview(public_shelves),
-            UniversalFooter()
+            NotStr(body)
         )
+        return (*page_parts, refresh_task) if refresh_task else page_parts
     else:
         # Show user's dashboard with pagination
-        from models import get_user_shelves_count
-        from components import Pagination
+        from components import CursorPagination
         
         current_auth_did = get_current_user_did(auth)
         logger.debug(f"Loading dashboard for user DID: {current_auth_did}")
         
-        # Pagination setup
+        # Pagination setup (cursor pages; ?page= still works for old links)
         page = max(1, int(page))
         limit = 12
         offset = (page - 1) * limit
         
-        # Get total count for pagination
-        total_count = get_user_shelves_count(current_auth_did, db_tables)
-        total_pages = max(1, (total_count + limit - 1) // limit)
-        
-        user_shelves = get_user_shelves(current_auth_did, db_tables, limit=limit, offset=offset)
+        user_shelves = get_user_shelves(current_auth_did, db_tables, limit=limit, offset=offset, cursor=cursor)
 
         content = [
             Div(
@@ -258,16 +305,18 @@ def index(auth, req, page: int = 1):
 
         # Add user's shelves with proper permission checking
         if user_shelves:
+            from models import PermissionContext
+            perms = PermissionContext(current_auth_did, db_tables).load(user_shelves)
             shelf_cards = []
             for shelf in user_shelves:
                 is_owner = getattr(shelf, 'user_relationship', 'owner') == 'owner'
-                can_edit = can_edit_bookshelf(shelf, current_auth_did, db_tables)
+                can_edit = perms.can_edit_bookshelf(shelf)
                 shelf_cards.append(BookshelfCard(shelf, is_owner=is_owner, can_edit=can_edit))
             content.append(Div(*shelf_cards, cls="bookshelf-grid"))
             
             # Add pagination if needed
-            if total_pages > 1:
-                content.append(Pagination(current_page=page, total_pages=total_pages, base_url="/"))
+            content.append(CursorPagination("/", user_shelves.next_cursor, user_shelves.prev_cursor,
+                                            show_first=bool(cursor) or page > 1))
         else:
             content.append(EmptyState(
                 "You haven't created any bookshelves yet",
@@ -461,7 +510,8 @@ async def upload_db(auth, req):
         
         file_content = await db_file.read()
         db_path = get_database_path()
-        upload_database(db_path, file_content)
+        repo = await get_repository()
+        await repo.write(upload_database, db_path, file_content)
         
         return Div("Database restored successfully. The application will now restart.", 
                    cls="alert-success", 
@@ -934,6 +984,12 @@ def admin_health_check(auth):
             "error": str(e)
         }
     
+    # Read connection pool occupancy and wait times
+    from models import get_read_pool
+    read_pool = get_read_pool()
+    if read_pool:
+        health_status["checks"]["read_pool"] = {"status": "healthy", **read_pool.stats()}
+    
     # Process monitor check
     try:
         monitor = get_process_monitor()
@@ -1545,6 +1601,17 @@ def admin_performance_apis(auth):
     return PerformanceApiTable(apis)
 
 
+@rt("/admin/performance/caches")
+def admin_performance_caches(auth):
+    """HTMX endpoint for in-process cache hit/miss stats."""
+    if not is_admin(auth):
+        return ""
+
+    from components import CacheStatsTable
+
+    return CacheStatsTable([cache.stats() for cache in page_caches])
+
+
 @rt("/admin/performance/slow-requests")
 def admin_performance_slow_requests(auth):
     """HTMX endpoint for slow requests list."""
@@ -1591,8 +1658,8 @@ async def login_handler(handle: str, password: str, sess):
         }
         
         # Store user in database - check if user exists first to avoid constraint errors
-        try:
-            existing_user = db_tables['users'][user_data['did']]
+        repo = await get_repository()
+        if await repo.get('users', user_data['did']):
             # User exists, update their info and last login
             update_data = {
                 'handle': user_data['handle'],
@@ -1600,12 +1667,10 @@ async def login_handler(handle: str, password: str, sess):
                 'avatar_url': user_data['avatar_url'],
                 'last_login': datetime.now()
             }
-            db_tables['users'].update(update_data, user_data['did'])
+            await repo.update('users', update_data, user_data['did'])
             logger.debug(f"Existing user updated in database: {user_data['handle']}")
-        except (IndexError, Exception):
-            # User doesn't exist, create them
-            # Note: FastLite can throw different exceptions when records aren't found
-            db_tables['users'].insert(**db_user_data)
+        else:
+            await repo.insert('users', **db_user_data)
             logger.info(f"New user created in database: {user_data['handle']}")
         
         # Store full auth data (including JWTs) in session
@@ -1615,7 +1680,10 @@ async def login_handler(handle: str, password: str, sess):
         # Following list is fetched in background to avoid blocking login
         async def sync_following_in_background(user_data_copy, auth_instance):
             try:
-                following_dids = auth_instance.get_following_list(user_data_copy)
+                following_dids = await asyncio.to_thread(auth_instance.get_following_list, user_data_copy)
+                if following_dids:
+                    from models import sync_follow_graph
+                    await repo.write(sync_follow_graph, user_data_copy['did'], following_dids, repo.db_tables)
                 await trigger_login_sync(user_data_copy['did'], following_dids)
                 logger.info(f"Background sync completed for {user_data_copy['handle']} with {len(following_dids)} following")
             except Exception as e:
@@ -1657,7 +1725,8 @@ async def logout_handler(sess):
         try:
             user_did = auth_data.get('did')
             if user_did and db_tables:
-                user = db_tables['users'].get(user_did)
+                repo = await get_repository()
+                user = await repo.get('users', user_did)
                 if user:
                     refresh_token = getattr(user, 'oauth_refresh_token', None)
                     dpop_private_key = getattr(user, 'oauth_dpop_private_jwk', None)
@@ -1679,7 +1748,7 @@ async def logout_handler(sess):
                             logger.warning(f"Failed to revoke OAuth tokens: {e}")
 
                     # Clear OAuth tokens from database
-                    db_tables['users'].update({
+                    await repo.update('users', {
                         'oauth_access_token': None,
                         'oauth_refresh_token': None,
                         'oauth_token_expires_at': None,
@@ -1890,15 +1959,15 @@ async def oauth_callback(code: str, state: str, sess):
         }
 
         # Store or update user in database
-        try:
-            existing_user = db_tables['users'][did]
+        repo = await get_repository()
+        if await repo.get('users', did):
             # Update existing user
-            db_tables['users'].update(db_user_data, did)
+            await repo.update('users', db_user_data, did)
             logger.info(f"Updated existing user with OAuth tokens: {handle}")
-        except (IndexError, Exception):
+        else:
             # Create new user
             db_user_data['created_at'] = datetime.now()
-            db_tables['users'].insert(**db_user_data)
+            await repo.insert('users', **db_user_data)
             logger.info(f"Created new user with OAuth tokens: {handle}")
 
         # Prepare session auth data
@@ -2000,8 +2069,90 @@ def create_shelf(name: str, description: str, privacy: str, auth, sess, self_joi
         return RedirectResponse('/shelf/new', status_code=303)
 
 
+def listing_total(shelves) -> int:
+    """Total size of a listing page fetched with with_total (0 if the listing failed to load)."""
+    return getattr(shelves, 'total', None) or 0
+
+def smart_mix_seed(session, auth=None) -> int:
+    """This session's seed for the smart-mix shuffle, so its explore pages keep one order.
+
+    Anonymous sessions share ANONYMOUS_MIX_SEEDS seeds so their first page can be cached.
+    """
+    if 'mix_seed' not in session:
+        session['mix_seed'] = random.randrange(1, ANONYMOUS_MIX_SEEDS + 1) if not auth else random.randrange(1, 2**31)
+    return session['mix_seed']
+
+def conditional_get(req, auth, *parts):
+    """Validators for a page rendered from parts, and a 304 response if the client already has it.
+
+    Returns (not_modified, headers): not_modified is None when the page has to
+    be rendered, and headers go on the rendered page's response.
+    """
+    etag = page_etag(get_current_user_did(auth), auth and (auth.get('handle'), auth.get('display_name'), auth.get('avatar_url')),
+                     req.headers.get('HX-Request'), *parts)
+    headers = validator_headers(etag, private=bool(auth))
+    if etag_matches(req.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers), []
+    return None, [HttpHeader(name, value) for name, value in headers.items()]
+
+def anonymous_explore_content(query: str, page: int, cursor: str, seed: int, limit: int) -> list:
+    """The explore page content for anonymous visitors: a search box over public shelves, else the smart mix."""
+    from models import get_mixed_public_shelves
+    from components import UnifiedExploreHero
+    
+    offset = (page - 1) * limit
+    if query:
+        # Anonymous users can still search, but with limited functionality
+        from models import search_shelves
+        shelves = search_shelves(
+            db_tables,
+            query=query,
+            privacy="public",  # Force public for anonymous users
+            sort_by="relevance",
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            with_total=True
+        )
+    else:
+        # Default view for anonymous users - mixed public shelves
+        shelves = get_mixed_public_shelves(db_tables, limit=limit, offset=offset, cursor=cursor, with_total=True,
+                                           seed=seed)
+    total_shelf_count = listing_total(shelves)
+    total_pages = max(1, (total_shelf_count + limit - 1) // limit)
+    
+    # Simple search form for anonymous users (just a search box)
+    simple_search = Form(
+        Div(
+            Input(
+                name="query",
+                type="search",
+                placeholder="Search public bookshelves...",
+                value=query,
+                cls="explore-search-input"
+            ),
+            Button("🔍 Search", type="submit", cls="explore-search-btn primary"),
+            cls="simple-search-row"
+        ),
+        action="/explore",
+        method="get",
+        cls="simple-explore-search-form"
+    )
+    
+    return [
+        UnifiedExploreHero(auth=None),
+        simple_search,
+        PublicShelvesGrid(shelves, page=page, total_pages=total_pages, total_count=total_shelf_count,
+                          cursor=cursor, params={"query": query})
+    ]
+
+def render_anonymous_explore_body(seed: int, limit: int) -> str:
+    """Render the first anonymous explore page for a smart-mix seed below the head."""
+    content = anonymous_explore_content("", 1, "", seed, limit)
+    return "".join(to_xml(part) for part in (NavBar(None), Container(*content), UniversalFooter()))
+
 @rt("/explore")
-def explore_page(auth, req, query: str = "", privacy: str = "public", sort_by: str = "smart_mix", page: int = 1, open_to_contributions: str = "", book_title: str = "", book_author: str = "", book_isbn: str = ""):
+def explore_page(auth, req, session, query: str = "", privacy: str = "public", sort_by: str = "smart_mix", page: int = 1, open_to_contributions: str = "", book_title: str = "", book_author: str = "", book_isbn: str = "", cursor: str = ""):
     """Unified explore page - simple discovery for anonymous users, enhanced search for logged-in users."""
     from models import search_shelves_enhanced, get_mixed_public_shelves
     from components import UnifiedExploreHero, ExploreSearchForm, SearchResultsGrid
@@ -2010,6 +2161,34 @@ def explore_page(auth, req, query: str = "", privacy: str = "public", sort_by: s
     limit = 12
     offset = (page - 1) * limit
     viewer_did = get_current_user_did(auth)
+    seed = smart_mix_seed(session, auth)
+    meta_tags = create_explore_meta_tags(req)
+    # A stale smart mix is still served; it is ranked again after this response
+    mix_task = shelf_mix_refresh_task()
+    
+    if not auth and not (query or cursor) and page == 1:
+        # The default first page is the same for every anonymous session with this
+        # seed; its validators follow the cached page, which may trail the listings
+        body, refresh_task = anonymous_page(('explore', seed), partial(render_anonymous_explore_body, seed, limit))
+        not_modified, validators = conditional_get(req, auth, 'explore', body)
+        if not_modified:
+            not_modified.background = mix_task
+            return not_modified
+        page_parts = (
+            Title("Explore - Bibliome"),
+            *meta_tags,
+            Favicon(light_icon='/static/bibliome.ico', dark_icon='/static/bibliome.ico'),
+            NotStr(body),
+            *validators
+        )
+        return (*page_parts, *(task for task in (refresh_task, mix_task) if task))
+    
+    # Listings only change with a write to some shelf or a new smart-mix
+    # generation; the filters are part of the URL the validators belong to
+    not_modified, validators = conditional_get(req, auth, 'explore', get_explore_version(db_tables), seed)
+    if not_modified:
+        not_modified.background = mix_task
+        return not_modified
     
     # Convert open_to_contributions string to boolean or None
     open_to_contributions_filter = None
@@ -2018,10 +2197,6 @@ def explore_page(auth, req, query: str = "", privacy: str = "public", sort_by: s
     elif open_to_contributions == "false":
         open_to_contributions_filter = False
     
-    # Get total count for pagination and display
-    total_shelf_count = get_public_shelves_count(db_tables)
-    total_pages = max(1, (total_shelf_count + limit - 1) // limit)
-    
     if auth:
         # Logged-in users get enhanced explore with search functionality
         if query or sort_by != "smart_mix" or open_to_contributions or book_title or book_author or book_isbn:
@@ -2036,11 +2211,16 @@ def explore_page(auth, req, query: str = "", privacy: str = "public", sort_by: s
                 sort_by=sort_by,
                 limit=limit,
                 offset=offset,
-                open_to_contributions=open_to_contributions_filter
+                open_to_contributions=open_to_contributions_filter,
+                cursor=cursor,
+                with_total=True,
+                seed=seed
             )
         else:
             # Default view - show smart mix of active and newest shelves
-            shelves = get_mixed_public_shelves(db_tables, limit=limit, offset=offset)
+            shelves = get_mixed_public_shelves(db_tables, limit=limit, offset=offset, cursor=cursor, with_total=True,
+                                               seed=seed)
+        total_shelf_count = listing_total(shelves)
         
         # Build content for logged-in users
         content = [
@@ -2063,52 +2243,13 @@ def explore_page(auth, req, query: str = "", privacy: str = "public", sort_by: s
                 privacy=privacy,
                 sort_by=sort_by,
                 open_to_contributions=open_to_contributions,
-                total_shelf_count=total_shelf_count
+                total_shelf_count=total_shelf_count,
+                cursor=cursor
             )
         ]
     else:
         # Anonymous users get simple discovery experience
-        if query:
-            # Anonymous users can still search, but with limited functionality
-            from models import search_shelves
-            shelves = search_shelves(
-                db_tables,
-                query=query,
-                privacy="public",  # Force public for anonymous users
-                sort_by="updated_at",
-                limit=limit,
-                offset=offset
-            )
-        else:
-            # Default view for anonymous users - mixed public shelves
-            shelves = get_mixed_public_shelves(db_tables, limit=limit, offset=offset)
-        
-        # Simple search form for anonymous users (just a search box)
-        simple_search = Form(
-            Div(
-                Input(
-                    name="query",
-                    type="search",
-                    placeholder="Search public bookshelves...",
-                    value=query,
-                    cls="explore-search-input"
-                ),
-                Button("🔍 Search", type="submit", cls="explore-search-btn primary"),
-                cls="simple-search-row"
-            ),
-            action="/explore",
-            method="get",
-            cls="simple-explore-search-form"
-        )
-        
-        content = [
-            UnifiedExploreHero(auth=None),
-            simple_search,
-            PublicShelvesGrid(shelves, page=page, total_pages=total_pages, total_count=total_shelf_count)
-        ]
-    
-    # Generate meta tags for explore page
-    meta_tags = create_explore_meta_tags(req)
+        content = anonymous_explore_content(query, page, cursor, seed, limit)
     
     return (
         Title("Explore - Bibliome"),
@@ -2116,7 +2257,9 @@ def explore_page(auth, req, query: str = "", privacy: str = "public", sort_by: s
         Favicon(light_icon='/static/bibliome.ico', dark_icon='/static/bibliome.ico'),
         NavBar(auth),
         Container(*content),
-        UniversalFooter()
+        UniversalFooter(),
+        *validators,
+        *([mix_task] if mix_task else [])
     )
 
 # Redirect /search to /explore
@@ -2145,8 +2288,22 @@ def search_redirect(query: str = "", privacy: str = "public", sort_by: str = "sm
     
     return RedirectResponse(redirect_url, status_code=301)  # Permanent redirect
 
+def shelf_mix_refresh_task():
+    """BackgroundTask that ranks the explore smart mix again if it is stale, else None."""
+    from models import shelf_mix_is_stale, refresh_stale_shelf_mix
+    if shelf_mix_is_stale(db_tables):
+        return BackgroundTask(refresh_stale_shelf_mix, db_tables)
+    return None
+
+def follow_graph_refresh_task(auth):
+    """BackgroundTask that refreshes the viewer's stored follow list if it is stale, else None."""
+    from models import follow_graph_is_stale, refresh_follow_graph
+    if follow_graph_is_stale(auth['did'], db_tables):
+        return BackgroundTask(refresh_follow_graph, auth, db_tables, bluesky_auth)
+    return None
+
 @rt("/network")
-def network_page(auth, activity_type: str = "all", date_filter: str = "all", page: int = 1):
+def network_page(auth, activity_type: str = "all", date_filter: str = "all", page: int = 1, cursor: str = ""):
     """Display the full network activity page with filtering and pagination."""
     if not auth:
         return RedirectResponse('/auth/login', status_code=303)
@@ -2164,14 +2321,17 @@ def network_page(auth, activity_type: str = "all", date_filter: str = "all", pag
         network_activities = get_network_activity(
             auth, db_tables, bluesky_auth, 
             limit=limit, offset=offset, 
-            activity_type=activity_type, date_filter=date_filter
+            activity_type=activity_type, date_filter=date_filter, cursor=cursor,
+            with_total=True
         )
         
-        # Get total count for pagination
-        total_count = get_network_activity_count(
-            auth, db_tables, bluesky_auth,
-            activity_type=activity_type, date_filter=date_filter
-        )
+        # Total comes back with the page; count separately only if the page couldn't tell
+        total_count = network_activities.total
+        if total_count is None:
+            total_count = get_network_activity_count(
+                auth, db_tables, bluesky_auth,
+                activity_type=activity_type, date_filter=date_filter
+            )
         total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
         
         logger.info(f"Network activities loaded: {len(network_activities)} activities found, {total_count} total")
@@ -2185,17 +2345,20 @@ def network_page(auth, activity_type: str = "all", date_filter: str = "all", pag
                 page=page, 
                 total_pages=total_pages,
                 activity_type=activity_type,
-                date_filter=date_filter
+                date_filter=date_filter,
+                cursor=cursor
             ) if network_activities else EmptyNetworkStateFullPage()
         ]
         
-        return (
+        page_parts = (
             Title("Your Network - Bibliome"),
             Favicon(light_icon='/static/bibliome.ico', dark_icon='/static/bibliome.ico'),
             NavBar(auth),
             Container(*content),
             UniversalFooter()
         )
+        refresh_task = follow_graph_refresh_task(auth)
+        return (*page_parts, refresh_task) if refresh_task else page_parts
         
     except Exception as e:
         logger.error(f"Error loading network page: {e}", exc_info=True)
@@ -2238,6 +2401,12 @@ def user_profile(handle: str, auth, req):
         if is_own_profile:
             return RedirectResponse('/', status_code=303)
         
+        # The lists below only change with the user's activity and shelves; which
+        # of them show depends only on whether the viewer is logged in
+        not_modified, validators = conditional_get(req, auth, 'user', user, get_user_profile_version(user.did, db_tables))
+        if not_modified:
+            return not_modified
+        
         # Get user's public content (filtered based on viewer permissions)
         public_shelves = get_user_public_shelves(user.did, db_tables, viewer_did=viewer_did, limit=12)
         user_activities = get_user_activity(user.did, db_tables, viewer_did=viewer_did, limit=15)
@@ -2259,7 +2428,8 @@ def user_profile(handle: str, auth, req):
             Favicon(light_icon='/static/bibliome.ico', dark_icon='/static/bibliome.ico'),
             NavBar(auth),
             Container(*content),
-            UniversalFooter()
+            UniversalFooter(),
+            *validators
         )
         
     except Exception as e:
@@ -2321,6 +2491,15 @@ def book_detail_page(book_id: int, auth, req, activity_filter: str = "all", from
                 UniversalFooter()
             )
         
+        # The book's activity and the versions of the shelves holding its work
+        # cover everything below, so the browser's copy may still be current
+        from models import get_user_role
+        not_modified, validators = conditional_get(req, auth, 'book', book_id, get_book_version(book_id, db_tables),
+                                                   get_user_role(shelf, user_did, db_tables))
+        if not_modified:
+            return not_modified
+        book = get_book_by_id(book_id, db_tables) or book
+        
         # Determine bookshelf context for comments
         bookshelf_context_id = None
         context_shelf = None
@@ -2553,7 +2732,8 @@ def book_detail_page(book_id: int, auth, req, activity_filter: str = "all", from
             Favicon(light_icon='/static/bibliome.ico', dark_icon='/static/bibliome.ico'),
             NavBar(auth),
             Container(*content),
-            UniversalFooter()
+            UniversalFooter(),
+            *validators
         )
         
     except Exception as e:
@@ -2570,9 +2750,83 @@ def book_detail_page(book_id: int, auth, req, activity_filter: str = "all", from
             UniversalFooter()
         )
 
+class ShelfFragment(NamedTuple):
+    """The rendered, cacheable part of a shelf page and what its meta tags need."""
+    header: str
+    books: str
+    book_count: int
+    sample_books: list
+
+def render_shelf_fragment(shelf, view: str, auth, user_did, user_auth_status: str, can_add: bool, can_vote: bool,
+                          can_remove: bool, can_edit: bool, can_share: bool) -> ShelfFragment:
+    """Render the shelf header and books section of view_shelf."""
+    # Get books with upvote counts using the new helper function
+    from models import get_books_with_upvotes
+    shelf_books = get_books_with_upvotes(shelf.id, user_did, db_tables)
+    
+    # Build action buttons
+    action_buttons = []
+    if can_edit or can_share:
+        action_buttons.append(A("Manage", href=f"/shelf/{shelf.slug}/manage", cls="secondary"))
+    
+    # Get shelf creator information
+    shelf_creator = None
+    try:
+        shelf_creator = db_tables['users'][shelf.owner_did]
+    except (IndexError, KeyError):
+        # Creator not found in local database, create placeholder
+        shelf_creator = type('User', (), {
+            'did': shelf.owner_did,
+            'handle': f"user-{shelf.owner_did[-8:]}",
+            'display_name': f"User {shelf.owner_did[-8:]}",
+            'avatar_url': ''
+        })()
+    
+    # New Shelf Header with view toggle, share button, and creator info
+    shelf_header = ShelfHeader(shelf, action_buttons, current_view=view, can_share=can_share, user_is_logged_in=bool(auth), creator=shelf_creator)
+    
+    # Always create a books-container div with book-grid inside for consistent HTMX targeting
+    if shelf_books:
+        # One query for every card's comment preview
+        from models import get_comment_previews
+        comment_previews = get_comment_previews([book.id for book in shelf_books], db_tables)
+        if view == "list":
+            from components import BookListView
+            books_content = BookListView(shelf_books, can_upvote=can_vote, can_remove=can_remove, user_auth_status=user_auth_status, comment_previews=comment_previews)
+        else:  # grid view (default)
+            books_content = Div(*[book.as_interactive_card(
+                can_upvote=can_vote, 
+                user_has_upvoted=book.user_has_upvoted,
+                upvote_count=book.upvote_count,
+                can_remove=can_remove,
+                user_auth_status=user_auth_status,
+                comment=comment_previews.get(book.id)
+            ) for book in shelf_books], cls="book-grid", id="book-grid")
+        
+        books_section = Section(
+            Div(books_content, id="books-container"),
+            cls=f"books-section {view}-view",
+            id="books-section"
+        )
+    else:
+        books_section = Section(
+            Div(
+                EnhancedEmptyState(can_add=can_add, shelf_id=shelf.id, user_auth_status=user_auth_status),
+                # Always include an empty book-grid div for HTMX targeting
+                Div(id="book-grid", cls="book-grid"),
+                id="books-container"
+            ),
+            cls=f"books-section {view}-view",
+            id="books-section"
+        )
+    
+    return ShelfFragment(to_xml(shelf_header), to_xml(books_section), len(shelf_books),
+                         get_sample_book_titles(shelf_books, max_titles=3))
+
 @rt("/shelf/{slug}")
 def view_shelf(slug: str, auth, req, view: str = "grid"):
     """Display a bookshelf."""
+    view = "list" if view == "list" else "grid"
     try:
         shelf = get_shelf_by_slug(slug, db_tables)
         if not shelf:
@@ -2582,58 +2836,51 @@ def view_shelf(slug: str, auth, req, view: str = "grid"):
                 A("← Back to Home", href="/")
             )
         
-        # Check permissions
+        # Check permissions (one role lookup answers every check below)
+        from models import PermissionContext
         user_did = get_current_user_did(auth)
-        if not can_view_bookshelf(shelf, user_did, db_tables):
+        perms = PermissionContext(user_did, db_tables)
+        if not perms.can_view_bookshelf(shelf):
             return NavBar(auth), Container(
                 H1("Access Denied"),
                 P("This bookshelf is private and you don't have permission to view it."),
                 A("← Back to Home", href="/")
             )
         
-        # Import the new permission functions
-        from models import (can_add_books, can_vote_books, can_remove_books, 
-                           can_edit_bookshelf, can_manage_members, can_generate_invites)
-        
-        can_add = can_add_books(shelf, user_did, db_tables)
-        can_vote = can_vote_books(shelf, user_did, db_tables)
-        can_remove = can_remove_books(shelf, user_did, db_tables)
-        can_edit = can_edit_bookshelf(shelf, user_did, db_tables)
-        can_manage = can_manage_members(shelf, user_did, db_tables)
-        can_share = can_generate_invites(shelf, user_did, db_tables)
-        
-        # Get books with upvote counts using the new helper function
-        from models import get_books_with_upvotes
-        shelf_books = get_books_with_upvotes(shelf.id, user_did, db_tables)
-        
-        # Generate meta tags for bookshelf with dynamic content
-        book_count = len(shelf_books)
-        sample_books = get_sample_book_titles(shelf_books, max_titles=3)
-        meta_tags = create_bookshelf_meta_tags(shelf, req, book_count=book_count, sample_books=sample_books)
+        # Every write the page shows bumps the shelf's version, so the browser's
+        # copy is current if it was rendered at this version for this viewer
+        version = get_shelf_version(shelf.id, db_tables)
+        not_modified, validators = conditional_get(req, auth, 'shelf', shelf.id, version, view, perms.role(shelf))
+        if not_modified:
+            return not_modified
+        # Reload the shelf so the page is no older than the version in its validators
+        shelf = get_shelf_by_slug(slug, db_tables) or shelf
+        
+        can_add = perms.can_add_books(shelf)
+        can_vote = perms.can_vote_books(shelf)
+        can_remove = perms.can_remove_books(shelf)
+        can_edit = perms.can_edit_bookshelf(shelf)
+        can_manage = perms.can_manage_members(shelf)
+        can_share = perms.can_generate_invites(shelf)
         
         # Determine user authentication status
         user_auth_status = "anonymous" if not auth else "logged_in"
         
-        # Build action buttons
-        action_buttons = []
-        if can_edit or can_share:
-            action_buttons.append(A("Manage", href=f"/shelf/{shelf.slug}/manage", cls="secondary"))
+        # The header and book grid are shared between viewers of the same tier
+        # until the next write to the shelf bumps its version
+        tier = perms.tier(shelf)
+        fragment_key = None
+        if tier in SHARED_SHELF_TIERS:
+            fragment_key = (shelf.id, version, view, tier)
+        fragment = shelf_fragments.get(fragment_key) if fragment_key else None
+        if fragment is None:
+            fragment = render_shelf_fragment(shelf, view, auth, user_did, user_auth_status, can_add,
+                                             can_vote, can_remove, can_edit, can_share)
+            if fragment_key:
+                shelf_fragments.put(fragment_key, fragment)
         
-        # Get shelf creator information
-        shelf_creator = None
-        try:
-            shelf_creator = db_tables['users'][shelf.owner_did]
-        except (IndexError, KeyError):
-            # Creator not found in local database, create placeholder
-            shelf_creator = type('User', (), {
-                'did': shelf.owner_did,
-                'handle': f"user-{shelf.owner_did[-8:]}",
-                'display_name': f"User {shelf.owner_did[-8:]}",
-                'avatar_url': ''
-            })()
-        
-        # New Shelf Header with view toggle, share button, and creator info
-        shelf_header = ShelfHeader(shelf, action_buttons, current_view=view, can_share=can_share, user_is_logged_in=bool(auth), creator=shelf_creator)
+        # Generate meta tags for bookshelf with dynamic content
+        meta_tags = create_bookshelf_meta_tags(shelf, req, book_count=fragment.book_count, sample_books=fragment.sample_books)
         
         # Show self-join button if applicable (logged in user, public shelf with self-join enabled, not already a member)
         self_join_section = None
@@ -2648,43 +2895,11 @@ def view_shelf(slug: str, auth, req, view: str = "grid"):
         # Show book search form if user can add books
         add_books_section = Section(AddBooksToggle(shelf.id), cls="add-books-section") if can_add else None
         
-        # Always create a books-container div with book-grid inside for consistent HTMX targeting
-        if shelf_books:
-            if view == "list":
-                from components import BookListView
-                books_content = BookListView(shelf_books, can_upvote=can_vote, can_remove=can_remove, user_auth_status=user_auth_status)
-            else:  # grid view (default)
-                books_content = Div(*[book.as_interactive_card(
-                    can_upvote=can_vote, 
-                    user_has_upvoted=book.user_has_upvoted,
-                    upvote_count=book.upvote_count,
-                    can_remove=can_remove,
-                    user_auth_status=user_auth_status,
-                    db_tables=db_tables
-                ) for book in shelf_books], cls="book-grid", id="book-grid")
-            
-            books_section = Section(
-                Div(books_content, id="books-container"),
-                cls=f"books-section {view}-view",
-                id="books-section"
-            )
-        else:
-            books_section = Section(
-                Div(
-                    EnhancedEmptyState(can_add=can_add, shelf_id=shelf.id, user_auth_status=user_auth_status),
-                    # Always include an empty book-grid div for HTMX targeting
-                    Div(id="book-grid", cls="book-grid"),
-                    id="books-container"
-                ),
-                cls=f"books-section {view}-view",
-                id="books-section"
-            )
-        
         content = [
-            shelf_header,
+            NotStr(fragment.header),
             self_join_section,
             add_books_section,
-            books_section,
+            NotStr(fragment.books),
             # Share modal container
             Div(id="share-modal-container"),
             # Comment modal container
@@ -2901,7 +3116,8 @@ def view_shelf(slug: str, auth, req, view: str = "grid"):
             Favicon(light_icon='/static/bibliome.ico', dark_icon='/static/bibliome.ico'),
             NavBar(auth),
             Container(*content),
-            UniversalFooter()
+            UniversalFooter(),
+            *validators
         )
         
     except Exception as e:
@@ -2930,10 +3146,13 @@ async def search_books_api(query: str, bookshelf_id: int, auth):
     
     try:
         # Check if user can add books to this bookshelf
-        shelf = db_tables['bookshelves'][bookshelf_id]
+        repo = await get_repository()
+        shelf = await repo.get('bookshelves', bookshelf_id)
+        if shelf is None:
+            return Div("Bookshelf not found.", cls="search-message")
         user_did = get_current_user_did(auth)
         from models import can_add_books
-        if not can_add_books(shelf, user_did, db_tables):
+        if not await repo.read(can_add_books, shelf, user_did, repo.db_tables):
             return Div("You don't have permission to add books to this shelf.", cls="search-message")
         
         logger.info(f"Book search request: '{query.strip()}' for shelf {bookshelf_id}")
@@ -3255,18 +3474,15 @@ def toggle_book(book_id: int, auth):
         if not can_add_books(shelf, user_did, db_tables):
             return Div("You don't have permission to add books to this shelf.", cls="error")
         
-        # Check if user already has a book record for this title/author/ISBN combination
+        # Check if user already has a book record for this work on the shelf
+        from models import get_work_votes, get_shelf_work
+        work_votes = get_work_votes(book_id, user_did, db_tables)
         existing_user_book = None
-        try:
-            # Find user's book record for this specific book (by title, author, ISBN)
-            user_books = list(db_tables['books'](
-                "bookshelf_id=? AND added_by_did=? AND title=? AND author=? AND COALESCE(isbn, '') = COALESCE(?, '')", 
-                (book.bookshelf_id, user_did, book.title, book.author, book.isbn or '')
-            ))
-            if user_books:
-                existing_user_book = user_books[0]
-        except:
-            pass
+        if work_votes and work_votes['user_book_id']:
+            try:
+                existing_user_book = db_tables['books'][work_votes['user_book_id']]
+            except:
+                pass
         
         if existing_user_book:
             # User has a +1 already - remove it (-1 action)
@@ -3283,19 +3499,17 @@ def toggle_book(book_id: int, auth):
             # Delete the user's book record from local database
             db_tables['books'].delete(existing_user_book.id)
             
-            # Count remaining book records for this title/author/ISBN
-            remaining_books = list(db_tables['books'](
-                "bookshelf_id=? AND title=? AND author=? AND COALESCE(isbn, '') = COALESCE(?, '')", 
-                (book.bookshelf_id, book.title, book.author, book.isbn or '')
-            ))
+            # Count remaining book records for this work
+            shelf_work = get_shelf_work(book.bookshelf_id, work_votes['work_id'], db_tables)
             
             # If no more book records exist, hide the book from view
-            if not remaining_books:
+            if not shelf_work:
                 logger.info(f"Book '{book.title}' hidden from shelf due to no remaining +1 votes")
                 return ""
             else:
-                # Return updated card with new count
-                new_vote_count = len(remaining_books)
+                # Return updated card with new count, represented by a book record that still exists
+                new_vote_count = shelf_work['vote_count']
+                book.id = shelf_work['first_book_id']
                 book.upvote_count = new_vote_count
                 book.user_has_upvoted = False
                 return book.as_interactive_card(can_upvote=True, user_has_upvoted=False, upvote_count=new_vote_count)
@@ -3336,14 +3550,11 @@ def toggle_book(book_id: int, auth):
             except Exception as e:
                 logger.warning(f"Could not log book addition activity: {e}")
             
-            # Count total book records for this title/author/ISBN
-            all_books = list(db_tables['books'](
-                "bookshelf_id=? AND title=? AND author=? AND COALESCE(isbn, '') = COALESCE(?, '')", 
-                (book.bookshelf_id, book.title, book.author, book.isbn or '')
-            ))
+            # Count total book records for this work
+            work_votes = get_work_votes(created_book.id, user_did, db_tables)
             
             # Return updated card with new count
-            new_vote_count = len(all_books)
+            new_vote_count = work_votes['vote_count'] if work_votes else 1
             book.upvote_count = new_vote_count
             book.user_has_upvoted = True
             return book.as_interactive_card(can_upvote=True, user_has_upvoted=True, upvote_count=new_vote_count)
@@ -3428,16 +3639,15 @@ def toggle_view(slug: str, view: str, auth):
             return Div("Shelf not found", cls="error")
         
         # Check permissions
+        from models import PermissionContext, get_books_with_upvotes
         user_did = get_current_user_did(auth)
-        if not can_view_bookshelf(shelf, user_did, db_tables):
+        perms = PermissionContext(user_did, db_tables)
+        if not perms.can_view_bookshelf(shelf):
             return Div("Access denied", cls="error")
         
-        # Import permission functions
-        from models import (can_add_books, can_vote_books, can_remove_books, get_books_with_upvotes)
-        
-        can_add = can_add_books(shelf, user_did, db_tables)
-        can_vote = can_vote_books(shelf, user_did, db_tables)
-        can_remove = can_remove_books(shelf, user_did, db_tables)
+        can_add = perms.can_add_books(shelf)
+        can_vote = perms.can_vote_books(shelf)
+        can_remove = perms.can_remove_books(shelf)
         
         # Get books with upvote counts
         shelf_books = get_books_with_upvotes(shelf.id, user_did, db_tables)
@@ -3447,9 +3657,12 @@ def toggle_view(slug: str, view: str, auth):
         
         # Always create consistent structure with book-grid for HTMX targeting
         if shelf_books:
+            # One query for every card's comment preview
+            from models import get_comment_previews
+            comment_previews = get_comment_previews([book.id for book in shelf_books], db_tables)
             if view == "list":
                 from components import BookListView
-                books_content = BookListView(shelf_books, can_upvote=can_vote, can_remove=can_remove, user_auth_status=user_auth_status)
+                books_content = BookListView(shelf_books, can_upvote=can_vote, can_remove=can_remove, user_auth_status=user_auth_status, comment_previews=comment_previews)
             else:  # grid view (default)
                 books_content = Div(*[book.as_interactive_card(
                     can_upvote=can_vote, 
@@ -3457,7 +3670,7 @@ def toggle_view(slug: str, view: str, auth):
                     upvote_count=book.upvote_count,
                     can_remove=can_remove,
                     user_auth_status=user_auth_status,
-                    db_tables=db_tables
+                    comment=comment_previews.get(book.id)
                 ) for book in shelf_books], cls="book-grid", id="book-grid")
             
             books_section_content = Div(books_content, id="books-container")
@@ -3498,11 +3711,12 @@ def manage_shelf(slug: str, auth, req):
             )
         
         user_did = get_current_user_did(auth)
-        from models import can_manage_members, can_generate_invites
+        from models import PermissionContext
+        perms = PermissionContext(user_did, db_tables)
         
-        can_edit = can_edit_bookshelf(shelf, user_did, db_tables)
-        can_manage = can_manage_members(shelf, user_did, db_tables)
-        can_generate = can_generate_invites(shelf, user_did, db_tables)
+        can_edit = perms.can_edit_bookshelf(shelf)
+        can_manage = perms.can_manage_members(shelf)
+        can_generate = perms.can_generate_invites(shelf)
         is_owner = shelf.owner_did == user_did
         
         if not (can_edit or can_generate):
@@ -3682,10 +3896,11 @@ def share_shelf(slug: str, auth, req):
             )
         
         user_did = get_current_user_did(auth)
-        from models import can_manage_members, can_generate_invites
+        from models import PermissionContext
+        perms = PermissionContext(user_did, db_tables)
         
-        can_manage = can_manage_members(shelf, user_did, db_tables)
-        can_generate = can_generate_invites(shelf, user_did, db_tables)
+        can_manage = perms.can_manage_members(shelf)
+        can_generate = perms.can_generate_invites(shelf)
         
         if not can_generate:
             return NavBar(auth), Container(
@@ -4338,7 +4553,9 @@ def load_network_activity_api(auth):
         network_activities = get_network_activity(auth, db_tables, bluesky_auth, limit=5)
         logger.info(f"Background network activities loaded: {len(network_activities)} activities found")
         
-        return NetworkActivityPreview(network_activities, auth)
+        refresh_task = follow_graph_refresh_task(auth)
+        preview = NetworkActivityPreview(network_activities, auth)
+        return (preview, refresh_task) if refresh_task else preview
     except Exception as e:
         logger.error(f"Error loading network activity in background: {e}", exc_info=True)
         # Return error state with retry option
@@ -4551,17 +4768,18 @@ def get_share_modal(slug: str, auth, req):
             return Div("Bookshelf not found.", cls="error")
         
         user_did = get_current_user_did(auth)
-        from models import can_generate_invites, get_user_role
+        from models import PermissionContext
+        perms = PermissionContext(user_did, db_tables)
         
         # Check if user can access share functionality at all
         # For now, we allow anyone who can view the shelf to see share options
         # but filter the options based on their permissions
-        if not can_view_bookshelf(shelf, user_did, db_tables):
+        if not perms.can_view_bookshelf(shelf):
             return Div("Permission denied.", cls="error")
         
         # Get user's role and permissions
-        user_role = get_user_role(shelf, user_did, db_tables)
-        can_generate = can_generate_invites(shelf, user_did, db_tables)
+        user_role = perms.role(shelf)
+        can_generate = perms.can_generate_invites(shelf)
         
         # Get base URL from request
         base_url = f"{req.url.scheme}://{req.url.netloc}"
@@ -48,6 +48,7 @@ from .services import (
     get_user_role,
     can_invite_role,
     validate_invite,
+    PermissionContext,
 )
 
 from .atproto import (
@@ -95,6 +96,7 @@ __all__ = [
     'get_user_role',
     'can_invite_role',
     'validate_invite',
+    'PermissionContext',
     # AT Protocol
     'generate_tid',
     'create_bookshelf_record',
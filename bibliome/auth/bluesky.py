@@ -2,13 +2,16 @@
 import httpx
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any
 
 from atproto import Client as AtprotoClient
 from fasthtml.common import *
-from fastcore.xtras import flexicache, time_policy
 from dotenv import load_dotenv
 
+from bibliome.infrastructure.shared_cache import SharedCache, shared_cached
+from bibliome.infrastructure.single_flight import SingleFlight
+
 from .diagnostics import log_auth_flow
 from .retry import retry_on_network_error
 
@@ -16,6 +19,15 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# app.bsky.actor.getProfiles accepts at most 25 actors per request
+PROFILE_BATCH_SIZE = 25
+PROFILE_FETCH_CONCURRENCY = int(os.getenv('PROFILE_FETCH_CONCURRENCY', 4))
+
+# Follow lists fetched by any process (a login sync in the web app, the scanner) are reused by the others
+following_cache = SharedCache("following", default_ttl=3600, max_entries=5000)
+# Threads missing the cache for the same user at once (page loads right after login) share one paginated fetch
+following_fetches = SingleFlight("following")
+
 
 class BlueskyAuth:
     """Handle Bluesky authentication and session management."""
@@ -239,9 +251,14 @@ class BlueskyAuth:
         client.login(session_string=session_data['session_string'])
         return client
     
-    @flexicache(time_policy(3600))  # Cache for 1 hour
+    # An empty list is what a failed fetch returns, so it is not cached
+    @shared_cached(following_cache, key=lambda self, user_did, session_string: user_did, store_if=bool)
     def _get_all_following_paginated(self, user_did: str, session_string: str) -> list[str]:
         """Get all DIDs that a user follows with pagination and caching."""
+        return following_fetches.call(user_did, lambda: self._fetch_following_pages(user_did, session_string))
+
+    def _fetch_following_pages(self, user_did: str, session_string: str) -> list[str]:
+        """Page through app.bsky.graph.getFollows for user_did; [] on failure."""
         try:
             client = AtprotoClient()
             client.login(session_string=session_string)
@@ -323,8 +340,14 @@ class BlueskyAuth:
             logger.error(f"Error getting following list for {auth_data.get('handle', 'unknown')}: {e}", exc_info=True)
             return []
 
-    def get_profiles_batch(self, dids: list[str], auth_data: dict) -> dict[str, dict]:
-        """Get profile info for multiple DIDs."""
+    def get_profiles_batch(self, dids: list[str], auth_data: dict, not_found: Optional[set] = None) -> dict[str, dict]:
+        """Get profile info for multiple DIDs.
+
+        DIDs are requested in chunks of PROFILE_BATCH_SIZE, up to
+        PROFILE_FETCH_CONCURRENCY chunks at a time. If not_found is given, the
+        DIDs of chunks that were answered but returned no profile are added to
+        it; DIDs of failed chunks are not, so callers can tell the two apart.
+        """
         try:
             if not dids:
                 return {}
@@ -334,25 +357,38 @@ class BlueskyAuth:
                 logger.warning("Could not get authenticated client for profiles batch.")
                 return {}
 
-            profiles = {}
-            batch_size = 25
-            for i in range(0, len(dids), batch_size):
-                batch_dids = dids[i:i + batch_size]
+            def fetch_chunk(batch_dids: list[str]) -> Optional[dict]:
                 try:
                     response = client.app.bsky.actor.get_profiles({'actors': batch_dids})
-                    if response and response.profiles:
-                        for profile in response.profiles:
-                            profiles[profile.did] = {
-                                'did': profile.did,
-                                'handle': profile.handle,
-                                'display_name': profile.display_name or profile.handle,
-                                'avatar_url': profile.avatar or ''
-                            }
                 except Exception as e:
                     logger.warning(f"Error fetching profile batch: {e}")
+                    return None
+                return {
+                    profile.did: {
+                        'did': profile.did,
+                        'handle': profile.handle,
+                        'display_name': profile.display_name or profile.handle,
+                        'avatar_url': profile.avatar or ''
+                    }
+                    for profile in (response.profiles if response and response.profiles else [])
+                }
+
+            chunks = [dids[i:i + PROFILE_BATCH_SIZE] for i in range(0, len(dids), PROFILE_BATCH_SIZE)]
+            if len(chunks) == 1:
+                results = [fetch_chunk(chunks[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(PROFILE_FETCH_CONCURRENCY, len(chunks))) as executor:
+                    results = list(executor.map(fetch_chunk, chunks))
+
+            profiles = {}
+            for batch_dids, batch_profiles in zip(chunks, results):
+                if batch_profiles is None:
                     continue
+                profiles.update(batch_profiles)
+                if not_found is not None:
+                    not_found.update(did for did in batch_dids if did not in batch_profiles)
             
-            logger.info(f"Retrieved {len(profiles)} profiles from {len(dids)} DIDs")
+            logger.info(f"Retrieved {len(profiles)} profiles from {len(dids)} DIDs in {len(chunks)} requests")
             return profiles
             
         except Exception as e:
@@ -20,6 +20,8 @@ from urllib.parse import urlencode, urlparse
 
 import httpx
 
+from bibliome.infrastructure.identity_cache import identity_cache, identity_from_doc
+
 # Try to import OAuth dependencies - gracefully degrade if not available
 try:
     from authlib.jose import JsonWebKey, jwt
@@ -244,7 +246,7 @@ class OAuthClient:
 
     def _resolve_did_document(self, did: str) -> Dict[str, Any]:
         """
-        Resolve DID document to get PDS.
+        Resolve DID document to get PDS, through the shared identity cache.
 
         Args:
             did: User's DID
@@ -252,38 +254,30 @@ class OAuthClient:
         Returns:
             Dict with 'did' and 'pds' URL
         """
+        identity = identity_cache.get(did)
+        if identity is not None and identity.pds_endpoint:
+            return {'did': did, 'pds': identity.pds_endpoint}
+
         try:
             # For did:plc, use the PLC directory
             if did.startswith('did:plc:'):
                 resp = self.http_client.get(f"https://plc.directory/{did}")
-                resp.raise_for_status()
-                doc = resp.json()
-
-                # Find PDS service endpoint
-                for service in doc.get('service', []):
-                    if service.get('type') == 'AtprotoPersonalDataServer':
-                        pds = service.get('serviceEndpoint')
-                        return {'did': did, 'pds': pds}
-
-                raise ATProtoOAuthError(f"No PDS found in DID document for {did}")
 
             # For did:web, resolve via HTTPS
             elif did.startswith('did:web:'):
                 domain = did.replace('did:web:', '')
                 resp = self.http_client.get(f"https://{domain}/.well-known/did.json")
-                resp.raise_for_status()
-                doc = resp.json()
-
-                for service in doc.get('service', []):
-                    if service.get('type') == 'AtprotoPersonalDataServer':
-                        pds = service.get('serviceEndpoint')
-                        return {'did': did, 'pds': pds}
-
-                raise ATProtoOAuthError(f"No PDS found in DID document for {did}")
 
             else:
                 raise ATProtoOAuthError(f"Unsupported DID method: {did}")
 
+            resp.raise_for_status()
+            identity = identity_from_doc(did, resp.json())
+            if not identity.pds_endpoint:
+                raise ATProtoOAuthError(f"No PDS found in DID document for {did}")
+            identity_cache.store(identity)
+            return {'did': did, 'pds': identity.pds_endpoint}
+
         except Exception as e:
             raise ATProtoOAuthError(f"Failed to resolve DID {did}: {e}")
 
@@ -3,26 +3,49 @@
 import httpx
 import os
 import logging
+import re
 import time
 from typing import Optional, List, Dict, Any
 from dotenv import load_dotenv
 from rate_limiter import ExponentialBackoffRateLimiter
 from performance_monitor import get_performance_monitor
+from bibliome.infrastructure.shared_cache import SharedCache
+from bibliome.infrastructure.single_flight import SingleFlight
+from bibliome.infrastructure.http_clients import get_http_client
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Lookups are cached in the shared cache file, so the web app, scanner and
+# ingester spend the Google Books quota on each query or ISBN once
+BOOK_CACHE_TTL = int(os.getenv('BOOK_METADATA_CACHE_TTL_HOURS', 24 * 7)) * 3600
+BOOK_CACHE_MISS_TTL = int(os.getenv('BOOK_METADATA_MISS_TTL_HOURS', 24)) * 3600
+book_search_cache = SharedCache("book_search", default_ttl=BOOK_CACHE_TTL, max_entries=20000)
+book_isbn_cache = SharedCache("book_isbn", default_ttl=BOOK_CACHE_TTL, max_entries=50000)
+
+# Concurrent misses for the same query or ISBN (a burst of firehose events
+# for one book, two users adding it at once) make one upstream request
+book_lookups = SingleFlight("book_api")
+
+# Background lookups stay in the cache once fewer than this share of the
+# Google Books bucket is left, keeping the rest for the add-book search
+BACKGROUND_QUOTA_RESERVE = float(os.getenv('GOOGLE_BOOKS_BACKGROUND_RESERVE', '0.25'))
+
 
 def _track_api_call(service: str, endpoint: str, duration_ms: float,
                     success: bool = True, status_code: int = None,
-                    error_message: str = None):
-    """Helper to track API calls to the performance monitor."""
+                    error_message: str = None, cache_hit: bool = False):
+    """Helper to track API calls to the performance monitor.
+
+    Lookups answered from the metadata cache are recorded under
+    "<endpoint> (cached)", next to the calls that went upstream.
+    """
     monitor = get_performance_monitor()
     if monitor:
         monitor.record_api_call(
             service=service,
-            endpoint=endpoint,
+            endpoint=f"{endpoint} (cached)" if cache_hit else endpoint,
             duration_ms=duration_ms,
             status_code=status_code,
             success=success,
@@ -30,6 +53,16 @@ def _track_api_call(service: str, endpoint: str, duration_ms: float,
         )
 
 
+def normalize_query(query: str) -> str:
+    """Search query as cached: lowercase, with runs of whitespace collapsed."""
+    return " ".join(query.lower().split())
+
+
+def normalize_isbn(isbn: str) -> str:
+    """ISBN as cached: digits and a trailing X only."""
+    return re.sub(r"[^0-9X]", "", isbn.upper())
+
+
 class BookAPIClient:
     """Client for fetching book metadata from external APIs."""
     
@@ -55,14 +88,39 @@ class BookAPIClient:
         
         logger.info(f"[bibliome_scanner] BookAPIClient initialized with rate limit: {google_books_rate_limit:.2f} req/sec, max retries: {max_retries}")
     
-    async def search_books(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
-        """Search for books using Google Books API with Open Library fallback."""
+    def quota_low(self) -> bool:
+        """Whether background lookups should be cache-only: the Google Books bucket is nearly empty or calls are being throttled."""
+        bucket = self.rate_limiter.base_limiter
+        return (bucket.available_tokens() < bucket.max_tokens * BACKGROUND_QUOTA_RESERVE
+                or self.rate_limiter.consecutive_failures >= 3)
+
+    async def search_books(self, query: str, max_results: int = 10, cache_only: bool = False) -> List[Dict[str, Any]]:
+        """Search for books using Google Books API with Open Library fallback.
+
+        Results are cached by normalized query; a query both APIs answered
+        with nothing is cached for BOOK_CACHE_MISS_TTL. With cache_only, a
+        query not in the cache returns [] without any request. Concurrent
+        misses for the same query share one upstream search.
+        """
+        cache_key = (normalize_query(query), max_results)
+        cached = book_search_cache.get_many([cache_key])
+        if cache_key in cached:
+            _track_api_call('google_books', 'search', 0, cache_hit=True)
+            return cached[cache_key]
+        if cache_only:
+            return []
+        return await book_lookups.do(('search', cache_key), lambda: self._search_upstream(cache_key, query, max_results))
+
+    async def _search_upstream(self, cache_key: tuple, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Search Google Books, then Open Library, and cache the answer under cache_key."""
         start_time = time.perf_counter()
         try:
             google_results = await self._search_google_books(query, max_results)
             duration_ms = (time.perf_counter() - start_time) * 1000
             if google_results:
                 _track_api_call('google_books', 'search', duration_ms, success=True)
+                book_search_cache.set(cache_key, google_results)
+                book_isbn_cache.set_many({normalize_isbn(book['isbn']): book for book in google_results if book['isbn']})
                 return google_results
 
             # Google failed or returned empty, try Open Library
@@ -70,14 +128,19 @@ class BookAPIClient:
             ol_results = await self._search_open_library(query, max_results)
             ol_duration = (time.perf_counter() - ol_start) * 1000
             _track_api_call('open_library', 'search', ol_duration, success=bool(ol_results))
-            return ol_results
+            if ol_results:
+                book_search_cache.set(cache_key, ol_results)
+            elif google_results is not None and ol_results is not None:
+                # Both answered and found nothing (None means a request failed)
+                book_search_cache.set(cache_key, [], ttl=BOOK_CACHE_MISS_TTL)
+            return ol_results or []
         except Exception as e:
             duration_ms = (time.perf_counter() - start_time) * 1000
             _track_api_call('google_books', 'search', duration_ms, success=False, error_message=str(e))
             raise
     
-    async def _search_google_books(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Search Google Books API with title-focused search and rate limiting."""
+    async def _search_google_books(self, query: str, max_results: int) -> Optional[List[Dict[str, Any]]]:
+        """Search Google Books API with title-focused search and rate limiting; None if the search failed."""
         try:
             title_query = f"intitle:{query.replace(' ', '+')}"
             params = {
@@ -92,10 +155,9 @@ class BookAPIClient:
             logger.debug(f"[bibliome_scanner] Trying Google Books title search with query: '{title_query}'")
             
             async def make_title_request():
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(self.google_books_url, params=params)
-                    response.raise_for_status()
-                    return response
+                response = await get_http_client("google_books").get(self.google_books_url, params=params)
+                response.raise_for_status()
+                return response
             
             try:
                 response = await self.rate_limiter.execute_with_backoff(make_title_request)
@@ -128,10 +190,9 @@ class BookAPIClient:
                 general_params["key"] = self.google_api_key
             
             async def make_general_request():
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(self.google_books_url, params=general_params)
-                    response.raise_for_status()
-                    return response
+                response = await get_http_client("google_books").get(self.google_books_url, params=general_params)
+                response.raise_for_status()
+                return response
             
             try:
                 general_response = await self.rate_limiter.execute_with_backoff(make_general_request)
@@ -144,17 +205,17 @@ class BookAPIClient:
                 logger.error(f"[bibliome_scanner] Google Books API error: {e.response.status_code}")
                 if e.response.status_code == 400:
                     logger.error(f"[bibliome_scanner] General search 400 error: {e.response.text[:200]}")
-                return []
+                return None
             except Exception as e:
                 logger.error(f"[bibliome_scanner] General search failed: {e}")
-                return []
+                return None
                     
         except Exception as e:
             logger.error(f"[bibliome_scanner] Google Books search error: {e}", exc_info=True)
-            return []
+            return None
     
-    async def _search_open_library(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Search Open Library API."""
+    async def _search_open_library(self, query: str, max_results: int) -> Optional[List[Dict[str, Any]]]:
+        """Search Open Library API; None if the search failed."""
         try:
             search_url = "https://openlibrary.org/search.json"
             params = {
@@ -163,22 +224,21 @@ class BookAPIClient:
                 "fields": "key,title,author_name,isbn,cover_i,publisher,publish_date,number_of_pages_median"
             }
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                logger.info(f"Trying Open Library search with query: '{query}'")
-                response = await client.get(search_url, params=params)
-                logger.debug(f"Open Library response status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    results = self._parse_open_library(data.get('docs', []))
-                    logger.info(f"Open Library search returned {len(results)} results")
-                    return results
-                else:
-                    logger.error(f"Open Library API error: {response.status_code}")
-                    return []
+            logger.info(f"Trying Open Library search with query: '{query}'")
+            response = await get_http_client("open_library").get(search_url, params=params)
+            logger.debug(f"Open Library response status: {response.status_code}")
+            
+            if response.status_code == 200:
+                data = response.json()
+                results = self._parse_open_library(data.get('docs', []))
+                logger.info(f"Open Library search returned {len(results)} results")
+                return results
+            else:
+                logger.error(f"Open Library API error: {response.status_code}")
+                return None
         except Exception as e:
             logger.error(f"Open Library search error: {e}", exc_info=True)
-            return []
+            return None
     
     def _parse_google_books(self, items: List[Dict]) -> List[Dict[str, Any]]:
         """Parse Google Books API response."""
@@ -236,11 +296,29 @@ class BookAPIClient:
         
         return ''
     
-    async def get_book_details(self, isbn: str) -> Optional[Dict[str, Any]]:
-        """Get detailed book information by ISBN with rate limiting."""
+    async def get_book_details(self, isbn: str, cache_only: bool = False) -> Optional[Dict[str, Any]]:
+        """Get detailed book information by ISBN with rate limiting.
+
+        Answers are cached by ISBN, including ISBNs Google Books doesn't know
+        (for BOOK_CACHE_MISS_TTL); failed lookups are not cached. With
+        cache_only, an ISBN not in the cache returns None without a request.
+        Concurrent misses for the same ISBN share one upstream lookup.
+        """
         if not isbn:
             return None
         
+        cache_key = normalize_isbn(isbn)
+        cached = book_isbn_cache.get_many([cache_key])
+        if cache_key in cached:
+            _track_api_call('google_books', 'isbn', 0, cache_hit=True)
+            return cached[cache_key]
+        if cache_only:
+            return None
+        return await book_lookups.do(('isbn', cache_key), lambda: self._lookup_isbn(cache_key, isbn))
+
+    async def _lookup_isbn(self, cache_key: str, isbn: str) -> Optional[Dict[str, Any]]:
+        """Look isbn up in Google Books and cache the answer under cache_key."""
+        start_time = time.perf_counter()
         try:
             params = {"q": f"isbn:{isbn}"}
             if self.google_api_key:
@@ -249,28 +327,34 @@ class BookAPIClient:
             logger.debug(f"[bibliome_scanner] Looking up book by ISBN: {isbn}")
             
             async def make_isbn_request():
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(self.google_books_url, params=params)
-                    response.raise_for_status()
-                    return response
+                response = await get_http_client("google_books").get(self.google_books_url, params=params)
+                response.raise_for_status()
+                return response
             
             try:
                 response = await self.rate_limiter.execute_with_backoff(make_isbn_request)
                 data = response.json()
+                _track_api_call('google_books', 'isbn', (time.perf_counter() - start_time) * 1000, success=True)
                 items = data.get('items', [])
-                if items:
-                    parsed = self._parse_google_books(items)
+                parsed = self._parse_google_books(items) if items else []
+                if parsed:
                     logger.debug(f"[bibliome_scanner] Found book details for ISBN {isbn}")
-                    return parsed[0] if parsed else None
+                    book_isbn_cache.set(cache_key, parsed[0])
+                    return parsed[0]
                 else:
                     logger.debug(f"[bibliome_scanner] No book found for ISBN {isbn}")
+                    book_isbn_cache.set(cache_key, None, ttl=BOOK_CACHE_MISS_TTL)
                     return None
                     
             except httpx.HTTPStatusError as e:
                 logger.error(f"[bibliome_scanner] ISBN lookup failed with status {e.response.status_code}")
+                _track_api_call('google_books', 'isbn', (time.perf_counter() - start_time) * 1000, success=False,
+                                status_code=e.response.status_code, error_message=str(e))
                 return None
             except Exception as e:
                 logger.error(f"[bibliome_scanner] ISBN lookup failed: {e}")
+                _track_api_call('google_books', 'isbn', (time.perf_counter() - start_time) * 1000, success=False,
+                                error_message=str(e))
                 return None
                 
         except Exception as e:
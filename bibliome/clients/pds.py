@@ -1,15 +1,33 @@
 """
 AT-Proto client for fetching Bibliome records directly from user PDS.
 """
+import asyncio
 import logging
-import time
-from typing import Iterable, Union, Dict, List, Any, Tuple
-from atproto import Client, IdResolver
+import os
+from collections import OrderedDict
+from typing import Iterable, Union, Dict, List, Any, Optional, Tuple
+
+import httpx
+from atproto import AsyncIdResolver, models
 from circuit_breaker import CircuitBreaker
 from rate_limiter import RateLimiter
+from bibliome.infrastructure.http_clients import HostLimitedTransport
+from bibliome.infrastructure.identity_cache import Identity, identity_cache, identity_from_doc
+from bibliome.infrastructure.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Requests in flight to any one PDS, across all the collections and repos being paged
+PDS_MAX_CONCURRENT_PER_HOST = int(os.getenv('PDS_MAX_CONCURRENT_PER_HOST', '4'))
+PDS_REQUEST_TIMEOUT = float(os.getenv('PDS_REQUEST_TIMEOUT_SECONDS', '30'))
+# Seconds an evicted PDS client stays open for requests already sent on it
+EVICTED_CLIENT_GRACE = 60
+# DID documents fetched at once by refresh_identities()
+IDENTITY_REFRESH_CONCURRENCY = int(os.getenv('IDENTITY_REFRESH_CONCURRENCY', '8'))
+
+# Concurrent syncs of the same repo (a user's login sync racing a scanner pass) share one walk of it
+repo_fetches = SingleFlight("pds_repo_records")
+
 
 # Custom exception classes for better error categorization
 class PDSError(Exception):
@@ -49,118 +67,145 @@ class TransientDIDResolutionError(PDSError):
 
 
 class PDSClientPool:
-    """Simple LRU-based client pool for PDS connections with TTL."""
-    
-    def __init__(self, max_size: int = 50, ttl_seconds: int = 300):
+    """
+    LRU of async XRPC clients, one per PDS endpoint.
+
+    Each client keeps its connections to that PDS alive and allows at most
+    max_per_host requests in flight to it, so paging many collections (or
+    many repos on one PDS) at once can't swamp a small self-hosted server.
+    Lookups and evictions are O(1). An evicted client is closed after
+    EVICTED_CLIENT_GRACE seconds, letting requests already sent on it finish.
+    Clients belong to the event loop that created them; the pool starts
+    over when used from a different loop.
+    """
+
+    def __init__(self, max_size: int = 50, max_per_host: int = PDS_MAX_CONCURRENT_PER_HOST,
+                 timeout: float = PDS_REQUEST_TIMEOUT):
         """
         Initialize client pool.
-        
+
         Args:
-            max_size: Maximum number of clients to cache
-            ttl_seconds: Time-to-live for cached clients (default: 5 minutes)
+            max_size: Maximum number of PDS clients to keep
+            max_per_host: Maximum concurrent requests to any one PDS
+            timeout: Request timeout in seconds
         """
         self.max_size = max_size
-        self.ttl_seconds = ttl_seconds
-        self._cache: Dict[str, Tuple[Client, float]] = {}
-        self._access_order: List[str] = []
-    
-    def get_client(self, pds_xrpc: str) -> Client:
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._clients: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+        self._loop = None
+
+    def get_client(self, pds_xrpc: str) -> httpx.AsyncClient:
         """
-        Get or create a client for the given PDS endpoint.
-        
+        Get or create the client for the given PDS endpoint.
+
+        Must be called from a coroutine.
+
         Args:
             pds_xrpc: PDS XRPC endpoint URL
-            
+
         Returns:
-            AT Protocol Client instance
+            httpx.AsyncClient for that PDS
         """
-        current_time = time.time()
-        
-        if pds_xrpc in self._cache:
-            client, cached_time = self._cache[pds_xrpc]
-            
-            if current_time - cached_time < self.ttl_seconds:
-                if pds_xrpc in self._access_order:
-                    self._access_order.remove(pds_xrpc)
-                self._access_order.append(pds_xrpc)
-                logger.debug(f"Reusing cached client for {pds_xrpc}")
-                return client
-            else:
-                del self._cache[pds_xrpc]
-                if pds_xrpc in self._access_order:
-                    self._access_order.remove(pds_xrpc)
-                logger.debug(f"Cache expired for {pds_xrpc}")
-        
-        client = Client(pds_xrpc)
-        
-        while len(self._cache) >= self.max_size and self._access_order:
-            oldest_key = self._access_order.pop(0)
-            if oldest_key in self._cache:
-                del self._cache[oldest_key]
-                logger.debug(f"Evicted oldest client: {oldest_key}")
-        
-        self._cache[pds_xrpc] = (client, current_time)
-        self._access_order.append(pds_xrpc)
-        logger.debug(f"Created and cached new client for {pds_xrpc}")
-        
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Clients of another (possibly closed) loop can't be used or closed from here
+            self._clients.clear()
+            self._loop = loop
+
+        client = self._clients.get(pds_xrpc)
+        if client is not None:
+            self._clients.move_to_end(pds_xrpc)
+            return client
+
+        client = httpx.AsyncClient(
+            timeout=self.timeout,
+            headers={"Accept": "application/json"},
+            transport=HostLimitedTransport(
+                httpx.AsyncHTTPTransport(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=self.max_per_host, max_keepalive_connections=self.max_per_host),
+                ),
+                self.max_per_host,
+            ),
+        )
+        self._clients[pds_xrpc] = client
+        logger.debug(f"Created client for {pds_xrpc}")
+
+        while len(self._clients) > self.max_size:
+            evicted_xrpc, evicted = self._clients.popitem(last=False)
+            loop.call_later(EVICTED_CLIENT_GRACE, lambda c=evicted: asyncio.ensure_future(c.aclose()))
+            logger.debug(f"Evicted least recently used client: {evicted_xrpc}")
+
         return client
-    
+
+    async def aclose(self):
+        """Close every pooled client."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
     def clear(self):
-        """Clear all cached clients."""
-        self._cache.clear()
-        self._access_order.clear()
+        """Forget all pooled clients (their connections close once they are garbage collected)."""
+        self._clients.clear()
         logger.debug("Client pool cleared")
-    
+
     def __len__(self) -> int:
-        """Return number of cached clients."""
-        return len(self._cache)
+        """Return number of pooled clients."""
+        return len(self._clients)
 
 
 class DirectPDSClient:
     """Client for fetching Bibliome records directly from user PDS."""
 
     def __init__(self, rate_limiter: RateLimiter = None):
-        self.resolver = IdResolver()
         self.circuit_breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
         self.rate_limiter = rate_limiter or RateLimiter(tokens_per_second=10, max_tokens=100)
-        self._client_pool = PDSClientPool(max_size=50, ttl_seconds=300)
+        self._client_pool = PDSClientPool(max_size=50)
+        self._resolver = None
+        self._resolver_loop = None
+
+    def _id_resolver(self) -> AsyncIdResolver:
+        """The async handle/DID resolver for the running event loop (its HTTP clients are bound to one loop)."""
+        loop = asyncio.get_running_loop()
+        if self._resolver_loop is not loop:
+            self._resolver = AsyncIdResolver(timeout=PDS_REQUEST_TIMEOUT)
+            self._resolver_loop = loop
+        return self._resolver
 
     def _ensure_xrpc(self, url: str) -> str:
         url = url.rstrip("/")
         return url if url.endswith("/xrpc") else url + "/xrpc"
 
-    def _extract_pds_endpoint(self, did_doc: Any) -> str:
-        if hasattr(did_doc, "service"):
-            services = getattr(did_doc, "service") or []
-        elif isinstance(did_doc, dict):
-            services = (did_doc.get("service") or [])
-        else:
-            services = []
-
-        for svc in services:
-            typ = getattr(svc, "type", None) if not isinstance(svc, dict) else svc.get("type")
-            endpoint = (
-                getattr(svc, "service_endpoint", None)
-                if not isinstance(svc, dict)
-                else (svc.get("service_endpoint") or svc.get("serviceEndpoint"))
-            )
-            if typ == "AtprotoPersonalDataServer" and endpoint:
-                return self._ensure_xrpc(endpoint)
+    async def _fetch_identity(self, did: str) -> Identity:
+        """Fetch did's DID document and record what it says in the identity cache."""
+        did_doc = await self._id_resolver().did.resolve(did)
+        if not did_doc:
+            raise TransientDIDResolutionError(did, RuntimeError(f"Failed to resolve DID document for {did}"))
+        identity = identity_from_doc(did, did_doc)
+        identity_cache.store(identity)
+        return identity
 
-        raise RuntimeError("PDS serviceEndpoint not found in DID document")
+    async def _resolve_did_and_pds(self, identifier: str) -> Tuple[str, str]:
+        """
+        DID and PDS XRPC endpoint of a handle or DID.
 
-    def _resolve_did_and_pds(self, identifier: str) -> Tuple[str, str]:
+        Handles are always resolved over the network: a cached DID document's
+        alsoKnownAs is only that account's unverified claim to the handle.
+        The DID's document is then read through the identity cache.
+        """
         try:
-            did = identifier if identifier.startswith("did:") else self.resolver.handle.resolve(identifier)
-            if not isinstance(did, str) or not did.startswith("did:"):
-                raise TransientDIDResolutionError(identifier, RuntimeError(f"Failed to resolve handle to DID: {identifier}"))
+            did = identifier
+            if not identifier.startswith("did:"):
+                did = await self._id_resolver().handle.resolve(identifier)
+                if not isinstance(did, str) or not did.startswith("did:"):
+                    raise TransientDIDResolutionError(identifier, RuntimeError(f"Failed to resolve handle to DID: {identifier}"))
+            identity = identity_cache.get(did) or await self._fetch_identity(did)
 
-            did_doc = self.resolver.did.resolve(did)
-            if not did_doc:
-                raise TransientDIDResolutionError(did, RuntimeError(f"Failed to resolve DID document for {did}"))
-
-            pds_xrpc = self._extract_pds_endpoint(did_doc)
-            return did, pds_xrpc
+            if not identity.pds_endpoint:
+                raise RuntimeError("PDS serviceEndpoint not found in DID document")
+            return identity.did, self._ensure_xrpc(identity.pds_endpoint)
         except (TransientDIDResolutionError, NonCompliantPDSError):
             raise
         except Exception as e:
@@ -172,71 +217,126 @@ class DirectPDSClient:
                 logger.error(f"Error resolving DID and PDS for {identifier}: {e}")
                 raise
 
+    async def refresh_identities(self, dids: Iterable[str]) -> int:
+        """
+        Fetch the DID documents of the dids whose cached identity is missing or expired.
+
+        Up to IDENTITY_REFRESH_CONCURRENCY documents are fetched at once and
+        the answers stored in one batch; DIDs that fail to resolve are skipped
+        and resolved on demand later. Returns the number refreshed.
+        """
+        dids = list(dict.fromkeys(dids))
+        known = identity_cache.get_many(dids)
+        semaphore = asyncio.Semaphore(IDENTITY_REFRESH_CONCURRENCY)
+
+        async def fetch(did: str) -> Optional[Identity]:
+            async with semaphore:
+                try:
+                    did_doc = await self._id_resolver().did.resolve(did)
+                except Exception as e:
+                    logger.debug(f"Could not refresh identity of {did}: {e}")
+                    return None
+            return identity_from_doc(did, did_doc) if did_doc else None
+
+        fetched = await asyncio.gather(*(fetch(did) for did in dids if did not in known))
+        identities = [identity for identity in fetched if identity is not None]
+        identity_cache.store_many(identities)
+        return len(identities)
+
     def _to_list(self, x: Union[str, Iterable[str]]) -> List[str]:
         if isinstance(x, str):
             return [x]
         return list(x)
 
+    async def _xrpc_get(self, pds_xrpc: str, method: str, params: Dict[str, Any],
+                        client: Optional[httpx.AsyncClient] = None) -> Dict[str, Any]:
+        """GET an XRPC query on a PDS and return its JSON body; a non-JSON body raises NonCompliantPDSError."""
+        client = client or self._client_pool.get_client(pds_xrpc)
+        response = await client.get(f"{pds_xrpc}/{method}", params=params)
+        response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError:
+            logger.error(f"Non-compliant PDS for {params.get('repo')}: server returned non-JSON response")
+            raise NonCompliantPDSError(pds_endpoint=pds_xrpc, did=params.get('repo'), response_snippet=response.text[:200])
+
+    async def _list_all_records(self, pds_xrpc: str, did: str, nsid: str, page_size: int,
+                                client: Optional[httpx.AsyncClient]) -> List[dict]:
+        """Page through com.atproto.repo.listRecords for one collection."""
+        cursor = None
+        all_recs: List[dict] = []
+
+        while True:
+            params = {"repo": did, "collection": nsid, "limit": page_size}
+            if cursor:
+                params["cursor"] = cursor
+
+            # Parsed as the atproto Client did, so values keep their record models
+            resp = models.ComAtprotoRepoListRecords.Response.model_validate(
+                await self._xrpc_get(pds_xrpc, "com.atproto.repo.listRecords", params, client)
+            )
+
+            for rec in resp.records or []:
+                uri = rec.uri
+                all_recs.append(
+                    {
+                        "uri": uri,
+                        "rkey": uri.rsplit("/", 1)[-1] if uri else None,
+                        "cid": getattr(rec, "cid", None),
+                        "value": rec.value,
+                    }
+                )
+
+            cursor = getattr(resp, "cursor", None)
+            if not cursor:
+                return all_recs
+
     async def get_repo_records(
         self,
         identifier: str,
         collections: Union[str, Iterable[str]],
         *,
         page_size: int = 100,
-        _client: Client = None,
+        _client: httpx.AsyncClient = None,
     ) -> Dict[str, Any]:
         """
         Fetch *all* records for one repo (handle or DID) across one or more collections.
-        Uses pooled client connections to reduce overhead.
+
+        The requested collections are paged concurrently over the pooled client
+        for the repo's PDS, which bounds the requests in flight to that host.
+        Concurrent calls for the same repo, collections and page size share one
+        fetch (and one rate limiter token).
         """
         async def _get_records():
             pds_xrpc = None
             try:
-                did, pds_xrpc = self._resolve_did_and_pds(identifier)
-                pds = _client or self._client_pool.get_client(pds_xrpc)
+                did, pds_xrpc = await self._resolve_did_and_pds(identifier)
 
-                desc = pds.com.atproto.repo.describe_repo({"repo": did})
-                available = set(desc.collections or [])
+                desc = await self._xrpc_get(pds_xrpc, "com.atproto.repo.describeRepo", {"repo": did}, _client)
+                available = set(desc.get("collections") or [])
 
                 wanted = self._to_list(collections)
-                results: Dict[str, List[dict]] = {}
                 missing: List[str] = [nsid for nsid in wanted if nsid not in available]
+                present = [nsid for nsid in wanted if nsid in available]
 
-                for nsid in wanted:
-                    if nsid not in available:
-                        results[nsid] = []
-                        continue
-
-                    cursor = None
-                    all_recs: List[dict] = []
-
-                    while True:
-                        params = {"repo": did, "collection": nsid, "limit": page_size}
-                        if cursor:
-                            params["cursor"] = cursor
-
-                        resp = pds.com.atproto.repo.list_records(params)
-
-                        for rec in resp.records or []:
-                            uri = rec.uri
-                            all_recs.append(
-                                {
-                                    "uri": uri,
-                                    "rkey": uri.rsplit("/", 1)[-1] if uri else None,
-                                    "cid": getattr(rec, "cid", None),
-                                    "value": rec.value,
-                                }
-                            )
-
-                        cursor = getattr(resp, "cursor", None)
-                        if not cursor:
-                            break
-
-                    results[nsid] = all_recs
+                pages = await asyncio.gather(*(
+                    self._list_all_records(pds_xrpc, did, nsid, page_size, _client) for nsid in present
+                ))
+                records = dict(zip(present, pages))
+                results: Dict[str, List[dict]] = {nsid: records.get(nsid, []) for nsid in wanted}
 
                 return {"did": did, "pds": pds_xrpc, "collections": results, "missing": missing}
             except (TransientDIDResolutionError, NonCompliantPDSError):
                 raise
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 429 or e.response.status_code >= 500:
+                    logger.warning(f"Transient error fetching records for {identifier}: {e}")
+                    raise TransientDIDResolutionError(identifier, e)
+                logger.error(f"Error getting repo records for {identifier}: {e}")
+                raise
+            except httpx.TransportError as e:
+                logger.warning(f"Transient error fetching records for {identifier}: {e}")
+                raise TransientDIDResolutionError(identifier, e)
             except Exception as e:
                 error_msg = str(e).lower()
                 
@@ -253,5 +353,12 @@ class DirectPDSClient:
                 else:
                     logger.error(f"Error getting repo records for {identifier}: {e}")
                     raise
-        
-        return await self.rate_limiter(_get_records())
+
+        if _client is not None:
+            return await self.rate_limiter(_get_records())
+        key = (identifier, tuple(self._to_list(collections)), page_size)
+        return await repo_fetches.do(key, lambda: self.rate_limiter(_get_records()))
+
+    async def aclose(self):
+        """Close the pooled PDS clients."""
+        await self._client_pool.aclose()
@@ -19,6 +19,7 @@ from .utils import (
     EmptyState,
     LoadingSpinner,
     Pagination,
+    CursorPagination,
 )
 
 # Form components
@@ -113,6 +114,7 @@ from .admin import (
     PerformanceRouteTable,
     PerformanceQueryTable,
     PerformanceApiTable,
+    CacheStatsTable,
     SlowRequestsList,
 )
 
@@ -127,6 +129,7 @@ __all__ = [
     "EmptyState",
     "LoadingSpinner",
     "Pagination",
+    "CursorPagination",
     # Forms
     "AddBooksToggle",
     "BookSearchForm",
@@ -206,5 +209,6 @@ __all__ = [
     "PerformanceRouteTable",
     "PerformanceQueryTable",
     "PerformanceApiTable",
+    "CacheStatsTable",
     "SlowRequestsList",
 ]
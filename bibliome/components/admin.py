@@ -341,6 +341,19 @@ def PerformanceDashboard(stats: Dict[str, Any]):
                 cls="performance-section"
             ),
 
+            # In-process caches Section
+            Section(
+                H2("Caches"),
+                Div(
+                    "Loading...",
+                    id="cache-stats",
+                    hx_get="/admin/performance/caches",
+                    hx_trigger="load",
+                    hx_swap="innerHTML"
+                ),
+                cls="performance-section"
+            ),
+
             # Recent Slow Requests Section
             Section(
                 H2("Recent Slow Requests"),
@@ -464,6 +477,48 @@ def PerformanceQueryTable(queries):
     )
 
 
+def CacheStatsTable(caches):
+    """Table showing hit/miss counters of the in-process caches (FragmentCache / StaleWhileRevalidateCache stats()); for SingleFlight, hits are collapsed calls."""
+    if not caches:
+        return P("No caches configured.", style="color: #6c757d; text-align: center; padding: 1rem;")
+
+    rows = []
+    for cache in caches:
+        hit_rate = cache.get('hit_rate', 0)
+        if hit_rate >= 80:
+            rate_style = "color: #28a745;"
+        elif hit_rate >= 50:
+            rate_style = "color: #ffc107; font-weight: bold;"
+        else:
+            rate_style = "color: #dc3545; font-weight: bold;"
+
+        rows.append(Tr(
+            Td(cache.get('name', ''), style="font-family: monospace; font-size: 0.85rem;"),
+            Td(f"{cache['in_flight']:,} in flight" if 'in_flight' in cache
+               else f"{cache.get('entries', 0):,}" if cache.get('max_entries', 0) is None
+               else f"{cache.get('entries', 0):,} / {cache.get('max_entries', 0):,}", style="text-align: right;"),
+            Td(f"{cache.get('hits', 0):,}" + (f" (+{cache['stale_hits']:,} stale)" if cache.get('stale_hits') else ""),
+               style="text-align: right;"),
+            Td(f"{cache.get('misses', 0):,}", style="text-align: right;"),
+            Td(f"{hit_rate:.1f}%", style=f"text-align: right; {rate_style}"),
+            Td(f"{cache.get('evictions', 0):,}", style="text-align: right;"),
+        ))
+
+    return Table(
+        Thead(Tr(
+            Th("Cache"),
+            Th("Entries", style="text-align: right;"),
+            Th("Hits", style="text-align: right;"),
+            Th("Misses", style="text-align: right;"),
+            Th("Hit Rate", style="text-align: right;"),
+            Th("Evictions", style="text-align: right;"),
+        )),
+        Tbody(*rows),
+        cls="performance-table",
+        style="width: 100%; border-collapse: collapse; font-size: 0.9rem;"
+    )
+
+
 def PerformanceApiTable(apis):
     """Table showing external API performance metrics."""
     if not apis:
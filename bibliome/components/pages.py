@@ -5,7 +5,7 @@ from datetime import datetime
 from typing import Dict, List, Any
 import os
 
-from .utils import format_time_ago, EmptyState, Pagination
+from .utils import format_time_ago, EmptyState, Pagination, CursorPagination
 from .cards import (
     MemberCard, InviteCard, ActivityCard, CompactActivityCard,
     ShelfPreviewCard, UserSearchResultCard, BookScrollCard, UserActivityCard
@@ -556,7 +556,7 @@ def ExplorePageHero():
     )
 
 
-def PublicShelvesGrid(shelves, page=1, total_pages=1, total_count=None):
+def PublicShelvesGrid(shelves, page=1, total_pages=1, total_count=None, cursor: str = "", params: dict = None):
     """Grid of public bookshelves with pagination.
     
     Args:
@@ -564,6 +564,8 @@ def PublicShelvesGrid(shelves, page=1, total_pages=1, total_count=None):
         page: Current page number
         total_pages: Total number of pages
         total_count: Total number of shelves (for header display). If None, uses len(shelves).
+        cursor: Cursor of the current page; a CursorPage gets cursor links instead of page numbers
+        params: Query parameters to keep in the pagination links
     """
     if not shelves:
         return EmptyState(
@@ -577,7 +579,11 @@ def PublicShelvesGrid(shelves, page=1, total_pages=1, total_count=None):
     header = H3(f"Bookshelves ({display_count})", cls="search-section-title")
     grid = Div(*[ShelfPreviewCard(shelf) for shelf in shelves], cls="public-shelves-grid")
     
-    pagination = Pagination(current_page=page, total_pages=total_pages, base_url="/explore")
+    if hasattr(shelves, 'next_cursor'):
+        pagination = CursorPagination("/explore", shelves.next_cursor, shelves.prev_cursor,
+                                      show_first=bool(cursor) or page > 1, params=params)
+    else:
+        pagination = Pagination(current_page=page, total_pages=total_pages, base_url="/explore")
     
     return Div(header, grid, pagination, id="public-shelves-grid")
 
@@ -621,7 +627,7 @@ def CommunityReadingSection(books):
     )
 
 
-def SearchResultsGrid(shelves, users=None, search_type="all", page: int = 1, query: str = "", privacy: str = "public", sort_by: str = "updated_at", open_to_contributions: str = "", total_shelf_count: int = None):
+def SearchResultsGrid(shelves, users=None, search_type="all", page: int = 1, query: str = "", privacy: str = "public", sort_by: str = "updated_at", open_to_contributions: str = "", total_shelf_count: int = None, cursor: str = ""):
     """Grid of search results with tabs for different content types.
     
     Args:
@@ -634,6 +640,7 @@ def SearchResultsGrid(shelves, users=None, search_type="all", page: int = 1, que
         sort_by: Sort order
         open_to_contributions: Open to contributions filter
         total_shelf_count: Total number of shelves (for header display). If None, uses len(shelves).
+        cursor: Cursor of the current page, when shelves is a CursorPage
     """
     # Use total_shelf_count if provided, otherwise fall back to len(shelves)
     shelf_count = total_shelf_count if total_shelf_count is not None else (len(shelves) if shelves else 0)
@@ -676,6 +683,13 @@ def SearchResultsGrid(shelves, users=None, search_type="all", page: int = 1, que
             "No shelves or users matched your search criteria. Try a different search."
         )
     
+    # Cursor pagination for keyset-paged shelves, keeping the search filters
+    if hasattr(shelves, 'next_cursor'):
+        params = {"query": query, "privacy": privacy, "sort_by": sort_by, "open_to_contributions": open_to_contributions}
+        pagination = CursorPagination("/explore", shelves.next_cursor, shelves.prev_cursor,
+                                      show_first=bool(cursor) or page > 1, params=params)
+        return Div(*sections, pagination, id="search-results-grid")
+    
     # Simple pagination (for now, just for shelves) - include open_to_contributions parameter
     pagination_links = []
     if page > 1:
@@ -688,8 +702,11 @@ def SearchResultsGrid(shelves, users=None, search_type="all", page: int = 1, que
     return Div(*sections, pagination, id="search-results-grid")
 
 
-def BookListView(books, can_upvote=True, can_remove=False, user_auth_status="anonymous", db_tables=None):
-    """Render books in a table/list view format."""
+def BookListView(books, can_upvote=True, can_remove=False, user_auth_status="anonymous", db_tables=None, comment_previews=None):
+    """Render books in a table/list view format.
+
+    comment_previews maps book id to a preloaded preview Comment (see get_comment_previews).
+    """
     if not books:
         return Div("No books to display", cls="empty-list-message")
     
@@ -700,7 +717,8 @@ def BookListView(books, can_upvote=True, can_remove=False, user_auth_status="ano
         upvote_count=book.upvote_count,
         can_remove=can_remove,
         user_auth_status=user_auth_status,
-        db_tables=db_tables
+        db_tables=db_tables,
+        comment=comment_previews.get(book.id) if comment_previews is not None else None
     ) for book in books]
     
     return Table(
@@ -856,7 +874,7 @@ def NetworkActivityFilters(activity_type="all", date_filter="all"):
     )
 
 
-def FullNetworkActivityFeed(activities: List[Dict], page: int = 1, total_pages: int = 1, activity_type: str = "all", date_filter: str = "all"):
+def FullNetworkActivityFeed(activities: List[Dict], page: int = 1, total_pages: int = 1, activity_type: str = "all", date_filter: str = "all", cursor: str = ""):
     """Full-page network activity feed with pagination."""
     if not activities:
         return Div(
@@ -870,7 +888,13 @@ def FullNetworkActivityFeed(activities: List[Dict], page: int = 1, total_pages:
     
     # Pagination
     pagination = None
-    if total_pages > 1:
+    if hasattr(activities, 'next_cursor'):
+        pagination = CursorPagination(
+            "/network", activities.next_cursor, activities.prev_cursor,
+            show_first=bool(cursor) or page > 1,
+            params={"activity_type": activity_type, "date_filter": date_filter}
+        )
+    elif total_pages > 1:
         pagination = Pagination(
             current_page=page, 
             total_pages=total_pages, 
@@ -158,3 +158,38 @@ def Pagination(current_page: int, total_pages: int, base_url: str):
         pagination_nav,
         cls="pagination-container"
     )
+
+
+def CursorPagination(base_url: str, next_cursor: str = None, prev_cursor: str = None, show_first: bool = False, params: dict = None):
+    """Previous/next links for keyset-paginated listings.
+
+    Cursors are the opaque tokens returned with a CursorPage; params are the
+    filters to carry along (empty values are dropped). show_first adds a link
+    back to the first page for listings that can only page forwards.
+    """
+    from urllib.parse import urlencode
+
+    def page_url(cursor=None):
+        query = {k: v for k, v in (params or {}).items() if v}
+        if cursor:
+            query["cursor"] = cursor
+        return f"{base_url}?{urlencode(query)}" if query else base_url
+
+    links = []
+    if show_first and not prev_cursor:
+        links.append(A("« First page", href=page_url(), title="First page",
+                       aria_label="First page", cls="pagination-first"))
+    if prev_cursor:
+        links.append(A("← Previous", href=page_url(prev_cursor), title="Previous page",
+                       aria_label="Previous page", cls="pagination-prev"))
+    if next_cursor:
+        links.append(A("Next →", href=page_url(next_cursor), title="Next page",
+                       aria_label="Next page", cls="pagination-next"))
+
+    if not links:
+        return None
+
+    return Div(
+        Nav(*links, cls="pagination", role="navigation", aria_label="Pagination navigation"),
+        cls="pagination-container"
+    )
@@ -5,6 +5,14 @@ This package provides infrastructure utilities:
 - CircuitBreaker: Protects services from cascading failures
 - RateLimiter: Token bucket algorithm with async support
 - ExponentialBackoffRateLimiter: Rate limiting with automatic retry and backoff
+- ReadConnectionPool: Pool of read-only SQLite connections with wait-time metrics
+- FragmentCache: LRU cache for rendered HTML fragments with hit/miss counters
+- StaleWhileRevalidateCache: TTL cache that serves stale pages while one caller refreshes them
+- SharedCache / shared_cached: TTL cache in a SQLite file shared by the web app and background services
+- IdentityCache / identity_cache: DID -> handle / PDS cache in the shared file, read by every resolver
+- SingleFlight: Collapses concurrent identical calls into one upstream request
+- get_http_client / close_http_clients: Pooled keep-alive HTTP/2 httpx clients shared across the process
+- page_etag / etag_matches / validator_headers: ETag validators for conditional GET
 
 Note: db_write_queue is imported from the root module for backward compatibility.
 """
@@ -15,8 +23,47 @@ from .circuit_breaker import CircuitBreaker
 # Rate limiters
 from .rate_limiter import RateLimiter, ExponentialBackoffRateLimiter
 
+# Read-only database connections
+from .read_pool import ReadConnectionPool, ReadPoolTimeout, dict_rows, object_rows, tuple_rows
+
+# Rendered fragments
+from .fragment_cache import FragmentCache
+from .swr_cache import StaleWhileRevalidateCache, CachedPage
+from .shared_cache import SharedCache, shared_cached
+from .identity_cache import IdentityCache, Identity, identity_cache, identity_from_doc
+
+# Request coalescing
+from .single_flight import SingleFlight
+
+# Outbound HTTP
+from .http_clients import get_http_client, close_http_clients, HostLimitedTransport
+
+# Conditional GET
+from .conditional import page_etag, etag_matches, validator_headers
+
 __all__ = [
     'CircuitBreaker',
     'RateLimiter',
     'ExponentialBackoffRateLimiter',
+    'ReadConnectionPool',
+    'ReadPoolTimeout',
+    'dict_rows',
+    'object_rows',
+    'tuple_rows',
+    'FragmentCache',
+    'StaleWhileRevalidateCache',
+    'CachedPage',
+    'SharedCache',
+    'shared_cached',
+    'IdentityCache',
+    'Identity',
+    'identity_cache',
+    'identity_from_doc',
+    'SingleFlight',
+    'get_http_client',
+    'close_http_clients',
+    'HostLimitedTransport',
+    'page_etag',
+    'etag_matches',
+    'validator_headers',
 ]
@@ -0,0 +1,49 @@
+"""Validators for conditional GET: weak ETags built from content versions."""
+import hashlib
+import os
+import time
+from typing import Optional
+
+# Part of every ETag so a deploy that changes templates invalidates what clients
+# hold. Set it to the release (e.g. the git commit) when running several workers;
+# the default, the process start time, only costs a re-download after a restart.
+RENDER_VERSION = os.getenv('RENDER_VERSION') or str(int(time.time()))
+
+
+def page_etag(*parts) -> str:
+    """
+    Weak ETag for a page rendered from parts.
+
+    parts are the cheap-to-read versions the page is rendered from (content
+    version counters, the viewer and their role, the view); anything not in
+    parts must not change the page.
+
+    Example:
+        etag = page_etag('shelf', shelf.id, get_shelf_version(shelf.id, db_tables), viewer_did)
+    """
+    digest = hashlib.sha1(repr((RENDER_VERSION, parts)).encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names etag (weak comparison, as RFC 9110 requires for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.strip().removeprefix('W/') == opaque for candidate in if_none_match.split(','))
+
+
+def validator_headers(etag: str, private: bool) -> dict:
+    """
+    Response headers that let browsers and proxies revalidate instead of re-downloading.
+
+    no-cache makes every use a conditional request, so a 304 is only ever served
+    against the current versions. Logged-in pages are private to the browser.
+    """
+    return {
+        'ETag': etag,
+        'Cache-Control': 'private, no-cache' if private else 'no-cache',
+        'Vary': 'Cookie, HX-Request',
+    }
@@ -0,0 +1,77 @@
+"""In-process LRU cache for rendered HTML fragments."""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class FragmentCache:
+    """
+    Bounded LRU map from a fragment key to its rendered value, with hit/miss counters.
+
+    Keys carry everything the rendering depends on (a content version, the view,
+    the viewer's permission tier), so entries are never invalidated in place: a
+    write produces new keys and the stale entries age out of the LRU order.
+
+    Example:
+        fragments = FragmentCache("shelf", max_entries=2000)
+        html = fragments.get_or_render((shelf_id, version, view), lambda: to_xml(render()))
+    """
+
+    def __init__(self, name: str, max_entries: int = 1000):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The cached value for key (now most recently used), or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entries past max_entries."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Any]) -> Any:
+        """The cached value for key, rendering and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = render()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Entry count and hit/miss/eviction counters since start-up."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            }
@@ -0,0 +1,127 @@
+"""Process-wide pooled httpx clients, shared by every call instead of opened per request."""
+import asyncio
+import logging
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '100'))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY_SECONDS', '30'))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', '10'))
+
+# (name, event loop) -> client; an AsyncClient's pool belongs to the loop that first used it
+_clients: Dict[Tuple[str, asyncio.AbstractEventLoop], httpx.AsyncClient] = {}
+
+
+class _HostLimitedStream(httpx.AsyncByteStream):
+    """Response body that gives its host slot back once it is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, slot: asyncio.Semaphore):
+        self._stream = stream
+        self._slot = slot
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._slot is not None:
+                self._slot.release()
+                self._slot = None
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport allowing at most max_per_host requests in flight to any one host.
+
+    httpx.Limits caps connections for the whole client; this keeps one slow
+    host (a cover CDN, an overloaded PDS) from taking every connection of a
+    client shared across hosts. A request holds its host's slot until its
+    response body is closed.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self.max_per_host = max_per_host
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        slot = self._slots.get(host)
+        if slot is None:
+            slot = self._slots[host] = asyncio.Semaphore(self.max_per_host)
+        await slot.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        response.stream = _HostLimitedStream(response.stream, slot)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def get_http_client(name: str = "default", *, timeout=10.0, http2: bool = True,
+                    max_connections: int = None, max_keepalive_connections: int = None,
+                    max_per_host: int = None, follow_redirects: bool = False,
+                    headers: Optional[dict] = None,
+                    transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """
+    The shared client called name for the running event loop, creating it on first use.
+
+    Clients keep connections alive between calls and speak HTTP/2 where the
+    server does. The options only apply when the client is created, so every
+    caller of one name should pass the same ones. Limits left as None use
+    the HTTP_* environment settings. Must be called from a coroutine.
+
+    Example:
+        client = get_http_client("google_books", timeout=10.0)
+        response = await client.get(url, params=params)
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get((name, loop))
+    if client is not None and not client.is_closed:
+        return client
+
+    # Clients of loops asyncio.run() has since closed can't be closed any more; just drop them
+    for key in [key for key in _clients if key[1].is_closed()]:
+        del _clients[key]
+
+    inner = transport or httpx.AsyncHTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections or HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+    client = httpx.AsyncClient(
+        timeout=timeout,
+        follow_redirects=follow_redirects,
+        headers=headers,
+        transport=HostLimitedTransport(inner, max_per_host or HTTP_MAX_CONNECTIONS_PER_HOST),
+    )
+    _clients[(name, loop)] = client
+    logger.debug(f"Opened shared HTTP client '{name}'")
+    return client
+
+
+async def close_http_clients(names: Optional[Iterable[str]] = None):
+    """Close the shared clients of the running event loop (only those called names, if given)."""
+    loop = asyncio.get_running_loop()
+    names = None if names is None else set(names)
+    for key in [key for key in _clients if key[1] is loop and (names is None or key[0] in names)]:
+        client = _clients.pop(key)
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing HTTP client '{key[0]}': {e}")
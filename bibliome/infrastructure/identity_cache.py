@@ -0,0 +1,197 @@
+"""DID → handle / PDS identity cache, kept in the shared cache file for every process."""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, NamedTuple, Optional
+
+from .shared_cache import DEFAULT_PATH, open_cache_file
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL_HOURS', '24')) * 3600
+
+# Expired rows are deleted once this many identities have been stored, not on every store
+_PRUNE_EVERY = 256
+
+
+class Identity(NamedTuple):
+    """What a DID document says about an account, and when it was fetched (epoch seconds)."""
+    did: str
+    handle: Optional[str]
+    pds_endpoint: Optional[str]
+    fetched_at: float
+
+
+def identity_from_doc(did: str, doc: Any) -> Identity:
+    """
+    Identity for did from its DID document (a JSON dict or an atproto DidDocument).
+
+    The handle is the first at:// entry of alsoKnownAs and the PDS the
+    AtprotoPersonalDataServer service's endpoint; either is None if absent.
+    """
+    if isinstance(doc, dict):
+        aliases = doc.get('alsoKnownAs') or []
+        services = doc.get('service') or []
+    else:
+        aliases = getattr(doc, 'also_known_as', None) or []
+        services = getattr(doc, 'service', None) or []
+
+    handle = next((aka[len('at://'):].lower() for aka in aliases
+                   if isinstance(aka, str) and aka.startswith('at://')), None)
+    pds_endpoint = None
+    for svc in services:
+        if isinstance(svc, dict):
+            typ, endpoint = svc.get('type'), svc.get('serviceEndpoint') or svc.get('service_endpoint')
+        else:
+            typ, endpoint = getattr(svc, 'type', None), getattr(svc, 'service_endpoint', None)
+        if typ == 'AtprotoPersonalDataServer' and isinstance(endpoint, str) and endpoint:
+            pds_endpoint = endpoint.rstrip('/')
+            break
+    return Identity(did, handle, pds_endpoint, time.time())
+
+
+class IdentityCache:
+    """
+    Handles and PDS endpoints of DIDs, read by every resolver instead of the network.
+
+    Rows live in the identity table of the shared cache file, so a DID
+    resolved by the scanner is known to the web app's OAuth login and the
+    other way round. Entries older than ttl are not returned; callers
+    resolve again and store() the new answer. The firehose ingester calls
+    invalidate() when an account's identity changes (new handle or PDS).
+    Read and write errors are logged and treated as misses.
+
+    Example:
+        identity = identity_cache.get(did)
+        if identity is None:
+            identity = identity_from_doc(did, resolve_did_document(did))
+            identity_cache.store(identity)
+    """
+
+    def __init__(self, ttl: float = IDENTITY_CACHE_TTL, path: Optional[str] = None):
+        self.name = "identity"
+        self.ttl = ttl
+        self.path = path or DEFAULT_PATH
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stores_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = open_cache_file(self.path)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS identity (
+                    did TEXT PRIMARY KEY,
+                    handle TEXT,
+                    pds_endpoint TEXT,
+                    fetched_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            # Handles are never looked up here (alsoKnownAs is unverified); drop the index earlier files had
+            conn.execute("DROP INDEX IF EXISTS idx_identity_handle")
+            self._conn = conn
+        return self._conn
+
+    def _query(self, sql: str, params: tuple) -> list:
+        try:
+            with self._lock:
+                return self._connection().execute(sql, params).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Identity cache read failed: {e}")
+            return []
+
+    def get(self, did: str) -> Optional[Identity]:
+        """The unexpired identity of did, or None."""
+        return self.get_many([did]).get(did)
+
+    def get_many(self, dids: Iterable[str]) -> dict:
+        """Unexpired identities of dids, as {did: Identity}; unknown and expired DIDs are left out."""
+        dids = list(dict.fromkeys(dids))
+        found = {}
+        cutoff = time.time() - self.ttl
+        for i in range(0, len(dids), 500):
+            chunk = dids[i:i + 500]
+            placeholders = ','.join('?' for _ in chunk)
+            for row in self._query(
+                f"SELECT did, handle, pds_endpoint, fetched_at FROM identity WHERE did IN ({placeholders}) AND fetched_at > ?",
+                (*chunk, cutoff)
+            ):
+                found[row[0]] = Identity(*row)
+        self.hits += len(found)
+        self.misses += len(dids) - len(found)
+        return found
+
+    def store(self, identity: Identity):
+        """Record identity, replacing what was known about its DID."""
+        self.store_many([identity])
+
+    def store_many(self, identities: Iterable[Identity]):
+        """Record identities in one transaction."""
+        rows = [(i.did, i.handle, i.pds_endpoint, i.fetched_at) for i in identities]
+        if not rows:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO identity (did, handle, pds_endpoint, fetched_at) VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+                    self._stores_since_prune += len(rows)
+                    if self._stores_since_prune >= _PRUNE_EVERY:
+                        self._stores_since_prune = 0
+                        conn.execute("DELETE FROM identity WHERE fetched_at <= ?", (time.time() - self.ttl,))
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Identity cache write failed: {e}")
+
+    def invalidate(self, did: str) -> bool:
+        """Forget did's identity, in every process; whether there was one."""
+        # Most identity events are for DIDs never seen here; check before taking the write lock
+        if not self._query("SELECT 1 FROM identity WHERE did = ?", (did,)):
+            return False
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM identity WHERE did = ?", (did,))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Identity cache invalidation failed: {e}")
+            return False
+        self.invalidations += 1
+        return True
+
+    def __len__(self) -> int:
+        rows = self._query("SELECT COUNT(*) FROM identity WHERE fetched_at > ?", (time.time() - self.ttl,))
+        return rows[0][0] if rows else 0
+
+    def stats(self) -> dict:
+        """Entry count and this process's hit/miss counters, shaped like FragmentCache.stats() (invalidations as evictions, no size cap)."""
+        lookups = self.hits + self.misses
+        return {
+            'name': f"{self.name} (shared)",
+            'entries': len(self),
+            'max_entries': None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.invalidations,
+            'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Shared by DirectPDSClient, the scanner, OAuth login and the firehose ingester
+identity_cache = IdentityCache()
@@ -31,6 +31,11 @@ class RateLimiter:
             self.tokens = min(self.max_tokens, self.tokens + new_tokens)
             self.last_refill_time = now
 
+    def available_tokens(self) -> float:
+        """Tokens in the bucket right now, without taking any (an estimate: the lock is not held)."""
+        refill = (time.monotonic() - self.last_refill_time) * self.tokens_per_second
+        return min(self.max_tokens, self.tokens + refill)
+
     async def acquire(self, weight: int = 1):
         """
         Acquire a token before making a rate-limited call.
@@ -0,0 +1,182 @@
+"""Pool of read-only SQLite connections for concurrent request reads."""
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import MISSING, fields
+from itertools import repeat, starmap
+from operator import add, itemgetter
+from pathlib import Path
+
+
+def dict_rows(columns: tuple, cursor) -> list[dict]:
+    """Build one dict per row; map() keeps the per-row work in C."""
+    return list(map(dict, map(zip, repeat(columns), cursor)))
+
+
+def tuple_rows(columns: tuple, cursor) -> tuple[tuple, list[tuple]]:
+    """The column names and the rows as plain tuples, for callers that pick columns by position."""
+    return columns, list(cursor)
+
+
+def object_rows(row_type):
+    """
+    A row factory building row_type (a dataclass with two or more fields)
+    straight from the cursor's tuples.
+
+    Columns are matched to fields by name; other columns are ignored and fields
+    the query doesn't select get their defaults. Each row costs one itemgetter
+    and one positional constructor call, with no per-row dict.
+    """
+    row_fields = fields(row_type)
+
+    def build(columns: tuple, cursor) -> list:
+        positions = {}
+        for i, column in enumerate(columns):
+            positions.setdefault(column, i)
+        missing = [f for f in row_fields if f.name not in positions]
+        if missing:
+            # Append the defaults to every row so they can be picked like columns
+            defaults = tuple(None if f.default is MISSING else f.default for f in missing)
+            positions.update((f.name, len(columns) + i) for i, f in enumerate(missing))
+            cursor = map(add, cursor, repeat(defaults))
+        pick = itemgetter(*(positions[f.name] for f in row_fields))
+        return list(starmap(row_type, map(pick, cursor)))
+
+    return build
+
+
+class ReadPoolTimeout(RuntimeError):
+    """Raised when no read connection frees up within the pool timeout."""
+
+
+class ReadConnectionPool:
+    """
+    A bounded pool of read-only SQLite connections.
+
+    Connections are opened with a mode=ro URI and PRAGMA query_only, so a read
+    path can never write. Each checkout gets a connection to itself, which
+    removes the cursor sharing that used to need retry-and-sleep loops.
+    execute() holds its connection for one statement only, so a pool much
+    smaller than the web server's threadpool serves every request.
+
+    Every checkout records how long it waited; stats() reports the totals.
+    """
+
+    def __init__(self, db_path: str, size: int = 8, timeout: float = 10.0,
+                 statement_cache_size: int = 256, row_factory=dict_rows):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.statement_cache_size = statement_cache_size
+        self.row_factory = row_factory
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        # Wait-time metrics
+        self._waits_ms = deque(maxlen=1000)
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30,
+                               cached_statements=self.statement_cache_size)
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA cache_size=10000")
+        conn.execute("PRAGMA temp_store=memory")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check out a connection, opening one if the pool isn't full yet."""
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._open < self.size
+                if can_open:
+                    self._open += 1
+            if can_open:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise ReadPoolTimeout(f"No read connection free after {self.timeout}s ({self.size} in use)")
+        self._record_wait((time.perf_counter() - started) * 1000)
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a checked-out connection to the pool."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """A connection checked out for the caller's exclusive use until the block exits."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def execute(self, query: str, params=(), row_factory=None) -> list:
+        """Run a read query and return its rows through row_factory (default: the pool's)."""
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            if cursor.description is None:
+                return []
+            return (row_factory or self.row_factory)(tuple(d[0] for d in cursor.description), cursor)
+
+    def _record_wait(self, wait_ms: float):
+        with self._lock:
+            self._checkouts += 1
+            self._wait_ms_total += wait_ms
+            self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+            self._waits_ms.append(wait_ms)
+
+    def stats(self) -> dict:
+        """Pool occupancy and checkout wait times (percentiles over the last 1000 checkouts)."""
+        with self._lock:
+            waits = sorted(self._waits_ms)
+            idle = self._idle.qsize()
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': idle,
+                'in_use': self._open - idle,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'wait_ms_avg': round(self._wait_ms_total / self._checkouts, 3) if self._checkouts else 0.0,
+                'wait_ms_p50': round(waits[len(waits) // 2], 3) if waits else 0.0,
+                'wait_ms_p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                'wait_ms_max': round(self._wait_ms_max, 3),
+            }
+
+    def close(self):
+        """Close the idle connections; checked-out ones close when the pool is dropped."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._open -= 1
@@ -0,0 +1,234 @@
+"""Cache shared by the web app and the background services through one SQLite file."""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# service_manager starts every process from the project root, so they all open the same file
+DEFAULT_PATH = os.getenv('SHARED_CACHE_PATH', 'data/shared_cache.db')
+
+# Entries beyond max_entries are evicted once this many sets have gone by, not on every set
+_EVICT_EVERY = 64
+
+_MISSING = object()
+
+
+def open_cache_file(path: str) -> sqlite3.Connection:
+    """Autocommit connection to a shared cache file in WAL mode, creating its directory if needed."""
+    if path != ':memory:':
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SharedCache:
+    """
+    Namespaced key/value cache with TTLs in a SQLite file that every process opens.
+
+    The web app, the firehose ingester, the scanner and the cover job each run
+    in their own process; a value one of them computes (a follow list, a DID's
+    PDS) is then reused by the others. Values must be JSON-serializable and keys
+    are stored as their JSON text, so tuples and lists of the same items name
+    the same entry. Each namespace keeps at most max_entries, dropping the
+    least recently read. Errors reading or writing the file are logged and
+    treated as misses, so a broken cache never fails its caller.
+
+    Example:
+        follows = SharedCache("follows", default_ttl=3600)
+        dids = follows.get(user_did)
+        if dids is None:
+            dids = fetch_follows(user_did)
+            follows.set(user_did, dids)
+    """
+
+    def __init__(self, namespace: str, default_ttl: float = 3600, max_entries: int = 10000,
+                 path: Optional[str] = None):
+        self.name = namespace
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.path = path or DEFAULT_PATH
+        self._conn = None
+        self._lock = threading.Lock()
+        self._sets_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = open_cache_file(self.path)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entry (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entry_accessed ON cache_entry(namespace, accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(key, separators=(',', ':'))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """The unexpired value for key, or default."""
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: Iterable[Hashable]) -> dict:
+        """Unexpired values for keys, as {key: value}; missing and expired keys are left out."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        by_text = {self._key(key): key for key in keys}
+        now = time.time()
+        found = {}
+        try:
+            with self._lock:
+                conn = self._connection()
+                texts = list(by_text)
+                for i in range(0, len(texts), 500):
+                    chunk = texts[i:i + 500]
+                    placeholders = ','.join('?' for _ in chunk)
+                    rows = conn.execute(
+                        f"SELECT key, value FROM cache_entry WHERE namespace = ? AND key IN ({placeholders}) AND expires_at > ?",
+                        (self.name, *chunk, now)
+                    ).fetchall()
+                    for text, value in rows:
+                        found[by_text[text]] = json.loads(value)
+                    if rows:
+                        conn.execute(
+                            f"UPDATE cache_entry SET accessed_at = ? WHERE namespace = ? AND key IN ({','.join('?' for _ in rows)})",
+                            (now, self.name, *(text for text, _ in rows))
+                        )
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.warning(f"Shared cache {self.name} read failed: {e}")
+        self.hits += len(found)
+        self.misses += len(by_text) - len(found)
+        return found
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store value under key for ttl seconds (default_ttl if not given)."""
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items: dict, ttl: Optional[float] = None):
+        """Store every {key: value} in items for ttl seconds (default_ttl if not given)."""
+        if not items:
+            return
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        try:
+            rows = [(self.name, self._key(key), json.dumps(value), expires_at, now) for key, value in items.items()]
+            with self._lock:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO cache_entry (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._sets_since_evict += len(rows)
+                    if self._sets_since_evict >= _EVICT_EVERY:
+                        self._sets_since_evict = 0
+                        self._evict(conn, now)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            logger.warning(f"Shared cache {self.name} write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then the least recently read ones past max_entries."""
+        expired = conn.execute("DELETE FROM cache_entry WHERE namespace = ? AND expires_at <= ?", (self.name, now)).rowcount
+        overflow = conn.execute("""
+            DELETE FROM cache_entry WHERE namespace = ? AND key IN (
+                SELECT key FROM cache_entry WHERE namespace = ?
+                ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.name, self.name, self.max_entries)).rowcount
+        self.evictions += expired + overflow
+
+    def delete(self, key: Hashable):
+        """Drop the entry for key, in every process."""
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM cache_entry WHERE namespace = ? AND key = ?", (self.name, self._key(key)))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache {self.name} delete failed: {e}")
+
+    def clear(self):
+        """Drop every entry in this namespace; the counters are kept."""
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM cache_entry WHERE namespace = ?", (self.name,))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache {self.name} clear failed: {e}")
+
+    def __len__(self) -> int:
+        try:
+            with self._lock:
+                return self._connection().execute(
+                    "SELECT COUNT(*) FROM cache_entry WHERE namespace = ? AND expires_at > ?", (self.name, time.time())
+                ).fetchone()[0]
+        except (sqlite3.Error, OSError):
+            return 0
+
+    def stats(self) -> dict:
+        """Entry count and this process's hit/miss/eviction counters, shaped like FragmentCache.stats()."""
+        lookups = self.hits + self.misses
+        return {
+            'name': f"{self.name} (shared)",
+            'entries': len(self),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def shared_cached(cache: SharedCache, key: Callable[..., Hashable], ttl: Optional[float] = None,
+                  store_if: Callable[[Any], bool] = lambda value: value is not None):
+    """
+    Decorator that reads a function's result through a SharedCache.
+
+    key builds the cache key from the call's arguments; results for which
+    store_if is false (by default None) are returned without being cached.
+
+    Example:
+        @shared_cached(follows, key=lambda self, user_did, session: user_did, store_if=bool)
+        def get_follows(self, user_did, session): ...
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            value = cache.get(cache_key, _MISSING)
+            if value is not _MISSING:
+                return value
+            value = fn(*args, **kwargs)
+            if store_if(value):
+                cache.set(cache_key, value, ttl)
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,110 @@
+"""Single-flight coalescing: concurrent identical calls share one upstream request."""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Call:
+    """An in-flight synchronous call that other threads wait on."""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait for it and get the same result, or the same
+    exception. Nothing is kept once the call finishes, so this only removes
+    duplicate concurrent requests; caching finished results is left to the
+    caches in front of it. Coroutines go through do(), blocking functions
+    called from threads through call(); the two never share a flight.
+
+    Example:
+        lookups = SingleFlight("book_api")
+        book = await lookups.do(("isbn", isbn), lambda: fetch_isbn(isbn))
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._futures: dict = {}
+        self._calls: dict = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn(), or the in-flight call for key if there is one on this event loop."""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        future = self._futures.get(flight_key)
+        if future is not None:
+            self.collapsed += 1
+            # A waiter being cancelled must not cancel the leader's call
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._futures[flight_key] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here, so an unwaited failure isn't logged as lost
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._futures[flight_key]
+
+    def call(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn(), or wait for the call for key another thread already has in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def __len__(self) -> int:
+        return len(self._futures) + len(self._calls)
+
+    def stats(self) -> dict:
+        """Leader and collapsed call counts, shaped like FragmentCache.stats(): collapsed calls are hits, in_flight replaces entries."""
+        calls = self.leaders + self.collapsed
+        return {
+            'name': f"{self.name} (single-flight)",
+            'in_flight': len(self),
+            'hits': self.collapsed,
+            'misses': self.leaders,
+            'evictions': 0,
+            'hit_rate': round(self.collapsed / calls * 100, 1) if calls else 0.0,
+        }
@@ -0,0 +1,130 @@
+"""Stale-while-revalidate cache for whole pages that are the same for every visitor."""
+import logging
+import threading
+import time
+from functools import partial
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CachedPage(NamedTuple):
+    """A cached value, the number of the computation that produced it and when it ran (monotonic)."""
+    value: Any
+    version: int
+    computed_at: float
+
+
+class StaleWhileRevalidateCache:
+    """
+    Time-based cache that serves stale values while one caller recomputes them.
+
+    An entry is fresh for ttl seconds and may then be served stale for another
+    max_stale seconds. The first lookup of a stale entry gets a refresh callable
+    to run after its response is sent (e.g. as a Starlette BackgroundTask), so no
+    visitor waits on a refresh and only one refresh runs per key. With no usable
+    entry (cold start, or stale past max_stale) the value is computed inline,
+    and concurrent callers for the key wait for that one computation instead of
+    each running their own.
+
+    Example:
+        pages = StaleWhileRevalidateCache("landing", ttl=60, max_stale=600)
+        page, refresh = pages.get_or_compute(("home",), render_landing)
+        return page.value, *([BackgroundTask(refresh)] if refresh else [])
+    """
+
+    def __init__(self, name: str, ttl: float = 60, max_stale: float = 600):
+        self.name = name
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries: dict = {}
+        self._refreshing: dict = {}  # key -> when its refresh was handed out
+        self._compute_locks: dict = {}
+        self._lock = threading.Lock()
+        self._versions = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> tuple[CachedPage, Optional[Callable[[], None]]]:
+        """
+        The entry for key and, if it is stale, the refresh to run after responding.
+
+        Only one caller per stale period gets a refresh callable; everyone else
+        gets None. Errors from an inline compute propagate to the caller.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry.computed_at if entry else None
+            if entry and age < self.ttl:
+                self.hits += 1
+                return entry, None
+            if entry and age < self.ttl + self.max_stale:
+                self.stale_hits += 1
+                # A refresh handed out more than ttl ago never ran (say the client
+                # went away before its background task), so hand out another
+                claimed_at = self._refreshing.get(key)
+                if claimed_at is not None and time.monotonic() - claimed_at < self.ttl:
+                    return entry, None
+                self._refreshing[key] = time.monotonic()
+                return entry, partial(self._refresh, key, compute)
+            compute_lock = self._compute_locks.setdefault(key, threading.Lock())
+
+        with compute_lock:
+            # Another caller may have computed the entry while this one waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and time.monotonic() - entry.computed_at < self.ttl:
+                    self.hits += 1
+                    return entry, None
+                self.misses += 1
+            return self._store(key, compute()), None
+
+    def _store(self, key: Hashable, value: Any) -> CachedPage:
+        with self._lock:
+            self._versions += 1
+            entry = CachedPage(value, self._versions, time.monotonic())
+            self._entries[key] = entry
+            return entry
+
+    def _refresh(self, key: Hashable, compute: Callable[[], Any]):
+        """Recompute a stale entry; on failure the stale value keeps being served until max_stale."""
+        try:
+            self._store(key, compute())
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            logger.warning(f"Refreshing {self.name} cache entry {key!r} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def clear(self):
+        """Drop every entry; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Entry count and hit/stale/miss/refresh counters since start-up, shaped like FragmentCache.stats()."""
+        with self._lock:
+            served = self.hits + self.stale_hits
+            lookups = served + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'max_entries': len(self._entries),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': 0,
+                'refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors,
+                'hit_rate': round(served / lookups * 100, 1) if lookups else 0.0,
+            }
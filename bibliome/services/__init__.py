@@ -19,7 +19,9 @@ from .permissions import (
     get_user_role,
     can_invite_role,
     validate_invite,
+    PermissionContext,
 )
+from .repository import AsyncRepository
 
 __all__ = [
     # Permissions
@@ -38,4 +40,7 @@ __all__ = [
     'get_user_role',
     'can_invite_role',
     'validate_invite',
+    'PermissionContext',
+    # Async data access
+    'AsyncRepository',
 ]
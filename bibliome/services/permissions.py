@@ -5,9 +5,12 @@ books, and comments. Permissions are checked against both ownership and
 explicit permission records.
 """
 
+import logging
 from datetime import datetime
 from typing import Optional, Dict, Any
 
+logger = logging.getLogger(__name__)
+
 
 def check_permission(bookshelf, user_did: str, required_roles: list, db_tables: Dict[str, Any]) -> bool:
     """Check if user has required permission for a bookshelf.
@@ -163,6 +166,126 @@ def get_user_role(bookshelf, user_did: str, db_tables: Dict[str, Any]) -> Option
         return None
 
 
+
+class PermissionContext:
+    """Request-scoped permission resolver for a single viewer.
+
+    Loads the viewer's active role for one or many shelves with a single query
+    and answers the can_* checks from memory, so a page that asks several
+    questions about a shelf (or one question about each of many shelves) does
+    not hit the permission table once per check. The rules are the same as the
+    module-level functions.
+
+    Example:
+        perms = PermissionContext(user_did, db_tables).load(shelves)
+        can_edit = perms.can_edit_bookshelf(shelf)
+    """
+
+    def __init__(self, user_did: Optional[str], db_tables: Dict[str, Any]):
+        self.user_did = user_did
+        self.db_tables = db_tables
+        self._roles: Dict[int, Optional[str]] = {}
+
+    def load(self, bookshelves) -> 'PermissionContext':
+        """Fetch the viewer's roles for every shelf not loaded yet, in one query."""
+        if not self.user_did:
+            return self
+        shelf_ids = list({shelf.id for shelf in bookshelves
+                          if shelf.id not in self._roles and shelf.owner_did != self.user_did})
+        if not shelf_ids:
+            return self
+
+        from models import safe_execute_query
+        placeholders = ",".join("?" * len(shelf_ids))
+        try:
+            rows = safe_execute_query(
+                self.db_tables['db'],
+                f"""SELECT bookshelf_id, role FROM permission
+                    WHERE user_did = ? AND status = 'active' AND bookshelf_id IN ({placeholders})""",
+                (self.user_did, *shelf_ids)
+            )
+        except Exception as e:
+            # Left unloaded, so these shelves are denied now and looked up again on the next check
+            logger.error(f"Error loading permissions of {self.user_did} for shelves {shelf_ids}: {e}")
+            return self
+
+        for shelf_id in shelf_ids:
+            self._roles[shelf_id] = None
+        for row in rows:
+            self._roles[row['bookshelf_id']] = row['role']
+        return self
+
+    def role(self, bookshelf) -> Optional[str]:
+        """Get the viewer's role for a bookshelf ('owner', 'moderator', 'contributor', 'viewer') or None."""
+        if not self.user_did:
+            return None
+        if bookshelf.owner_did == self.user_did:
+            return 'owner'
+        if bookshelf.id not in self._roles:
+            self.load([bookshelf])
+        return self._roles.get(bookshelf.id)
+
+    def tier(self, bookshelf) -> str:
+        """What the viewer's shelf page depends on: 'anonymous', 'reader' (logged in, can't vote) or their role.
+
+        Pages for the 'anonymous' and 'reader' tiers carry no per-viewer state,
+        so they can be shared between viewers of the same tier.
+        """
+        if not self.user_did:
+            return 'anonymous'
+        if not self.can_vote_books(bookshelf):
+            return 'reader'
+        return self.role(bookshelf) or 'self-join'
+
+    def check(self, bookshelf, required_roles: list) -> bool:
+        """Same rules as check_permission, answered from the loaded roles."""
+        if not self.user_did:
+            return bookshelf.privacy == 'public'
+        return self.role(bookshelf) in ('owner', *required_roles)
+
+    def can_view_bookshelf(self, bookshelf) -> bool:
+        """Check if the viewer can view a bookshelf."""
+        if bookshelf.privacy in ('public', 'link-only'):
+            return True
+        return self.check(bookshelf, ['viewer', 'contributor', 'moderator', 'owner'])
+
+    def can_add_books(self, bookshelf) -> bool:
+        """Check if the viewer can add books (contributor, moderator, owner, or self-join enabled)."""
+        if not self.user_did:
+            return False
+        return self.check(bookshelf, ['contributor', 'moderator', 'owner']) or bool(bookshelf.self_join)
+
+    def can_vote_books(self, bookshelf) -> bool:
+        """Check if the viewer can vote on books (same as can_add_books)."""
+        return self.can_add_books(bookshelf)
+
+    def can_comment_on_books(self, bookshelf) -> bool:
+        """Check if the viewer can comment on books (same as can_add_books)."""
+        return self.can_add_books(bookshelf)
+
+    def can_remove_books(self, bookshelf) -> bool:
+        """Check if the viewer can remove books (moderator, owner)."""
+        if not self.user_did:
+            return False
+        return self.check(bookshelf, ['moderator', 'owner'])
+
+    def can_edit_bookshelf(self, bookshelf) -> bool:
+        """Check if the viewer can edit bookshelf details (moderator, owner)."""
+        return self.can_remove_books(bookshelf)
+
+    def can_manage_members(self, bookshelf) -> bool:
+        """Check if the viewer can manage members (moderator, owner)."""
+        return self.can_remove_books(bookshelf)
+
+    def can_generate_invites(self, bookshelf) -> bool:
+        """Check if the viewer can generate invites (moderator, owner)."""
+        return self.can_remove_books(bookshelf)
+
+    def can_delete_shelf(self, bookshelf) -> bool:
+        """Check if the viewer can delete the bookshelf (owner only)."""
+        return bool(self.user_did) and bookshelf.owner_did == self.user_did
+
+
 def can_invite_role(inviter_role: str, target_role: str) -> bool:
     """Check if a user with inviter_role can invite someone with target_role.
     
@@ -0,0 +1,94 @@
+"""Async access to the synchronous data layer for async routes and services.
+
+FastLite tables and the models.py functions block on SQLite. Calling them from
+an ``async def`` handler stalls the event loop for every other request, so
+async code goes through AsyncRepository instead, which runs each call on a
+worker thread. Reads share a small thread pool (they use the read connection
+pool); writes go through a single writer thread, which is SQLite's limit anyway.
+"""
+
+import asyncio
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from apswutils.db import NotFoundError
+
+_read_executor: Optional[ThreadPoolExecutor] = None
+_write_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _executors() -> tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+    """The process-wide read and write executors, created on first use."""
+    global _read_executor, _write_executor
+    if _read_executor is None:
+        workers = int(os.getenv('READ_POOL_SIZE', 8))
+        _read_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-read')
+        _write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-write')
+    return _read_executor, _write_executor
+
+
+class AsyncRepository:
+    """
+    Awaitable wrappers around db_tables and the models.py functions.
+
+    Any models.py function can be awaited with read() or write(), e.g.
+    ``await repo.read(can_add_books, shelf, did, repo.db_tables)``. The table
+    helpers cover the FastLite calls async code makes most often.
+    """
+
+    def __init__(self, db_tables: Dict[str, Any]):
+        self.db_tables = db_tables
+        self._read_executor, self._write_executor = _executors()
+
+    async def read(self, fn: Callable, *args, **kwargs):
+        """Run a read-only call on a reader thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, partial(fn, *args, **kwargs))
+
+    async def write(self, fn: Callable, *args, **kwargs):
+        """Run a call that writes on the writer thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._write_executor, partial(fn, *args, **kwargs))
+
+    def write_nowait(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue a write (e.g. a log row) behind earlier writes without waiting for it."""
+        return self._write_executor.submit(fn, *args, **kwargs)
+
+    # Table helpers
+
+    async def get(self, table: str, pk) -> Optional[Any]:
+        """The row with primary key pk, or None if there is none."""
+        return await self.read(self._get, table, pk)
+
+    def _get(self, table: str, pk):
+        try:
+            return self.db_tables[table][pk]
+        except (NotFoundError, IndexError):
+            return None
+
+    async def find(self, table: str, where: str = None, args: tuple = (), **kwargs) -> list:
+        """Rows of table matching where, as table(where, args, ...) would return them."""
+        return await self.read(lambda: list(self.db_tables[table](where, args, **kwargs)))
+
+    async def insert(self, table: str, record=None, **kwargs):
+        """Insert a record (or keyword values) and return the inserted row."""
+        if record is None:
+            return await self.write(lambda: self.db_tables[table].insert(**kwargs))
+        return await self.write(self.db_tables[table].insert, record)
+
+    async def update(self, table: str, data, pk=None):
+        """Update a record, or the row pk with the values in data."""
+        if pk is None:
+            return await self.write(self.db_tables[table].update, data)
+        return await self.write(self.db_tables[table].update, data, pk)
+
+    async def query(self, sql: str, params: tuple = ()) -> list[dict]:
+        """Run a read query through safe_execute_query (the read connection pool)."""
+        from models import safe_execute_query
+        return await self.read(safe_execute_query, self.db_tables['db'], sql, params)
+
+    async def execute(self, sql: str, params: tuple = ()):
+        """Run a write statement on the main connection."""
+        return await self.write(self.db_tables['db'].execute, sql, params)
@@ -10,8 +10,8 @@ from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
-from apswutils.db import NotFoundError
-from models import SyncLog, User, Bookshelf, Book, generate_slug
+from models import (SyncLog, User, Bookshelf, Book, generate_slug, refresh_shelf_stats, refresh_shelf_mix,
+                    refresh_inbox_pull_authors, store_profiles)
 from database_manager import db_manager
 from direct_pds_client import DirectPDSClient
 from hybrid_discovery import HybridDiscoveryService
@@ -19,6 +19,8 @@ from circuit_breaker import CircuitBreaker
 from rate_limiter import RateLimiter
 from api_clients import BookAPIClient
 from atproto import IdResolver
+from bibliome.infrastructure.http_clients import close_http_clients
+from bibliome.infrastructure.identity_cache import identity_cache, identity_from_doc
 
 # Configure logging with service name prefix
 log_level_str = os.getenv('LOG_LEVEL', 'INFO').upper()
@@ -61,6 +63,7 @@ class BiblioMeScanner:
         self.pds_client = DirectPDSClient(rate_limiter)
         self.discovery = HybridDiscoveryService(self.pds_client)
         self.db_tables = None
+        self.repo = None  # AsyncRepository over db_tables; all database calls go through it
         self.scan_interval_hours = int(os.getenv('BIBLIOME_SCAN_INTERVAL_HOURS', '6'))
         self.import_public_only = os.getenv('BIBLIOME_IMPORT_PUBLIC_ONLY', 'true').lower() == 'true'
         self.user_batch_size = int(os.getenv('BIBLIOME_USER_BATCH_SIZE', '50'))
@@ -88,25 +91,33 @@ class BiblioMeScanner:
         # Run the first scan in the background without blocking
         asyncio.create_task(self.run_scan_cycle())
 
-        while self.running:
-            try:
-                # The loop now only schedules subsequent scans
-                logger.info(f"Next scan scheduled in {self.scan_interval_hours} hours.")
-                await asyncio.sleep(self.scan_interval_hours * 3600)
-                if self.running:
-                    await self.run_scan_cycle()
-            except Exception as e:
-                logger.error(f"Error in scan scheduling loop: {e}", exc_info=True)
-                await asyncio.sleep(3600) # Wait an hour before retrying on major failure
+        try:
+            while self.running:
+                try:
+                    # The loop now only schedules subsequent scans
+                    logger.info(f"Next scan scheduled in {self.scan_interval_hours} hours.")
+                    await asyncio.sleep(self.scan_interval_hours * 3600)
+                    if self.running:
+                        await self.run_scan_cycle()
+                except Exception as e:
+                    logger.error(f"Error in scan scheduling loop: {e}", exc_info=True)
+                    await asyncio.sleep(3600) # Wait an hour before retrying on major failure
+        finally:
+            await self.pds_client.aclose()
+            await close_http_clients()
 
     async def run_scan_cycle(self):
         """Runs a complete scan and import cycle."""
         logger.info("Starting new scan cycle...")
-        self.db_tables = await db_manager.get_connection()
+        await self._connect()
         
         # 1. Discover users with Bibliome records
         discovered_dids = await self.discovery.discover_users()
         logger.info(f"Discovered a total of {len(discovered_dids)} Bibliome users.")
+
+        # Refresh expired identities in one batch, so the per-user steps below resolve from the cache
+        refreshed = await self.pds_client.refresh_identities(discovered_dids)
+        logger.info(f"Refreshed {refreshed} expired or unknown identities.")
         
         # 2. Process discovered users and create database entries
         logger.info(f"Processing {len(discovered_dids)} discovered users to create database entries...")
@@ -140,6 +151,21 @@ class BiblioMeScanner:
             for did in batch:
                 await self.sync_user_content(did)
             logger.info(f"Completed content sync for batch of {len(batch)} users.")
+        
+        # 4. Let time-based shelf statistics (30-day activity, new-shelf boost) decay, then re-rank explore
+        refreshed = await self.repo.write(refresh_shelf_stats, self.db_tables)
+        logger.info(f"Refreshed shelf statistics for {refreshed} bookshelves.")
+        ranked = await self.repo.write(refresh_shelf_mix, self.db_tables)
+        logger.info(f"Ranked {ranked} bookshelves for the explore smart mix.")
+
+        # 5. Read very-followed authors at feed time instead of fanning them out
+        pull = await self.repo.write(refresh_inbox_pull_authors, self.db_tables)
+        logger.info(f"Network feed pull authors: {pull['pull']} (+{pull['added']} -{pull['removed']}).")
+
+    async def _connect(self):
+        """Attach to this process's database and its AsyncRepository."""
+        self.repo = await db_manager.get_repository()
+        self.db_tables = self.repo.db_tables
 
     def _construct_blob_url(self, did: str, cid: str, pds_endpoint: str) -> str:
         """Constructs a proper blob URL from a PDS endpoint, DID, and CID."""
@@ -147,7 +173,7 @@ class BiblioMeScanner:
         return f"{base_url}/xrpc/com.atproto.sync.getBlob?did={did}&cid={cid}"
 
     def _resolve_did_to_handle(self, did: str) -> str:
-        """Resolve a DID to its handle using AT Protocol Identity resolver.
+        """Resolve a DID to its handle through the identity cache, fetching its DID document on a miss.
         
         Args:
             did: The DID to resolve (e.g., 'did:plc:abc123...')
@@ -156,17 +182,18 @@ class BiblioMeScanner:
             The resolved handle (e.g., 'alice.bsky.social') or the DID as fallback
         """
         try:
-            # Use the IdResolver to get the DID document
-            did_doc = self.id_resolver.did.resolve(did)
-            
-            # Extract handle from alsoKnownAs field
-            if did_doc and hasattr(did_doc, 'also_known_as') and did_doc.also_known_as:
-                for aka in did_doc.also_known_as:
-                    if isinstance(aka, str) and aka.startswith('at://'):
-                        # Extract handle from at:// URI (e.g., 'at://alice.bsky.social' -> 'alice.bsky.social')
-                        handle = aka[5:]  # Remove 'at://' prefix
-                        logger.debug(f"Resolved DID {did} to handle {handle}")
-                        return handle
+            identity = identity_cache.get(did)
+            if identity is None:
+                # Use the IdResolver to get the DID document
+                did_doc = self.id_resolver.did.resolve(did)
+                if did_doc:
+                    identity = identity_from_doc(did, did_doc)
+                    identity_cache.store(identity)
+
+            # Handle from the alsoKnownAs field (e.g., 'at://alice.bsky.social' -> 'alice.bsky.social')
+            if identity and identity.handle:
+                logger.debug(f"Resolved DID {did} to handle {identity.handle}")
+                return identity.handle
             
             # If no handle found in alsoKnownAs, try to resolve directly
             # This is a fallback that might work in some cases
@@ -199,17 +226,17 @@ class BiblioMeScanner:
             # Resolve DID to handle
             resolved_handle = self._resolve_did_to_handle(did)
 
-            try:
-                user = self.db_tables['users'][did]
+            user = await self.repo.get('users', did)
+            if user is not None:
                 # User exists, update if needed
                 user.is_remote = True
                 user.last_seen_remote = datetime.now(timezone.utc)
                 user.display_name = display_name
                 user.avatar_url = avatar_url
                 user.handle = resolved_handle  # Update handle with resolved value
-                self.db_tables['users'].update(user)
+                await self.repo.update('users', user)
                 self.log_sync_activity('user', did, 'updated', f'Profile updated, handle resolved to {resolved_handle}')
-            except NotFoundError:
+            else:
                 # New user, try to insert into DB
                 new_user = User(
                     did=did,
@@ -222,23 +249,35 @@ class BiblioMeScanner:
                     remote_sync_status='synced'
                 )
                 try:
-                    self.db_tables['users'].insert(new_user)
+                    await self.repo.insert('users', new_user)
                     self.log_sync_activity('user', did, 'imported', f'New remote user discovered, handle resolved to {resolved_handle}')
                 except Exception as insert_error:
                     # Race condition: another process inserted this user, update instead
                     if 'UNIQUE constraint failed' in str(insert_error):
                         logger.debug(f"User {did} was inserted by another process, updating instead")
-                        user = self.db_tables['users'][did]
+                        user = await self.repo.get('users', did)
                         user.is_remote = True
                         user.last_seen_remote = datetime.now(timezone.utc)
                         user.display_name = display_name
                         user.avatar_url = avatar_url
                         user.handle = resolved_handle
-                        self.db_tables['users'].update(user)
+                        await self.repo.update('users', user)
                         self.log_sync_activity('user', did, 'updated', f'Profile updated (race condition recovery), handle: {resolved_handle}')
                     else:
                         raise  # Re-raise other errors
 
+            # Warm the profile cache the network feed reads, unless the handle fell back to the DID
+            if resolved_handle != did:
+                try:
+                    await self.repo.write(store_profiles, {did: {
+                        'did': did,
+                        'handle': resolved_handle,
+                        'display_name': display_name or resolved_handle,
+                        'avatar_url': avatar_url or ''
+                    }}, self.db_tables)
+                except Exception as e:
+                    logger.warning(f"Could not cache profile for {did}: {e}")
+
         except Exception as e:
             logger.error(f"Error syncing profile for {did}: {e}", exc_info=True)
             self.log_sync_activity('user', did, 'failed', str(e))
@@ -282,9 +321,7 @@ class BiblioMeScanner:
 
         try:
             # Ensure the user exists before creating the bookshelf to prevent foreign key constraint errors
-            try:
-                user = self.db_tables['users'][did]
-            except NotFoundError:
+            if await self.repo.get('users', did) is None:
                 # User doesn't exist, create a minimal user record
                 logger.warning(f"User {did} not found when syncing bookshelf {uri}, creating minimal user record")
                 minimal_user = User(
@@ -297,7 +334,7 @@ class BiblioMeScanner:
                     remote_sync_status='partial'
                 )
                 try:
-                    self.db_tables['users'].insert(minimal_user)
+                    await self.repo.insert('users', minimal_user)
                     logger.info(f"Created minimal user record for {did}")
                 except Exception as insert_error:
                     if 'UNIQUE constraint failed' in str(insert_error):
@@ -330,7 +367,7 @@ class BiblioMeScanner:
                     logger.warning(f"Failed to parse createdAt '{created_at_raw}' for bookshelf {uri}: {e}")
 
             # Deduplication check
-            existing_shelf_list = self.db_tables['bookshelves']("original_atproto_uri=?", (uri,))
+            existing_shelf_list = await self.repo.find('bookshelves', "original_atproto_uri=?", (uri,))
             if existing_shelf_list:
                 # Update existing shelf
                 shelf = existing_shelf_list[0]
@@ -342,7 +379,7 @@ class BiblioMeScanner:
                 # Update created_at if we have it and it's not already set
                 if created_at and not shelf.created_at:
                     shelf.created_at = created_at
-                self.db_tables['bookshelves'].update(shelf)
+                await self.repo.update('bookshelves', shelf)
                 self.log_sync_activity('bookshelf', uri, 'updated')
             else:
                 # Create new shelf
@@ -361,7 +398,7 @@ class BiblioMeScanner:
                     remote_sync_status='synced',
                     original_atproto_uri=uri
                 )
-                self.db_tables['bookshelves'].insert(new_shelf)
+                await self.repo.insert('bookshelves', new_shelf)
                 self.log_sync_activity('bookshelf', uri, 'imported')
         except Exception as e:
             logger.error(f"Error syncing bookshelf {uri}: {e}")
@@ -370,11 +407,14 @@ class BiblioMeScanner:
     async def enrich_book_with_cover(self, book_data: dict) -> dict:
         """Enrich book data with cover image from external APIs using persistent rate-limited client."""
         try:
-            # Use the persistent BookAPIClient with rate limiting
+            # Use the persistent BookAPIClient with rate limiting; with the Google
+            # Books quota nearly spent, only use what is already cached
+            cache_only = self.book_api_client.quota_low()
+
             # Try to get book details by ISBN first (most reliable)
             if book_data.get('isbn'):
                 logger.debug(f"Looking up cover for ISBN: {book_data['isbn']}")
-                details = await self.book_api_client.get_book_details(book_data['isbn'])
+                details = await self.book_api_client.get_book_details(book_data['isbn'], cache_only=cache_only)
                 if details and details.get('cover_url'):
                     book_data['cover_url'] = details['cover_url']
                     logger.debug(f"Found cover via ISBN lookup: {details['cover_url']}")
@@ -387,7 +427,7 @@ class BiblioMeScanner:
                     search_query += f" {book_data['author']}"
 
                 logger.debug(f"Searching for cover with query: '{search_query}'")
-                results = await self.book_api_client.search_books(search_query, max_results=1)
+                results = await self.book_api_client.search_books(search_query, max_results=1, cache_only=cache_only)
                 if results and results[0].get('cover_url'):
                     book_data['cover_url'] = results[0]['cover_url']
                     logger.debug(f"Found cover via search: {results[0]['cover_url']}")
@@ -421,9 +461,7 @@ class BiblioMeScanner:
 
         try:
             # Ensure the user exists before creating the book to prevent foreign key constraint errors
-            try:
-                user = self.db_tables['users'][did]
-            except NotFoundError:
+            if await self.repo.get('users', did) is None:
                 # User doesn't exist, create a minimal user record
                 logger.warning(f"User {did} not found when syncing book {uri}, creating minimal user record")
                 minimal_user = User(
@@ -436,7 +474,7 @@ class BiblioMeScanner:
                     remote_sync_status='partial'
                 )
                 try:
-                    self.db_tables['users'].insert(minimal_user)
+                    await self.repo.insert('users', minimal_user)
                     logger.info(f"Created minimal user record for {did}")
                 except Exception as insert_error:
                     if 'UNIQUE constraint failed' in str(insert_error):
@@ -445,21 +483,21 @@ class BiblioMeScanner:
                         raise
             
             # Find the local bookshelf this book belongs to
-            parent_shelf_list = self.db_tables['bookshelves']("original_atproto_uri=?", (bookshelf_ref_uri,))
+            parent_shelf_list = await self.repo.find('bookshelves', "original_atproto_uri=?", (bookshelf_ref_uri,))
             if not parent_shelf_list:
                 self.log_sync_activity('book', uri, 'skipped', 'Parent bookshelf not found locally')
                 return
             parent_shelf_id = parent_shelf_list[0].id
 
             # Deduplication check
-            existing_book_list = self.db_tables['books']("original_atproto_uri=?", (uri,))
+            existing_book_list = await self.repo.find('books', "original_atproto_uri=?", (uri,))
             if existing_book_list:
                 # Update existing book
                 book = existing_book_list[0]
                 book.title = getattr(value, 'title', book.title)
                 book.author = getattr(value, 'author', book.author)
                 book.isbn = getattr(value, 'isbn', book.isbn)
-                self.db_tables['books'].update(book)
+                await self.repo.update('books', book)
                 self.log_sync_activity('book', uri, 'updated')
             else:
                 # Create new book with cover enrichment
@@ -486,7 +524,7 @@ class BiblioMeScanner:
                     logger.warning(f"Failed to enrich book with cover, proceeding without: {e}")
 
                 new_book = Book(**book_dict)
-                created_book = self.db_tables['books'].insert(new_book)
+                created_book = await self.repo.insert('books', new_book)
                 
                 # Cache the cover image if available
                 if book_dict.get('cover_url') and book_dict['cover_url'].strip():
@@ -501,7 +539,7 @@ class BiblioMeScanner:
                         # Handle the result based on the new return format
                         if cache_result['success']:
                             # Successfully cached
-                            self.db_tables['books'].update({
+                            await self.repo.update('books', {
                                 'cached_cover_path': cache_result['cached_path'],
                                 'cover_cached_at': datetime.now(timezone.utc),
                                 'cover_rate_limited_until': None  # Clear any previous rate limit
@@ -509,14 +547,14 @@ class BiblioMeScanner:
                             logger.debug(f"Cover cached for book {created_book.id}: {cache_result['cached_path']}")
                         elif cache_result['error_type'] == 'rate_limit':
                             # Rate limited - mark for later retry
-                            self.db_tables['books'].update({
+                            await self.repo.update('books', {
                                 'cover_cached_at': datetime.now(timezone.utc),
                                 'cover_rate_limited_until': cache_result['rate_limited_until']
                             }, created_book.id)
                             logger.info(f"Cover download rate limited for book {created_book.id}, will retry after {cache_result['rate_limited_until']}")
                         else:
                             # Other error - mark as attempted
-                            self.db_tables['books'].update({
+                            await self.repo.update('books', {
                                 'cover_cached_at': datetime.now(timezone.utc)
                             }, created_book.id)
                             logger.debug(f"Cover caching failed for book {created_book.id}: {cache_result['error_type']}")
@@ -530,15 +568,18 @@ class BiblioMeScanner:
             self.log_sync_activity('book', uri, 'failed', str(e))
 
     def log_sync_activity(self, sync_type: str, target_id: str, action: str, details: str = ""):
-        """Logs synchronization activity to the database."""
+        """Logs synchronization activity to the database (queued on the writer thread, not awaited)."""
+        log_entry = SyncLog(
+            sync_type=sync_type,
+            target_id=target_id,
+            action=action,
+            details=details,
+            timestamp=datetime.now(timezone.utc)
+        )
+        self.repo.write_nowait(self._insert_sync_log, log_entry)
+
+    def _insert_sync_log(self, log_entry: SyncLog):
         try:
-            log_entry = SyncLog(
-                sync_type=sync_type,
-                target_id=target_id,
-                action=action,
-                details=details,
-                timestamp=datetime.now(timezone.utc)
-            )
             self.db_tables['sync_logs'].insert(log_entry)
         except Exception as e:
             logger.error(f"Failed to log sync activity: {e}")
@@ -600,8 +641,8 @@ class BiblioMeScanner:
         logger.info(f"[ON-DEMAND] Starting login sync for user {user_did}")
         
         # Initialize DB connection if needed
-        if self.db_tables is None:
-            self.db_tables = await db_manager.get_connection()
+        if self.repo is None:
+            await self._connect()
         
         results = {
             'user_did': user_did,
@@ -616,8 +657,8 @@ class BiblioMeScanner:
             await self.sync_user_content(user_did)
             
             # Count what was synced
-            user_shelves = self.db_tables['bookshelves']("owner_did=?", (user_did,))
-            user_books = self.db_tables['books']("added_by_did=?", (user_did,))
+            user_shelves = await self.repo.find('bookshelves', "owner_did=?", (user_did,))
+            user_books = await self.repo.find('books', "added_by_did=?", (user_did,))
             
             results['bookshelves_synced'] = len(user_shelves)
             results['books_synced'] = len(user_books)
@@ -646,8 +687,8 @@ class BiblioMeScanner:
         logger.info(f"[NETWORK-SYNC] Starting background sync for {len(following_dids)} following DIDs (max: {max_users})")
         
         # Initialize DB connection if needed
-        if self.db_tables is None:
-            self.db_tables = await db_manager.get_connection()
+        if self.repo is None:
+            await self._connect()
         
         synced_count = 0
         checked_count = 0
@@ -663,7 +704,7 @@ class BiblioMeScanner:
                 checked_count += 1
                 
                 # Check if we should sync this user (cooldown check)
-                if not self._should_sync_user(did):
+                if not await self.repo.read(self._should_sync_user, did):
                     skipped_count += 1
                     continue
                 
@@ -751,6 +792,7 @@ async def main():
     print("Running a single scan cycle for debugging...")
     await scanner.run_scan_cycle()
     print("Debug scan cycle complete.")
+    await close_http_clients()
 
 if __name__ == "__main__":
     # This allows running the script directly for a one-off scan
@@ -24,6 +24,7 @@ from bibliome.components import (
     EmptyState,
     LoadingSpinner,
     Pagination,
+    CursorPagination,
     # Forms
     AddBooksToggle,
     BookSearchForm,
@@ -98,6 +99,13 @@ from bibliome.components import (
     AdminDatabaseSection,
     DatabaseUploadForm,
     BackupHistoryCard,
+    PerformanceDashboard,
+    PerformanceOverviewCard,
+    PerformanceRouteTable,
+    PerformanceQueryTable,
+    PerformanceApiTable,
+    CacheStatsTable,
+    SlowRequestsList,
 )
 
 __all__ = [
@@ -111,6 +119,7 @@ __all__ = [
     "EmptyState",
     "LoadingSpinner",
     "Pagination",
+    "CursorPagination",
     # Forms
     "AddBooksToggle",
     "BookSearchForm",
@@ -185,4 +194,11 @@ __all__ = [
     "AdminDatabaseSection",
     "DatabaseUploadForm",
     "BackupHistoryCard",
+    "PerformanceDashboard",
+    "PerformanceOverviewCard",
+    "PerformanceRouteTable",
+    "PerformanceQueryTable",
+    "PerformanceApiTable",
+    "CacheStatsTable",
+    "SlowRequestsList",
 ]
@@ -10,6 +10,8 @@ import httpx
 from PIL import Image
 import io
 
+from bibliome.infrastructure.http_clients import get_http_client
+
 logger = logging.getLogger(__name__)
 
 class CoverCacheManager:
@@ -91,28 +93,28 @@ class CoverCacheManager:
             
             logger.info(f"Downloading cover for book {book_id}: {cover_url}")
             
-            # Download the image with redirect following
-            async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-                response = await client.get(cover_url)
-                response.raise_for_status()
-                
-                if not response.content:
-                    logger.warning(f"Empty response for cover URL: {cover_url}")
-                    result['error_type'] = 'empty_response'
-                    return result
-                
-                # Process and save the image
-                cached_path = await self._process_and_save_image(
-                    book_id, cover_url, response.content
-                )
-                
-                if cached_path:
-                    result['success'] = True
-                    result['cached_path'] = cached_path
-                else:
-                    result['error_type'] = 'processing_error'
-                
+            # Download the image with redirect following, over the pooled cover client
+            client = get_http_client("covers", follow_redirects=True)
+            response = await client.get(cover_url, timeout=timeout)
+            response.raise_for_status()
+            
+            if not response.content:
+                logger.warning(f"Empty response for cover URL: {cover_url}")
+                result['error_type'] = 'empty_response'
                 return result
+            
+            # Process and save the image
+            cached_path = await self._process_and_save_image(
+                book_id, cover_url, response.content
+            )
+            
+            if cached_path:
+                result['success'] = True
+                result['cached_path'] = cached_path
+            else:
+                result['error_type'] = 'processing_error'
+            
+            return result
                 
         except httpx.TimeoutException:
             logger.warning(f"Timeout downloading cover for book {book_id}: {cover_url}")
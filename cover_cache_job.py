@@ -9,6 +9,7 @@ from dotenv import load_dotenv
 
 from database_manager import db_manager
 from cover_cache import cover_cache
+from bibliome.infrastructure.http_clients import close_http_clients
 
 # Configure logging
 log_level_str = os.getenv('LOG_LEVEL', 'INFO').upper()
@@ -30,7 +31,7 @@ class CoverCacheJob:
     """Background job to cache book covers and retry failed attempts."""
     
     def __init__(self):
-        self.db_tables = None
+        self.repo = None  # AsyncRepository; database calls run off the event loop
         self.running = True
         self.job_interval_hours = int(os.getenv('COVER_CACHE_JOB_INTERVAL_HOURS', '24'))
         self.batch_size = int(os.getenv('COVER_CACHE_BATCH_SIZE', '50'))
@@ -45,20 +46,23 @@ class CoverCacheJob:
         # Run the first job cycle immediately
         asyncio.create_task(self.run_job_cycle())
         
-        while self.running:
-            try:
-                logger.info(f"Next cover cache job scheduled in {self.job_interval_hours} hours.")
-                await asyncio.sleep(self.job_interval_hours * 3600)
-                if self.running:
-                    await self.run_job_cycle()
-            except Exception as e:
-                logger.error(f"Error in cover cache job scheduling loop: {e}", exc_info=True)
-                await asyncio.sleep(3600)  # Wait an hour before retrying on major failure
+        try:
+            while self.running:
+                try:
+                    logger.info(f"Next cover cache job scheduled in {self.job_interval_hours} hours.")
+                    await asyncio.sleep(self.job_interval_hours * 3600)
+                    if self.running:
+                        await self.run_job_cycle()
+                except Exception as e:
+                    logger.error(f"Error in cover cache job scheduling loop: {e}", exc_info=True)
+                    await asyncio.sleep(3600)  # Wait an hour before retrying on major failure
+        finally:
+            await close_http_clients()
     
     async def run_job_cycle(self):
         """Run a complete cover caching cycle."""
         logger.info("Starting cover cache job cycle...")
-        self.db_tables = await db_manager.get_connection()
+        self.repo = await db_manager.get_repository()
         
         try:
             # 1. Cache covers for books without cached covers (skip rate-limited ones)
@@ -97,8 +101,7 @@ class CoverCacheJob:
                 LIMIT ?
             """
             
-            cursor = self.db_tables['db'].execute(query, (self.batch_size,))
-            books_to_cache = cursor.fetchall()
+            books_to_cache = await self.repo.query(query, (self.batch_size,))
             
             if not books_to_cache:
                 logger.info("No books found that need cover caching")
@@ -110,8 +113,8 @@ class CoverCacheJob:
             semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
             tasks = []
             
-            for book_id, cover_url in books_to_cache:
-                task = self._cache_book_cover_with_semaphore(semaphore, book_id, cover_url)
+            for book in books_to_cache:
+                task = self._cache_book_cover_with_semaphore(semaphore, book['id'], book['cover_url'])
                 tasks.append(task)
             
             # Wait for all downloads to complete
@@ -137,7 +140,7 @@ class CoverCacheJob:
                 
                 if cache_result['success']:
                     # Successfully cached
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cached_cover_path': cache_result['cached_path'],
                         'cover_cached_at': datetime.now(),
                         'cover_rate_limited_until': None  # Clear any previous rate limit
@@ -146,7 +149,7 @@ class CoverCacheJob:
                     return True
                 elif cache_result['error_type'] == 'rate_limit':
                     # Rate limited - mark for later retry
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cover_cached_at': datetime.now(),
                         'cover_rate_limited_until': cache_result['rate_limited_until']
                     }, book_id)
@@ -154,7 +157,7 @@ class CoverCacheJob:
                     return False
                 else:
                     # Other error - mark as attempted
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cover_cached_at': datetime.now()
                     }, book_id)
                     logger.debug(f"Cover caching failed for book {book_id}: {cache_result['error_type']}")
@@ -185,8 +188,7 @@ class CoverCacheJob:
                 LIMIT ?
             """
             
-            cursor = self.db_tables['db'].execute(query, (retry_cutoff.isoformat(), self.batch_size // 2))
-            books_to_retry = cursor.fetchall()
+            books_to_retry = await self.repo.query(query, (retry_cutoff.isoformat(), self.batch_size // 2))
             
             if not books_to_retry:
                 logger.info("No failed cover downloads found to retry")
@@ -198,8 +200,8 @@ class CoverCacheJob:
             semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
             tasks = []
             
-            for book_id, cover_url in books_to_retry:
-                task = self._retry_book_cover_with_semaphore(semaphore, book_id, cover_url)
+            for book in books_to_retry:
+                task = self._retry_book_cover_with_semaphore(semaphore, book['id'], book['cover_url'])
                 tasks.append(task)
             
             # Wait for all retries to complete
@@ -225,7 +227,7 @@ class CoverCacheJob:
                 
                 if cache_result['success']:
                     # Successfully cached
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cached_cover_path': cache_result['cached_path'],
                         'cover_cached_at': datetime.now(),
                         'cover_rate_limited_until': None  # Clear any previous rate limit
@@ -234,7 +236,7 @@ class CoverCacheJob:
                     return True
                 elif cache_result['error_type'] == 'rate_limit':
                     # Rate limited again - update the rate limit period
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cover_cached_at': datetime.now(),
                         'cover_rate_limited_until': cache_result['rate_limited_until']
                     }, book_id)
@@ -242,7 +244,7 @@ class CoverCacheJob:
                     return False
                 else:
                     # Other error - update the retry timestamp
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cover_cached_at': datetime.now()
                     }, book_id)
                     logger.debug(f"Cover retry failed for book {book_id}: {cache_result['error_type']}")
@@ -252,7 +254,7 @@ class CoverCacheJob:
                 logger.error(f"Error retrying cover cache for book {book_id}: {e}")
                 # Update the retry timestamp even if failed
                 try:
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cover_cached_at': datetime.now()
                     }, book_id)
                 except:
@@ -279,8 +281,7 @@ class CoverCacheJob:
                 LIMIT ?
             """
             
-            cursor = self.db_tables['db'].execute(query, (current_time.isoformat(), self.batch_size // 4))
-            books_to_recover = cursor.fetchall()
+            books_to_recover = await self.repo.query(query, (current_time.isoformat(), self.batch_size // 4))
             
             if not books_to_recover:
                 logger.info("No rate-limited covers ready for recovery")
@@ -292,8 +293,8 @@ class CoverCacheJob:
             semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
             tasks = []
             
-            for book_id, cover_url in books_to_recover:
-                task = self._recover_rate_limited_cover_with_semaphore(semaphore, book_id, cover_url)
+            for book in books_to_recover:
+                task = self._recover_rate_limited_cover_with_semaphore(semaphore, book['id'], book['cover_url'])
                 tasks.append(task)
             
             # Wait for all recoveries to complete
@@ -319,7 +320,7 @@ class CoverCacheJob:
                 
                 if cache_result['success']:
                     # Successfully cached
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cached_cover_path': cache_result['cached_path'],
                         'cover_cached_at': datetime.now(),
                         'cover_rate_limited_until': None  # Clear the rate limit
@@ -328,7 +329,7 @@ class CoverCacheJob:
                     return True
                 elif cache_result['error_type'] == 'rate_limit':
                     # Still rate limited - update the rate limit period
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cover_cached_at': datetime.now(),
                         'cover_rate_limited_until': cache_result['rate_limited_until']
                     }, book_id)
@@ -336,7 +337,7 @@ class CoverCacheJob:
                     return False
                 else:
                     # Other error - clear rate limit but mark as failed
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cover_cached_at': datetime.now(),
                         'cover_rate_limited_until': None  # Clear rate limit since it's not a rate limit error
                     }, book_id)
@@ -347,7 +348,7 @@ class CoverCacheJob:
                 logger.error(f"Error recovering rate-limited cover for book {book_id}: {e}")
                 # Clear rate limit on exception
                 try:
-                    self.db_tables['books'].update({
+                    await self.repo.update('books', {
                         'cover_cached_at': datetime.now(),
                         'cover_rate_limited_until': None
                     }, book_id)
@@ -361,8 +362,7 @@ class CoverCacheJob:
         
         try:
             # Get all valid book IDs
-            cursor = self.db_tables['db'].execute("SELECT id FROM book")
-            valid_book_ids = {row[0] for row in cursor.fetchall()}
+            valid_book_ids = {row['id'] for row in await self.repo.query("SELECT id FROM book")}
             
             # Use the cover cache manager to clean up orphaned files
             removed_count = cover_cache.cleanup_orphaned_covers(valid_book_ids)
@@ -385,25 +385,24 @@ class CoverCacheJob:
                 return
             
             # Get database stats
-            cursor = self.db_tables['db'].execute("""
+            db_stats = (await self.repo.query("""
                 SELECT 
                     COUNT(*) as total_books,
                     COUNT(CASE WHEN cover_url != '' AND cover_url IS NOT NULL THEN 1 END) as books_with_urls,
                     COUNT(CASE WHEN cached_cover_path != '' AND cached_cover_path IS NOT NULL THEN 1 END) as books_with_cached_covers
                 FROM book
-            """)
-            db_stats = cursor.fetchone()
+            """))[0]
             
             logger.info(f"Cover cache statistics:")
             logger.info(f"  - Total cached files: {stats['total_files']}")
             logger.info(f"  - Total cache size: {stats['total_size_mb']} MB")
             logger.info(f"  - Cache directory: {stats['cache_dir']}")
-            logger.info(f"  - Total books in database: {db_stats[0]}")
-            logger.info(f"  - Books with cover URLs: {db_stats[1]}")
-            logger.info(f"  - Books with cached covers: {db_stats[2]}")
+            logger.info(f"  - Total books in database: {db_stats['total_books']}")
+            logger.info(f"  - Books with cover URLs: {db_stats['books_with_urls']}")
+            logger.info(f"  - Books with cached covers: {db_stats['books_with_cached_covers']}")
             
-            if db_stats[1] > 0:
-                cache_percentage = (db_stats[2] / db_stats[1]) * 100
+            if db_stats['books_with_urls'] > 0:
+                cache_percentage = (db_stats['books_with_cached_covers'] / db_stats['books_with_urls']) * 100
                 logger.info(f"  - Cache coverage: {cache_percentage:.1f}%")
             
         except Exception as e:
@@ -420,6 +419,7 @@ async def main():
     print("Running a single cover cache job cycle for debugging...")
     await job.run_job_cycle()
     print("Debug cover cache job cycle complete.")
+    await close_http_clients()
 
 if __name__ == "__main__":
     # This allows running the script directly for a one-off job
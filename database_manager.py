@@ -17,6 +17,7 @@ class DatabaseManager:
     
     def __init__(self):
         self._db = None
+        self._repository = None
         self._lock = asyncio.Lock()
         # Configuration from environment
         self._max_retries = int(os.getenv('DB_CONNECTION_MAX_RETRIES', '5'))
@@ -90,5 +91,13 @@ class DatabaseManager:
                 raise last_error
             raise RuntimeError("Database connection failed for unknown reason")
 
+    async def get_repository(self):
+        """The AsyncRepository over this process's database tables (see get_connection)."""
+        db_tables = await self.get_connection()
+        if self._repository is None or self._repository.db_tables is not db_tables:
+            from bibliome.services.repository import AsyncRepository
+            self._repository = AsyncRepository(db_tables)
+        return self._repository
+
 # Global singleton instance
 db_manager = DatabaseManager()
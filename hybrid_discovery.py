@@ -7,6 +7,7 @@ from typing import Iterable, List, Set, Dict, Any, Optional
 import httpx
 
 from direct_pds_client import DirectPDSClient
+from bibliome.infrastructure.http_clients import get_http_client, close_http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -43,11 +44,14 @@ class HybridDiscoveryService:
             "https://bsky.network",  # soft fallback
         ]
 
-        # Single shared client; enable HTTP/2 and sane limits.
-        self.client = httpx.AsyncClient(
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared relay/PDS client from the process registry (HTTP/2, kept-alive connections)."""
+        return get_http_client(
+            "relay_discovery",
             timeout=httpx.Timeout(30.0, connect=10.0),
-            http2=True,
-            limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
+            max_connections=50,
+            max_keepalive_connections=10,
         )
 
     async def _get_json(self, base: str, xrpc: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -210,4 +214,4 @@ class HybridDiscoveryService:
         return sorted(all_dids)
 
     async def aclose(self):
-        await self.client.aclose()
+        await close_http_clients(["relay_discovery"])
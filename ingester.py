@@ -26,6 +26,7 @@ silence_noisy_loggers()
 
 from database_manager import db_manager
 from api_clients import BookAPIClient
+from bibliome.infrastructure.identity_cache import identity_cache
 
 # Process name for monitoring
 PROCESS_NAME = "firehose_ingester"
@@ -33,6 +34,9 @@ PROCESS_NAME = "firehose_ingester"
 # Database instance will be managed asynchronously
 db_tables = None
 
+# One client for the whole process, so its rate limiter sees every lookup
+book_api = None
+
 # Cursor file for resume functionality
 CURSOR_FILE = Path("firehose.cursor")
 
@@ -166,12 +170,17 @@ async def enrich_book_with_cover(book_data: dict) -> dict:
     """Enrich book data with cover image from external APIs."""
     try:
         # Initialize BookAPIClient if not already done
-        book_api = BookAPIClient()
+        global book_api
+        if book_api is None:
+            book_api = BookAPIClient()
+
+        # With the Google Books quota nearly spent, only use what is already cached
+        cache_only = book_api.quota_low()
 
         # Try to get book details by ISBN first (most reliable)
         if book_data.get('isbn'):
             logger.debug(f"Looking up cover for ISBN: {book_data['isbn']}")
-            details = await book_api.get_book_details(book_data['isbn'])
+            details = await book_api.get_book_details(book_data['isbn'], cache_only=cache_only)
             if details and details.get('cover_url'):
                 book_data['cover_url'] = details['cover_url']
                 logger.debug(f"Found cover via ISBN lookup: {details['cover_url']}")
@@ -184,7 +193,7 @@ async def enrich_book_with_cover(book_data: dict) -> dict:
                 search_query += f" {book_data['author']}"
 
             logger.debug(f"Searching for cover with query: '{search_query}'")
-            results = await book_api.search_books(search_query, max_results=1)
+            results = await book_api.search_books(search_query, max_results=1, cache_only=cache_only)
             if results and results[0].get('cover_url'):
                 book_data['cover_url'] = results[0]['cover_url']
                 logger.debug(f"Found cover via search: {results[0]['cover_url']}")
@@ -348,6 +357,11 @@ def on_message_handler(message, db_tables):
     
     try:
         evt = parse_subscribe_repos_message(message)
+        if isinstance(evt, models.ComAtprotoSyncSubscribeRepos.Identity):
+            # Handle or PDS changed: drop the cached identity so every process resolves it again
+            if identity_cache.invalidate(evt.did):
+                logger.debug(f"Identity cache invalidated for {evt.did}")
+            return
         if not isinstance(evt, models.ComAtprotoSyncSubscribeRepos.Commit):
             return
         if not evt.ops:
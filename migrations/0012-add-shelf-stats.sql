@@ -0,0 +1,77 @@
+-- Migration to add denormalized per-shelf statistics
+-- Created: 2026-10-16
+--
+-- Listing pages (explore, the anonymous homepage, shelf search) used to count
+-- books, load recent covers and score activity with several queries per shelf.
+-- shelf_stats keeps those numbers on one row per shelf so a listing is a single
+-- join. Rows are maintained by the triggers in triggers/shelf_stats.sql, which
+-- cover every writer (web app, firehose ingester, network scanner).
+
+CREATE TABLE IF NOT EXISTS shelf_stats (
+    bookshelf_id INTEGER PRIMARY KEY,
+    book_count INTEGER NOT NULL DEFAULT 0,
+    contributor_count INTEGER NOT NULL DEFAULT 0, -- active contributors + moderators
+    member_count INTEGER NOT NULL DEFAULT 0,      -- all active permissions
+    last_book_added_at DATETIME,
+    recent_covers TEXT NOT NULL DEFAULT '[]',     -- JSON array, up to 4 newest cover URLs
+    recent_book_count INTEGER NOT NULL DEFAULT 0, -- books added in the last 30 days
+    activity_score REAL NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (bookshelf_id) REFERENCES bookshelf(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_shelf_stats_activity ON shelf_stats(activity_score DESC);
+CREATE INDEX IF NOT EXISTS idx_shelf_stats_last_added ON shelf_stats(last_book_added_at DESC);
+
+-- Live computation of the shelf_stats columns, filtered by bookshelf_id when
+-- refreshing a single shelf. The activity score mirrors the weights of
+-- calculate_shelf_activity_score(): recent additions 40%, contributors 30%,
+-- total books 20%, new-shelf boost 10%, +20% for shelves open to contributions.
+CREATE VIEW IF NOT EXISTS shelf_stats_live AS
+SELECT
+    s.bookshelf_id,
+    s.book_count,
+    s.contributor_count,
+    s.member_count,
+    s.last_book_added_at,
+    s.recent_covers,
+    s.recent_book_count,
+    (
+        s.recent_book_count * 10 * 0.4 +
+        s.contributor_count * 5 * 0.3 +
+        s.book_count * 2 * 0.2 +
+        (MAX(0, 60 - s.age_days) / 60.0) * 20 * 0.1
+    ) * (CASE WHEN s.self_join THEN 1.2 ELSE 1.0 END) AS activity_score
+FROM (
+    SELECT
+        bs.id AS bookshelf_id,
+        bs.self_join,
+        COALESCE(CAST(julianday('now') - julianday(bs.created_at) AS INTEGER), 365) AS age_days,
+        (SELECT COUNT(*) FROM book b WHERE b.bookshelf_id = bs.id) AS book_count,
+        (SELECT COUNT(DISTINCT p.user_did) FROM permission p
+         WHERE p.bookshelf_id = bs.id AND p.status = 'active'
+           AND p.role IN ('contributor', 'moderator')) AS contributor_count,
+        (SELECT COUNT(DISTINCT p.user_did) FROM permission p
+         WHERE p.bookshelf_id = bs.id AND p.status = 'active') AS member_count,
+        (SELECT MAX(b.added_at) FROM book b WHERE b.bookshelf_id = bs.id) AS last_book_added_at,
+        (SELECT json_group_array(c.cover_url) FROM (
+            SELECT b.cover_url FROM book b
+            WHERE b.bookshelf_id = bs.id AND b.cover_url IS NOT NULL AND b.cover_url != ''
+            ORDER BY b.added_at DESC
+            LIMIT 4
+        ) c) AS recent_covers,
+        (SELECT COUNT(*) FROM book b
+         WHERE b.bookshelf_id = bs.id
+           AND julianday(b.added_at) >= julianday('now', '-30 days')) AS recent_book_count
+    FROM bookshelf bs
+) s;
+
+-- Backfill existing shelves
+INSERT OR REPLACE INTO shelf_stats (
+    bookshelf_id, book_count, contributor_count, member_count, last_book_added_at,
+    recent_covers, recent_book_count, activity_score, updated_at
+)
+SELECT
+    bookshelf_id, book_count, contributor_count, member_count, last_book_added_at,
+    recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+FROM shelf_stats_live;
@@ -0,0 +1,29 @@
+-- Migration to add FTS5 full-text indexes for shelf search
+-- Created: 2026-10-16
+--
+-- External-content FTS5 tables over bookshelf (name, description) and book
+-- (title, author). The rowid of each index row is the source row id. They are
+-- kept in sync by the triggers in triggers/search_index.sql. The prefix
+-- indexes make "term*" queries (search-as-you-type) cheap.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS bookshelf_fts USING fts5(
+    name,
+    description,
+    content='bookshelf',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5(
+    title,
+    author,
+    content='book',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+-- Index existing rows
+INSERT INTO bookshelf_fts(bookshelf_fts) VALUES('rebuild');
+INSERT INTO book_fts(book_fts) VALUES('rebuild');
@@ -0,0 +1,118 @@
+-- Migration to add canonical works
+-- Created: 2026-10-16
+--
+-- Every book row is one member's +1 for a title on a shelf, so shelf pages used
+-- to group book rows by (title, author, isbn) and self-join book twice to find
+-- the viewer's vote and the first adder. A work is the edition-independent
+-- identity of a book: its key is the normalized ISBN-13 when the book has a
+-- valid ISBN-10/13, otherwise the lower-cased title and author.
+--
+--   work        one row per distinct work_key
+--   book_work   one row per book, pointing at its work
+--   shelf_work  one row per (shelf, work) with the vote count and first adder
+--
+-- book_work and shelf_work are maintained by the triggers in triggers/works.sql.
+
+CREATE TABLE IF NOT EXISTS work (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    work_key TEXT NOT NULL UNIQUE,  -- 'isbn:<isbn13>' or 'text:<title>|<author>'
+    title TEXT NOT NULL DEFAULT '',
+    author TEXT NOT NULL DEFAULT '',
+    isbn13 TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS book_work (
+    book_id INTEGER PRIMARY KEY,
+    work_id INTEGER NOT NULL,
+    bookshelf_id INTEGER NOT NULL,
+    added_by_did TEXT NOT NULL DEFAULT '',
+    added_at DATETIME,
+    FOREIGN KEY (book_id) REFERENCES book(id) ON DELETE CASCADE,
+    FOREIGN KEY (work_id) REFERENCES work(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_book_work_shelf_work_voter ON book_work(bookshelf_id, work_id, added_by_did);
+
+CREATE TABLE IF NOT EXISTS shelf_work (
+    bookshelf_id INTEGER NOT NULL,
+    work_id INTEGER NOT NULL,
+    vote_count INTEGER NOT NULL DEFAULT 0,
+    first_book_id INTEGER NOT NULL,      -- earliest added book row, used as the card's representative
+    first_added_by_did TEXT NOT NULL DEFAULT '',
+    first_added_at DATETIME,
+    PRIMARY KEY (bookshelf_id, work_id),
+    FOREIGN KEY (bookshelf_id) REFERENCES bookshelf(id) ON DELETE CASCADE,
+    FOREIGN KEY (work_id) REFERENCES work(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_shelf_work_votes ON shelf_work(bookshelf_id, vote_count DESC);
+CREATE INDEX IF NOT EXISTS idx_shelf_work_work ON shelf_work(work_id, vote_count DESC);
+
+-- Work key for every book. ISBN-10s are converted to ISBN-13 (978 prefix and
+-- recomputed check digit) so both editions of a number land on the same work.
+CREATE VIEW IF NOT EXISTS book_work_key AS
+SELECT
+    book_id,
+    bookshelf_id,
+    added_by_did,
+    added_at,
+    title,
+    author,
+    isbn13,
+    CASE
+        WHEN isbn13 IS NOT NULL THEN 'isbn:' || isbn13
+        ELSE 'text:' || lower(trim(title)) || '|' || lower(trim(author))
+    END AS work_key
+FROM (
+    SELECT
+        book_id, bookshelf_id, added_by_did, added_at, title, author,
+        CASE
+            WHEN length(digits) = 13 AND digits NOT GLOB '*[^0-9]*' THEN digits
+            WHEN length(digits) = 10 AND substr(digits, 1, 9) NOT GLOB '*[^0-9]*'
+                 AND substr(digits, 10, 1) GLOB '[0-9X]' THEN
+                '978' || substr(digits, 1, 9) || ((10 - (38
+                    + 3 * substr(digits, 1, 1) + substr(digits, 2, 1)
+                    + 3 * substr(digits, 3, 1) + substr(digits, 4, 1)
+                    + 3 * substr(digits, 5, 1) + substr(digits, 6, 1)
+                    + 3 * substr(digits, 7, 1) + substr(digits, 8, 1)
+                    + 3 * substr(digits, 9, 1)) % 10) % 10)
+        END AS isbn13
+    FROM (
+        SELECT
+            b.id AS book_id,
+            b.bookshelf_id,
+            COALESCE(b.added_by_did, '') AS added_by_did,
+            b.added_at,
+            COALESCE(b.title, '') AS title,
+            COALESCE(b.author, '') AS author,
+            replace(replace(upper(trim(COALESCE(b.isbn, ''))), '-', ''), ' ', '') AS digits
+        FROM book b
+    )
+);
+
+-- Live computation of shelf_work rows. The bare columns come from the row
+-- holding MIN(added_at), i.e. the first book added for that work.
+CREATE VIEW IF NOT EXISTS shelf_work_live AS
+SELECT
+    bookshelf_id,
+    work_id,
+    COUNT(*) AS vote_count,
+    book_id AS first_book_id,
+    added_by_did AS first_added_by_did,
+    MIN(added_at) AS first_added_at
+FROM book_work
+GROUP BY bookshelf_id, work_id;
+
+-- Backfill existing books
+INSERT OR IGNORE INTO work (work_key, title, author, isbn13)
+SELECT work_key, title, author, isbn13 FROM book_work_key ORDER BY added_at, book_id;
+
+INSERT OR REPLACE INTO book_work (book_id, work_id, bookshelf_id, added_by_did, added_at)
+SELECT k.book_id, w.id, k.bookshelf_id, k.added_by_did, k.added_at
+FROM book_work_key k
+JOIN work w ON w.work_key = k.work_key;
+
+INSERT OR REPLACE INTO shelf_work (bookshelf_id, work_id, vote_count, first_book_id, first_added_by_did, first_added_at)
+SELECT bookshelf_id, work_id, vote_count, first_book_id, first_added_by_did, first_added_at
+FROM shelf_work_live;
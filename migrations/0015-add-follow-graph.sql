@@ -0,0 +1,27 @@
+-- Migration to add a local copy of each viewer's Bluesky follow graph
+-- Created: 2026-10-16
+--
+-- The network feed used to fetch the viewer's follows from Bluesky (up to 50
+-- pages of 100) and bind every DID into WHERE a.user_did IN (?, ?, ...). The
+-- follow table keeps that list per viewer so the feed is an indexed join, and
+-- follow_sync records when each viewer's list was last refreshed. Rows are
+-- written by sync_follow_graph(), which only applies the difference.
+
+CREATE TABLE IF NOT EXISTS follow (
+    follower_did TEXT NOT NULL,
+    followed_did TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (follower_did, followed_did)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_follow_followed ON follow(followed_did);
+
+CREATE TABLE IF NOT EXISTS follow_sync (
+    follower_did TEXT PRIMARY KEY,
+    follow_count INTEGER NOT NULL DEFAULT 0,
+    synced_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Feed lookups probe activity by author, newest first; bookshelf_id makes the
+-- index covering for the privacy join, so a page is picked without reading rows
+CREATE INDEX IF NOT EXISTS idx_activity_user_feed ON activity(user_did, created_at DESC, bookshelf_id);
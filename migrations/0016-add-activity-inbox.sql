@@ -0,0 +1,51 @@
+-- Migration to add per-viewer network feed inboxes
+-- Created: 2026-10-16
+--
+-- The network feed joins activity, bookshelf and permission over everyone the
+-- viewer follows on every request. activity_inbox materializes that feed: each
+-- new activity is copied (fanned out) to the inbox of every stored follower, so
+-- a feed page is a primary-key range scan of one viewer's rows.
+--
+--   activity_inbox        newest INBOX_MAX_ITEMS (500) activities per viewer
+--   activity_inbox_size   row count per viewer, used to trim the oldest row
+--   activity_pull_author  authors with too many stored followers to fan out;
+--                         their activity is read from activity at feed time
+--
+-- Rows are maintained by the triggers in triggers/activity_inbox.sql and can be
+-- rebuilt with rebuild_activity_inboxes().
+
+CREATE TABLE IF NOT EXISTS activity_inbox (
+    viewer_did TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    activity_id INTEGER NOT NULL,
+    author_did TEXT NOT NULL,
+    PRIMARY KEY (viewer_did, created_at, activity_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_activity_inbox_author ON activity_inbox(author_did, viewer_did);
+CREATE INDEX IF NOT EXISTS idx_activity_inbox_activity ON activity_inbox(activity_id);
+
+CREATE TABLE IF NOT EXISTS activity_inbox_size (
+    viewer_did TEXT PRIMARY KEY,
+    item_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS activity_pull_author (
+    author_did TEXT PRIMARY KEY,
+    follower_count INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Backfill the newest 500 activities of every stored viewer
+INSERT OR IGNORE INTO activity_inbox (viewer_did, created_at, activity_id, author_did)
+SELECT viewer_did, created_at, activity_id, author_did
+FROM (
+    SELECT f.follower_did AS viewer_did, COALESCE(a.created_at, '') AS created_at, a.id AS activity_id, a.user_did AS author_did,
+           ROW_NUMBER() OVER (PARTITION BY f.follower_did ORDER BY a.created_at DESC, a.id DESC) AS position
+    FROM follow f
+    JOIN activity a ON a.user_did = f.followed_did
+)
+WHERE position <= 500;
+
+INSERT OR REPLACE INTO activity_inbox_size (viewer_did, item_count)
+SELECT viewer_did, COUNT(*) FROM activity_inbox GROUP BY viewer_did;
@@ -0,0 +1,46 @@
+-- Migration to add composite indexes for the hot read paths
+-- Created: 2026-10-16
+--
+-- Each index matches a predicate plus the ORDER BY of a query in models.py,
+-- so those queries seek straight to their rows in order instead of filtering
+-- a single-column index and sorting the result in a temp B-tree:
+--
+--   permission(bookshelf_id, user_did, status)   check_permission
+--   permission(user_did, status, bookshelf_id)   get_user_shelves, PermissionContext
+--   book(bookshelf_id, added_at)                 shelf recent covers and book counts
+--   book(bookshelf_id, title, author)            duplicate check when adding a book
+--   book(added_at)                               get_recent_community_books
+--   activity(book_id, created_at)                get_book_activity
+--   user(handle)                                 get_user_by_handle, profile pages
+--   bookshelf(owner_did, updated_at)             get_user_public_shelves
+--   bookshelf(privacy, created_at / updated_at)  public shelf listings; the sort
+--                                                keys are COALESCE(x, '') so the
+--                                                indexes are on that expression
+--
+-- activity(user_did, created_at) is already covered by idx_activity_user_feed
+-- (migration 0015). Single-column indexes that are now a prefix of a composite
+-- one are dropped.
+--
+-- tests/integration/test_query_plans.py checks the plans of the models.py
+-- queries against these indexes.
+
+CREATE INDEX IF NOT EXISTS idx_permission_shelf_user ON permission(bookshelf_id, user_did, status);
+CREATE INDEX IF NOT EXISTS idx_permission_user_shelf ON permission(user_did, status, bookshelf_id);
+DROP INDEX IF EXISTS idx_permission_bookshelf;
+DROP INDEX IF EXISTS idx_permission_user;
+
+CREATE INDEX IF NOT EXISTS idx_book_shelf_added ON book(bookshelf_id, added_at);
+CREATE INDEX IF NOT EXISTS idx_book_shelf_title ON book(bookshelf_id, title, author);
+CREATE INDEX IF NOT EXISTS idx_book_added ON book(added_at);
+DROP INDEX IF EXISTS idx_book_bookshelf;
+
+CREATE INDEX IF NOT EXISTS idx_activity_book ON activity(book_id, created_at);
+DROP INDEX IF EXISTS idx_activity_user;
+
+CREATE INDEX IF NOT EXISTS idx_user_handle ON user(handle);
+
+CREATE INDEX IF NOT EXISTS idx_bookshelf_privacy_created ON bookshelf(privacy, COALESCE(created_at, ''));
+CREATE INDEX IF NOT EXISTS idx_bookshelf_privacy_updated ON bookshelf(privacy, COALESCE(updated_at, ''));
+DROP INDEX IF EXISTS idx_bookshelf_privacy;
+CREATE INDEX IF NOT EXISTS idx_bookshelf_owner_updated ON bookshelf(owner_did, updated_at);
+DROP INDEX IF EXISTS idx_bookshelf_owner;
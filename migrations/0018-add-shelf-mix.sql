@@ -0,0 +1,29 @@
+-- Migration to add the precomputed smart-mix ranking for explore
+-- Created: 2026-10-16
+--
+-- get_mixed_public_shelves used to rank the candidate shelves two ways and
+-- shuffle each page on every request. refresh_shelf_mix() now scores every
+-- public shelf in one pass over shelf_stats and stores the mixed order as a
+-- numbered generation:
+--
+--   shelf_mix             (generation, position) -> shelf; 60% of positions
+--                         go to the most active shelves, 40% to the newest
+--   shelf_mix_generation  one row per refresh, with its shelf count
+--
+-- A page is a primary-key range of positions, shuffled with a per-session seed
+-- in small windows, so deep pages cost the same as the first and a session
+-- never sees a shelf twice. The previous generation is kept so cursors handed
+-- out before a refresh keep paging the order they started in.
+
+CREATE TABLE IF NOT EXISTS shelf_mix (
+    generation INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    bookshelf_id INTEGER NOT NULL,
+    PRIMARY KEY (generation, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS shelf_mix_generation (
+    generation INTEGER PRIMARY KEY,
+    shelf_count INTEGER NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
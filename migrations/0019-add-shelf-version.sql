@@ -0,0 +1,17 @@
+-- Migration to add per-shelf content versions
+-- Created: 2026-10-16
+--
+-- shelf_version holds a counter per bookshelf that the triggers in
+-- triggers/shelf_version.sql bump on every write that changes what the shelf
+-- page shows: books added, removed or voted on (each vote is a book row), cover
+-- caching, comments, shelf edits and privacy changes, and the owner's profile.
+-- Every writer (routes, the firehose ingester, the scanner, background jobs)
+-- goes through those tables, so the counter never misses a change.
+--
+-- Rendered shelf fragments are cached under the version (see view_shelf in
+-- app.py); a shelf without a row is at version 0.
+
+CREATE TABLE IF NOT EXISTS shelf_version (
+    bookshelf_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
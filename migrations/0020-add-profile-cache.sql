@@ -0,0 +1,18 @@
+-- Migration to add a local cache of Bluesky profiles
+-- Created: 2026-10-16
+--
+-- The network feed showed each activity's author by calling
+-- app.bsky.actor.getProfiles in chunks of 25 DIDs on every render.
+-- profile_cache keeps the last answer per DID: found = 0 records a DID
+-- Bluesky returned no profile for, so it is not asked about again until its
+-- shorter TTL runs out. Rows are written by store_profiles(), from the feed's
+-- own fetches and from the profiles the scanner syncs.
+
+CREATE TABLE IF NOT EXISTS profile_cache (
+    did TEXT PRIMARY KEY,
+    handle TEXT,
+    display_name TEXT,
+    avatar_url TEXT,
+    found INTEGER NOT NULL DEFAULT 1,
+    fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
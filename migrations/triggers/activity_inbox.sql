@@ -0,0 +1,52 @@
+-- Keep activity_inbox in sync with activity and follow.
+-- New activity is fanned out to the inboxes of the author's stored followers,
+-- unless the author is in activity_pull_author. Each inbox keeps its newest
+-- 500 rows (INBOX_MAX_ITEMS in models.py): an insert past the limit deletes
+-- the viewer's oldest row.
+
+CREATE TRIGGER IF NOT EXISTS trg_activity_inbox_fanout AFTER INSERT ON activity
+WHEN NOT EXISTS (SELECT 1 FROM activity_pull_author WHERE author_did = NEW.user_did)
+BEGIN
+    INSERT OR IGNORE INTO activity_inbox (viewer_did, created_at, activity_id, author_did)
+    SELECT follower_did, COALESCE(NEW.created_at, ''), NEW.id, NEW.user_did
+    FROM follow WHERE followed_did = NEW.user_did;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_activity_inbox_activity_delete AFTER DELETE ON activity
+BEGIN
+    DELETE FROM activity_inbox WHERE activity_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_activity_inbox_insert AFTER INSERT ON activity_inbox
+BEGIN
+    INSERT INTO activity_inbox_size (viewer_did, item_count) VALUES (NEW.viewer_did, 1)
+    ON CONFLICT(viewer_did) DO UPDATE SET item_count = item_count + 1;
+    DELETE FROM activity_inbox
+    WHERE viewer_did = NEW.viewer_did
+      AND (SELECT item_count FROM activity_inbox_size WHERE viewer_did = NEW.viewer_did) > 500
+      AND (created_at, activity_id) = (
+          SELECT created_at, activity_id FROM activity_inbox
+          WHERE viewer_did = NEW.viewer_did
+          ORDER BY created_at, activity_id LIMIT 1
+      );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_activity_inbox_delete AFTER DELETE ON activity_inbox
+BEGIN
+    UPDATE activity_inbox_size SET item_count = item_count - 1 WHERE viewer_did = OLD.viewer_did;
+END;
+
+-- A new follow brings the author's recent activity into the viewer's inbox
+CREATE TRIGGER IF NOT EXISTS trg_activity_inbox_follow_insert AFTER INSERT ON follow
+WHEN NOT EXISTS (SELECT 1 FROM activity_pull_author WHERE author_did = NEW.followed_did)
+BEGIN
+    INSERT OR IGNORE INTO activity_inbox (viewer_did, created_at, activity_id, author_did)
+    SELECT NEW.follower_did, COALESCE(a.created_at, ''), a.id, a.user_did
+    FROM activity a WHERE a.user_did = NEW.followed_did
+    ORDER BY a.created_at DESC, a.id DESC LIMIT 500;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_activity_inbox_follow_delete AFTER DELETE ON follow
+BEGIN
+    DELETE FROM activity_inbox WHERE author_did = OLD.followed_did AND viewer_did = OLD.follower_did;
+END;
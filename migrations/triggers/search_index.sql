@@ -0,0 +1,35 @@
+-- Keep the bookshelf_fts and book_fts external-content indexes in sync.
+-- External-content FTS5 tables need the old values to remove an entry, so
+-- updates are a 'delete' of the old row followed by an insert of the new one.
+
+CREATE TRIGGER IF NOT EXISTS trg_bookshelf_fts_insert AFTER INSERT ON bookshelf
+BEGIN
+    INSERT INTO bookshelf_fts(rowid, name, description) VALUES (NEW.id, NEW.name, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_bookshelf_fts_delete AFTER DELETE ON bookshelf
+BEGIN
+    INSERT INTO bookshelf_fts(bookshelf_fts, rowid, name, description) VALUES ('delete', OLD.id, OLD.name, OLD.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_bookshelf_fts_update AFTER UPDATE OF name, description ON bookshelf
+BEGIN
+    INSERT INTO bookshelf_fts(bookshelf_fts, rowid, name, description) VALUES ('delete', OLD.id, OLD.name, OLD.description);
+    INSERT INTO bookshelf_fts(rowid, name, description) VALUES (NEW.id, NEW.name, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_book_fts_insert AFTER INSERT ON book
+BEGIN
+    INSERT INTO book_fts(rowid, title, author) VALUES (NEW.id, NEW.title, NEW.author);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_book_fts_delete AFTER DELETE ON book
+BEGIN
+    INSERT INTO book_fts(book_fts, rowid, title, author) VALUES ('delete', OLD.id, OLD.title, OLD.author);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_book_fts_update AFTER UPDATE OF title, author ON book
+BEGIN
+    INSERT INTO book_fts(book_fts, rowid, title, author) VALUES ('delete', OLD.id, OLD.title, OLD.author);
+    INSERT INTO book_fts(rowid, title, author) VALUES (NEW.id, NEW.title, NEW.author);
+END;
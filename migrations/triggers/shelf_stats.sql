@@ -0,0 +1,64 @@
+-- Keep shelf_stats current on every book, permission and bookshelf write.
+-- Installed by setup_database() after the model tables are connected, because
+-- FastLite table transforms rebuild tables and drop any triggers attached to them.
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_stats_book_insert AFTER INSERT ON book
+BEGIN
+    INSERT OR REPLACE INTO shelf_stats (bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, updated_at)
+    SELECT bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+    FROM shelf_stats_live WHERE bookshelf_id = NEW.bookshelf_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_stats_book_delete AFTER DELETE ON book
+BEGIN
+    INSERT OR REPLACE INTO shelf_stats (bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, updated_at)
+    SELECT bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+    FROM shelf_stats_live WHERE bookshelf_id = OLD.bookshelf_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_stats_book_update AFTER UPDATE OF bookshelf_id, cover_url, added_at ON book
+BEGIN
+    INSERT OR REPLACE INTO shelf_stats (bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, updated_at)
+    SELECT bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+    FROM shelf_stats_live WHERE bookshelf_id IN (OLD.bookshelf_id, NEW.bookshelf_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_stats_permission_insert AFTER INSERT ON permission
+BEGIN
+    INSERT OR REPLACE INTO shelf_stats (bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, updated_at)
+    SELECT bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+    FROM shelf_stats_live WHERE bookshelf_id = NEW.bookshelf_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_stats_permission_delete AFTER DELETE ON permission
+BEGIN
+    INSERT OR REPLACE INTO shelf_stats (bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, updated_at)
+    SELECT bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+    FROM shelf_stats_live WHERE bookshelf_id = OLD.bookshelf_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_stats_permission_update AFTER UPDATE OF bookshelf_id, role, status ON permission
+BEGIN
+    INSERT OR REPLACE INTO shelf_stats (bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, updated_at)
+    SELECT bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+    FROM shelf_stats_live WHERE bookshelf_id IN (OLD.bookshelf_id, NEW.bookshelf_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_stats_bookshelf_insert AFTER INSERT ON bookshelf
+BEGIN
+    INSERT OR REPLACE INTO shelf_stats (bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, updated_at)
+    SELECT bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+    FROM shelf_stats_live WHERE bookshelf_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_stats_bookshelf_update AFTER UPDATE OF self_join, created_at ON bookshelf
+BEGIN
+    INSERT OR REPLACE INTO shelf_stats (bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, updated_at)
+    SELECT bookshelf_id, book_count, contributor_count, member_count, last_book_added_at, recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+    FROM shelf_stats_live WHERE bookshelf_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_stats_bookshelf_delete AFTER DELETE ON bookshelf
+BEGIN
+    DELETE FROM shelf_stats WHERE bookshelf_id = OLD.id;
+END;
@@ -0,0 +1,134 @@
+-- Bump shelf_version on every write that changes a rendered shelf page.
+-- Installed by setup_database() after the model tables are connected, because
+-- FastLite table transforms rebuild tables and drop any triggers attached to them.
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_book_insert AFTER INSERT ON book
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (NEW.bookshelf_id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_book_delete AFTER DELETE ON book
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (OLD.bookshelf_id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+-- Only columns a page shows: the cover cache job rewrites cached_cover_path,
+-- cover_cached_at and cover_rate_limited_until all day, and pages render cover_url.
+-- Replaces the unconditional trg_shelf_version_book_update of earlier databases.
+DROP TRIGGER IF EXISTS trg_shelf_version_book_update;
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_book_content_update AFTER UPDATE ON book
+WHEN OLD.bookshelf_id IS NOT NEW.bookshelf_id OR OLD.title IS NOT NEW.title
+    OR OLD.added_by_did IS NOT NEW.added_by_did OR OLD.isbn IS NOT NEW.isbn
+    OR OLD.author IS NOT NEW.author OR OLD.cover_url IS NOT NEW.cover_url
+    OR OLD.description IS NOT NEW.description OR OLD.publisher IS NOT NEW.publisher
+    OR OLD.published_date IS NOT NEW.published_date OR OLD.page_count IS NOT NEW.page_count
+    OR OLD.atproto_uri IS NOT NEW.atproto_uri OR OLD.added_at IS NOT NEW.added_at
+    OR OLD.is_remote IS NOT NEW.is_remote OR OLD.remote_added_by_did IS NOT NEW.remote_added_by_did
+    OR OLD.original_atproto_uri IS NOT NEW.original_atproto_uri
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (OLD.bookshelf_id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+    INSERT INTO shelf_version (bookshelf_id, version)
+    SELECT NEW.bookshelf_id, 1 WHERE NEW.bookshelf_id IS NOT OLD.bookshelf_id
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_comment_insert AFTER INSERT ON comment
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (NEW.bookshelf_id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_comment_delete AFTER DELETE ON comment
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (OLD.bookshelf_id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_comment_update AFTER UPDATE OF content, bookshelf_id, book_id ON comment
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (NEW.bookshelf_id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+-- The scanner rewrites every synced shelf, setting last_synced and remote_sync_status,
+-- which no page shows; a rescan that changes nothing else leaves the version alone.
+-- Replaces the unconditional trg_shelf_version_bookshelf_update of earlier databases.
+DROP TRIGGER IF EXISTS trg_shelf_version_bookshelf_update;
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_bookshelf_content_update AFTER UPDATE ON bookshelf
+WHEN OLD.name IS NOT NEW.name OR OLD.owner_did IS NOT NEW.owner_did OR OLD.slug IS NOT NEW.slug
+    OR OLD.description IS NOT NEW.description OR OLD.privacy IS NOT NEW.privacy
+    OR OLD.self_join IS NOT NEW.self_join OR OLD.atproto_uri IS NOT NEW.atproto_uri
+    OR OLD.created_at IS NOT NEW.created_at OR OLD.updated_at IS NOT NEW.updated_at
+    OR OLD.is_remote IS NOT NEW.is_remote OR OLD.remote_owner_did IS NOT NEW.remote_owner_did
+    OR OLD.discovered_at IS NOT NEW.discovered_at OR OLD.original_atproto_uri IS NOT NEW.original_atproto_uri
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (NEW.id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_bookshelf_delete AFTER DELETE ON bookshelf
+BEGIN
+    DELETE FROM shelf_version WHERE bookshelf_id = OLD.id;
+END;
+
+-- The page header shows the owner's profile; book cards and comment previews
+-- show adders' and commenters' names, which are left to age out with the next write
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_owner_update AFTER UPDATE OF handle, display_name, avatar_url ON user
+WHEN OLD.handle IS NOT NEW.handle OR OLD.display_name IS NOT NEW.display_name OR OLD.avatar_url IS NOT NEW.avatar_url
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version)
+    SELECT id, 1 FROM bookshelf WHERE owner_did = NEW.did
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+-- New shelves start at version 1, so listings see them through the row-0 counter below
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_bookshelf_insert AFTER INSERT ON bookshelf
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (NEW.id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+-- Member lists and counts appear on shelf cards and in the viewer's controls
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_permission_insert AFTER INSERT ON permission
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (NEW.bookshelf_id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_permission_update AFTER UPDATE ON permission
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (NEW.bookshelf_id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_permission_delete AFTER DELETE ON permission
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (OLD.bookshelf_id, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+-- Row 0 (ALL_SHELVES_VERSION_ID) is bumped whenever any shelf's row changes,
+-- for pages that list many shelves such as explore and search
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_all_insert AFTER INSERT ON shelf_version
+WHEN NEW.bookshelf_id != 0
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (0, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_all_update AFTER UPDATE ON shelf_version
+WHEN NEW.bookshelf_id != 0
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (0, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_version_all_delete AFTER DELETE ON shelf_version
+WHEN OLD.bookshelf_id != 0
+BEGIN
+    INSERT INTO shelf_version (bookshelf_id, version) VALUES (0, 1)
+    ON CONFLICT (bookshelf_id) DO UPDATE SET version = version + 1;
+END;
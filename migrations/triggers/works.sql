@@ -0,0 +1,50 @@
+-- Keep book_work and shelf_work in sync with book.
+-- Book writes (re)assign the book's work; book_work writes recompute the
+-- affected (shelf, work) rows of shelf_work from shelf_work_live.
+
+CREATE TRIGGER IF NOT EXISTS trg_work_book_insert AFTER INSERT ON book
+BEGIN
+    INSERT OR IGNORE INTO work (work_key, title, author, isbn13)
+    SELECT work_key, title, author, isbn13 FROM book_work_key WHERE book_id = NEW.id;
+    DELETE FROM book_work WHERE book_id = NEW.id;
+    INSERT INTO book_work (book_id, work_id, bookshelf_id, added_by_did, added_at)
+    SELECT k.book_id, w.id, k.bookshelf_id, k.added_by_did, k.added_at
+    FROM book_work_key k JOIN work w ON w.work_key = k.work_key
+    WHERE k.book_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_work_book_delete AFTER DELETE ON book
+BEGIN
+    DELETE FROM book_work WHERE book_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_work_book_update AFTER UPDATE OF bookshelf_id, title, author, isbn, added_by_did, added_at ON book
+BEGIN
+    INSERT OR IGNORE INTO work (work_key, title, author, isbn13)
+    SELECT work_key, title, author, isbn13 FROM book_work_key WHERE book_id = NEW.id;
+    DELETE FROM book_work WHERE book_id = OLD.id;
+    INSERT INTO book_work (book_id, work_id, bookshelf_id, added_by_did, added_at)
+    SELECT k.book_id, w.id, k.bookshelf_id, k.added_by_did, k.added_at
+    FROM book_work_key k JOIN work w ON w.work_key = k.work_key
+    WHERE k.book_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_work_insert AFTER INSERT ON book_work
+BEGIN
+    INSERT OR REPLACE INTO shelf_work (bookshelf_id, work_id, vote_count, first_book_id, first_added_by_did, first_added_at)
+    SELECT bookshelf_id, work_id, vote_count, first_book_id, first_added_by_did, first_added_at
+    FROM shelf_work_live WHERE bookshelf_id = NEW.bookshelf_id AND work_id = NEW.work_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_work_delete AFTER DELETE ON book_work
+BEGIN
+    DELETE FROM shelf_work WHERE bookshelf_id = OLD.bookshelf_id AND work_id = OLD.work_id;
+    INSERT INTO shelf_work (bookshelf_id, work_id, vote_count, first_book_id, first_added_by_did, first_added_at)
+    SELECT bookshelf_id, work_id, vote_count, first_book_id, first_added_by_did, first_added_at
+    FROM shelf_work_live WHERE bookshelf_id = OLD.bookshelf_id AND work_id = OLD.work_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_shelf_work_bookshelf_delete AFTER DELETE ON bookshelf
+BEGIN
+    DELETE FROM shelf_work WHERE bookshelf_id = OLD.id;
+END;
@@ -1,11 +1,14 @@
 """Database models for BookdIt using FastLite."""
 
 from fastlite import *
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from typing import Optional
+import apsw
+import json
+import os
+import re
 import secrets
 import string
-import threading
 import random
 from fasthtml.common import *
 from fastcore.all import patch
@@ -13,168 +16,74 @@ from atproto import Client, models as at_models
 from atproto_client.exceptions import UnauthorizedError, BadRequestError
 import logging
 from performance_monitor import track_query_func
+from bibliome.services.permissions import PermissionContext
+from bibliome.infrastructure.read_pool import ReadConnectionPool, dict_rows, object_rows, tuple_rows
+from bibliome.infrastructure.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
-# Thread-local storage for database connections
-# This ensures each thread gets its own isolated SQLite connection,
-# preventing cursor invalidation issues from concurrent access
-_thread_local = threading.local()
-_connection_lock = threading.Lock()
+# Reads run on a pool of read-only connections so concurrent requests never
+# share a cursor; writes stay on the main FastLite connection.
+READ_POOL_SIZE = int(os.getenv('READ_POOL_SIZE', 8))
+READ_POOL_TIMEOUT = float(os.getenv('READ_POOL_TIMEOUT', 10))
 
+_read_pool: Optional[ReadConnectionPool] = None
 
-class ThreadLocalConnectionPool:
-    """
-    Manages thread-local database connections to prevent cursor invalidation.
-    
-    SQLite connections are not thread-safe by default. When multiple threads
-    share a connection, cursor operations can be invalidated by other threads.
-    This class provides each thread with its own dedicated connection.
-    """
-    
-    def __init__(self, db_path: str = 'data/bookdit.db'):
-        self.db_path = db_path
-        self._main_db = None
-        
-    def set_main_db(self, db):
-        """Set the main database connection (used for table references)."""
-        self._main_db = db
-        
-    def get_connection(self):
-        """Get or create a thread-local database connection."""
-        if not hasattr(_thread_local, 'connection') or _thread_local.connection is None:
-            import sqlite3
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            # Note: WAL mode and synchronous are database-wide settings already
-            # configured by setup_database(). Only set connection-specific pragmas
-            # here to avoid blocking operations that can hang the async event loop.
-            conn.execute("PRAGMA busy_timeout=30000")
-            conn.execute("PRAGMA cache_size=10000")
-            conn.execute("PRAGMA temp_store=memory")
-            _thread_local.connection = conn
-            logger.debug(f"Created new thread-local connection for thread {threading.current_thread().name}")
-        return _thread_local.connection
-    
-    def close_connection(self):
-        """Close the thread-local connection if it exists."""
-        if hasattr(_thread_local, 'connection') and _thread_local.connection:
-            try:
-                _thread_local.connection.close()
-            except Exception:
-                pass
-            _thread_local.connection = None
-
-
-# Global connection pool instance
-_connection_pool = None
-
-
-def get_connection_pool():
-    """Get the global connection pool instance."""
-    global _connection_pool
-    if _connection_pool is None:
-        _connection_pool = ThreadLocalConnectionPool()
-    return _connection_pool
-
-
-def safe_execute_query(db, query: str, params: tuple = (), max_retries: int = 5) -> list[dict]:
+
+def configure_read_pool(db_path: str) -> Optional[ReadConnectionPool]:
+    """Replace the read pool with one for db_path; in-memory databases get no pool."""
+    global _read_pool
+    close_read_pool()
+    if db_path and db_path != ':memory:':
+        _read_pool = ReadConnectionPool(db_path, size=READ_POOL_SIZE, timeout=READ_POOL_TIMEOUT)
+    return _read_pool
+
+
+def get_read_pool() -> Optional[ReadConnectionPool]:
+    """The read pool set up by setup_database, or None if reads use the main connection."""
+    return _read_pool
+
+
+def close_read_pool():
+    """Close and drop the read pool (scripts that reopen databases call this)."""
+    global _read_pool
+    if _read_pool is not None:
+        _read_pool.close()
+        _read_pool = None
+
+
+def safe_execute_query(db, query: str, params: tuple = (), row_factory=dict_rows) -> list:
     """
-    Safely execute a query and return results as a list of dictionaries.
+    Execute a read query and return results as a list of dictionaries.
 
-    This function handles the SQLite cursor invalidation issue that occurs when
-    concurrent requests share the same database connection. The error
-    "Can't get description for statements that have completed execution" happens
-    when another thread/request uses the connection between execute() and
-    accessing cursor.description.
-    
-    Uses thread-local connections and improved retry logic with exponential
-    backoff and jitter to handle concurrent access scenarios.
+    The query runs on a connection checked out of the read pool for this
+    statement only. Without a pool (in-memory databases) it runs on db itself. Errors are raised
+    to the caller rather than retried.
 
     Args:
-        db: Database connection object (may be ignored in favor of thread-local connection)
+        db: Database connection used when there is no read pool
         query: SQL query to execute
         params: Query parameters
-        max_retries: Number of retry attempts for cursor errors (default: 5)
+        row_factory: Builds the result from (column names, cursor); e.g.
+            object_rows(ShelfRow) returns row objects instead of dicts
 
     Returns:
         List of dictionaries with column names as keys
     """
-    import time
-    import sqlite3
-
-    # Try to use thread-local connection first for isolation
-    pool = get_connection_pool()
-    use_thread_local = pool._main_db is not None
-    
-    for attempt in range(max_retries):
-        try:
-            # Choose connection based on availability
-            if use_thread_local:
-                conn = pool.get_connection()
-                cursor = conn.execute(query, params)
-            else:
-                cursor = db.execute(query, params)
-                
-            # Immediately capture description and rows to minimize race window
-            description = cursor.description
-            if description is None:
-                return []
-            columns = [d[0] for d in description]
-            rows = cursor.fetchall()
-            return [dict(zip(columns, row)) for row in rows]
-
-        except sqlite3.ProgrammingError as e:
-            # Handle "Can't get description for statements that have completed execution"
-            error_msg = str(e).lower()
-            if 'completed execution' in error_msg:
-                if attempt < max_retries - 1:
-                    # Exponential backoff with jitter to reduce collision probability
-                    base_delay = 0.1 * (2 ** attempt)
-                    jitter = random.uniform(0, 0.1 * (attempt + 1))
-                    delay = base_delay + jitter
-                    logger.warning(f"Cursor invalidated (attempt {attempt + 1}/{max_retries}), retrying in {delay:.3f}s...")
-                    time.sleep(delay)
-                    continue
-                else:
-                    # On final attempt, log and return empty rather than raising
-                    logger.error(f"Cursor invalidation persisted after {max_retries} attempts, returning empty result")
-                    return []
-            raise
-        except sqlite3.OperationalError as e:
-            error_msg = str(e).lower()
-            if ('database is locked' in error_msg or 'busy' in error_msg):
-                if attempt < max_retries - 1:
-                    # Exponential backoff with jitter
-                    base_delay = 0.2 * (2 ** attempt)
-                    jitter = random.uniform(0, 0.2 * (attempt + 1))
-                    delay = base_delay + jitter
-                    logger.warning(f"Database busy (attempt {attempt + 1}/{max_retries}), retrying in {delay:.3f}s...")
-                    time.sleep(delay)
-                    continue
-                else:
-                    logger.error(f"Database remained busy after {max_retries} attempts, returning empty result")
-                    return []
-            raise
-        
-        except Exception as e:
-            # Catch FastLite or other wrapped exceptions that may contain cursor errors
-            error_msg = str(e).lower()
-            if 'completed execution' in error_msg or 'description' in error_msg:
-                if attempt < max_retries - 1:
-                    # Exponential backoff with jitter
-                    base_delay = 0.1 * (2 ** attempt)
-                    jitter = random.uniform(0, 0.1 * (attempt + 1))
-                    delay = base_delay + jitter
-                    logger.warning(f"Cursor error via wrapped exception (attempt {attempt + 1}/{max_retries}), retrying in {delay:.3f}s...")
-                    time.sleep(delay)
-                    continue
-                else:
-                    logger.error(f"Cursor error persisted after {max_retries} attempts, returning empty result")
-                    return []
-            raise
-
-    return []
+    pool = get_read_pool()
+    if pool is not None:
+        return pool.execute(query, params, row_factory)
+
+    cursor = db.execute(query, params)
+    try:
+        description = cursor.description
+    except apsw.ExecutionCompleteError:
+        # apsw finishes a statement that returns no rows during execute()
+        return []
+    if description is None:
+        return []
+    return row_factory(tuple(d[0] for d in description), cursor)
 
 
 def create_bookshelf_record(client: Client, name: str, description: str, privacy: str, open_to_contributions: bool = False) -> str:
@@ -702,6 +611,36 @@ class ProcessMetric:
     metric_type: str = "counter"
     recorded_at: datetime = None
 
+
+# Row types for list queries. Each is a slotted dataclass with the model's
+# columns plus the joined/computed columns its queries select, built straight
+# from the cursor by object_rows() instead of dict -> model -> setattr per row.
+def _row_type(name: str, model, extra: dict, namespace: dict = None):
+    """A slotted dataclass with model's fields (and defaults) followed by extra's."""
+    from dataclasses import make_dataclass, field
+    columns = [(f, object, field(default=getattr(model, f, None))) for f in model.__annotations__]
+    columns += [(f, object, field(default=default)) for f, default in extra.items()]
+    return make_dataclass(name, columns, namespace=namespace, slots=True, eq=False)
+
+
+def _listing_owner(self) -> Optional[User]:
+    """The shelf owner's profile from the joined user columns, if the owner is known."""
+    if self.owner_handle is None:
+        return None
+    return User(did=self.owner_did, handle=self.owner_handle,
+                display_name=self.owner_name or '', avatar_url=self.owner_avatar_url or '')
+
+
+ShelfRow = _row_type('ShelfRow', Bookshelf, {'user_relationship': None, 'vote_count': 0})
+ShelfListingRow = _row_type('ShelfListingRow', Bookshelf, {
+    'owner_handle': None, 'owner_name': None, 'owner_avatar_url': None,
+    'book_count': 0, 'contributor_count': 0, 'member_count': 0, 'recent_book_count': 0,
+    'recent_covers': '[]', 'activity_score': 0, 'last_book_added_at': None,
+}, namespace={'owner': property(_listing_owner)})
+BookRow = _row_type('BookRow', Book, {'bookshelf_name': None, 'bookshelf_slug': None})
+CommentRow = _row_type('CommentRow', Comment, {'user_handle': None, 'user_display_name': None, 'user_avatar_url': None})
+
+
 def validate_primary_key_setup(db, table_name: str, expected_pk_column: str):
     """Validate that a table has the correct primary key setup."""
     try:
@@ -727,6 +666,58 @@ def validate_primary_key_setup(db, table_name: str, expected_pk_column: str):
         print(f"✗ Table {table_name} primary key validation failed: {e}")
         raise
 
+# Migrations before this version only create or alter the tables that are also
+# declared as model classes, so in-memory databases get that schema from
+# db.create(). Later migrations add derived tables, views and indexes that have
+# no class equivalent and are replayed directly for in-memory databases.
+FIRST_DERIVED_MIGRATION = 12
+
+
+def _resolve_migrations_dir(migrations_dir: str) -> str:
+    """Resolve a relative migrations directory against the project root if needed."""
+    import os
+
+    if os.path.isdir(migrations_dir):
+        return migrations_dir
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), migrations_dir)
+
+
+def apply_migration_scripts(db, migrations_dir: str = 'migrations', first_version: int = FIRST_DERIVED_MIGRATION):
+    """Execute migration scripts from first_version onwards against an unmanaged connection.
+
+    fastmigrate only manages on-disk databases; this lets in-memory databases
+    (used by the test suite) pick up the derived schema as well.
+    """
+    import os
+    import glob
+
+    migrations_dir = _resolve_migrations_dir(migrations_dir)
+    for script_path in sorted(glob.glob(os.path.join(migrations_dir, '[0-9]*-*.sql'))):
+        version = int(os.path.basename(script_path).split('-', 1)[0])
+        if version < first_version:
+            continue
+        with open(script_path) as f:
+            db.conn.execute(f.read())
+
+
+def install_triggers(db, migrations_dir: str = 'migrations'):
+    """Create the triggers that keep derived tables in sync with their sources.
+
+    Triggers live in migrations/triggers/ rather than in numbered migrations
+    because db.create(..., transform=True) rebuilds a table whenever its schema
+    drifts from the model class, silently dropping any triggers on it. Every
+    statement uses IF NOT EXISTS, so this is safe to run on each startup; a
+    changed trigger gets a new name and its old one is dropped.
+    """
+    import os
+    import glob
+
+    triggers_dir = os.path.join(_resolve_migrations_dir(migrations_dir), 'triggers')
+    for script_path in sorted(glob.glob(os.path.join(triggers_dir, '*.sql'))):
+        with open(script_path) as f:
+            db.conn.execute(f.read())
+
+
 def setup_database(db_path: str = 'data/bookdit.db', migrations_dir: str = 'migrations', memory: bool = False):
     """Initialize the database with fastmigrate and all tables."""
     import os
@@ -766,7 +757,11 @@ def setup_database(db_path: str = 'data/bookdit.db', migrations_dir: str = 'migr
     db.execute("PRAGMA mmap_size=268435456")
     
     # Create table objects for FastLite operations with explicit primary keys
-    # These will connect to existing tables created by migrations
+    # These will connect to existing tables created by migrations.
+    # If a transform rebuilds a table, the rename back to its original name must
+    # not re-validate views/triggers that reference it (they would briefly point
+    # at a missing table); legacy_alter_table skips that check.
+    db.execute("PRAGMA legacy_alter_table=ON")
     users = db.create(User, pk='did', transform=True, if_not_exists=True)
     bookshelves = db.create(Bookshelf, pk='id', transform=True, if_not_exists=True)
     books = db.create(Book, pk='id', transform=True, if_not_exists=True)
@@ -775,6 +770,14 @@ def setup_database(db_path: str = 'data/bookdit.db', migrations_dir: str = 'migr
     comments = db.create(Comment, pk='id', transform=True, if_not_exists=True)
     activities = db.create(Activity, pk='id', transform=True, if_not_exists=True)
     sync_logs = db.create(SyncLog, pk='id', transform=True, if_not_exists=True)
+    db.execute("PRAGMA legacy_alter_table=OFF")
+
+    if memory:
+        apply_migration_scripts(db, migrations_dir)
+    install_triggers(db, migrations_dir)
+    shelf_stats = db.t.shelf_stats
+    works = db.t.work
+    shelf_works = db.t.shelf_work
     
     # Connect to process monitoring tables created by migrations
     # These tables are already created by 0003-add-process-monitoring.sql
@@ -793,11 +796,9 @@ def setup_database(db_path: str = 'data/bookdit.db', migrations_dir: str = 'migr
         print(f"⚠ Warning: Process monitoring table validation failed: {e}")
         # Don't fail the entire setup, just log the warning
     
-    # Initialize thread-local connection pool with database path
-    pool = get_connection_pool()
-    pool.db_path = db_path if db_path != ':memory:' else 'data/bookdit.db'
-    pool.set_main_db(db)
-    print("✓ Thread-local connection pool initialized for concurrent access safety")
+    # Open the read-only connection pool used by safe_execute_query
+    if configure_read_pool(db_path):
+        print(f"✓ Read connection pool initialized ({READ_POOL_SIZE} read-only connections)")
     
     return {
         'db': db,
@@ -809,6 +810,9 @@ def setup_database(db_path: str = 'data/bookdit.db', migrations_dir: str = 'migr
         'comments': comments,
         'activities': activities,
         'sync_logs': sync_logs,
+        'shelf_stats': shelf_stats,
+        'works': works,
+        'shelf_works': shelf_works,
         'process_status': process_status,
         'process_logs': process_logs,
         'process_metrics': process_metrics
@@ -981,14 +985,14 @@ def get_books_with_upvotes(bookshelf_id: int, user_did: str = None, db_tables=No
     """Get books for a bookshelf with vote counts based on Book records, user voting status, and added-by user info.
 
     In the new system, each Book record represents a user's +1 vote for that book.
-    We count Book records grouped by title/author/ISBN to get the vote count.
+    Votes are counted per work (see migrations/0014-add-works.sql): shelf_work holds
+    the count and first adder for each work on the shelf, and the first added Book
+    record represents the work on the page.
     """
     if not db_tables:
         return []
 
     try:
-        # Query to get unique books with vote counts based on Book records
-        # Group by title, author, and ISBN to identify the same book added by different users
         query = """
             SELECT
                 b.title,
@@ -999,38 +1003,26 @@ def get_books_with_upvotes(bookshelf_id: int, user_did: str = None, db_tables=No
                 b.publisher,
                 b.published_date,
                 b.page_count,
-                COUNT(*) as upvote_count,
-                MIN(b.id) as representative_id,
-                MIN(b.added_at) as first_added_at,
-                CASE WHEN user_book.id IS NOT NULL THEN 1 ELSE 0 END as user_has_upvoted,
+                sw.vote_count as upvote_count,
+                sw.first_book_id as representative_id,
+                sw.first_added_at,
+                EXISTS (
+                    SELECT 1 FROM book_work ub
+                    WHERE ub.bookshelf_id = sw.bookshelf_id
+                      AND ub.work_id = sw.work_id
+                      AND ub.added_by_did = ?
+                ) as user_has_upvoted,
                 first_adder.handle as added_by_handle,
                 first_adder.display_name as added_by_display_name
-            FROM book b
-            LEFT JOIN book user_book ON b.bookshelf_id = user_book.bookshelf_id 
-                AND b.title = user_book.title 
-                AND b.author = user_book.author 
-                AND COALESCE(b.isbn, '') = COALESCE(user_book.isbn, '')
-                AND user_book.added_by_did = ?
-            LEFT JOIN book first_book ON b.title = first_book.title 
-                AND b.author = first_book.author 
-                AND COALESCE(b.isbn, '') = COALESCE(first_book.isbn, '')
-                AND b.bookshelf_id = first_book.bookshelf_id
-                AND first_book.added_at = (
-                    SELECT MIN(added_at) FROM book 
-                    WHERE bookshelf_id = ? 
-                    AND title = b.title 
-                    AND author = b.author 
-                    AND COALESCE(isbn, '') = COALESCE(b.isbn, '')
-                )
-            LEFT JOIN user first_adder ON first_book.added_by_did = first_adder.did
-            WHERE b.bookshelf_id = ?
-            GROUP BY b.title, b.author, COALESCE(b.isbn, '')
-            ORDER BY upvote_count DESC, b.title ASC
+            FROM shelf_work sw
+            JOIN book b ON b.id = sw.first_book_id
+            LEFT JOIN user first_adder ON first_adder.did = sw.first_added_by_did
+            WHERE sw.bookshelf_id = ?
+            ORDER BY sw.vote_count DESC, b.title ASC
         """
 
-        # Use FastLite's q() method for efficient raw SQL execution
-        params = [user_did or '', bookshelf_id, bookshelf_id]
-        rows = db_tables['db'].q(query, params)
+        params = (user_did or '', bookshelf_id)
+        rows = safe_execute_query(db_tables['db'], query, params)
 
         books_with_votes = []
         for row in rows:
@@ -1063,6 +1055,46 @@ def get_books_with_upvotes(bookshelf_id: int, user_did: str = None, db_tables=No
         logger.error(f"Error getting books with vote counts: {e}")
         return []
 
+
+def get_work_votes(book_id: int, user_did: str = None, db_tables=None) -> Optional[dict]:
+    """Get the vote state of the work a book belongs to, on that book's shelf.
+
+    Returns:
+        Dict with work_id, bookshelf_id, vote_count, first_book_id and user_book_id
+        (the viewer's own Book record for the work, or None), or None if the book
+        is unknown
+    """
+    try:
+        rows = safe_execute_query(db_tables['db'], """
+            SELECT
+                bw.work_id,
+                bw.bookshelf_id,
+                COALESCE(sw.vote_count, 0) as vote_count,
+                sw.first_book_id,
+                (
+                    SELECT ub.book_id FROM book_work ub
+                    WHERE ub.bookshelf_id = bw.bookshelf_id
+                      AND ub.work_id = bw.work_id
+                      AND ub.added_by_did = ?
+                    LIMIT 1
+                ) as user_book_id
+            FROM book_work bw
+            LEFT JOIN shelf_work sw ON sw.bookshelf_id = bw.bookshelf_id AND sw.work_id = bw.work_id
+            WHERE bw.book_id = ?
+        """, (user_did or '', book_id))
+        return rows[0] if rows else None
+    except Exception as e:
+        logger.error(f"Error getting work votes for book {book_id}: {e}")
+        return None
+
+
+def get_shelf_work(bookshelf_id: int, work_id: int, db_tables) -> Optional[dict]:
+    """Get the shelf_work row (vote count and first adder) for a work on a shelf."""
+    rows = safe_execute_query(
+        db_tables['db'], "SELECT * FROM shelf_work WHERE bookshelf_id = ? AND work_id = ?", (bookshelf_id, work_id)
+    )
+    return rows[0] if rows else None
+
 def log_activity(user_did: str, activity_type: str, db_tables, bookshelf_id: int = None, book_id: int = None, metadata: str = ""):
     """Log user activity for the social feed."""
     try:
@@ -1078,81 +1110,438 @@ def log_activity(user_did: str, activity_type: str, db_tables, bookshelf_id: int
     except Exception as e:
         print(f"Error logging activity: {e}")
 
-@track_query_func('get_network_activity', 'select')
-def get_network_activity(auth_data: dict, db_tables, bluesky_auth, limit: int = 20, offset: int = 0, activity_type: str = "all", date_filter: str = "all"):
-    """Get recent activity from users in the current user's network with filtering and pagination."""
+# A viewer's stored follow list is refreshed in the background once it is older than this
+FOLLOW_GRAPH_MAX_AGE = timedelta(hours=1)
+
+def sync_follow_graph(user_did: str, following_dids: list[str], db_tables) -> dict:
+    """Make the stored follow list of user_did match following_dids.
+
+    Only the difference is written: new follows are inserted, unfollowed
+    accounts deleted, and follow_sync is stamped with the refresh time.
+
+    Returns:
+        Dict with 'added', 'removed' and 'total' counts
+    """
+    db = db_tables['db']
+    stored = {row['followed_did'] for row in db.q("SELECT followed_did FROM follow WHERE follower_did = ?", (user_did,))}
+    wanted = set(following_dids)
+    added = wanted - stored
+    removed = stored - wanted
+
+    with db.conn:
+        if added:
+            db.conn.executemany(
+                "INSERT OR IGNORE INTO follow (follower_did, followed_did) VALUES (?, ?)",
+                [(user_did, did) for did in added]
+            )
+        if removed:
+            db.conn.executemany(
+                "DELETE FROM follow WHERE follower_did = ? AND followed_did = ?",
+                [(user_did, did) for did in removed]
+            )
+        db.execute(
+            "INSERT OR REPLACE INTO follow_sync (follower_did, follow_count, synced_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            (user_did, len(wanted))
+        )
+    return {'added': len(added), 'removed': len(removed), 'total': len(wanted)}
+
+def follow_graph_synced_at(user_did: str, db_tables) -> Optional[datetime]:
+    """When the stored follow list of user_did was last refreshed, or None if never."""
+    rows = safe_execute_query(db_tables['db'], "SELECT synced_at FROM follow_sync WHERE follower_did = ?", (user_did,))
+    if not rows or not rows[0]['synced_at']:
+        return None
+    return datetime.fromisoformat(rows[0]['synced_at']).replace(tzinfo=timezone.utc)
+
+def follow_graph_is_stale(user_did: str, db_tables, max_age: timedelta = FOLLOW_GRAPH_MAX_AGE) -> bool:
+    """True if the follow list of user_did was never stored or is older than max_age."""
+    synced_at = follow_graph_synced_at(user_did, db_tables)
+    return synced_at is None or datetime.now(timezone.utc) - synced_at > max_age
+
+def refresh_follow_graph(auth_data: dict, db_tables, bluesky_auth) -> Optional[dict]:
+    """Fetch the viewer's follows from Bluesky and store them with sync_follow_graph.
+
+    An empty fetch for a viewer who had follows stored is treated as a failed
+    request: the stored list is kept and the refresh is retried later.
+    """
+    user_did = auth_data.get('did')
     try:
-        # Get list of users the current user follows
-        following_dids = bluesky_auth.get_following_list(auth_data, limit=100)
-        
-        if not following_dids:
-            return []
-        
+        following_dids = bluesky_auth.get_following_list(auth_data)
+        if not following_dids and follow_graph_synced_at(user_did, db_tables) is not None:
+            stored = db_tables['db'].q("SELECT follow_count FROM follow_sync WHERE follower_did = ?", (user_did,))
+            if stored and stored[0]['follow_count']:
+                logger.warning(f"Empty follow list for {user_did}; keeping {stored[0]['follow_count']} stored follows")
+                return None
+        result = sync_follow_graph(user_did, following_dids, db_tables)
+        logger.info(f"Follow graph for {user_did}: +{result['added']} -{result['removed']} ({result['total']} total)")
+        return result
+    except Exception as e:
+        logger.error(f"Error refreshing follow graph for {user_did}: {e}")
+        return None
+
+# Cached Bluesky profiles are shown for this long before being fetched again;
+# DIDs Bluesky had no profile for are asked about again sooner
+PROFILE_CACHE_MAX_AGE = timedelta(hours=int(os.getenv('PROFILE_CACHE_MAX_AGE_HOURS', 24)))
+PROFILE_CACHE_MISSING_MAX_AGE = timedelta(hours=1)
+
+def store_profiles(profiles: dict[str, dict], db_tables, missing_dids=()) -> int:
+    """Write fetched profiles, and DIDs known to have none, to profile_cache.
+
+    Returns:
+        Number of rows written
+    """
+    rows = [(did, profile.get('handle'), profile.get('display_name'), profile.get('avatar_url') or '', 1)
+            for did, profile in profiles.items()]
+    rows += [(did, None, None, None, 0) for did in set(missing_dids) - set(profiles)]
+    if rows:
+        db = db_tables['db']
+        with db.conn:
+            db.conn.executemany(
+                "INSERT OR REPLACE INTO profile_cache (did, handle, display_name, avatar_url, found, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                rows
+            )
+    return len(rows)
+
+def get_cached_profiles(dids: list[str], db_tables) -> tuple[dict[str, dict], set[str], dict[str, dict]]:
+    """Cached profiles of dids, split by age.
+
+    Returns:
+        (fresh, missing, stale): profiles younger than PROFILE_CACHE_MAX_AGE,
+        DIDs recently found to have no profile, and older profiles that may be
+        shown if fetching them again fails
+    """
+    fresh, missing, stale = {}, set(), {}
+    if not dids:
+        return fresh, missing, stale
+    placeholders = ','.join('?' for _ in dids)
+    rows = safe_execute_query(db_tables['db'], f"""
+        SELECT did, handle, display_name, avatar_url, found, fetched_at
+        FROM profile_cache WHERE did IN ({placeholders})
+    """, tuple(dids))
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        age = now - datetime.fromisoformat(row['fetched_at']).replace(tzinfo=timezone.utc)
+        if not row['found']:
+            if age <= PROFILE_CACHE_MISSING_MAX_AGE:
+                missing.add(row['did'])
+            continue
+        profile = {key: row[key] for key in ('did', 'handle', 'display_name', 'avatar_url')}
+        (fresh if age <= PROFILE_CACHE_MAX_AGE else stale)[row['did']] = profile
+    return fresh, missing, stale
+
+def get_profiles(dids: list[str], auth_data: dict, db_tables, bluesky_auth) -> dict[str, dict]:
+    """Profiles of dids, read through profile_cache.
+
+    Only DIDs without a fresh cache row are fetched from Bluesky, and what
+    comes back (including DIDs with no profile) is cached. A profile whose
+    refetch fails is served from its expired row.
+    """
+    dids = list(dict.fromkeys(dids))
+    profiles, missing, stale = get_cached_profiles(dids, db_tables)
+    to_fetch = [did for did in dids if did not in profiles and did not in missing]
+    if not to_fetch:
+        return profiles
+
+    not_found = set()
+    fetched = bluesky_auth.get_profiles_batch(to_fetch, auth_data, not_found=not_found)
+    try:
+        store_profiles(fetched, db_tables, not_found)
+    except Exception as e:
+        logger.warning(f"Could not cache {len(fetched)} profiles: {e}")
+    profiles.update(fetched)
+    for did in to_fetch:
+        if did not in profiles and did not in not_found and did in stale:
+            profiles[did] = stale[did]
+    return profiles
+
+def _network_activity_from_sql(current_user_did: str, activity_type: str, date_filter: str,
+                               use_inbox: bool = False, boundary: list = None) -> tuple[str, list, list[tuple[str, str]]]:
+    """FROM/WHERE clause and sort keys of the network feed: activity by followed users on shelves the viewer can see.
+
+    With use_inbox the feed reads the viewer's activity_inbox plus the activity
+    of followed pull authors; otherwise it joins follow to activity. boundary is
+    the (created_at, id) key of the viewer's oldest inbox row: the inbox form
+    then reads pull authors down to it and the join form only below it, so the
+    two split the feed between them (see _network_activity_page). Neither form
+    reads activity rows to pick a page; get_network_activity loads the details
+    of one page.
+    """
+    sort_key = "(COALESCE(a.created_at, ''), a.id)"
+    if use_inbox:
+        pull_since = f" AND {sort_key} >= (?, ?)" if boundary else ""
+        from_sql = f"""
+            FROM (
+                SELECT activity_id, created_at FROM activity_inbox WHERE viewer_did = ?
+                UNION ALL
+                SELECT a.id, COALESCE(a.created_at, '')
+                FROM follow f
+                JOIN activity_pull_author pa ON pa.author_did = f.followed_did
+                JOIN activity a ON a.user_did = f.followed_did
+                WHERE f.follower_did = ?{pull_since}
+            ) i
+            JOIN activity a ON a.id = i.activity_id
+        """
+        params = [current_user_did, current_user_did] + (list(boundary) if boundary else [])
+        sort_keys = [("i.created_at", "DESC"), ("i.activity_id", "DESC")]
+    else:
+        from_sql = """
+            FROM follow f
+            JOIN activity a ON a.user_did = f.followed_did
+        """
+        params = []
+        sort_keys = [("COALESCE(a.created_at, '')", "DESC"), ("a.id", "DESC")]
+    from_sql += """
+        LEFT JOIN bookshelf b ON a.bookshelf_id = b.id
+        LEFT JOIN permission p ON b.id = p.bookshelf_id AND p.user_did = ? AND p.status = 'active'
+        WHERE (
+            b.privacy = 'public' 
+            OR b.privacy = 'link-only'
+            OR (b.privacy = 'private' AND b.owner_did = ?)
+            OR (b.privacy = 'private' AND p.user_did IS NOT NULL)
+        )
+    """
+    params += [current_user_did, current_user_did]
+    if not use_inbox:
+        from_sql += " AND f.follower_did = ?"
+        params.append(current_user_did)
+        if boundary:
+            from_sql += f" AND {sort_key} < (?, ?)"
+            params.extend(boundary)
+
+    # Add activity type filter
+    if activity_type != "all":
+        from_sql += " AND a.activity_type = ?"
+        params.append(activity_type)
+
+    # Add date filter
+    if date_filter != "all":
+        if date_filter == "1d":
+            from_sql += " AND a.created_at >= datetime('now', '-1 day')"
+        elif date_filter == "7d":
+            from_sql += " AND a.created_at >= datetime('now', '-7 days')"
+        elif date_filter == "30d":
+            from_sql += " AND a.created_at >= datetime('now', '-30 days')"
+
+    return from_sql, params, sort_keys
+
+# Activity inboxes (see migration 0016). INBOX_MAX_ITEMS must match triggers/activity_inbox.sql.
+INBOX_MAX_ITEMS = 500
+INBOX_PULL_MIN_FOLLOWERS = int(os.getenv('INBOX_PULL_MIN_FOLLOWERS', 1000))
+
+def refresh_inbox_pull_authors(db_tables, min_followers: int = INBOX_PULL_MIN_FOLLOWERS) -> dict:
+    """Move authors between fan-out and pull according to their stored follower count.
+
+    Fanning out an author with min_followers or more followers writes that many
+    inbox rows per activity, so their activity is read at feed time instead.
+    Authors who become pull authors leave every inbox; authors who drop below
+    the threshold are copied back into their followers' inboxes.
+
+    Returns:
+        Dict with 'pull' (authors now pulled), 'added' and 'removed' counts
+    """
+    db = db_tables['db']
+    counts = {row['followed_did']: row['followers'] for row in db.q(
+        "SELECT followed_did, COUNT(*) AS followers FROM follow GROUP BY followed_did HAVING COUNT(*) >= ?",
+        (min_followers,)
+    )}
+    current = {row['author_did'] for row in db.q("SELECT author_did FROM activity_pull_author")}
+    added = set(counts) - current
+    removed = current - set(counts)
+
+    with db.conn:
+        for author_did, followers in counts.items():
+            db.execute(
+                "INSERT OR REPLACE INTO activity_pull_author (author_did, follower_count, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+                (author_did, followers)
+            )
+        for author_did in added:
+            db.execute("DELETE FROM activity_inbox WHERE author_did = ?", (author_did,))
+        for author_did in removed:
+            db.execute("DELETE FROM activity_pull_author WHERE author_did = ?", (author_did,))
+            db.execute("""
+                INSERT OR IGNORE INTO activity_inbox (viewer_did, created_at, activity_id, author_did)
+                SELECT f.follower_did, COALESCE(a.created_at, ''), a.id, a.user_did
+                FROM follow f JOIN activity a ON a.user_did = f.followed_did
+                WHERE f.followed_did = ?
+            """, (author_did,))
+    return {'pull': len(counts), 'added': len(added), 'removed': len(removed)}
+
+def rebuild_activity_inboxes(db_tables) -> int:
+    """Rebuild every viewer's activity inbox from follow and activity.
+
+    Triggers keep inboxes current; this is the backfill job for databases
+    written to while the triggers were missing.
+
+    Returns:
+        Number of inbox rows written
+    """
+    db = db_tables['db']
+    with db.conn:
+        db.execute("DELETE FROM activity_inbox")
+        db.execute("""
+            INSERT OR IGNORE INTO activity_inbox (viewer_did, created_at, activity_id, author_did)
+            SELECT viewer_did, created_at, activity_id, author_did
+            FROM (
+                SELECT f.follower_did AS viewer_did, COALESCE(a.created_at, '') AS created_at, a.id AS activity_id,
+                       a.user_did AS author_did,
+                       ROW_NUMBER() OVER (PARTITION BY f.follower_did ORDER BY a.created_at DESC, a.id DESC) AS position
+                FROM follow f
+                JOIN activity a ON a.user_did = f.followed_did
+                WHERE f.followed_did NOT IN (SELECT author_did FROM activity_pull_author)
+            )
+            WHERE position <= ?
+        """, (INBOX_MAX_ITEMS,))
+        # Recount in one pass so this also works with the triggers missing
+        db.execute("DELETE FROM activity_inbox_size")
+        db.execute("""
+            INSERT INTO activity_inbox_size (viewer_did, item_count)
+            SELECT viewer_did, COUNT(*) FROM activity_inbox GROUP BY viewer_did
+        """)
+        return db.q("SELECT COALESCE(SUM(item_count), 0) AS total FROM activity_inbox_size")[0]['total']
+
+def _ensure_follow_graph(auth_data: dict, db_tables, bluesky_auth):
+    """Fill the viewer's follow list on first use; later refreshes run in the background."""
+    if follow_graph_synced_at(auth_data.get('did'), db_tables) is None:
+        refresh_follow_graph(auth_data, db_tables, bluesky_auth)
+
+def _inbox_boundary(current_user_did: str, db_tables) -> Optional[list]:
+    """(created_at, id) key of the viewer's oldest inbox row, or None for an empty inbox."""
+    rows = safe_execute_query(db_tables['db'], """
+        SELECT created_at, activity_id FROM activity_inbox WHERE viewer_did = ?
+        ORDER BY created_at, activity_id LIMIT 1
+    """, (current_user_did,))
+    return [rows[0]['created_at'], rows[0]['activity_id']] if rows else None
+
+# Item columns of a network feed page; created_key and id make up the row's sort key
+NETWORK_FEED_COLUMNS = "a.id, COALESCE(a.created_at, '') AS created_key"
+
+def _network_activity_page(current_user_did: str, db_tables, activity_type: str, date_filter: str, limit: int,
+                           cursor: str = None, offset: int = 0, use_inbox: bool = True,
+                           with_total: bool = False) -> "CursorPage":
+    """One keyset page of network feed ids, read from the inbox while it covers the page.
+
+    An inbox only holds the viewer's newest INBOX_MAX_ITEMS activities. The feed
+    is read from it down to its oldest row and continues below that row with
+    the follow join; both listings sort by (created_at, id), so a cursor from
+    either one pages into the other and a page may take rows from both.
+    """
+    boundary = _inbox_boundary(current_user_did, db_tables) if use_inbox else None
+    older = _network_activity_from_sql(current_user_did, activity_type, date_filter, boundary=boundary)
+    if boundary is None:
+        return paged_query(db_tables, NETWORK_FEED_COLUMNS, *older, limit,
+                           cursor=cursor, offset=offset, with_total=with_total)
+    inbox = _network_activity_from_sql(current_user_did, activity_type, date_filter, use_inbox=True, boundary=boundary)
+
+    def page(listing, size, cursor=None, offset=0):
+        return paged_query(db_tables, NETWORK_FEED_COLUMNS, *listing, size, cursor=cursor, offset=offset)
+
+    def sort_key(row):
+        return [row['created_key'], row['id']]
+
+    def counted(found):
+        return CursorPage(found, found.next_cursor, found.prev_cursor, total)
+
+    values, direction = decode_cursor(cursor)
+    if values is not None and len(values) != 2:
+        values, direction = None, "next"
+    total = _listing_total(db_tables, *inbox[:2]) + _listing_total(db_tables, *older[:2]) if with_total else None
+
+    if values is None or direction == "next":
+        if values is not None and values <= boundary:
+            return counted(page(older, limit, cursor))
+        newer = page(inbox, limit, cursor, offset)
+        if newer.next_cursor:
+            return counted(newer)
+        # The inbox part is used up; fill the page from the join
+        remaining = limit - len(newer)
+        older_offset = 0
+        if not newer and values is None and offset:
+            older_offset = max(offset - _listing_total(db_tables, *inbox[:2]), 0)
+        rest = page(older, max(remaining, 1), None if newer else cursor, older_offset)
+        items = list(newer) + (list(rest) if remaining else [])
+        if not items:
+            return CursorPage(total=total)
+        if remaining:
+            next_cursor = rest.next_cursor
+        else:
+            next_cursor = encode_cursor(sort_key(items[-1]), "next") if rest else None
+        has_prev = values is not None or offset > 0
+        return CursorPage(items, next_cursor,
+                          encode_cursor(sort_key(items[0]), "prev") if has_prev else None, total)
+
+    if values >= boundary:
+        return counted(page(inbox, limit, cursor))
+    rest = page(older, limit, cursor)
+    if rest.prev_cursor:
+        return counted(rest)
+    # Going back past the newest joined row; fill the page from the inbox
+    remaining = limit - len(rest)
+    newer = page(inbox, max(remaining, 1), encode_cursor(values, "prev"))
+    items = (list(newer) if remaining else []) + list(rest)
+    if not items:
+        return CursorPage(total=total)
+    if remaining:
+        prev_cursor = newer.prev_cursor
+    else:
+        prev_cursor = encode_cursor(sort_key(items[0]), "prev") if newer else None
+    return CursorPage(items, encode_cursor(sort_key(items[-1]), "next"), prev_cursor, total)
+
+def get_network_activity(auth_data: dict, db_tables, bluesky_auth, limit: int = 20, offset: int = 0, activity_type: str = "all", date_filter: str = "all", cursor: str = None, use_inbox: bool = True, with_total: bool = False):
+    """Get recent activity from users in the current user's network with filtering and pagination.
+
+    Followed users come from the stored follow table (see refresh_follow_graph).
+    With use_inbox the newest activities are read from the viewer's
+    activity_inbox and older ones from the follow join (see
+    _network_activity_page); without it every page joins follow to activity.
+    Pages by (created_at, id) keyset when a cursor is given; the returned
+    CursorPage carries the cursors for the neighbouring pages.
+    """
+    try:
+        _ensure_follow_graph(auth_data, db_tables, bluesky_auth)
         current_user_did = auth_data.get('did')
         
-        # Build query to get activities from followed users with permission-aware privacy filtering
-        placeholders = ','.join(['?' for _ in following_dids])
-        query = f"""
-            SELECT a.*, b.name as bookshelf_name, b.slug as bookshelf_slug, b.privacy,
+        page = _network_activity_page(
+            current_user_did, db_tables, activity_type, date_filter, limit,
+            cursor=cursor, offset=offset, use_inbox=use_inbox, with_total=with_total
+        )
+        if not page:
+            return page
+        
+        # Load shelf and book details for this page only
+        page_ids = [row['id'] for row in page]
+        placeholders = ','.join('?' for _ in page_ids)
+        details = {row['id']: row for row in safe_execute_query(db_tables['db'], f"""
+            SELECT a.*, b.name as bookshelf_name, b.slug as bookshelf_slug, b.privacy as bookshelf_privacy,
                    bk.title as book_title, bk.author as book_author, bk.cover_url as book_cover_url
             FROM activity a
             LEFT JOIN bookshelf b ON a.bookshelf_id = b.id
             LEFT JOIN book bk ON a.book_id = bk.id
-            LEFT JOIN permission p ON b.id = p.bookshelf_id AND p.user_did = ? AND p.status = 'active'
-            WHERE a.user_did IN ({placeholders})
-            AND (
-                b.privacy = 'public' 
-                OR b.privacy = 'link-only'
-                OR (b.privacy = 'private' AND b.owner_did = ?)
-                OR (b.privacy = 'private' AND p.user_did IS NOT NULL)
-            )
-        """
-        
-        params = [current_user_did] + following_dids + [current_user_did]
-        
-        # Add activity type filter
-        if activity_type != "all":
-            query += " AND a.activity_type = ?"
-            params.append(activity_type)
-        
-        # Add date filter
-        if date_filter != "all":
-            if date_filter == "1d":
-                query += " AND a.created_at >= datetime('now', '-1 day')"
-            elif date_filter == "7d":
-                query += " AND a.created_at >= datetime('now', '-7 days')"
-            elif date_filter == "30d":
-                query += " AND a.created_at >= datetime('now', '-30 days')"
-        
-        query += " ORDER BY a.created_at DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-        
-        # Execute raw SQL query
-        cursor = db_tables['db'].execute(query, params)
-        raw_activities = cursor.fetchall()
+            WHERE a.id IN ({placeholders})
+        """, tuple(page_ids))}
+        raw_activities = [details[activity_id] for activity_id in page_ids if activity_id in details]
         
         # Get profiles for the users who created these activities
-        activity_user_dids = list(set([row[1] for row in raw_activities]))
-        profiles = bluesky_auth.get_profiles_batch(activity_user_dids, auth_data)
+        activity_user_dids = list(set([row['user_did'] for row in raw_activities]))
+        profiles = get_profiles(activity_user_dids, auth_data, db_tables, bluesky_auth)
         
         # Format activities with user profiles
         activities = []
         for row in raw_activities:
             activity_data = {
-                'id': row[0],
-                'user_did': row[1],
-                'activity_type': row[2],
-                'bookshelf_id': row[3],
-                'book_id': row[4],
-                'created_at': row[5],
-                'metadata': row[6],
-                'bookshelf_name': row[7],
-                'bookshelf_slug': row[8],
-                'bookshelf_privacy': row[9],
-                'book_title': row[10],
-                'book_author': row[11],
-                'book_cover_url': row[12],
-                'user_profile': profiles.get(row[1], {
+                'id': row['id'],
+                'user_did': row['user_did'],
+                'activity_type': row['activity_type'],
+                'bookshelf_id': row['bookshelf_id'],
+                'book_id': row['book_id'],
+                'created_at': row['created_at'],
+                'metadata': row['metadata'],
+                'bookshelf_name': row['bookshelf_name'],
+                'bookshelf_slug': row['bookshelf_slug'],
+                'bookshelf_privacy': row['bookshelf_privacy'],
+                'book_title': row['book_title'],
+                'book_author': row['book_author'],
+                'book_cover_url': row['book_cover_url'],
+                'user_profile': profiles.get(row['user_did'], {
                     'handle': 'unknown',
                     'display_name': 'Unknown User',
                     'avatar_url': ''
@@ -1160,57 +1549,27 @@ def get_network_activity(auth_data: dict, db_tables, bluesky_auth, limit: int =
             }
             activities.append(activity_data)
         
-        return activities
+        return page.with_items(activities)
         
     except Exception as e:
         print(f"Error getting network activity: {e}")
-        return []
+        return CursorPage()
 
-def get_network_activity_count(auth_data: dict, db_tables, bluesky_auth, activity_type: str = "all", date_filter: str = "all"):
+def get_network_activity_count(auth_data: dict, db_tables, bluesky_auth, activity_type: str = "all", date_filter: str = "all", use_inbox: bool = True):
     """Get total count of network activities for pagination."""
     try:
-        # Get list of users the current user follows
-        following_dids = bluesky_auth.get_following_list(auth_data, limit=100)
-        
-        if not following_dids:
-            return 0
-        
+        _ensure_follow_graph(auth_data, db_tables, bluesky_auth)
         current_user_did = auth_data.get('did')
-        
-        # Build count query with permission-aware privacy filtering
-        placeholders = ','.join(['?' for _ in following_dids])
-        query = f"""
-            SELECT COUNT(*)
-            FROM activity a
-            LEFT JOIN bookshelf b ON a.bookshelf_id = b.id
-            LEFT JOIN permission p ON b.id = p.bookshelf_id AND p.user_did = ? AND p.status = 'active'
-            WHERE a.user_did IN ({placeholders})
-            AND (
-                b.privacy = 'public' 
-                OR b.privacy = 'link-only'
-                OR (b.privacy = 'private' AND b.owner_did = ?)
-                OR (b.privacy = 'private' AND p.user_did IS NOT NULL)
+        boundary = _inbox_boundary(current_user_did, db_tables) if use_inbox else None
+        from_sql, params, _ = _network_activity_from_sql(current_user_did, activity_type, date_filter, boundary=boundary)
+        total = _listing_total(db_tables, from_sql, params)
+        if boundary is not None:
+            # The inbox holds the rows from its oldest one up
+            from_sql, params, _ = _network_activity_from_sql(
+                current_user_did, activity_type, date_filter, use_inbox=True, boundary=boundary
             )
-        """
-        
-        params = [current_user_did] + following_dids + [current_user_did]
-        
-        # Add activity type filter
-        if activity_type != "all":
-            query += " AND a.activity_type = ?"
-            params.append(activity_type)
-        
-        # Add date filter
-        if date_filter != "all":
-            if date_filter == "1d":
-                query += " AND a.created_at >= datetime('now', '-1 day')"
-            elif date_filter == "7d":
-                query += " AND a.created_at >= datetime('now', '-7 days')"
-            elif date_filter == "30d":
-                query += " AND a.created_at >= datetime('now', '-30 days')"
-        
-        cursor = db_tables['db'].execute(query, params)
-        return cursor.fetchone()[0]
+            total += _listing_total(db_tables, from_sql, params)
+        return total
         
     except Exception as e:
         print(f"Error getting network activity count: {e}")
@@ -1223,20 +1582,40 @@ def get_shelf_by_slug(slug: str, db_tables):
     except IndexError:
         return None
 
+# shelf_version row bumped on a write to any shelf (see triggers/shelf_version.sql)
+ALL_SHELVES_VERSION_ID = 0
+
+def get_shelf_version(bookshelf_id: int, db_tables) -> int:
+    """Content version of a shelf, bumped by triggers on every write its page shows (0 if never written)."""
+    rows = safe_execute_query(db_tables['db'], "SELECT version FROM shelf_version WHERE bookshelf_id = ?", (bookshelf_id,))
+    return rows[0]['version'] if rows else 0
+
 def get_book_count_for_shelf(bookshelf_id: int, db_tables) -> int:
     """Get the total number of books on a specific bookshelf."""
     try:
         # Use a more efficient count query
-        query = "SELECT COUNT(*) FROM book WHERE bookshelf_id = ?"
-        cursor = db_tables['db'].execute(query, (bookshelf_id,))
-        return cursor.fetchone()[0]
+        query = "SELECT COUNT(*) AS total FROM book WHERE bookshelf_id = ?"
+        rows = safe_execute_query(db_tables['db'], query, (bookshelf_id,))
+        return rows[0]['total'] if rows else 0
     except Exception as e:
         print(f"Error getting book count for shelf {bookshelf_id}: {e}")
         return 0
 
-def get_public_shelves(db_tables, limit: int = 20, offset: int = 0):
-    """Fetch a paginated list of public bookshelves."""
-    return db_tables['bookshelves'](where="privacy='public'", limit=limit, offset=offset, order_by='created_at DESC')
+def get_public_shelves(db_tables, limit: int = 20, offset: int = 0, cursor: str = None):
+    """Fetch a page of public bookshelves, newest first.
+
+    Returns:
+        CursorPage of ShelfRow objects
+    """
+    try:
+        return paged_query(
+            db_tables, "bs.*", "FROM bookshelf bs WHERE bs.privacy = 'public'", [],
+            _shelf_sort_keys("created_at"), limit, cursor=cursor, offset=offset,
+            row_factory=object_rows(ShelfRow)
+        )
+    except Exception as e:
+        logger.error(f"Error getting public shelves: {e}")
+        return CursorPage()
 
 
 def get_public_shelves_count(db_tables, include_empty: bool = False) -> int:
@@ -1249,15 +1628,14 @@ def get_public_shelves_count(db_tables, include_empty: bool = False) -> int:
     try:
         if include_empty:
             query = "SELECT COUNT(*) as total FROM bookshelf WHERE privacy = 'public'"
-            rows = safe_execute_query(db_tables['db'], query, ())
         else:
             query = """
-                SELECT COUNT(DISTINCT bs.id) as total 
+                SELECT COUNT(*) as total
                 FROM bookshelf bs
-                JOIN book b ON bs.id = b.bookshelf_id
-                WHERE bs.privacy = 'public'
+                JOIN shelf_stats ss ON ss.bookshelf_id = bs.id
+                WHERE bs.privacy = 'public' AND ss.book_count > 0
             """
-            rows = safe_execute_query(db_tables['db'], query, ())
+        rows = safe_execute_query(db_tables['db'], query, ())
         
         if rows:
             return rows[0].get('total', 0)
@@ -1267,50 +1645,21 @@ def get_public_shelves_count(db_tables, include_empty: bool = False) -> int:
         return 0
 
 
-def search_shelves_count(db_tables, query: str = "", book_title: str = "", book_author: str = "", book_isbn: str = "", privacy: str = "public", open_to_contributions: bool = None, include_empty: bool = False) -> int:
+def search_shelves_count(db_tables, query: str = "", book_title: str = "", book_author: str = "", book_isbn: str = "", privacy: str = "public", open_to_contributions: bool = None, include_empty: bool = False, search_mode: str = "fts") -> int:
     """Get total count of search results for pagination."""
     try:
-        # Base count query
-        sql_query = """
-            SELECT COUNT(DISTINCT bs.id) as total
+        with_clause, join_clause, conditions, params = _shelf_search_clauses(
+            query, book_title, book_author, book_isbn, privacy, open_to_contributions, include_empty, search_mode,
+            ranked=False
+        )
+        sql_query = f"""
+            {with_clause}
+            SELECT COUNT(*) as total
             FROM bookshelf bs
+            {join_clause}
             JOIN user u ON bs.owner_did = u.did
-            LEFT JOIN book b ON bs.id = b.bookshelf_id
+            LEFT JOIN shelf_stats ss ON ss.bookshelf_id = bs.id
         """
-        
-        conditions = []
-        params = []
-        
-        # General text search
-        if query:
-            conditions.append("(bs.name LIKE ? OR bs.description LIKE ? OR b.title LIKE ? OR b.author LIKE ?)")
-            params.extend([f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%"])
-        
-        # Advanced book search
-        if book_title:
-            conditions.append("b.title LIKE ?")
-            params.append(f"%{book_title}%")
-        if book_author:
-            conditions.append("b.author LIKE ?")
-            params.append(f"%{book_author}%")
-        if book_isbn:
-            conditions.append("b.isbn = ?")
-            params.append(book_isbn)
-        
-        # Privacy filter
-        if privacy != "all":
-            conditions.append("bs.privacy = ?")
-            params.append(privacy)
-        
-        # Open to contributions filter
-        if open_to_contributions is not None:
-            conditions.append("bs.self_join = ?")
-            params.append(1 if open_to_contributions else 0)
-        
-        # Exclude empty shelves unless include_empty is True
-        if not include_empty:
-            conditions.append("b.id IS NOT NULL")
-        
         if conditions:
             sql_query += " WHERE " + " AND ".join(conditions)
         
@@ -1348,122 +1697,473 @@ def get_user_shelves_count(user_did: str, db_tables) -> int:
 
 
 @track_query_func('get_user_shelves', 'select')
-def get_user_shelves(user_did: str, db_tables, limit: int = 20, offset: int = 0):
-    """Fetch a paginated list of a user's bookshelves (owned + member shelves)."""
+def get_user_shelves(user_did: str, db_tables, limit: int = 20, offset: int = 0, cursor: str = None, with_total: bool = False):
+    """Fetch a page of a user's bookshelves (owned + member shelves), most recently updated first.
+
+    Returns:
+        CursorPage of ShelfRow objects with user_relationship set; with_total
+        also sets its total (see paged_query)
+    """
     try:
         # Use raw SQL to combine owned shelves and shelves with active permissions
-        query = """
-            SELECT DISTINCT b.*, 'owner' as user_relationship
-            FROM bookshelf b
-            WHERE b.owner_did = ?
-            UNION
-            SELECT DISTINCT b.*, p.role as user_relationship
-            FROM bookshelf b
-            JOIN permission p ON b.id = p.bookshelf_id
-            WHERE p.user_did = ? AND p.status = 'active'
-            ORDER BY updated_at DESC
-            LIMIT ? OFFSET ?
+        from_sql = """
+            FROM (
+                SELECT DISTINCT b.*, 'owner' as user_relationship
+                FROM bookshelf b
+                WHERE b.owner_did = ?
+                UNION
+                SELECT DISTINCT b.*, p.role as user_relationship
+                FROM bookshelf b
+                JOIN permission p ON b.id = p.bookshelf_id
+                WHERE p.user_did = ? AND p.status = 'active'
+            )
         """
+        sort_keys = [("COALESCE(updated_at, '')", "DESC"), ("id", "DESC")]
 
-        # Use safe_execute_query to handle cursor invalidation from concurrent requests
-        rows = safe_execute_query(db_tables['db'], query, (user_did, user_did, limit, offset))
-
-        # Convert raw results back to Bookshelf objects
-        shelves = []
-        for shelf_data in rows:
-            # Extract the user_relationship before creating Bookshelf object
-            user_relationship = shelf_data.pop('user_relationship', 'owner')
-            shelf = Bookshelf(**{k: v for k, v in shelf_data.items() if k in Bookshelf.__annotations__})
-            # Add the relationship info as an attribute
-            shelf.user_relationship = user_relationship
-            shelves.append(shelf)
-
-        return shelves
+        return paged_query(
+            db_tables, "*", from_sql, [user_did, user_did], sort_keys, limit, cursor=cursor, offset=offset,
+            with_total=with_total, row_factory=object_rows(ShelfRow)
+        )
 
     except Exception as e:
         logger.error(f"Error getting user shelves for {user_did}: {e}")
         # Fallback to just owned shelves if there's an error
-        return db_tables['bookshelves']("owner_did=?", (user_did,), limit=limit, offset=offset, order_by='updated_at DESC')
+        return CursorPage(db_tables['bookshelves']("owner_did=?", (user_did,), limit=limit, offset=offset, order_by='updated_at DESC'))
+
+class CursorPage(list):
+    """One page of a keyset-paginated listing.
+
+    Behaves like the plain list the listing functions used to return, with
+    next_cursor/prev_cursor set when there is a page after/before this one and
+    total set when the listing was asked for its size (see paged_query).
+    """
+
+    def __init__(self, items=(), next_cursor: str = None, prev_cursor: str = None, total: Optional[int] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    def with_items(self, items) -> "CursorPage":
+        """The same page position and total holding different items (e.g. rows mapped to models)."""
+        return CursorPage(items, self.next_cursor, self.prev_cursor, self.total)
+
+
+def encode_cursor(values: list, direction: str = "next") -> str:
+    """Encode a sort key and paging direction ("next" or "prev") as an opaque token."""
+    import base64
+    payload = json.dumps({"k": list(values), "d": direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> tuple[Optional[list], str]:
+    """Decode a cursor token, returning (None, "next") for a missing or malformed token."""
+    import base64
+    if not token:
+        return None, "next"
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        values, direction = payload["k"], payload.get("d", "next")
+        if not isinstance(values, list) or direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return values, direction
+    except Exception:
+        logger.warning(f"Ignoring malformed pagination cursor: {token[:40]}")
+        return None, "next"
+
+
+def _keyset_order(sort_keys: list[tuple[str, str]], reverse: bool = False) -> str:
+    """ORDER BY terms for sort_keys, optionally with every direction flipped."""
+    flip = {"ASC": "DESC", "DESC": "ASC"}
+    return ", ".join(f"{expr} {flip[order] if reverse else order}" for expr, order in sort_keys)
+
+
+def _keyset_condition(sort_keys: list[tuple[str, str]], values: list, direction: str = "next") -> tuple[str, list]:
+    """WHERE condition selecting rows after (or before) values in sort_keys order.
+
+    Expanded as (k0 > v0) OR (k0 = v0 AND k1 > v1) OR ... so mixed ASC/DESC
+    keys work; ">" becomes "<" for DESC keys and for direction "prev".
+    """
+    clauses, params = [], []
+    for i, (expr, order) in enumerate(sort_keys):
+        after = (order == "ASC") == (direction == "next")
+        terms = [f"{prev_expr} = ?" for prev_expr, _ in sort_keys[:i]]
+        terms.append(f"{expr} {'>' if after else '<'} ?")
+        clauses.append("(" + " AND ".join(terms) + ")")
+        params.extend(values[:i + 1])
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+# Totals of at least this many rows are cached for PAGED_TOTAL_TTL seconds and
+# reused by later pages, so deep listings don't recount on every request.
+PAGED_TOTAL_CACHE_MIN_ROWS = 1000
+PAGED_TOTAL_TTL = 60
+_paged_totals: dict[tuple, tuple[int, float]] = {}
+
+
+def _cached_total(key: tuple) -> Optional[int]:
+    """An approximate total stored by paged_query for this listing, if still fresh."""
+    import time
+    cached = _paged_totals.get(key)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    return None
+
+
+def _cache_total(key: tuple, total: int):
+    import time
+    if total < PAGED_TOTAL_CACHE_MIN_ROWS:
+        return
+    if len(_paged_totals) > 512:
+        _paged_totals.clear()
+    _paged_totals[key] = (total, time.monotonic() + PAGED_TOTAL_TTL)
+
+
+def _listing_total(db_tables, from_sql: str, params: list) -> int:
+    """COUNT(*) of a paged_query listing, sharing paged_query's cache of large totals."""
+    total_key = ("", from_sql, tuple(params))
+    total = _cached_total(total_key)
+    if total is None:
+        rows = safe_execute_query(db_tables['db'], f"SELECT COUNT(*) AS total {from_sql}", tuple(params))
+        total = rows[0]['total'] if rows else 0
+        _cache_total(total_key, total)
+    return total
+
+
+def paged_query(db_tables, columns: str, from_sql: str, params: list, sort_keys: list[tuple[str, str]],
+                limit: int, cursor: str = None, offset: int = 0, with_clause: str = "",
+                with_total: bool = False, row_factory=dict_rows) -> CursorPage:
+    """Run SELECT columns from_sql one keyset page at a time.
+
+    from_sql is everything after the column list (FROM, JOINs, WHERE). Rows are
+    paged in sort_keys order, whose last key must be unique (e.g. the id). A
+    cursor takes precedence over offset, which is kept for callers that still
+    page by number.
+
+    With with_total the same statement also returns the size of the whole
+    listing through a (SELECT COUNT(*) from_sql) column, so callers don't need
+    a separate count query. Large totals are cached briefly and then reported without counting.
+
+    Returns:
+        CursorPage of row dicts, or of whatever row_factory builds (see safe_execute_query)
+    """
+    values, direction = decode_cursor(cursor)
+    if values is not None and len(values) != len(sort_keys):
+        values, direction = None, "next"
+
+    total_key = (with_clause, from_sql, tuple(params))
+    total = _cached_total(total_key) if with_total else None
+    count_rows = with_total and total is None
+
+    key_columns = ", ".join(f"{expr} AS _k{i}" for i, (expr, _) in enumerate(sort_keys))
+    query_params = list(params)
+    if count_rows:
+        # Counts the listing before the keyset filter. An uncorrelated subquery runs
+        # once, and unlike COUNT(*) OVER () it lets the page be read in index order.
+        key_columns += f", (SELECT COUNT(*) {from_sql}) AS _total"
+        # params are in statement order: with_clause's, then from_sql's (now twice)
+        with_params = with_clause.count("?")
+        query_params[with_params:with_params] = params[with_params:]
+    keys = [(f"_k{i}", order) for i, (_, order) in enumerate(sort_keys)]
+    sql = f"{with_clause} SELECT * FROM (SELECT {columns}, {key_columns} {from_sql})"
+    if values is not None:
+        condition, condition_params = _keyset_condition(keys, values, direction)
+        sql += f" WHERE {condition}"
+        query_params.extend(condition_params)
+    sql += f" ORDER BY {_keyset_order(keys, reverse=direction == 'prev')} LIMIT ?"
+    query_params.append(limit + 1)
+    if values is None and offset:
+        sql += " OFFSET ?"
+        query_params.append(offset)
+
+    columns, rows = safe_execute_query(db_tables['db'], sql, tuple(query_params), row_factory=tuple_rows) or ((), [])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == "prev":
+        rows.reverse()
+    if count_rows:
+        if rows:
+            total = rows[0][-1]
+        elif values is None and not offset:
+            total = 0
+        else:
+            # A page past the end carries no total column; count the same listing on its own
+            count = safe_execute_query(db_tables['db'], f"{with_clause} SELECT COUNT(*) AS total {from_sql}", tuple(params))
+            total = count[0]['total'] if count else None
+        if total is not None:
+            _cache_total(total_key, total)
+    if not rows:
+        return CursorPage(total=total)
+
+    # The sort keys (and total) are the trailing columns; the rest make the items
+    width = len(columns) - len(sort_keys) - count_rows
+    first_key = list(rows[0][width:width + len(sort_keys)])
+    last_key = list(rows[-1][width:width + len(sort_keys)])
+    rows = row_factory(columns[:width], (row[:width] for row in rows))
+
+    # Going forward there is a next page if we over-fetched; going back there
+    # always is (we came from it), and there is a previous page if we over-fetched.
+    has_next = has_more if direction == "next" else True
+    has_prev = (values is not None or offset > 0) if direction == "next" else has_more
+    return CursorPage(rows,
+                      encode_cursor(last_key, "next") if has_next else None,
+                      encode_cursor(first_key, "prev") if has_prev else None,
+                      total)
+
+
+# Shelf columns plus owner profile and shelf_stats, selected by every shelf listing.
+# Use with: FROM bookshelf bs LEFT JOIN user u ... LEFT JOIN shelf_stats ss ...
+SHELF_LISTING_COLUMNS = """
+    bs.*,
+    u.handle AS owner_handle,
+    u.display_name AS owner_name,
+    u.avatar_url AS owner_avatar_url,
+    COALESCE(ss.book_count, 0) AS book_count,
+    COALESCE(ss.contributor_count, 0) AS contributor_count,
+    COALESCE(ss.member_count, 0) AS member_count,
+    COALESCE(ss.recent_book_count, 0) AS recent_book_count,
+    COALESCE(ss.recent_covers, '[]') AS recent_covers,
+    COALESCE(ss.activity_score, 0) AS activity_score,
+    ss.last_book_added_at
+"""
+
+# Keyset sort keys for search_shelves sort options; every listing breaks ties on bs.id
+SHELF_SORT_KEYS = {
+    "updated_at": [("COALESCE(bs.updated_at, '')", "DESC")],
+    "created_at": [("COALESCE(bs.created_at, '')", "DESC")],
+    "name": [("bs.name", "ASC")],
+    "book_count": [("COALESCE(ss.book_count, 0)", "DESC")],
+    "recently_active": [("COALESCE(ss.recent_book_count, 0)", "DESC"), ("COALESCE(ss.last_book_added_at, '')", "DESC")],
+    "most_contributors": [("COALESCE(ss.contributor_count, 0)", "DESC")],
+    "most_viewers": [("COALESCE(ss.member_count, 0)", "DESC")],
+    "smart_mix": [("COALESCE(ss.activity_score, 0)", "DESC")],
+    "relevance": [("sh.rank", "ASC")],
+}
+
+
+def _shelf_sort_keys(sort_by: str) -> list[tuple[str, str]]:
+    """Keyset sort keys for a sort option, ending with the bs.id tiebreaker."""
+    return SHELF_SORT_KEYS.get(sort_by, SHELF_SORT_KEYS["updated_at"]) + [("bs.id", "DESC")]
+
+
+_listing_row_objects = object_rows(ShelfListingRow)
+
+
+def _shelf_listing_rows(columns: tuple, cursor) -> list:
+    """Row factory for SHELF_LISTING_COLUMNS queries: ShelfListingRow objects with recent_covers parsed."""
+    shelves = _listing_row_objects(columns, cursor)
+    for shelf in shelves:
+        shelf.recent_covers = json.loads(shelf.recent_covers or '[]')
+    return shelves
+
+
+def refresh_shelf_stats(db_tables, bookshelf_id: int = None) -> int:
+    """Recompute shelf_stats for one shelf, or every shelf when bookshelf_id is None.
+
+    Writes keep shelf_stats current through triggers; this is only needed to let
+    the time-based parts (30-day additions, new-shelf boost) decay.
+
+    Returns:
+        Number of shelves refreshed
+    """
+    query = """
+        INSERT OR REPLACE INTO shelf_stats (
+            bookshelf_id, book_count, contributor_count, member_count, last_book_added_at,
+            recent_covers, recent_book_count, activity_score, updated_at
+        )
+        SELECT bookshelf_id, book_count, contributor_count, member_count, last_book_added_at,
+               recent_covers, recent_book_count, activity_score, CURRENT_TIMESTAMP
+        FROM shelf_stats_live
+    """
+    try:
+        db = db_tables['db']
+        if bookshelf_id is None:
+            db.execute(query)
+        else:
+            db.execute(query + " WHERE bookshelf_id = ?", (bookshelf_id,))
+        return db.conn.changes()
+    except Exception as e:
+        logger.error(f"Error refreshing shelf stats: {e}")
+        return 0
+
+
+def rebuild_works(db_tables) -> int:
+    """Reassign every book to its work and recompute shelf_work from scratch.
+
+    Triggers keep book_work and shelf_work current; this is a recovery tool for
+    databases written to while the triggers were missing.
+
+    Returns:
+        Number of (shelf, work) rows written
+    """
+    try:
+        db = db_tables['db']
+        db.execute("""
+            INSERT OR IGNORE INTO work (work_key, title, author, isbn13)
+            SELECT work_key, title, author, isbn13 FROM book_work_key ORDER BY added_at, book_id
+        """)
+        db.execute("DELETE FROM book_work")
+        db.execute("DELETE FROM shelf_work")
+        db.execute("""
+            INSERT INTO book_work (book_id, work_id, bookshelf_id, added_by_did, added_at)
+            SELECT k.book_id, w.id, k.bookshelf_id, k.added_by_did, k.added_at
+            FROM book_work_key k JOIN work w ON w.work_key = k.work_key
+        """)
+        # The book_work insert trigger already filled shelf_work; rewrite it in one pass
+        # so this also works with the triggers missing.
+        db.execute("""
+            INSERT OR REPLACE INTO shelf_work (bookshelf_id, work_id, vote_count, first_book_id, first_added_by_did, first_added_at)
+            SELECT bookshelf_id, work_id, vote_count, first_book_id, first_added_by_did, first_added_at
+            FROM shelf_work_live
+        """)
+        return db.conn.changes()
+    except Exception as e:
+        logger.error(f"Error rebuilding works: {e}")
+        return 0
+
+
+def rebuild_search_index(db_tables) -> bool:
+    """Rebuild the bookshelf_fts and book_fts indexes from their content tables.
+
+    Triggers keep the indexes in sync; this is a recovery tool for databases
+    written to while the triggers were missing.
+    """
+    try:
+        db_tables['db'].execute("INSERT INTO bookshelf_fts(bookshelf_fts) VALUES('rebuild')")
+        db_tables['db'].execute("INSERT INTO book_fts(book_fts) VALUES('rebuild')")
+        return True
+    except Exception as e:
+        logger.error(f"Error rebuilding search index: {e}")
+        return False
+
 
 @track_query_func('get_public_shelves_with_stats', 'select')
-def get_public_shelves_with_stats(db_tables, limit: int = 20, offset: int = 0, include_empty: bool = False):
+def get_public_shelves_with_stats(db_tables, limit: int = 20, offset: int = 0, include_empty: bool = False, cursor: str = None, with_total: bool = False):
     """Get public shelves with book counts and recent book covers for display.
     
     Args:
         db_tables: Database tables
         limit: Maximum number of shelves to return
-        offset: Offset for pagination
+        offset: Offset for pagination (ignored when cursor is given)
         include_empty: If False (default), filter out shelves with 0 books
-    """
-    # Get more shelves than requested to account for filtering out empty ones
-    fetch_limit = limit * 2 if not include_empty else limit
-    public_shelves = get_public_shelves(db_tables, limit=fetch_limit, offset=offset)
-    
-    shelves_with_stats = []
-    for shelf in public_shelves:
-        # Get total book count for the shelf
-        shelf.book_count = len(db_tables['books']("bookshelf_id=?", (shelf.id,)))
-        
-        # Skip empty shelves unless include_empty is True
-        if not include_empty and shelf.book_count == 0:
-            continue
-        
-        # Get up to 4 recent book covers
-        recent_books = db_tables['books'](
-            "bookshelf_id=?", (shelf.id,), 
-            limit=4, 
-            order_by='added_at DESC'
-        )
-        shelf.recent_covers = [book.cover_url for book in recent_books if book.cover_url]
-        
-        # Get owner's profile
-        try:
-            shelf.owner = db_tables['users'][shelf.owner_did]
-        except IndexError:
-            shelf.owner = None
-        
-        shelves_with_stats.append(shelf)
-        
-        # Stop once we have enough shelves
-        if len(shelves_with_stats) >= limit:
-            break
-            
-    return shelves_with_stats
+        cursor: Keyset cursor from a previous page
+        with_total: Also set the page's total (see paged_query)
 
-def search_shelves(db_tables, query: str = "", book_title: str = "", book_author: str = "", book_isbn: str = "", user_did: str = None, privacy: str = "public", sort_by: str = "updated_at", limit: int = 20, offset: int = 0, open_to_contributions: bool = None, include_empty: bool = False):
-    """Search for bookshelves based on various criteria, including contained books.
-    
-    Args:
-        include_empty: If False (default), filter out shelves with 0 books
+    Returns:
+        CursorPage of ShelfListingRow objects, newest first
     """
-    # Base query with proper book count aggregation
-    sql_query = """
-        SELECT bs.*, u.display_name as owner_name, u.handle as owner_handle,
-               COUNT(DISTINCT b.id) as book_count
+    from_sql = """
         FROM bookshelf bs
-        JOIN user u ON bs.owner_did = u.did
-        LEFT JOIN book b ON bs.id = b.bookshelf_id
+        LEFT JOIN user u ON u.did = bs.owner_did
+        LEFT JOIN shelf_stats ss ON ss.bookshelf_id = bs.id
+        WHERE bs.privacy = 'public'
     """
+    if not include_empty:
+        from_sql += " AND ss.book_count > 0"
     
-    # Conditions and parameters
+    try:
+        return paged_query(
+            db_tables, SHELF_LISTING_COLUMNS, from_sql, [], _shelf_sort_keys("created_at"),
+            limit, cursor=cursor, offset=offset, with_total=with_total, row_factory=_shelf_listing_rows
+        )
+    except Exception as e:
+        logger.error(f"Error getting public shelves with stats: {e}")
+        return CursorPage()
+
+def build_fts_query(text: str, column: str = None) -> str:
+    """Turn free text into an FTS5 MATCH expression with prefix matching on every word.
+
+    Each word becomes a quoted prefix term ("harr"* "pott"*), so FTS5 operators
+    typed by users are treated as plain text. Returns "" when there is nothing
+    searchable in the text.
+    """
+    terms = re.findall(r'\w+', text.lower())
+    if not terms:
+        return ""
+    expression = " ".join(f'"{term}"*' for term in terms)
+    return f"{column} : ({expression})" if column else expression
+
+
+# Ranks every shelf matching the search text by its best bm25 score, either from
+# its own name/description or from one of its books. Lower ranks are better.
+SHELF_SEARCH_HITS_CTE = """
+    search_hits AS (
+        SELECT bookshelf_id, MIN(rank) AS rank FROM (
+            SELECT rowid AS bookshelf_id, bm25(bookshelf_fts, 10.0, 2.0) AS rank
+            FROM bookshelf_fts WHERE bookshelf_fts MATCH ?
+            UNION ALL
+            SELECT b.bookshelf_id, bm25(book_fts, 5.0, 3.0) AS rank
+            FROM book_fts JOIN book b ON b.id = book_fts.rowid
+            WHERE book_fts MATCH ?
+        )
+        GROUP BY bookshelf_id
+    )
+"""
+
+
+def _shelf_search_clauses(query: str = "", book_title: str = "", book_author: str = "", book_isbn: str = "", privacy: str = "public", open_to_contributions: bool = None, include_empty: bool = False, search_mode: str = "fts", ranked: bool = True):
+    """Build the pieces shared by search_shelves and search_shelves_count.
+
+    Args:
+        ranked: Join the bm25-ranked search_hits CTE (needed for relevance
+            ordering); counts pass False and use a cheaper membership test.
+
+    Returns:
+        (with_clause, join_clause, conditions, params) - params are in statement order
+    """
+    with_clause = ""
+    join_clause = ""
     conditions = []
     params = []
     
+    fts_query = build_fts_query(query) if (query and search_mode == "fts") else ""
+    book_fts_query = ""
+    if search_mode == "fts":
+        column_queries = [q for q in (build_fts_query(book_title, "title") if book_title else "",
+                                      build_fts_query(book_author, "author") if book_author else "") if q]
+        book_fts_query = " AND ".join(column_queries)
+    
     # General text search (shelves and books)
-    if query:
-        conditions.append("(bs.name LIKE ? OR bs.description LIKE ? OR b.title LIKE ? OR b.author LIKE ?)")
+    if fts_query and ranked:
+        with_clause = "WITH " + SHELF_SEARCH_HITS_CTE
+        join_clause = "JOIN search_hits sh ON sh.bookshelf_id = bs.id"
+        params.extend([fts_query, fts_query])
+    elif fts_query:
+        conditions.append("""bs.id IN (
+            SELECT rowid FROM bookshelf_fts WHERE bookshelf_fts MATCH ?
+            UNION
+            SELECT b.bookshelf_id FROM book_fts JOIN book b ON b.id = book_fts.rowid WHERE book_fts MATCH ?
+        )""")
+        params.extend([fts_query, fts_query])
+    elif query:
+        conditions.append("""(bs.name LIKE ? OR bs.description LIKE ? OR EXISTS (
+            SELECT 1 FROM book b WHERE b.bookshelf_id = bs.id AND (b.title LIKE ? OR b.author LIKE ?)
+        ))""")
         params.extend([f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%"])
-        
-    # Advanced book search
-    if book_title:
-        conditions.append("b.title LIKE ?")
-        params.append(f"%{book_title}%")
-    if book_author:
-        conditions.append("b.author LIKE ?")
-        params.append(f"%{book_author}%")
-    if book_isbn:
-        conditions.append("b.isbn = ?")
-        params.append(book_isbn)
+    
+    # Advanced book search - a single book must match every given field
+    if book_fts_query:
+        isbn_condition = " AND b.isbn = ?" if book_isbn else ""
+        conditions.append(f"""bs.id IN (
+            SELECT b.bookshelf_id FROM book_fts JOIN book b ON b.id = book_fts.rowid
+            WHERE book_fts MATCH ?{isbn_condition}
+        )""")
+        params.append(book_fts_query)
+        if book_isbn:
+            params.append(book_isbn)
+    else:
+        book_conditions = []
+        if book_title:
+            book_conditions.append("b.title LIKE ?")
+            params.append(f"%{book_title}%")
+        if book_author:
+            book_conditions.append("b.author LIKE ?")
+            params.append(f"%{book_author}%")
+        if book_isbn:
+            book_conditions.append("b.isbn = ?")
+            params.append(book_isbn)
+        if book_conditions:
+            conditions.append(f"EXISTS (SELECT 1 FROM book b WHERE b.bookshelf_id = bs.id AND {' AND '.join(book_conditions)})")
     
     # Privacy filter
     if privacy != "all":
@@ -1475,273 +2175,284 @@ def search_shelves(db_tables, query: str = "", book_title: str = "", book_author
         conditions.append("bs.self_join = ?")
         params.append(1 if open_to_contributions else 0)
     
-    # Build WHERE clause
-    if conditions:
-        sql_query += " WHERE " + " AND ".join(conditions)
+    # Exclude empty shelves unless include_empty is True
+    if not include_empty:
+        conditions.append("ss.book_count > 0")
     
-    # Group by bookshelf to aggregate book counts
-    sql_query += " GROUP BY bs.id, u.display_name, u.handle"
+    return with_clause, join_clause, conditions, params
+
+
+def search_shelves(db_tables, query: str = "", book_title: str = "", book_author: str = "", book_isbn: str = "", user_did: str = None, privacy: str = "public", sort_by: str = "updated_at", limit: int = 20, offset: int = 0, open_to_contributions: bool = None, include_empty: bool = False, search_mode: str = "fts", cursor: str = None, with_total: bool = False):
+    """Search for bookshelves based on various criteria, including contained books.
+    
+    Args:
+        sort_by: One of the SHELF_SORT_KEYS keys; activity-based sorts read shelf_stats
+            and "relevance" orders full-text matches by bm25
+        include_empty: If False (default), filter out shelves with 0 books
+        search_mode: "fts" (default) matches words and prefixes through the FTS5
+            indexes; "like" uses substring matching
+        cursor: Keyset cursor from a previous page's next_cursor/prev_cursor;
+            takes precedence over offset
+        with_total: Also set the page's total number of matches (see paged_query)
+
+    Returns:
+        CursorPage of ShelfListingRow objects
+    """
+    with_clause, join_clause, conditions, params = _shelf_search_clauses(
+        query, book_title, book_author, book_isbn, privacy, open_to_contributions, include_empty, search_mode
+    )
     
-    # Sorting
-    if sort_by == "updated_at":
-        sql_query += " ORDER BY bs.updated_at DESC"
-    elif sort_by == "created_at":
-        sql_query += " ORDER BY bs.created_at DESC"
-    elif sort_by == "name":
-        sql_query += " ORDER BY bs.name ASC"
-    elif sort_by == "book_count":
-        sql_query += " ORDER BY book_count DESC"
+    from_sql = f"""
+        FROM bookshelf bs
+        {join_clause}
+        JOIN user u ON bs.owner_did = u.did
+        LEFT JOIN shelf_stats ss ON ss.bookshelf_id = bs.id
+    """
+    if conditions:
+        from_sql += " WHERE " + " AND ".join(conditions)
     
-    # Pagination
-    sql_query += " LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
+    if sort_by == "relevance" and not join_clause:
+        sort_by = "updated_at"
     
     try:
-        # Use safe_execute_query to handle cursor invalidation from concurrent requests
-        rows = safe_execute_query(db_tables['db'], sql_query, tuple(params))
-
-        shelves = []
-        for shelf_data in rows:
-            # Extract book_count before creating Bookshelf object
-            book_count = shelf_data.pop('book_count', 0)
-            shelf = Bookshelf(**{k: v for k, v in shelf_data.items() if k in Bookshelf.__annotations__})
-            shelf.owner_name = shelf_data.get('owner_name')
-            shelf.owner_handle = shelf_data.get('owner_handle')
-            shelf.book_count = book_count
-            shelves.append(shelf)
-
-        # Add book covers and owner info for each shelf (same as get_public_shelves_with_stats)
-        for shelf in shelves:
-            # Get up to 4 recent book covers
-            recent_books = db_tables['books'](
-                "bookshelf_id=?", (shelf.id,),
-                limit=4,
-                order_by='added_at DESC'
-            )
-            shelf.recent_covers = [book.cover_url for book in recent_books if book.cover_url]
-
-            # Get owner's profile
-            try:
-                shelf.owner = db_tables['users'][shelf.owner_did]
-            except IndexError:
-                shelf.owner = None
-
-        return shelves
+        return paged_query(
+            db_tables, SHELF_LISTING_COLUMNS, from_sql, params, _shelf_sort_keys(sort_by),
+            limit, cursor=cursor, offset=offset, with_clause=with_clause, with_total=with_total,
+            row_factory=_shelf_listing_rows
+        )
     except Exception as e:
         logger.error(f"Error searching shelves: {e}")
-        return []
+        return CursorPage()
 
 def get_recent_community_books(db_tables, limit: int = 15):
-    """Fetch the most recently added books from public bookshelves."""
+    """Fetch the most recently added books from public bookshelves, as BookRow objects."""
     query = """
         SELECT b.*, bs.name as bookshelf_name, bs.slug as bookshelf_slug
         FROM book b
-        JOIN bookshelf bs ON b.bookshelf_id = bs.id
+        -- CROSS JOIN keeps book as the outer loop: walking idx_book_added newest
+        -- first stops after limit public books instead of sorting every public book
+        CROSS JOIN bookshelf bs ON b.bookshelf_id = bs.id
         WHERE bs.privacy = 'public'
         ORDER BY b.added_at DESC
         LIMIT ?
     """
 
     try:
-        # Use safe_execute_query to handle cursor invalidation from concurrent requests
-        rows = safe_execute_query(db_tables['db'], query, (limit,))
-
-        # Manually map results to Book objects since it's a raw query
-        books = []
-        for book_data in rows:
-            book = Book(**{k: v for k, v in book_data.items() if k in Book.__annotations__})
-            book.bookshelf_name = book_data.get('bookshelf_name')
-            book.bookshelf_slug = book_data.get('bookshelf_slug')
-            books.append(book)
-        return books
+        return safe_execute_query(db_tables['db'], query, (limit,), row_factory=object_rows(BookRow))
     except Exception as e:
         logger.error(f"Error fetching recent community books: {e}")
         return []
 
 def calculate_shelf_activity_score(shelf_id: int, db_tables) -> float:
-    """Calculate an activity score for a bookshelf based on various metrics."""
+    """Calculate an activity score for a bookshelf based on various metrics.
+
+    The weighting lives in the shelf_stats_live view (see migration 0012) so the
+    same score is stored in shelf_stats and used to rank explore listings.
+    """
     try:
-        from datetime import datetime, timedelta, timezone as tz
-        
-        # Get shelf info
-        shelf = db_tables['bookshelves'][shelf_id]
-        
-        # Recent book additions (last 30 days) - weight: 40%
-        thirty_days_ago = datetime.now(tz.utc) - timedelta(days=30)
-        recent_books_query = """
-            SELECT COUNT(*) FROM book 
-            WHERE bookshelf_id = ? AND added_at >= ?
-        """
-        cursor = db_tables['db'].execute(recent_books_query, (shelf_id, thirty_days_ago.isoformat()))
-        recent_books_count = cursor.fetchone()[0]
-        
-        # Contributor count - weight: 30%
-        contributors_query = """
-            SELECT COUNT(DISTINCT user_did) FROM permission 
-            WHERE bookshelf_id = ? AND status = 'active' AND role IN ('contributor', 'moderator')
-        """
-        cursor = db_tables['db'].execute(contributors_query, (shelf_id,))
-        contributor_count = cursor.fetchone()[0]
-        
-        # Total engagement (book records) - weight: 20%
-        # Count total book records as engagement metric
-        books_query = """
-            SELECT COUNT(*) FROM book 
-            WHERE bookshelf_id = ?
-        """
-        cursor = db_tables['db'].execute(books_query, (shelf_id,))
-        total_books = cursor.fetchone()[0]
-        
-        # Shelf age boost (newer shelves get bonus) - weight: 10%
-        # Handle both datetime objects and string dates
-        if shelf.created_at:
-            if isinstance(shelf.created_at, str):
-                try:
-                    # Parse ISO format datetime string
-                    shelf_created = datetime.fromisoformat(shelf.created_at.replace('Z', '+00:00'))
-                except ValueError:
-                    # Fallback for other date formats
-                    from dateutil.parser import parse
-                    shelf_created = parse(shelf.created_at)
-            else:
-                shelf_created = shelf.created_at
-            
-            # Ensure both datetimes have consistent timezone handling
-            if shelf_created.tzinfo is not None:
-                # shelf_created is timezone-aware, make datetime.now() timezone-aware too
-                from datetime import timezone
-                current_time = datetime.now(timezone.utc)
-            else:
-                # shelf_created is timezone-naive, use naive datetime.now()
-                current_time = datetime.now()
-            
-            shelf_age_days = (current_time - shelf_created).days
-        else:
-            shelf_age_days = 365
-        age_score = max(0, 60 - shelf_age_days) / 60  # Boost for shelves < 60 days old
-        
-        # Calculate weighted score
-        activity_score = (
-            (recent_books_count * 10) * 0.4 +  # Recent activity
-            (contributor_count * 5) * 0.3 +    # Collaboration
-            (total_books * 2) * 0.2 +          # Engagement
-            (age_score * 20) * 0.1              # Recency
+        rows = safe_execute_query(
+            db_tables['db'],
+            "SELECT activity_score FROM shelf_stats_live WHERE bookshelf_id = ?",
+            (shelf_id,)
         )
-        
-        # Open collaboration bonus (+20%)
-        if getattr(shelf, 'self_join', False):
-            activity_score *= 1.2
-        
-        return activity_score
-        
+        return float(rows[0]['activity_score']) if rows else 0.0
     except Exception as e:
-        print(f"Error calculating activity score for shelf {shelf_id}: {e}")
+        logger.error(f"Error calculating activity score for shelf {shelf_id}: {e}")
         return 0.0
 
+# Smart mix (see migrations/0018-add-shelf-mix.sql): the share of positions that
+# go to the most active shelves, how many positions a session's seed shuffles
+# together, and how old the ranking may get before it is refreshed in the background.
+SHELF_MIX_ACTIVE_SHARE = 0.6
+SHELF_MIX_WINDOW = 36
+SHELF_MIX_MAX_AGE = timedelta(minutes=int(os.getenv('SHELF_MIX_MAX_AGE_MINUTES', 30)))
+
+# Requests that find the ranking stale at the same time share one refresh
+shelf_mix_refreshes = SingleFlight("shelf_mix")
+
+
+def refresh_shelf_mix(db_tables) -> int:
+    """Rank every public shelf with books into a new smart-mix generation.
+
+    One query reads the scores of all candidate shelves from shelf_stats. They
+    are merged into a single order in which SHELF_MIX_ACTIVE_SHARE of every run
+    of positions goes to the most active shelf not placed yet and the rest to
+    the newest. Generations older than the previous one are deleted.
+
+    Returns:
+        Number of shelves ranked
+    """
+    db = db_tables['db']
+    candidates = [(row['id'], row['activity_score'], row['created_at']) for row in db.q("""
+        SELECT bs.id, ss.activity_score, COALESCE(bs.created_at, '') AS created_at
+        FROM bookshelf bs
+        JOIN shelf_stats ss ON ss.bookshelf_id = bs.id
+        WHERE bs.privacy = 'public' AND ss.book_count > 0
+    """)]
+    most_active = iter(sorted(candidates, key=lambda c: (c[1], c[0]), reverse=True))
+    newest = iter(sorted(candidates, key=lambda c: (c[2], c[0]), reverse=True))
+
+    order, placed, active_placed = [], set(), 0
+    while len(order) < len(candidates):
+        active_turn = active_placed < int((len(order) + 1) * SHELF_MIX_ACTIVE_SHARE + 0.5)
+        for stream in ((most_active, newest) if active_turn else (newest, most_active)):
+            shelf = next((c for c in stream if c[0] not in placed), None)
+            if shelf:
+                active_placed += stream is most_active
+                placed.add(shelf[0])
+                order.append(shelf[0])
+                break
+
+    with db.conn:
+        generation = db.q("SELECT COALESCE(MAX(generation), 0) + 1 AS next FROM shelf_mix_generation")[0]['next']
+        db.conn.executemany(
+            "INSERT INTO shelf_mix (generation, position, bookshelf_id) VALUES (?, ?, ?)",
+            [(generation, position, shelf_id) for position, shelf_id in enumerate(order)]
+        )
+        db.execute(
+            "INSERT INTO shelf_mix_generation (generation, shelf_count, created_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            (generation, len(order))
+        )
+        db.execute("DELETE FROM shelf_mix WHERE generation < ?", (generation - 1,))
+        db.execute("DELETE FROM shelf_mix_generation WHERE generation < ?", (generation - 1,))
+    return len(order)
+
+
+def _shelf_mix_generation(db_tables, generation: int = None) -> Optional[dict]:
+    """The requested smart-mix generation if it is still stored, else the newest one (None if never ranked).
+
+    Only reads: a stale ranking is still served, and refreshed by
+    refresh_stale_shelf_mix after the response or by the scanner.
+    """
+    query = "SELECT generation, shelf_count, created_at FROM shelf_mix_generation ORDER BY generation DESC LIMIT 2"
+    rows = safe_execute_query(db_tables['db'], query)
+    for row in rows:
+        if row['generation'] == generation:
+            return row
+    return rows[0] if rows else None
+
+
+def shelf_mix_is_stale(db_tables) -> bool:
+    """Whether the smart mix has never been ranked or its newest generation is older than SHELF_MIX_MAX_AGE."""
+    mix = _shelf_mix_generation(db_tables)
+    if mix is None:
+        return True
+    created_at = datetime.fromisoformat(mix['created_at']).replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - created_at > SHELF_MIX_MAX_AGE
+
+
+def refresh_stale_shelf_mix(db_tables) -> int:
+    """Rank the smart mix again if it is stale (see shelf_mix_is_stale).
+
+    Meant to run after a response, as a BackgroundTask; threads that call it
+    while a refresh is in flight wait for that one instead of ranking again.
+
+    Returns:
+        Number of shelves ranked, 0 if the ranking was still fresh
+    """
+    return shelf_mix_refreshes.call(
+        'refresh', lambda: refresh_shelf_mix(db_tables) if shelf_mix_is_stale(db_tables) else 0
+    )
+
+
+def _shelf_mix_positions(generation: int, seed: int, offset: int, limit: int, shelf_count: int) -> list[int]:
+    """Ranking positions shown at offset..offset + limit in the session's order.
+
+    Each SHELF_MIX_WINDOW block of positions is shuffled by a generator seeded
+    with the session seed, generation and block, so the same session always
+    sees the same order and blocks never exchange shelves.
+    """
+    first_block = offset - offset % SHELF_MIX_WINDOW
+    order = []
+    for block in range(first_block, min(offset + limit, shelf_count), SHELF_MIX_WINDOW):
+        positions = list(range(block, min(block + SHELF_MIX_WINDOW, shelf_count)))
+        random.Random(f"{seed}:{generation}:{block}").shuffle(positions)
+        order.extend(positions)
+    return order[offset - first_block:offset - first_block + limit]
+
+
+def get_explore_version(db_tables) -> tuple:
+    """What the explore listings are built from: the all-shelves version and the newest stored smart-mix generation.
+
+    Two primary-key lookups in one statement, cheap enough for every
+    conditional GET; it never ranks, even when the mix is stale.
+    """
+    rows = safe_execute_query(db_tables['db'], """
+        SELECT (SELECT version FROM shelf_version WHERE bookshelf_id = ?) AS shelf_version,
+               (SELECT MAX(generation) FROM shelf_mix_generation) AS generation
+    """, (ALL_SHELVES_VERSION_ID,))
+    row = rows[0] if rows else {}
+    return row.get('shelf_version') or 0, row.get('generation') or 0
+
+
 @track_query_func('get_mixed_public_shelves', 'select')
-def get_mixed_public_shelves(db_tables, limit: int = 20, offset: int = 0):
+def get_mixed_public_shelves(db_tables, limit: int = 20, offset: int = 0, cursor: str = None, with_total: bool = False,
+                             seed: int = None):
     """Get a smart mix of new and popular/active public bookshelves.
 
-    This function properly supports pagination by fetching enough data
-    to satisfy the requested offset + limit, then applying the smart
-    mix algorithm before slicing to the requested page.
+    Pages are read from the precomputed ranking (see refresh_shelf_mix), in
+    which 60% of positions hold the most active shelves and the rest the
+    newest. seed shuffles nearby positions per session: the same seed gives the
+    same pages, so paging never repeats or skips a shelf, and any page costs one
+    primary-key lookup per shelf. The cursor records the ranking generation,
+    position and seed it was issued for. Shelves made private or emptied since
+    the last refresh are left out, so a page can come back short. Until the
+    first ranking exists the newest public shelves are listed instead.
+
+    Returns:
+        CursorPage of ShelfListingRow objects; with_total also sets its total,
+        the number of shelves in the ranking
     """
+    values, _ = decode_cursor(cursor)
+    generation = None
+    if values is not None and len(values) == 3 and all(isinstance(v, int) for v in values):
+        generation, offset, seed = values
+    seed = seed or 0
+
     try:
-        # Calculate how many shelves we need to fetch to satisfy pagination
-        # We need at least offset + limit shelves after mixing
-        total_needed = offset + limit
-        
-        # Fetch extra shelves to have enough for mixing algorithm
-        # Get 2x what we need to ensure good mixing variety
-        fetch_limit = total_needed * 2
-        
-        # Get all public shelves with basic stats (always from offset=0 for consistent mixing)
-        public_shelves = get_public_shelves_with_stats(db_tables, limit=fetch_limit, offset=0)
-        
-        # If we don't have enough shelves for the requested page, return empty
-        if len(public_shelves) <= offset:
-            return []
-        
-        # Calculate activity scores for each shelf
-        shelves_with_scores = []
-        for shelf in public_shelves:
-            activity_score = calculate_shelf_activity_score(shelf.id, db_tables)
-            shelf.activity_score = activity_score
-            shelves_with_scores.append(shelf)
-        
-        # Sort by activity score (descending)
-        shelves_with_scores.sort(key=lambda s: s.activity_score, reverse=True)
-        
-        # Get the most active shelves (top 60% of total_needed)
-        active_count = int(total_needed * 0.6)
-        active_shelves = shelves_with_scores[:active_count]
-        
-        # Get newest shelves (remaining 40% of total_needed)
-        newest_shelves = sorted(
-            [s for s in shelves_with_scores if s not in active_shelves],
-            key=lambda s: s.created_at or datetime.min,
-            reverse=True
-        )[:total_needed - active_count]
-        
-        # Combine and shuffle for variety
-        mixed_shelves = active_shelves + newest_shelves
-        import random
-        random.shuffle(mixed_shelves)
-        
-        # Apply pagination - slice to get the requested page
-        return mixed_shelves[offset:offset + limit]
-        
+        mix = _shelf_mix_generation(db_tables, generation)
+        if mix is None:
+            return get_public_shelves_with_stats(db_tables, limit=limit, offset=offset, cursor=cursor,
+                                                 with_total=with_total)
+        generation, shelf_count = mix['generation'], mix['shelf_count']
+        positions = _shelf_mix_positions(generation, seed, offset, limit, shelf_count)
+
+        shelves = []
+        if positions:
+            columns, rows = safe_execute_query(db_tables['db'], f"""
+                SELECT {SHELF_LISTING_COLUMNS}, m.position AS mix_position
+                FROM shelf_mix m
+                JOIN bookshelf bs ON bs.id = m.bookshelf_id
+                LEFT JOIN user u ON u.did = bs.owner_did
+                LEFT JOIN shelf_stats ss ON ss.bookshelf_id = bs.id
+                WHERE m.generation = ? AND m.position IN ({','.join('?' * len(positions))})
+                  AND bs.privacy = 'public' AND COALESCE(ss.book_count, 0) > 0
+            """, (generation, *positions), row_factory=tuple_rows) or ((), [])
+            by_position = {row[-1]: row[:-1] for row in rows}
+            shelves = _shelf_listing_rows(columns[:-1], [by_position[p] for p in positions if p in by_position])
+
+        next_cursor = encode_cursor([generation, offset + limit, seed]) if offset + limit < shelf_count else None
+        prev_cursor = encode_cursor([generation, max(0, offset - limit), seed], "prev") if offset > 0 else None
+        return CursorPage(shelves, next_cursor, prev_cursor, shelf_count if with_total else None)
+
     except Exception as e:
-        print(f"Error getting mixed public shelves: {e}")
+        logger.error(f"Error getting mixed public shelves: {e}")
         # Fallback to regular public shelves
-        return get_public_shelves_with_stats(db_tables, limit=limit, offset=offset)
+        return get_public_shelves_with_stats(db_tables, limit=limit, offset=offset, with_total=with_total)
 
-def search_shelves_enhanced(db_tables, query: str = "", book_title: str = "", book_author: str = "", book_isbn: str = "", user_did: str = None, privacy: str = "public", sort_by: str = "smart_mix", limit: int = 20, offset: int = 0, open_to_contributions: bool = None):
+def search_shelves_enhanced(db_tables, query: str = "", book_title: str = "", book_author: str = "", book_isbn: str = "", user_did: str = None, privacy: str = "public", sort_by: str = "smart_mix", limit: int = 20, offset: int = 0, open_to_contributions: bool = None, cursor: str = None, with_total: bool = False, seed: int = None):
     """Enhanced search for bookshelves with activity-based sorting options."""
     
     # If sort_by is smart_mix and no search query, use the mixed results
     if sort_by == "smart_mix" and not any([query, book_title, book_author, book_isbn]):
-        return get_mixed_public_shelves(db_tables, limit=limit, offset=offset)
-    
-    # For other cases, use the existing search with enhanced sorting
-    shelves = search_shelves(db_tables, query, book_title, book_author, book_isbn, user_did, privacy, sort_by, limit*2, 0, open_to_contributions)
-    
-    # Apply activity-based sorting for new sort options
-    if sort_by == "recently_active":
-        # Sort by recent book additions
-        for shelf in shelves:
-            recent_books_query = """
-                SELECT COUNT(*) FROM book 
-                WHERE bookshelf_id = ? AND added_at >= datetime('now', '-30 days')
-            """
-            cursor = db_tables['db'].execute(recent_books_query, (shelf.id,))
-            shelf.recent_activity = cursor.fetchone()[0]
-        shelves.sort(key=lambda s: getattr(s, 'recent_activity', 0), reverse=True)
-        
-    elif sort_by == "most_contributors":
-        # Sort by contributor count
-        for shelf in shelves:
-            contributors_query = """
-                SELECT COUNT(DISTINCT user_did) FROM permission 
-                WHERE bookshelf_id = ? AND status = 'active' AND role IN ('contributor', 'moderator')
-            """
-            cursor = db_tables['db'].execute(contributors_query, (shelf.id,))
-            shelf.contributor_count = cursor.fetchone()[0]
-        shelves.sort(key=lambda s: getattr(s, 'contributor_count', 0), reverse=True)
-        
-    elif sort_by == "most_viewers":
-        # Sort by total member count (viewers + contributors + moderators)
-        for shelf in shelves:
-            viewers_query = """
-                SELECT COUNT(DISTINCT user_did) FROM permission 
-                WHERE bookshelf_id = ? AND status = 'active'
-            """
-            cursor = db_tables['db'].execute(viewers_query, (shelf.id,))
-            shelf.viewer_count = cursor.fetchone()[0]
-        shelves.sort(key=lambda s: getattr(s, 'viewer_count', 0), reverse=True)
+        return get_mixed_public_shelves(db_tables, limit=limit, offset=offset, cursor=cursor, with_total=with_total, seed=seed)
+    
+    # A smart mix of text search results is simply the best matches first
+    if sort_by == "smart_mix" and query:
+        sort_by = "relevance"
     
-    # Apply pagination
-    return shelves[offset:offset + limit]
+    # Activity-based sorts are ordered in SQL from shelf_stats
+    return search_shelves(db_tables, query, book_title, book_author, book_isbn, user_did, privacy, sort_by, limit, offset, open_to_contributions, cursor=cursor, with_total=with_total)
 
 def get_user_by_handle(handle: str, db_tables):
     """Get a user by their handle, returning None if not found."""
@@ -1760,37 +2471,41 @@ def get_user_by_did(did: str, db_tables):
         print(f"Error getting user by DID {did}: {e}")
         return None
 
+def get_user_profile_version(user_did: str, db_tables) -> tuple:
+    """What a profile page's lists are built from: the user's newest activity and their shelves' versions.
+
+    Counting the shelves as well as summing their versions catches a shelf
+    being created or deleted.
+    """
+    query = """
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM activity WHERE user_did = ?) AS last_activity_id,
+               COUNT(bs.id) AS shelf_count, COALESCE(SUM(sv.version), 0) AS shelf_versions
+        FROM bookshelf bs
+        LEFT JOIN shelf_version sv ON sv.bookshelf_id = bs.id
+        WHERE bs.owner_did = ?
+    """
+    _, rows = safe_execute_query(db_tables['db'], query, (user_did, user_did), row_factory=tuple_rows)
+    return rows[0]
+
 def get_user_public_shelves(user_did: str, db_tables, viewer_did: str = None, limit: int = 20):
     """Get a user's public bookshelves, and link-only shelves if viewer has access."""
     try:
-        # Always include public shelves
-        privacy_conditions = ["privacy='public'"]
-        
-        # If viewer is logged in, also include link-only shelves
-        if viewer_did:
-            privacy_conditions.append("privacy='link-only'")
-        
-        privacy_clause = " OR ".join(privacy_conditions)
-        shelves = db_tables['bookshelves'](
-            f"owner_did=? AND ({privacy_clause})", 
-            (user_did,), 
-            limit=limit, 
-            order_by='updated_at DESC'
-        )
-        
-        # Add book counts and recent covers
-        for shelf in shelves:
-            shelf.book_count = len(db_tables['books']("bookshelf_id=?", (shelf.id,)))
-            recent_books = db_tables['books'](
-                "bookshelf_id=?", (shelf.id,), 
-                limit=4, 
-                order_by='added_at DESC'
-            )
-            shelf.recent_covers = [book.cover_url for book in recent_books if book.cover_url]
-        
-        return shelves
+        # Always include public shelves; logged-in viewers also see link-only shelves
+        privacy_values = ['public', 'link-only'] if viewer_did else ['public']
+        placeholders = ','.join('?' for _ in privacy_values)
+        query = f"""
+            SELECT {SHELF_LISTING_COLUMNS}
+            FROM bookshelf bs
+            LEFT JOIN user u ON u.did = bs.owner_did
+            LEFT JOIN shelf_stats ss ON ss.bookshelf_id = bs.id
+            WHERE bs.owner_did = ? AND bs.privacy IN ({placeholders})
+            ORDER BY bs.updated_at DESC
+            LIMIT ?
+        """
+        return safe_execute_query(db_tables['db'], query, (user_did, *privacy_values, limit),
+                                  row_factory=_shelf_listing_rows)
     except Exception as e:
-        print(f"Error getting user public shelves for {user_did}: {e}")
+        logger.error(f"Error getting user public shelves for {user_did}: {e}")
         return []
 
 def get_user_activity(user_did: str, db_tables, viewer_did: str = None, limit: int = 20):
@@ -1815,26 +2530,25 @@ def get_user_activity(user_did: str, db_tables, viewer_did: str = None, limit: i
             LIMIT ?
         """
         
-        cursor = db_tables['db'].execute(query, (user_did, limit))
-        raw_activities = cursor.fetchall()
+        raw_activities = safe_execute_query(db_tables['db'], query, (user_did, limit))
         
         # Format activities
         activities = []
         for row in raw_activities:
             activity_data = {
-                'id': row[0],
-                'user_did': row[1],
-                'activity_type': row[2],
-                'bookshelf_id': row[3],
-                'book_id': row[4],
-                'created_at': row[5],
-                'metadata': row[6],
-                'bookshelf_name': row[7],
-                'bookshelf_slug': row[8],
-                'bookshelf_privacy': row[9],
-                'book_title': row[10],
-                'book_author': row[11],
-                'book_cover_url': row[12]
+                'id': row['id'],
+                'user_did': row['user_did'],
+                'activity_type': row['activity_type'],
+                'bookshelf_id': row['bookshelf_id'],
+                'book_id': row['book_id'],
+                'created_at': row['created_at'],
+                'metadata': row['metadata'],
+                'bookshelf_name': row['bookshelf_name'],
+                'bookshelf_slug': row['bookshelf_slug'],
+                'bookshelf_privacy': row['privacy'],
+                'book_title': row['book_title'],
+                'book_author': row['book_author'],
+                'book_cover_url': row['book_cover_url']
             }
             activities.append(activity_data)
         
@@ -1902,6 +2616,23 @@ def get_book_by_id(book_id: int, db_tables):
     except IndexError:
         return None
 
+def get_book_version(book_id: int, db_tables) -> tuple:
+    """What a book page is built from: the book's newest activity and the versions of every shelf holding its work.
+
+    The book's own shelf is among them, so edits to the book and its comments
+    are covered; the other shelves change the "appears on" list.
+    """
+    query = """
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM activity WHERE book_id = ?) AS last_activity_id,
+               COUNT(sw.bookshelf_id) AS shelf_count, COALESCE(SUM(sv.version), 0) AS shelf_versions
+        FROM book_work bw
+        JOIN shelf_work sw ON sw.work_id = bw.work_id
+        LEFT JOIN shelf_version sv ON sv.bookshelf_id = sw.bookshelf_id
+        WHERE bw.book_id = ?
+    """
+    _, rows = safe_execute_query(db_tables['db'], query, (book_id, book_id), row_factory=tuple_rows)
+    return rows[0]
+
 def get_book_comments(book_id: int, db_tables, bookshelf_id: int = None, limit: int = 50):
     """Get comments for a book with user information.
 
@@ -1912,13 +2643,13 @@ def get_book_comments(book_id: int, db_tables, bookshelf_id: int = None, limit:
         limit: Maximum number of comments to return
 
     Returns:
-        List of comments, filtered by bookshelf if bookshelf_id is provided
+        List of CommentRow objects, filtered by bookshelf if bookshelf_id is provided
     """
     try:
         if bookshelf_id is not None:
             # Filter comments by both book and bookshelf (shelf-specific context)
             query = """
-                SELECT c.*, u.handle, u.display_name, u.avatar_url
+                SELECT c.*, u.handle AS user_handle, u.display_name AS user_display_name, u.avatar_url AS user_avatar_url
                 FROM comment c
                 JOIN user u ON c.user_did = u.did
                 WHERE c.book_id = ? AND c.bookshelf_id = ?
@@ -1929,7 +2660,7 @@ def get_book_comments(book_id: int, db_tables, bookshelf_id: int = None, limit:
         else:
             # Show all comments for the book across all bookshelves (general book page)
             query = """
-                SELECT c.*, u.handle, u.display_name, u.avatar_url
+                SELECT c.*, u.handle AS user_handle, u.display_name AS user_display_name, u.avatar_url AS user_avatar_url
                 FROM comment c
                 JOIN user u ON c.user_did = u.did
                 WHERE c.book_id = ?
@@ -1938,26 +2669,16 @@ def get_book_comments(book_id: int, db_tables, bookshelf_id: int = None, limit:
             """
             params = (book_id, limit)
 
-        # Use safe_execute_query to handle cursor invalidation from concurrent requests
-        rows = safe_execute_query(db_tables['db'], query, params)
-
-        comments = []
-        for comment_data in rows:
-            # Parse datetime fields if they're strings
-            for date_field in ['created_at', 'updated_at']:
-                if date_field in comment_data and comment_data[date_field]:
-                    if isinstance(comment_data[date_field], str):
-                        try:
-                            comment_data[date_field] = datetime.fromisoformat(comment_data[date_field].replace('Z', '+00:00'))
-                        except ValueError:
-                            # If parsing fails, set to None
-                            comment_data[date_field] = None
-
-            comment = Comment(**{k: v for k, v in comment_data.items() if k in Comment.__annotations__})
-            comment.user_handle = comment_data.get('handle')
-            comment.user_display_name = comment_data.get('display_name')
-            comment.user_avatar_url = comment_data.get('avatar_url')
-            comments.append(comment)
+        comments = safe_execute_query(db_tables['db'], query, params, row_factory=object_rows(CommentRow))
+        for comment in comments:
+            # Parse datetime fields if they're strings; unparseable ones become None
+            for date_field in ('created_at', 'updated_at'):
+                value = getattr(comment, date_field)
+                if value and isinstance(value, str):
+                    try:
+                        setattr(comment, date_field, datetime.fromisoformat(value.replace('Z', '+00:00')))
+                    except ValueError:
+                        setattr(comment, date_field, None)
 
         return comments
 
@@ -1965,6 +2686,44 @@ def get_book_comments(book_id: int, db_tables, bookshelf_id: int = None, limit:
         logger.error(f"Error getting comments for book {book_id} (bookshelf {bookshelf_id}): {e}")
         return []
 
+def get_comment_previews(book_ids: list[int], db_tables) -> dict:
+    """Pick one random preview comment for each of many books in a single query.
+
+    Used by shelf pages so rendering N book cards costs one comment query rather
+    than N. Each book's preview is drawn from its 10 oldest comments, matching
+    what the card renderers used to load per book.
+
+    Returns:
+        Dict of book_id -> CommentRow (with user_handle/user_display_name set);
+        books without comments are absent
+    """
+    if not book_ids:
+        return {}
+
+    try:
+        placeholders = ",".join("?" * len(book_ids))
+        query = f"""
+            SELECT * FROM (
+                SELECT
+                    c.*, u.handle AS user_handle, u.display_name AS user_display_name, u.avatar_url AS user_avatar_url,
+                    ROW_NUMBER() OVER (PARTITION BY c.book_id ORDER BY random()) AS preview_rank
+                FROM (
+                    SELECT c.*, ROW_NUMBER() OVER (PARTITION BY c.book_id ORDER BY c.created_at ASC) AS age_rank
+                    FROM comment c
+                    WHERE c.book_id IN ({placeholders})
+                ) c
+                JOIN user u ON c.user_did = u.did
+                WHERE c.age_rank <= 10
+            )
+            WHERE preview_rank = 1
+        """
+        comments = safe_execute_query(db_tables['db'], query, tuple(book_ids), row_factory=object_rows(CommentRow))
+        return {comment.book_id: comment for comment in comments}
+
+    except Exception as e:
+        logger.error(f"Error getting comment previews for {len(book_ids)} books: {e}")
+        return {}
+
 def get_book_activity(book_id: int, db_tables, activity_type: str = "all", limit: int = 20):
     """Get activity for a specific book with filtering."""
     try:
@@ -2015,51 +2774,36 @@ def get_book_activity(book_id: int, db_tables, activity_type: str = "all", limit
         return []
 
 def get_book_shelves(book_id: int, db_tables, viewer_did: str = None):
-    """Get all shelves that contain this book (with permission filtering)."""
+    """Get all shelves that contain this book (with permission filtering), as ShelfRow objects with vote_count set."""
     try:
-        # Get the book to find similar books by title/author/ISBN
-        book = get_book_by_id(book_id, db_tables)
-        if not book:
-            return []
-
-        # Find all shelves containing books with the same title/author/ISBN
+        # Find all shelves holding the same work, with the vote count stored per shelf
         query = """
-            SELECT DISTINCT bs.*, COUNT(b.id) as vote_count
-            FROM bookshelf bs
-            JOIN book b ON bs.id = b.bookshelf_id
-            LEFT JOIN permission p ON bs.id = p.bookshelf_id AND p.user_did = ? AND p.status = 'active'
-            WHERE b.title = ? AND b.author = ? AND COALESCE(b.isbn, '') = COALESCE(?, '')
+            SELECT bs.*, sw.vote_count
+            FROM book_work bw
+            JOIN shelf_work sw ON sw.work_id = bw.work_id
+            JOIN bookshelf bs ON bs.id = sw.bookshelf_id
+            WHERE bw.book_id = ?
             AND (
                 bs.privacy = 'public'
                 OR bs.privacy = 'link-only'
                 OR (bs.privacy = 'private' AND bs.owner_did = ?)
-                OR (bs.privacy = 'private' AND p.user_did IS NOT NULL)
+                OR (bs.privacy = 'private' AND EXISTS (
+                    SELECT 1 FROM permission p
+                    WHERE p.bookshelf_id = bs.id AND p.user_did = ? AND p.status = 'active'
+                ))
             )
-            GROUP BY bs.id
-            ORDER BY vote_count DESC, bs.updated_at DESC
+            ORDER BY sw.vote_count DESC, bs.updated_at DESC
         """
 
-        params = (viewer_did or '', book.title, book.author, book.isbn or '', viewer_did or '')
+        params = (book_id, viewer_did or '', viewer_did or '')
 
-        # Use safe_execute_query to handle cursor invalidation from concurrent requests
-        rows = safe_execute_query(db_tables['db'], query, params)
-
-        shelves = []
-        for shelf_data in rows:
-            vote_count = shelf_data.pop('vote_count', 0)
-            shelf = Bookshelf(**{k: v for k, v in shelf_data.items() if k in Bookshelf.__annotations__})
-            shelf.vote_count = vote_count
-            shelves.append(shelf)
-
-        return shelves
+        return safe_execute_query(db_tables['db'], query, params, row_factory=object_rows(ShelfRow))
 
     except Exception as e:
         logger.error(f"Error getting shelves for book {book_id}: {e}")
         return []
-
-# FT rendering methods for models
 @patch
-def __ft__(self: Bookshelf):
+def __ft__(self: Bookshelf | ShelfRow | ShelfListingRow):
     """Render a Bookshelf as a Card component."""
     privacy_icon = {
         'public': '🌍',
@@ -2075,7 +2819,7 @@ def __ft__(self: Bookshelf):
     )
 
 @patch
-def __ft__(self: Book):
+def __ft__(self: Book | BookRow):
     """Render a Book as a Card component (basic version without upvote functionality)."""
     # Generate Google Books URL
     if self.isbn:
@@ -2124,7 +2868,7 @@ def __ft__(self: Book):
     )
 
 @patch
-def as_interactive_card(self: Book, can_upvote=False, user_has_upvoted=False, upvote_count=0, can_remove=False, user_auth_status="anonymous", db_tables=None):
+def as_interactive_card(self: Book, can_upvote=False, user_has_upvoted=False, upvote_count=0, can_remove=False, user_auth_status="anonymous", db_tables=None, comment=None):
     """Render Book as a card with clickable title, +1/-1 toggle, and optional comment preview."""
     
     cover = Img(
@@ -2140,24 +2884,19 @@ def as_interactive_card(self: Book, can_upvote=False, user_has_upvoted=False, up
         cls="book-description"
     ) if self.description else None
     
-    # Get a random comment if available
+    # Use the preloaded preview comment, or pick a random one for this book
     comment_preview = None
-    if db_tables:
-        try:
-            comments = get_book_comments(self.id, db_tables, limit=10)
-            if comments:
-                import random
-                random_comment = random.choice(comments)
-                comment_preview = Div(
-                    P(f'"{random_comment.content[:60]}{"..." if len(random_comment.content) > 60 else ""}"', 
-                      cls="comment-preview-text"),
-                    P(f"— {random_comment.user_display_name or random_comment.user_handle}", 
-                      cls="comment-preview-author"),
-                    cls="comment-preview"
-                )
-        except Exception as e:
-            # Silently handle any errors in comment fetching
-            pass
+    preview = comment
+    if preview is None and db_tables:
+        preview = get_comment_previews([self.id], db_tables).get(self.id)
+    if preview:
+        comment_preview = Div(
+            P(f'"{preview.content[:60]}{"..." if len(preview.content) > 60 else ""}"', 
+              cls="comment-preview-text"),
+            P(f"— {preview.user_display_name or preview.user_handle}", 
+              cls="comment-preview-author"),
+            cls="comment-preview"
+        )
     
     # Build action row with just +1/-1 toggle and comment button
     action_icons = []
@@ -2304,7 +3043,7 @@ def as_interactive_card(self: Book, can_upvote=False, user_has_upvoted=False, up
     )
 
 @patch
-def as_table_row(self: Book, can_upvote=False, user_has_upvoted=False, upvote_count=0, can_remove=False, user_auth_status="anonymous", db_tables=None):
+def as_table_row(self: Book, can_upvote=False, user_has_upvoted=False, upvote_count=0, can_remove=False, user_auth_status="anonymous", db_tables=None, comment=None):
     """Render Book as a table row for list view with full feature parity to grid view."""
     
     # Clickable cover thumbnail (links to book detail page)
@@ -2340,24 +3079,19 @@ def as_table_row(self: Book, can_upvote=False, user_has_upvoted=False, upvote_co
     if description_text:
         description_parts.append(Div(description_text, cls="book-table-description"))
     
-    # Get a random comment preview if available (matching grid view)
-    if db_tables:
-        try:
-            comments = get_book_comments(self.id, db_tables, limit=10)
-            if comments:
-                import random
-                random_comment = random.choice(comments)
-                comment_preview = Div(
-                    P(f'"{random_comment.content[:40]}{"..." if len(random_comment.content) > 40 else ""}"', 
-                      cls="comment-preview-text"),
-                    P(f"— {random_comment.user_display_name or random_comment.user_handle}", 
-                      cls="comment-preview-author"),
-                    cls="comment-preview table-comment-preview"
-                )
-                description_parts.append(comment_preview)
-        except Exception:
-            # Silently handle any errors in comment fetching
-            pass
+    # Use the preloaded preview comment, or pick a random one for this book (matching grid view)
+    preview = comment
+    if preview is None and db_tables:
+        preview = get_comment_previews([self.id], db_tables).get(self.id)
+    if preview:
+        comment_preview = Div(
+            P(f'"{preview.content[:40]}{"..." if len(preview.content) > 40 else ""}"', 
+              cls="comment-preview-text"),
+            P(f"— {preview.user_display_name or preview.user_handle}", 
+              cls="comment-preview-author"),
+            cls="comment-preview table-comment-preview"
+        )
+        description_parts.append(comment_preview)
     
     # Add discrete user attribution
     added_by_handle = getattr(self, 'added_by_handle', None)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for benchmarks.
+
+Builds a fully migrated Bibliome database filled with deterministic fake users,
+bookshelves, books, members, comments, activity and follows. Books are drawn
+from a catalogue with Zipf popularity, so popular works sit on many shelves and
+collect votes within a shelf, and a few users attract most followers. Rows are
+bulk loaded with the sync triggers removed and the derived tables (shelf_stats,
+FTS indexes, works, activity inboxes) are rebuilt afterwards, which is much
+faster than firing every trigger per row.
+
+Run from project root: python scripts/benchmark_data.py data/bench.db --size 100k
+"""
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models import (setup_database, refresh_shelf_stats, refresh_shelf_mix, rebuild_search_index, rebuild_works,
+                    refresh_inbox_pull_authors, rebuild_activity_inboxes)
+
+MIGRATIONS_DIR = str(project_root / 'migrations')
+
+# Named dataset sizes (books)
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+MEMBER_ROLES = ['viewer', 'viewer', 'contributor', 'contributor', 'contributor', 'moderator']
+
+SYLLABLES = ["an", "bel", "cor", "dra", "el", "fen", "gar", "hol", "ith", "jor", "kal", "lum",
+             "mor", "nal", "or", "pel", "quin", "ras", "sil", "tor", "ul", "var", "wyn", "xan",
+             "yel", "zor"]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    """Generate `size` distinct pseudo-words."""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+_ZIPF_WEIGHTS = {}
+
+
+def zipf_choice(words: list, rng: random.Random):
+    """Pick an item with a Zipf (1/rank) distribution, like words in real titles."""
+    weights = _ZIPF_WEIGHTS.get(len(words))
+    if weights is None:
+        weights = _ZIPF_WEIGHTS[len(words)] = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    return words[bisect.bisect_left(weights, rng.random() * weights[-1])]
+
+
+def _drop_triggers(conn: sqlite3.Connection):
+    names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+    for name in names:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def generate_dataset(db_path: str, books: int, books_per_shelf: int = 50, shelves_per_user: int = 4,
+                     seed: int = 42, members_per_shelf: int = 2, comments_per_book: float = 0.1,
+                     follows_per_user: int = 10) -> dict:
+    """Create a migrated database at db_path and fill it with synthetic data.
+
+    Returns:
+        Summary dict with row counts, the vocabulary and the build time
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    db_tables = setup_database(db_path, migrations_dir=MIGRATIONS_DIR)
+    db_tables['db'].conn.close()
+
+    vocabulary = make_vocabulary(5000, rng)
+    shelf_count = max(1, books // books_per_shelf)
+    user_count = max(1, shelf_count // shelves_per_user)
+    now = datetime.now(timezone.utc)
+
+    # One catalogue entry per five books: the head of the Zipf curve is on many shelves
+    catalogue = []
+    for i in range(max(1, books // 5)):
+        title = " ".join(zipf_choice(vocabulary, rng) for _ in range(rng.randint(1, 5))).title()
+        author = f"{zipf_choice(vocabulary, rng).title()} {zipf_choice(vocabulary, rng).title()}"
+        catalogue.append((title, author, f"978{i:010d}"))
+    user_ids = list(range(user_count))
+
+    conn = sqlite3.connect(db_path)
+    _drop_triggers(conn)
+    with conn:
+        conn.executemany(
+            "INSERT INTO user (did, handle, display_name, avatar_url, created_at) VALUES (?, ?, ?, '', ?)",
+            ((f"did:plc:bench{i:08d}", f"bench{i}.bsky.social", f"Bench User {i}", now.isoformat())
+             for i in range(user_count))
+        )
+
+        def shelf_rows():
+            for i in range(shelf_count):
+                created = now - timedelta(days=rng.randint(0, 720))
+                name = " ".join(zipf_choice(vocabulary, rng) for _ in range(rng.randint(1, 3))).title()
+                yield (i + 1, name, f"did:plc:bench{i % user_count:08d}", f"bench-shelf-{i}",
+                       f"Shelf about {zipf_choice(vocabulary, rng)}",
+                       'public' if rng.random() < 0.9 else 'link-only',
+                       created.isoformat(), created.isoformat(), int(rng.random() < 0.3))
+        conn.executemany(
+            """INSERT INTO bookshelf (id, name, owner_did, slug, description, privacy, created_at, updated_at, self_join)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            shelf_rows()
+        )
+
+        def book_rows():
+            for i in range(books):
+                shelf_id = i % shelf_count + 1
+                added = now - timedelta(minutes=rng.randint(0, 720 * 24 * 60))
+                title, author, isbn = zipf_choice(catalogue, rng)
+                yield (i + 1, shelf_id, title, f"did:plc:bench{rng.randrange(user_count):08d}", isbn, author,
+                       f"https://covers.example.com/{isbn}.jpg", added.isoformat())
+        conn.executemany(
+            """INSERT INTO book (id, bookshelf_id, title, added_by_did, isbn, author, cover_url, added_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            book_rows()
+        )
+
+        def permission_rows():
+            for shelf_index in range(shelf_count):
+                owner = shelf_index % user_count
+                members = rng.sample(user_ids, min(user_count, rng.randint(0, members_per_shelf * 2)))
+                for member in members:
+                    if member != owner:
+                        granted = (now - timedelta(days=rng.randint(0, 360))).isoformat()
+                        yield (shelf_index + 1, f"did:plc:bench{member:08d}", rng.choice(MEMBER_ROLES),
+                               f"did:plc:bench{owner:08d}", granted, granted)
+        conn.executemany(
+            """INSERT INTO permission (bookshelf_id, user_did, role, status, granted_by_did, granted_at, joined_at)
+               VALUES (?, ?, ?, 'active', ?, ?, ?)""",
+            permission_rows()
+        )
+
+        def comment_rows():
+            for _ in range(int(books * comments_per_book)):
+                book_index = rng.randrange(books)
+                created = (now - timedelta(minutes=rng.randint(0, 360 * 24 * 60))).isoformat()
+                yield (book_index + 1, book_index % shelf_count + 1, f"did:plc:bench{rng.randrange(user_count):08d}",
+                       " ".join(zipf_choice(vocabulary, rng) for _ in range(rng.randint(3, 20))).capitalize(), created)
+        conn.executemany(
+            "INSERT INTO comment (book_id, bookshelf_id, user_did, content, created_at) VALUES (?, ?, ?, ?, ?)",
+            comment_rows()
+        )
+
+        # The activity log_activity would have written for every shelf, book and comment
+        conn.execute("""
+            INSERT INTO activity (user_did, activity_type, bookshelf_id, created_at, metadata)
+            SELECT owner_did, 'bookshelf_created', id, created_at, '' FROM bookshelf
+        """)
+        conn.execute("""
+            INSERT INTO activity (user_did, activity_type, bookshelf_id, book_id, created_at, metadata)
+            SELECT added_by_did, 'book_added', bookshelf_id, id, added_at, '' FROM book
+        """)
+        conn.execute("""
+            INSERT INTO activity (user_did, activity_type, bookshelf_id, book_id, created_at, metadata)
+            SELECT user_did, 'comment_added', bookshelf_id, book_id, created_at, '' FROM comment
+        """)
+
+        # Followed users are Zipf-skewed too: a few accounts have most followers
+        def follow_rows():
+            for follower in range(user_count):
+                followed = {zipf_choice(user_ids, rng) for _ in range(rng.randint(0, follows_per_user * 2))}
+                followed.discard(follower)
+                for target in followed:
+                    yield f"did:plc:bench{follower:08d}", f"did:plc:bench{target:08d}"
+        conn.executemany("INSERT INTO follow (follower_did, followed_did) VALUES (?, ?)", follow_rows())
+        conn.execute("""
+            INSERT INTO follow_sync (follower_did, follow_count)
+            SELECT u.did, (SELECT COUNT(*) FROM follow f WHERE f.follower_did = u.did) FROM user u
+        """)
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ('permission', 'comment', 'activity', 'follow')}
+    conn.close()
+
+    # Reconnecting through setup_database reinstalls the triggers; then rebuild derived tables
+    db_tables = setup_database(db_path, migrations_dir=MIGRATIONS_DIR)
+    rebuild_search_index(db_tables)
+    rebuild_works(db_tables)
+    refresh_shelf_stats(db_tables)
+    refresh_shelf_mix(db_tables)
+    refresh_inbox_pull_authors(db_tables)
+    rebuild_activity_inboxes(db_tables)
+    db_tables['db'].conn.close()
+
+    return {
+        'db_path': db_path,
+        'users': user_count,
+        'shelves': shelf_count,
+        'books': books,
+        'permissions': counts['permission'],
+        'comments': counts['comment'],
+        'activities': counts['activity'],
+        'follows': counts['follow'],
+        'vocabulary': vocabulary,
+        'build_seconds': time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Bibliome database for benchmarks")
+    parser.add_argument('db_path')
+    parser.add_argument('--size', choices=sorted(SIZES), help="named size; overrides --books")
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--books-per-shelf', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    books = SIZES[args.size] if args.size else args.books
+    summary = generate_dataset(args.db_path, books, args.books_per_shelf, seed=args.seed)
+    print(f"Built {summary['db_path']}: {summary['users']:,} users, {summary['shelves']:,} shelves, "
+          f"{summary['books']:,} books, {summary['permissions']:,} members, {summary['comments']:,} comments, "
+          f"{summary['activities']:,} activities, {summary['follows']:,} follows "
+          f"in {summary['build_seconds']:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark event-loop lag while async handlers read the database.
+
+Builds a synthetic database, then runs --clients concurrent "async handlers"
+that each make --requests slow shelf searches (LIKE mode), once calling
+search_shelves directly inside the coroutine (what the async routes used to
+do) and once through AsyncRepository. A ticker that sleeps 5 ms measures how
+late the event loop wakes it: that lateness is what every other in-flight
+request waits.
+
+Run from project root: python scripts/benchmark_event_loop.py --books 100000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models import setup_database, search_shelves, close_read_pool
+from bibliome.services.repository import AsyncRepository
+from benchmark_data import generate_dataset, MIGRATIONS_DIR
+from benchmark_search import percentile
+
+TICK_SECONDS = 0.005
+
+
+async def measure_lag(stop: asyncio.Event, lags: list[float]):
+    """Record how late each 5 ms sleep wakes up, in milliseconds."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, (time.perf_counter() - started - TICK_SECONDS) * 1000))
+
+
+async def run_mode(db_tables, terms: list[str], clients: int, requests: int, use_repository: bool) -> dict:
+    repo = AsyncRepository(db_tables)
+
+    async def handler(client: int):
+        for i in range(requests):
+            term = terms[(client * requests + i) % len(terms)]
+            if use_repository:
+                await repo.read(search_shelves, db_tables, query=term, limit=12, search_mode="like")
+            else:
+                search_shelves(db_tables, query=term, limit=12, search_mode="like")
+            await asyncio.sleep(0)
+
+    lags = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(c) for c in range(clients)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return {
+        'lag_p50': statistics.median(lags),
+        'lag_p95': percentile(lags, 95),
+        'lag_max': max(lags),
+        'throughput': clients * requests / elapsed,
+    }
+
+
+def run(books: int, clients: int, requests: int):
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "bench_event_loop.db")
+        summary = generate_dataset(db_path, books)
+        terms = [rng.choice(summary['vocabulary']) for _ in range(50)]
+        print(f"{books:,} books / {summary['shelves']:,} shelves; "
+              f"{clients} clients x {requests} LIKE searches")
+
+        close_read_pool()
+        db_tables = setup_database(db_path, migrations_dir=MIGRATIONS_DIR)
+
+        for label, use_repository in (("blocking", False), ("repository", True)):
+            result = asyncio.run(run_mode(db_tables, terms, clients, requests, use_repository))
+            print(f"  {label:<11} loop lag p50={result['lag_p50']:7.2f} ms  p95={result['lag_p95']:7.2f} ms  "
+                  f"max={result['lag_max']:7.2f} ms  {result['throughput']:6.1f} req/s")
+
+        close_read_pool()
+        db_tables['db'].conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event-loop lag with and without AsyncRepository")
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=10)
+    args = parser.parse_args()
+    run(args.books, args.clients, args.requests)
+
+
+if __name__ == '__main__':
+    main()
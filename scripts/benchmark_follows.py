@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark the network feed: old IN (...) list vs follow join vs activity inbox.
+
+Builds a synthetic database, adds activity for a pool of authors and a viewer
+who follows --follows of them, then times one feed page + count each way.
+Also times the initial and an incremental sync_follow_graph (which fills the
+viewer's inbox through triggers) and the fan-out cost of one new activity.
+
+Run from project root: python scripts/benchmark_follows.py --follows 5000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models import (setup_database, get_network_activity, get_network_activity_count,
+                    sync_follow_graph, close_read_pool)
+from benchmark_data import generate_dataset, MIGRATIONS_DIR
+from benchmark_search import percentile
+
+VIEWER_DID = "did:plc:benchviewer"
+
+# The feed query before the follow table: every followed DID bound as a parameter
+LEGACY_FEED_QUERY = """
+    SELECT a.*, b.name as bookshelf_name, b.slug as bookshelf_slug, b.privacy,
+           bk.title as book_title, bk.author as book_author, bk.cover_url as book_cover_url
+    FROM activity a
+    LEFT JOIN bookshelf b ON a.bookshelf_id = b.id
+    LEFT JOIN book bk ON a.book_id = bk.id
+    LEFT JOIN permission p ON b.id = p.bookshelf_id AND p.user_did = ? AND p.status = 'active'
+    WHERE a.user_did IN ({placeholders})
+    AND (
+        b.privacy = 'public'
+        OR b.privacy = 'link-only'
+        OR (b.privacy = 'private' AND b.owner_did = ?)
+        OR (b.privacy = 'private' AND p.user_did IS NOT NULL)
+    )
+"""
+
+
+class StoredGraphAuth:
+    """Stands in for BlueskyAuth once the follow graph is stored: no network calls."""
+
+    def __init__(self, following):
+        self.following = following
+
+    def get_following_list(self, auth_data, limit=None):
+        return self.following
+
+    def get_profiles_batch(self, dids, auth_data, not_found=None):
+        return {}
+
+
+def add_activity(db_path: str, authors: int, activities: int, shelves: int, rng: random.Random):
+    """Insert activity rows from synthetic authors on existing shelves."""
+    now = datetime.now(timezone.utc)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO activity (user_did, activity_type, bookshelf_id, created_at, metadata) VALUES (?, ?, ?, ?, '')",
+            ((f"did:plc:author{rng.randrange(authors):08d}", 'book_added', rng.randint(1, shelves),
+              (now - timedelta(minutes=rng.randint(0, 90 * 24 * 60))).isoformat())
+             for _ in range(activities))
+        )
+    conn.close()
+
+
+def time_calls(fn, repeats: int) -> list[float]:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    print(f"  {label:<28} p50={statistics.median(timings):8.2f} ms  p95={percentile(timings, 95):8.2f} ms")
+
+
+def run(books: int, authors: int, activities: int, follows: int, repeats: int, fanout_followers: int):
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "bench_follows.db")
+        summary = generate_dataset(db_path, books)
+        add_activity(db_path, authors, activities, summary['shelves'], rng)
+        print(f"{activities:,} activities from {authors:,} authors; viewer follows {follows:,}")
+
+        close_read_pool()
+        db_tables = setup_database(db_path, migrations_dir=MIGRATIONS_DIR)
+        following = [f"did:plc:author{i:08d}" for i in rng.sample(range(authors), follows)]
+        auth = {'did': VIEWER_DID}
+
+        started = time.perf_counter()
+        sync_follow_graph(VIEWER_DID, following, db_tables)
+        print(f"  initial sync_follow_graph    {(time.perf_counter() - started) * 1000:8.2f} ms")
+        churned = following[follows // 100:] + [f"did:plc:newfollow{i}" for i in range(follows // 100)]
+        started = time.perf_counter()
+        sync_follow_graph(VIEWER_DID, churned, db_tables)
+        print(f"  1% churn sync_follow_graph   {(time.perf_counter() - started) * 1000:8.2f} ms")
+        sync_follow_graph(VIEWER_DID, following, db_tables)
+
+        conn = db_tables['db'].conn
+        legacy_sql = LEGACY_FEED_QUERY.format(placeholders=','.join('?' * len(following)))
+        legacy_params = [VIEWER_DID, *following, VIEWER_DID]
+
+        def legacy_page():
+            list(conn.execute(legacy_sql + " ORDER BY a.created_at DESC LIMIT 20", legacy_params))
+
+        def legacy_count():
+            list(conn.execute(f"SELECT COUNT(*) FROM ({legacy_sql})", legacy_params))
+
+        bluesky_auth = StoredGraphAuth(following)
+        report("IN list: page", time_calls(legacy_page, repeats))
+        report("IN list: count", time_calls(legacy_count, repeats))
+        for label, use_inbox in (("follow join", False), ("inbox", True)):
+            report(f"{label}: page", time_calls(
+                lambda: get_network_activity(auth, db_tables, bluesky_auth, use_inbox=use_inbox), repeats))
+            report(f"{label}: count", time_calls(
+                lambda: get_network_activity_count(auth, db_tables, bluesky_auth, use_inbox=use_inbox), repeats))
+
+        # Fan-out cost: one new activity from a followed author with many stored followers
+        author = following[0]
+        for i in range(fanout_followers):
+            sync_follow_graph(f"did:plc:benchfollower{i}", [author], db_tables)
+        db_tables['db'].execute(
+            "INSERT OR IGNORE INTO user (did, handle, display_name, avatar_url) VALUES (?, 'bench-author', '', '')", (author,)
+        )
+        started = time.perf_counter()
+        db_tables['db'].execute(
+            "INSERT INTO activity (user_did, activity_type, bookshelf_id, created_at, metadata) VALUES (?, 'book_added', 1, ?, '')",
+            (author, datetime.now(timezone.utc).isoformat())
+        )
+        print(f"  fan-out to {fanout_followers + 1:,} inboxes    {(time.perf_counter() - started) * 1000:8.2f} ms")
+
+        close_read_pool()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the network feed against a stored follow graph")
+    parser.add_argument('--books', type=int, default=50_000)
+    parser.add_argument('--authors', type=int, default=50_000)
+    parser.add_argument('--activities', type=int, default=500_000)
+    parser.add_argument('--follows', type=int, default=5_000)
+    parser.add_argument('--repeats', type=int, default=30)
+    parser.add_argument('--fanout-followers', type=int, default=1000,
+                        help="stored followers of the author whose new activity is fanned out")
+    args = parser.parse_args()
+    run(args.books, args.authors, args.activities, args.follows, args.repeats, args.fanout_followers)
+
+
+if __name__ == '__main__':
+    main()
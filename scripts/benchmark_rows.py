@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark building list-query results: model objects vs slotted row types.
+
+Builds a synthetic database, then fetches --rows shelf listing rows (with owner
+and shelf_stats columns) and --rows community book rows, once the old way
+(dict per row, filtered into a Bookshelf/Book, extras attached with setattr)
+and once through object_rows() into ShelfListingRow/BookRow. Reports rows/sec
+and the memory each result row keeps alive (tracemalloc).
+
+Run from project root: python scripts/benchmark_rows.py --rows 10000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models import (setup_database, close_read_pool, safe_execute_query, Bookshelf, Book, User,
+                    BookRow, SHELF_LISTING_COLUMNS, _shelf_listing_rows)
+from bibliome.infrastructure import object_rows
+from benchmark_data import generate_dataset, MIGRATIONS_DIR
+
+SHELF_QUERY = f"""
+    SELECT {SHELF_LISTING_COLUMNS}
+    FROM bookshelf bs
+    LEFT JOIN user u ON u.did = bs.owner_did
+    LEFT JOIN shelf_stats ss ON ss.bookshelf_id = bs.id
+    ORDER BY bs.id LIMIT ?
+"""
+
+BOOK_QUERY = """
+    SELECT b.*, bs.name AS bookshelf_name, bs.slug AS bookshelf_slug
+    FROM book b
+    JOIN bookshelf bs ON b.bookshelf_id = bs.id
+    ORDER BY b.id LIMIT ?
+"""
+
+
+def shelves_as_models(db, limit: int) -> list:
+    """The listing rows as they were built before the row types."""
+    shelves = []
+    for row in safe_execute_query(db, SHELF_QUERY, (limit,)):
+        shelf = Bookshelf(**{k: v for k, v in row.items() if k in Bookshelf.__annotations__})
+        shelf.book_count = row.get('book_count', 0)
+        shelf.contributor_count = row.get('contributor_count', 0)
+        shelf.member_count = row.get('member_count', 0)
+        shelf.recent_book_count = row.get('recent_book_count', 0)
+        shelf.activity_score = row.get('activity_score', 0)
+        shelf.last_book_added_at = row.get('last_book_added_at')
+        shelf.recent_covers = json.loads(row.get('recent_covers') or '[]')
+        shelf.owner_name = row.get('owner_name')
+        shelf.owner_handle = row.get('owner_handle')
+        shelf.owner = User(did=shelf.owner_did, handle=row['owner_handle'],
+                           display_name=row.get('owner_name') or '',
+                           avatar_url=row.get('owner_avatar_url') or '') if row.get('owner_handle') is not None else None
+        shelves.append(shelf)
+    return shelves
+
+
+def shelves_as_rows(db, limit: int) -> list:
+    return safe_execute_query(db, SHELF_QUERY, (limit,), row_factory=_shelf_listing_rows)
+
+
+def books_as_models(db, limit: int) -> list:
+    books = []
+    for row in safe_execute_query(db, BOOK_QUERY, (limit,)):
+        book = Book(**{k: v for k, v in row.items() if k in Book.__annotations__})
+        book.bookshelf_name = row.get('bookshelf_name')
+        book.bookshelf_slug = row.get('bookshelf_slug')
+        books.append(book)
+    return books
+
+
+def books_as_rows(db, limit: int) -> list:
+    return safe_execute_query(db, BOOK_QUERY, (limit,), row_factory=object_rows(BookRow))
+
+
+def measure(fn, db, limit: int, repeats: int) -> tuple[float, float, int]:
+    """(rows/sec at the median run, bytes retained per row, rows returned)."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rows = fn(db, limit)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    rows = fn(db, limit)
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return len(rows) / statistics.median(timings), retained / len(rows), len(rows)
+
+
+def run(rows: int, repeats: int):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "bench_rows.db")
+        # Five books per shelf so there are as many shelves as requested rows
+        generate_dataset(db_path, rows * 5, books_per_shelf=5)
+
+        close_read_pool()
+        db_tables = setup_database(db_path, migrations_dir=MIGRATIONS_DIR)
+        db = db_tables['db']
+
+        for label, before, after in (("shelf listing", shelves_as_models, shelves_as_rows),
+                                     ("community books", books_as_models, books_as_rows)):
+            for kind, fn in (("models", before), ("row types", after)):
+                rate, per_row, count = measure(fn, db, rows, repeats)
+                print(f"  {label:<16} {kind:<10} {count:>7,} rows  {rate:>10,.0f} rows/s  {per_row:>7,.0f} bytes/row")
+
+        close_read_pool()
+        db.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model objects vs slotted row types for list queries")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeats', type=int, default=7)
+    args = parser.parse_args()
+    run(args.rows, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
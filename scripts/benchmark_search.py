@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark shelf search latency: FTS5 vs LIKE.
+
+Generates a synthetic database per size and times search_shelves plus
+search_shelves_count (what one explore search costs) for a mix of common
+words, rare words and short prefixes.
+
+Run from project root: python scripts/benchmark_search.py --sizes 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models import setup_database, search_shelves, search_shelves_count, close_read_pool
+from benchmark_data import generate_dataset, MIGRATIONS_DIR
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def time_search(db_tables, terms: list[str], mode: str) -> list[float]:
+    """Return per-search latencies in milliseconds for one page + count."""
+    timings = []
+    for term in terms:
+        started = time.perf_counter()
+        search_shelves(db_tables, query=term, sort_by="relevance", limit=12, search_mode=mode)
+        search_shelves_count(db_tables, query=term, search_mode=mode)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def run(sizes: list[int], queries: int, like_limit: int):
+    rng = random.Random(7)
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in sizes:
+            db_path = os.path.join(tmpdir, f"bench_{size}.db")
+            summary = generate_dataset(db_path, size)
+            print(f"\n{size:,} books / {summary['shelves']:,} shelves (built in {summary['build_seconds']:.1f}s)")
+
+            vocabulary = summary['vocabulary']
+            workloads = {
+                'common': vocabulary[:10],                                   # most frequent words
+                'rare': [rng.choice(vocabulary) for _ in range(queries)],    # long-tail words
+                'prefix': [rng.choice(vocabulary)[:3] for _ in range(10)],   # search-as-you-type
+            }
+
+            close_read_pool()
+            db_tables = setup_database(db_path, migrations_dir=MIGRATIONS_DIR)
+
+            for workload, terms in workloads.items():
+                for mode, mode_terms in (("fts", terms), ("like", terms[:like_limit])):
+                    timings = time_search(db_tables, mode_terms, mode)
+                    row = (size, workload, mode, len(timings), statistics.median(timings), percentile(timings, 95))
+                    results.append(row)
+                    print(f"  {workload:<7}{mode:<5} n={row[3]:<4} p50={row[4]:8.1f} ms  p95={row[5]:8.1f} ms")
+
+            close_read_pool()
+            db_tables['db'].conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FTS5 vs LIKE shelf search")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=50, help="random-word queries per size")
+    parser.add_argument('--like-limit', type=int, default=10,
+                        help="LIKE searches are slow at scale; only time this many")
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.like_limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Data-layer benchmark suite: p50/p95 of the models.py read functions.
+
+Generates (or reuses) a synthetic database from benchmark_data.py, then times
+each read function in CASES --repeats times, rotating through a fixed set of
+realistic inputs (busiest shelves, most-followed viewers, common search words).
+Results are written as a JSON baseline; --compare reads an earlier baseline,
+prints the change per function and exits non-zero when a p50 regressed by more
+than --threshold percent.
+
+Run from project root:
+    python scripts/benchmark_suite.py --size 100k --output data/bench-100k.json
+    python scripts/benchmark_suite.py --size 100k --compare data/bench-100k.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import models
+from models import setup_database, close_read_pool
+from benchmark_data import generate_dataset, MIGRATIONS_DIR, SIZES
+from benchmark_follows import StoredGraphAuth
+from benchmark_search import percentile
+
+INPUTS = 20  # distinct inputs each case rotates through
+
+
+def pick_inputs(db_tables, rng: random.Random) -> dict:
+    """Inputs shaped like real traffic: big shelves, busy viewers and readers, popular books."""
+    db = db_tables['db']
+
+    def column(sql, params=()):
+        return [row[0] for row in db.execute(sql, params)]
+
+    shelves = column("SELECT bookshelf_id FROM shelf_stats ORDER BY book_count DESC LIMIT ?", (INPUTS,))
+    books = column("SELECT first_book_id FROM shelf_work ORDER BY vote_count DESC LIMIT ?", (INPUTS,))
+    words = [row[0] for row in db.execute("SELECT name FROM bookshelf ORDER BY id LIMIT ?", (INPUTS * 5,))]
+    return {
+        'shelves': [models.get_shelf_by_slug(slug, db_tables) for slug in column(
+            "SELECT slug FROM bookshelf WHERE id IN (%s)" % ','.join('?' * len(shelves)), shelves)],
+        'shelf_ids': shelves,
+        'books': books,
+        'viewers': column("SELECT follower_did FROM follow_sync ORDER BY follow_count DESC LIMIT ?", (INPUTS,)),
+        'members': column("SELECT user_did FROM permission GROUP BY user_did ORDER BY COUNT(*) DESC LIMIT ?", (INPUTS,)),
+        'terms': rng.sample(sorted({w.lower() for name in words for w in name.split()}), INPUTS),
+        'prefixes': [f"bench{i}" for i in range(1, INPUTS + 1)],
+    }
+
+
+def build_cases(db_tables, inputs: dict) -> dict:
+    """Benchmark name -> fn(i) making one call with the i-th input."""
+    auth = StoredGraphAuth([])
+    pick = lambda key, i: inputs[key][i % len(inputs[key])]
+    return {
+        'get_books_with_upvotes': lambda i: models.get_books_with_upvotes(
+            pick('shelf_ids', i), pick('members', i), db_tables),
+        'check_permission': lambda i: models.check_permission(
+            pick('shelves', i), pick('members', i), ['contributor', 'moderator'], db_tables),
+        'search_shelves[fts]': lambda i: models.search_shelves(
+            db_tables, query=pick('terms', i), sort_by='relevance', limit=12),
+        'search_shelves_count[fts]': lambda i: models.search_shelves_count(db_tables, query=pick('terms', i)),
+        'search_shelves[updated_at]': lambda i: models.search_shelves(db_tables, sort_by='updated_at', limit=12),
+        'search_shelves[smart_mix]': lambda i: models.search_shelves(db_tables, sort_by='smart_mix', limit=12),
+        'get_public_shelves_with_stats': lambda i: models.get_public_shelves_with_stats(
+            db_tables, limit=12, with_total=True),
+        'get_mixed_public_shelves': lambda i: models.get_mixed_public_shelves(db_tables, limit=12, seed=i),
+        'get_mixed_public_shelves[page 50]': lambda i: models.get_mixed_public_shelves(
+            db_tables, limit=12, offset=600, seed=i),
+        'get_recent_community_books': lambda i: models.get_recent_community_books(db_tables),
+        'get_network_activity': lambda i: models.get_network_activity(
+            {'did': pick('viewers', i)}, db_tables, auth),
+        'get_network_activity_count': lambda i: models.get_network_activity_count(
+            {'did': pick('viewers', i)}, db_tables, auth),
+        'get_user_shelves': lambda i: models.get_user_shelves(pick('members', i), db_tables),
+        'get_user_activity': lambda i: models.get_user_activity(
+            pick('viewers', i), db_tables, viewer_did=pick('members', i)),
+        'search_users': lambda i: models.search_users(db_tables, pick('prefixes', i), viewer_did=pick('viewers', i)),
+        'get_book_comments': lambda i: models.get_book_comments(pick('books', i), db_tables),
+        'get_comment_previews': lambda i: models.get_comment_previews(inputs['books'], db_tables),
+        'get_book_shelves': lambda i: models.get_book_shelves(pick('books', i), db_tables, viewer_did=pick('members', i)),
+    }
+
+
+def time_case(fn, repeats: int) -> dict:
+    fn(0)  # warm the page cache and statement cache
+    timings = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': round(statistics.median(timings), 4), 'p95_ms': round(percentile(timings, 95), 4),
+            'samples': repeats}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run(db_path: str, books: int, repeats: int, only: list[str] = None) -> dict:
+    if not os.path.exists(db_path):
+        summary = generate_dataset(db_path, books)
+        print(f"Built {books:,} books / {summary['shelves']:,} shelves in {summary['build_seconds']:.1f}s")
+
+    close_read_pool()
+    db_tables = setup_database(db_path, migrations_dir=MIGRATIONS_DIR)
+    counts = {table: db_tables['db'].execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ('user', 'bookshelf', 'book', 'permission', 'comment', 'activity', 'follow')}
+    cases = build_cases(db_tables, pick_inputs(db_tables, random.Random(3)))
+
+    results = {}
+    for name, fn in cases.items():
+        if only and name not in only:
+            continue
+        results[name] = time_case(fn, repeats)
+        print(f"  {name:<32} p50={results[name]['p50_ms']:9.3f} ms  p95={results[name]['p95_ms']:9.3f} ms")
+
+    close_read_pool()
+    db_tables['db'].conn.close()
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'rows': counts,
+            'repeats': repeats,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Print p50/p95 changes against baseline; return the names whose p50 regressed past threshold."""
+    if baseline['meta'].get('rows') != current['meta']['rows']:
+        print("  warning: the baseline was recorded on a different dataset")
+    regressions = []
+    print(f"\n  vs {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta'].get('created_at', '?')})")
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"  {name:<32} new")
+            continue
+        change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:<32} p50 {before['p50_ms']:9.3f} -> {result['p50_ms']:9.3f} ms ({change:+6.1f}%)  "
+              f"p95 {before['p95_ms']:9.3f} -> {result['p95_ms']:9.3f} ms{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the models.py read functions and record p50/p95")
+    parser.add_argument('--size', choices=sorted(SIZES), default='10k')
+    parser.add_argument('--db', help="database to reuse; generated at this path if missing")
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--only', nargs='+', help="benchmark only these functions")
+    parser.add_argument('--output', help="write the results as a JSON baseline")
+    parser.add_argument('--compare', help="JSON baseline to compare against")
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help="p50 slowdown in percent that counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = args.db or os.path.join(tmpdir, f"bench_suite_{args.size}.db")
+        current = run(db_path, SIZES[args.size], args.repeats, args.only)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
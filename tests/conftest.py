@@ -19,6 +19,9 @@ from typing import Dict, Any, Optional
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Keep the cross-process cache out of data/ (each SharedCache gets its own in-memory database)
+os.environ.setdefault('SHARED_CACHE_PATH', ':memory:')
+
 
 # ============================================================================
 # Event Loop Configuration
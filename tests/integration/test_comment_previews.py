@@ -0,0 +1,107 @@
+"""
+Integration tests for batched comment previews on shelf pages.
+"""
+
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+
+
+@contextmanager
+def count_queries(db):
+    """Count SQL statements executed on the database connection."""
+    statements = []
+
+    def tracer(cursor, sql, bindings):
+        statements.append(sql)
+        return True
+
+    db.conn.exec_trace = tracer
+    try:
+        yield statements
+    finally:
+        db.conn.exec_trace = None
+
+
+def _add_commented_books(db_tables, factory, shelf, user, count):
+    from models import Comment
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        book = db_tables['books'].insert(factory.create_book(shelf.id, user.did, title=f"Book {i}"))
+        for j in range(2):
+            db_tables['comments'].insert(Comment(
+                book_id=book.id, bookshelf_id=shelf.id, user_did=user.did,
+                content=f"Comment {j} on book {i}", created_at=now + timedelta(seconds=j),
+                updated_at=now + timedelta(seconds=j)
+            ))
+
+
+def _render_shelf_books(db_tables, shelf, user):
+    """The book section of view_shelf: vote-grouped books, previews, grid and list views."""
+    from models import get_books_with_upvotes, get_comment_previews
+    from components import BookListView
+
+    books = get_books_with_upvotes(shelf.id, user.did, db_tables)
+    previews = get_comment_previews([book.id for book in books], db_tables)
+    cards = [book.as_interactive_card(can_upvote=True, user_has_upvoted=book.user_has_upvoted,
+                                      upvote_count=book.upvote_count, comment=previews.get(book.id))
+             for book in books]
+    table = BookListView(books, comment_previews=previews)
+    return books, previews, cards, table
+
+
+@pytest.mark.integration
+class TestCommentPreviews:
+    """Tests for get_comment_previews and the shelf page query count."""
+
+    def test_one_preview_per_commented_book(self, db_with_shelf, factory):
+        """Every commented book gets one of its own comments; uncommented books are absent."""
+        from models import get_comment_previews
+        db_tables, user, shelf = db_with_shelf
+        _add_commented_books(db_tables, factory, shelf, user, 3)
+        bare = db_tables['books'].insert(factory.create_book(shelf.id, user.did, title="No comments"))
+
+        book_ids = [b.id for b in db_tables['books']("bookshelf_id=?", (shelf.id,))]
+        previews = get_comment_previews(book_ids, db_tables)
+
+        assert bare.id not in previews
+        assert len(previews) == 3
+        for book_id, comment in previews.items():
+            assert comment.book_id == book_id
+            assert comment.user_handle == user.handle
+
+    def test_empty_input(self, db_tables):
+        from models import get_comment_previews
+        assert get_comment_previews([], db_tables) == {}
+
+    def test_shelf_page_query_count_is_constant(self, db_with_shelf, factory):
+        """Rendering 30 books costs the same number of queries as rendering 3."""
+        from fasthtml.common import to_xml
+        db_tables, user, shelf = db_with_shelf
+        other_shelf = db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Bigger"))
+        _add_commented_books(db_tables, factory, shelf, user, 3)
+        _add_commented_books(db_tables, factory, other_shelf, user, 30)
+
+        with count_queries(db_tables['db']) as small:
+            books, _, cards, _ = _render_shelf_books(db_tables, shelf, user)
+        with count_queries(db_tables['db']) as large:
+            large_books, _, large_cards, table = _render_shelf_books(db_tables, other_shelf, user)
+
+        assert len(books) == 3 and len(large_books) == 30
+        assert len(large) == len(small) == 2
+        assert all("comment-preview-text" in to_xml(card) for card in large_cards)
+        assert to_xml(table).count("table-comment-preview") == 30
+
+    def test_book_comments_are_compact_rows(self, db_with_shelf, factory):
+        """get_book_comments builds slotted CommentRow objects with the author joined and dates parsed."""
+        from models import get_book_comments, CommentRow
+        db_tables, user, shelf = db_with_shelf
+        _add_commented_books(db_tables, factory, shelf, user, 1)
+        book = db_tables['books']("bookshelf_id=?", (shelf.id,))[0]
+
+        comments = get_book_comments(book.id, db_tables)
+
+        assert [c.content for c in comments] == ["Comment 0 on book 0", "Comment 1 on book 0"]
+        assert all(isinstance(c, CommentRow) and not hasattr(c, '__dict__') for c in comments)
+        assert comments[0].user_handle == user.handle
+        assert isinstance(comments[0].created_at, datetime)
@@ -0,0 +1,189 @@
+"""
+Integration tests for the stored follow graph behind the network feed.
+"""
+
+import pytest
+from datetime import datetime, timezone, timedelta
+
+
+def _add_activity(db_tables, factory, author_did, count=1):
+    from models import Activity
+    shelf = db_tables['bookshelves'].insert(factory.create_bookshelf(author_did))
+    for i in range(count):
+        db_tables['activities'].insert(Activity(
+            user_did=author_did, activity_type='bookshelf_created', bookshelf_id=shelf.id,
+            created_at=datetime.now(timezone.utc) - timedelta(minutes=i)
+        ))
+    return shelf
+
+
+@pytest.mark.integration
+class TestSyncFollowGraph:
+    """Tests for sync_follow_graph and its freshness helpers."""
+
+    def test_only_differences_are_written(self, db_tables):
+        from models import sync_follow_graph
+        assert sync_follow_graph('did:plc:viewer', ['did:plc:a', 'did:plc:b'], db_tables) == {'added': 2, 'removed': 0, 'total': 2}
+        assert sync_follow_graph('did:plc:viewer', ['did:plc:b', 'did:plc:c'], db_tables) == {'added': 1, 'removed': 1, 'total': 2}
+
+        stored = db_tables['db'].q("SELECT followed_did FROM follow WHERE follower_did = ? ORDER BY followed_did", ('did:plc:viewer',))
+        assert [r['followed_did'] for r in stored] == ['did:plc:b', 'did:plc:c']
+
+    def test_staleness(self, db_tables):
+        from models import sync_follow_graph, follow_graph_is_stale
+        assert follow_graph_is_stale('did:plc:viewer', db_tables)
+
+        sync_follow_graph('did:plc:viewer', ['did:plc:a'], db_tables)
+        assert not follow_graph_is_stale('did:plc:viewer', db_tables)
+
+        db_tables['db'].execute("UPDATE follow_sync SET synced_at = datetime('now', '-2 hours')")
+        assert follow_graph_is_stale('did:plc:viewer', db_tables)
+
+    def test_empty_fetch_keeps_stored_follows(self, db_tables, mock_bluesky_auth):
+        from models import sync_follow_graph, refresh_follow_graph
+        sync_follow_graph('did:plc:viewer', ['did:plc:a'], db_tables)
+        mock_bluesky_auth.get_following_list.return_value = []
+
+        assert refresh_follow_graph({'did': 'did:plc:viewer'}, db_tables, mock_bluesky_auth) is None
+        assert db_tables['db'].q("SELECT COUNT(*) AS n FROM follow")[0]['n'] == 1
+
+
+@pytest.mark.integration
+class TestNetworkFeedFromFollowGraph:
+    """Tests that the network feed reads followed users from the follow table."""
+
+    def test_first_visit_fills_graph_then_reads_locally(self, db_with_user, factory, mock_bluesky_auth):
+        from models import get_network_activity, get_network_activity_count
+        db_tables, user = db_with_user
+        _add_activity(db_tables, factory, 'did:plc:following1', count=2)
+        _add_activity(db_tables, factory, 'did:plc:stranger')
+        auth = {'did': user.did}
+
+        assert len(get_network_activity(auth, db_tables, mock_bluesky_auth)) == 2
+        assert get_network_activity_count(auth, db_tables, mock_bluesky_auth) == 2
+        assert mock_bluesky_auth.get_following_list.call_count == 1
+
+    def test_unfollowed_users_drop_out(self, db_with_user, factory, mock_bluesky_auth):
+        from models import get_network_activity, sync_follow_graph
+        db_tables, user = db_with_user
+        _add_activity(db_tables, factory, 'did:plc:following1')
+        _add_activity(db_tables, factory, 'did:plc:following2')
+        sync_follow_graph(user.did, ['did:plc:following1', 'did:plc:following2'], db_tables)
+        auth = {'did': user.did}
+
+        assert len(get_network_activity(auth, db_tables, mock_bluesky_auth)) == 2
+        sync_follow_graph(user.did, ['did:plc:following2'], db_tables)
+        assert [a['user_did'] for a in get_network_activity(auth, db_tables, mock_bluesky_auth)] == ['did:plc:following2']
+        mock_bluesky_auth.get_following_list.assert_not_called()
+
+    def test_private_shelf_activity_hidden(self, db_with_user, factory, mock_bluesky_auth):
+        from models import Activity, get_network_activity, sync_follow_graph
+        db_tables, user = db_with_user
+        private = db_tables['bookshelves'].insert(factory.create_bookshelf('did:plc:following1', privacy='private'))
+        db_tables['activities'].insert(Activity(
+            user_did='did:plc:following1', activity_type='bookshelf_created', bookshelf_id=private.id,
+            created_at=datetime.now(timezone.utc)
+        ))
+        sync_follow_graph(user.did, ['did:plc:following1'], db_tables)
+
+        assert get_network_activity({'did': user.did}, db_tables, mock_bluesky_auth) == []
+
+
+def _inbox(db_tables, viewer_did):
+    rows = db_tables['db'].q(
+        "SELECT activity_id FROM activity_inbox WHERE viewer_did = ? ORDER BY created_at DESC, activity_id DESC", (viewer_did,)
+    )
+    return [r['activity_id'] for r in rows]
+
+
+@pytest.mark.integration
+class TestActivityInbox:
+    """Tests for fan-out of activity into per-viewer inboxes."""
+
+    def test_new_activity_fans_out_to_followers(self, db_tables, factory):
+        from models import sync_follow_graph
+        sync_follow_graph('did:plc:viewer', ['did:plc:author'], db_tables)
+        _add_activity(db_tables, factory, 'did:plc:author', count=2)
+        _add_activity(db_tables, factory, 'did:plc:stranger')
+
+        assert len(_inbox(db_tables, 'did:plc:viewer')) == 2
+
+    def test_follow_and_unfollow_update_inbox(self, db_tables, factory):
+        from models import sync_follow_graph
+        _add_activity(db_tables, factory, 'did:plc:author', count=3)
+
+        sync_follow_graph('did:plc:viewer', ['did:plc:author'], db_tables)
+        assert len(_inbox(db_tables, 'did:plc:viewer')) == 3
+
+        sync_follow_graph('did:plc:viewer', [], db_tables)
+        assert _inbox(db_tables, 'did:plc:viewer') == []
+
+    def test_inbox_keeps_newest_items(self, db_tables, factory):
+        from models import sync_follow_graph, INBOX_MAX_ITEMS
+        sync_follow_graph('did:plc:viewer', ['did:plc:author'], db_tables)
+        _add_activity(db_tables, factory, 'did:plc:author', count=INBOX_MAX_ITEMS + 5)
+
+        newest = [r['id'] for r in db_tables['db'].q(
+            "SELECT id FROM activity ORDER BY created_at DESC, id DESC LIMIT ?", (INBOX_MAX_ITEMS,)
+        )]
+        assert _inbox(db_tables, 'did:plc:viewer') == newest
+        assert db_tables['db'].q("SELECT item_count FROM activity_inbox_size")[0]['item_count'] == INBOX_MAX_ITEMS
+
+    def test_pull_authors_are_read_at_feed_time(self, db_with_user, factory, mock_bluesky_auth):
+        from models import sync_follow_graph, refresh_inbox_pull_authors, get_network_activity
+        db_tables, user = db_with_user
+        sync_follow_graph(user.did, ['did:plc:following1', 'did:plc:following2'], db_tables)
+        sync_follow_graph('did:plc:other', ['did:plc:following1'], db_tables)
+        _add_activity(db_tables, factory, 'did:plc:following1')
+        _add_activity(db_tables, factory, 'did:plc:following2')
+
+        assert refresh_inbox_pull_authors(db_tables, min_followers=2) == {'pull': 1, 'added': 1, 'removed': 0}
+        _add_activity(db_tables, factory, 'did:plc:following1')
+
+        assert len(_inbox(db_tables, user.did)) == 1
+        feed = get_network_activity({'did': user.did}, db_tables, mock_bluesky_auth, use_inbox=True)
+        assert sorted(a['user_did'] for a in feed) == ['did:plc:following1', 'did:plc:following1', 'did:plc:following2']
+
+        assert refresh_inbox_pull_authors(db_tables, min_followers=3)['removed'] == 1
+        assert len(_inbox(db_tables, user.did)) == 3
+
+    def test_inbox_and_join_feeds_match(self, db_with_user, factory, mock_bluesky_auth):
+        from models import sync_follow_graph, rebuild_activity_inboxes, get_network_activity, get_network_activity_count
+        db_tables, user = db_with_user
+        for author in ('did:plc:following1', 'did:plc:following2', 'did:plc:stranger'):
+            _add_activity(db_tables, factory, author, count=3)
+        sync_follow_graph(user.did, ['did:plc:following1', 'did:plc:following2'], db_tables)
+        auth = {'did': user.did}
+
+        assert rebuild_activity_inboxes(db_tables) == 6
+        inbox = get_network_activity(auth, db_tables, mock_bluesky_auth, limit=4, use_inbox=True)
+        joined = get_network_activity(auth, db_tables, mock_bluesky_auth, limit=4, use_inbox=False)
+        assert [a['id'] for a in inbox] == [a['id'] for a in joined]
+        nxt = get_network_activity(auth, db_tables, mock_bluesky_auth, limit=4, cursor=inbox.next_cursor, use_inbox=True)
+        assert len(nxt) == 2 and nxt.next_cursor is None
+        assert get_network_activity_count(auth, db_tables, mock_bluesky_auth, use_inbox=True) == 6
+
+    def test_feed_continues_past_the_inbox(self, db_with_user, factory, mock_bluesky_auth):
+        from models import sync_follow_graph, get_network_activity, get_network_activity_count, INBOX_MAX_ITEMS
+        db_tables, user = db_with_user
+        sync_follow_graph(user.did, ['did:plc:following1', 'did:plc:following2'], db_tables)
+        _add_activity(db_tables, factory, 'did:plc:following1', count=INBOX_MAX_ITEMS + 5)
+        _add_activity(db_tables, factory, 'did:plc:following2', count=3)
+        auth = {'did': user.did}
+        joined = [a['id'] for a in get_network_activity(auth, db_tables, mock_bluesky_auth, limit=1000, use_inbox=False)]
+        assert len(joined) == INBOX_MAX_ITEMS + 8 and len(_inbox(db_tables, user.did)) == INBOX_MAX_ITEMS
+
+        pages = [get_network_activity(auth, db_tables, mock_bluesky_auth, limit=40, with_total=True)]
+        while pages[-1].next_cursor:
+            pages.append(get_network_activity(auth, db_tables, mock_bluesky_auth, limit=40, cursor=pages[-1].next_cursor))
+        assert [a['id'] for page in pages for a in page] == joined
+        assert pages[0].total == get_network_activity_count(auth, db_tables, mock_bluesky_auth) == len(joined)
+
+        # Back from the last page, across the inbox's oldest row
+        back = [pages[-1]]
+        while back[-1].prev_cursor:
+            back.append(get_network_activity(auth, db_tables, mock_bluesky_auth, limit=40, cursor=back[-1].prev_cursor))
+        assert [a['id'] for page in reversed(back) for a in page] == joined
+
+        straddling = get_network_activity(auth, db_tables, mock_bluesky_auth, limit=40, offset=480)
+        assert [a['id'] for a in straddling] == joined[480:520]
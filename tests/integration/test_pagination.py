@@ -0,0 +1,313 @@
+"""
+Integration tests for keyset (cursor) pagination of shelf listings and network activity.
+"""
+
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+
+
+@contextmanager
+def count_queries(db):
+    """Collect SQL statements executed on the database connection."""
+    statements = []
+
+    def tracer(cursor, sql, bindings):
+        statements.append(sql)
+        return True
+
+    db.conn.exec_trace = tracer
+    try:
+        yield statements
+    finally:
+        db.conn.exec_trace = None
+
+
+def _add_public_shelves(db_tables, factory, user, count):
+    """Add public shelves with distinct timestamps and a varying number of books."""
+    start = datetime.now(timezone.utc) - timedelta(days=count)
+    shelves = []
+    for i in range(count):
+        stamp = start + timedelta(hours=i)
+        shelf = db_tables['bookshelves'].insert(factory.create_bookshelf(
+            user.did, name=f"Shelf {i}", created_at=stamp, updated_at=stamp
+        ))
+        for j in range(1 + i % 4):
+            db_tables['books'].insert(factory.create_book(shelf.id, user.did, title=f"Book {i}-{j}"))
+        shelves.append(shelf)
+    return shelves
+
+
+def _walk(fetch, limit):
+    """Follow next cursors from the first page; return the pages of shelf ids."""
+    pages = []
+    cursor = None
+    while True:
+        page = fetch(limit=limit, cursor=cursor)
+        pages.append([item.id for item in page])
+        if not page.next_cursor:
+            return pages
+        cursor = page.next_cursor
+
+
+@pytest.mark.integration
+class TestCursorEncoding:
+    """Tests for the opaque cursor tokens."""
+
+    def test_round_trip(self):
+        from models import encode_cursor, decode_cursor
+        token = encode_cursor(["2026-01-01 10:00:00", 42], "prev")
+        assert decode_cursor(token) == (["2026-01-01 10:00:00", 42], "prev")
+
+    @pytest.mark.parametrize("token", [None, "", "not-a-cursor", "e30"])
+    def test_malformed_cursor_is_first_page(self, token):
+        from models import decode_cursor
+        assert decode_cursor(token) == (None, "next")
+
+
+@pytest.mark.integration
+class TestShelfListingCursors:
+    """Tests that cursor pages cover a listing exactly once."""
+
+    def test_public_shelves_pages_forward_and_back(self, db_with_user, factory):
+        from models import get_public_shelves_with_stats
+        db_tables, user = db_with_user
+        _add_public_shelves(db_tables, factory, user, 7)
+
+        everything = [s.id for s in get_public_shelves_with_stats(db_tables, limit=20)]
+        pages = _walk(lambda **kw: get_public_shelves_with_stats(db_tables, **kw), 3)
+        assert [len(p) for p in pages] == [3, 3, 1]
+        assert sum(pages, []) == everything
+
+        second = get_public_shelves_with_stats(db_tables, limit=3, cursor=get_public_shelves_with_stats(db_tables, limit=3).next_cursor)
+        back = get_public_shelves_with_stats(db_tables, limit=3, cursor=second.prev_cursor)
+        assert [s.id for s in back] == pages[0]
+        assert back.prev_cursor is None
+
+    @pytest.mark.parametrize("sort_by", ["updated_at", "name", "book_count", "recently_active"])
+    def test_search_sorts_page_without_overlap(self, db_with_user, factory, sort_by):
+        from models import search_shelves
+        db_tables, user = db_with_user
+        _add_public_shelves(db_tables, factory, user, 8)
+
+        everything = [s.id for s in search_shelves(db_tables, sort_by=sort_by, limit=20)]
+        pages = _walk(lambda **kw: search_shelves(db_tables, sort_by=sort_by, **kw), 3)
+        assert sum(pages, []) == everything
+
+    def test_user_shelves_include_memberships(self, db_with_permissions, factory):
+        from models import get_user_shelves
+        db_tables, shelf, users = db_with_permissions
+        _add_public_shelves(db_tables, factory, users['viewer'], 4)
+
+        pages = _walk(lambda **kw: get_user_shelves(users['viewer'].did, db_tables, **kw), 2)
+        ids = sum(pages, [])
+        assert len(ids) == len(set(ids)) == 5
+        assert shelf.id in ids
+
+    def test_malformed_cursor_falls_back_to_first_page(self, db_with_user, factory):
+        from models import get_public_shelves
+        db_tables, user = db_with_user
+        _add_public_shelves(db_tables, factory, user, 4)
+
+        first = get_public_shelves(db_tables, limit=2)
+        assert [s.id for s in get_public_shelves(db_tables, limit=2, cursor="garbage")] == [s.id for s in first]
+
+
+@pytest.mark.integration
+class TestMixedShelfCursors:
+    """Tests for the two-stream smart mix cursor."""
+
+    def test_mix_pages_never_repeat(self, db_with_user, factory):
+        from models import get_mixed_public_shelves, refresh_shelf_mix
+        db_tables, user = db_with_user
+        shelves = _add_public_shelves(db_tables, factory, user, 11)
+        refresh_shelf_mix(db_tables)
+
+        pages = _walk(lambda **kw: get_mixed_public_shelves(db_tables, **kw), 4)
+        ids = sum(pages, [])
+        assert len(ids) == len(set(ids))
+        assert set(ids) == {s.id for s in shelves}
+        assert all(len(p) == 4 for p in pages[:-1])
+
+    def test_empty_shelves_are_not_mixed(self, db_with_user, factory):
+        from models import get_mixed_public_shelves, refresh_shelf_mix
+        db_tables, user = db_with_user
+        empty = db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Empty"))
+        _add_public_shelves(db_tables, factory, user, 3)
+        refresh_shelf_mix(db_tables)
+
+        page = get_mixed_public_shelves(db_tables, limit=10)
+        assert empty.id not in {s.id for s in page}
+        assert page.next_cursor is None
+
+
+    def test_seeded_pages_are_stable(self, db_with_user, factory):
+        """A seed always gives the same pages, by cursor or by offset; another seed reorders them."""
+        from models import get_mixed_public_shelves, refresh_shelf_mix
+        db_tables, user = db_with_user
+        shelves = _add_public_shelves(db_tables, factory, user, 11)
+        refresh_shelf_mix(db_tables)
+
+        pages = _walk(lambda **kw: get_mixed_public_shelves(db_tables, seed=5, **kw), 4)
+        assert pages == _walk(lambda **kw: get_mixed_public_shelves(db_tables, seed=5, **kw), 4)
+        assert pages == [[s.id for s in get_mixed_public_shelves(db_tables, limit=4, offset=o, seed=5)] for o in (0, 4, 8)]
+
+        other = [_walk(lambda **kw: get_mixed_public_shelves(db_tables, seed=seed, **kw), 4) for seed in range(6, 10)]
+        assert any(p != pages for p in other)
+        assert all(sorted(sum(p, [])) == sorted(s.id for s in shelves) for p in other)
+
+    def test_cursor_keeps_its_ranking_across_refresh(self, db_with_user, factory):
+        """A cursor pages the ranking it was issued for; new shelves appear from the next ranking."""
+        from models import get_mixed_public_shelves, refresh_shelf_mix
+        db_tables, user = db_with_user
+        shelves = _add_public_shelves(db_tables, factory, user, 6)
+        refresh_shelf_mix(db_tables)
+
+        first = get_mixed_public_shelves(db_tables, limit=3, seed=1)
+        added = db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Late Shelf"))
+        db_tables['books'].insert(factory.create_book(added.id, user.did))
+        refresh_shelf_mix(db_tables)
+
+        second = get_mixed_public_shelves(db_tables, limit=3, cursor=first.next_cursor)
+        assert sorted(s.id for s in first + second) == sorted(s.id for s in shelves)
+        assert second.next_cursor is None
+        assert added.id in {s.id for s in get_mixed_public_shelves(db_tables, limit=10, seed=1)}
+
+    def test_reads_never_rank(self, db_with_user, factory):
+        """Before the first ranking the newest shelves are listed; a stale ranking is served as is."""
+        from models import get_mixed_public_shelves, refresh_shelf_mix, shelf_mix_is_stale
+        db_tables, user = db_with_user
+        shelves = _add_public_shelves(db_tables, factory, user, 5)
+
+        pages = _walk(lambda **kw: get_mixed_public_shelves(db_tables, **kw), 2)
+        assert sorted(sum(pages, [])) == sorted(s.id for s in shelves)
+        assert shelf_mix_is_stale(db_tables)
+        assert not db_tables['db'].q("SELECT 1 FROM shelf_mix_generation")
+
+        refresh_shelf_mix(db_tables)
+        db_tables['db'].execute("UPDATE shelf_mix_generation SET created_at = datetime('now', '-1 day')")
+        get_mixed_public_shelves(db_tables, limit=2)
+        assert db_tables['db'].q("SELECT COUNT(*) AS n FROM shelf_mix_generation")[0]['n'] == 1
+
+    def test_stale_ranking_is_refreshed_once(self, db_with_user, factory):
+        from models import refresh_shelf_mix, refresh_stale_shelf_mix, shelf_mix_is_stale
+        db_tables, user = db_with_user
+        _add_public_shelves(db_tables, factory, user, 3)
+        refresh_shelf_mix(db_tables)
+
+        assert refresh_stale_shelf_mix(db_tables) == 0  # still fresh
+        db_tables['db'].execute("UPDATE shelf_mix_generation SET created_at = datetime('now', '-1 day')")
+        assert shelf_mix_is_stale(db_tables)
+        assert refresh_stale_shelf_mix(db_tables) == 3
+        assert refresh_stale_shelf_mix(db_tables) == 0
+        assert not shelf_mix_is_stale(db_tables)
+
+    def test_ranking_interleaves_active_and_newest(self, db_with_user, factory):
+        """Positions alternate between the most active and the newest shelves not placed yet."""
+        from models import refresh_shelf_mix
+        db_tables, user = db_with_user
+        shelves = _add_public_shelves(db_tables, factory, user, 8)  # later shelves are newer
+        scores = {row['bookshelf_id']: row['activity_score']
+                  for row in db_tables['db'].q("SELECT bookshelf_id, activity_score FROM shelf_stats")}
+        most_active = max(shelves, key=lambda s: (scores[s.id], s.id))
+
+        assert refresh_shelf_mix(db_tables) == 8
+        order = [row['bookshelf_id'] for row in db_tables['db'].q(
+            "SELECT bookshelf_id FROM shelf_mix WHERE generation = (SELECT MAX(generation) FROM shelf_mix) ORDER BY position")]
+        assert order[0] == most_active.id
+        assert order[1] == next(s.id for s in reversed(shelves) if s.id != most_active.id)
+        assert sorted(order) == sorted(s.id for s in shelves)
+
+
+@pytest.mark.integration
+class TestNetworkActivityCursor:
+    """Tests for cursor paging of network activity."""
+
+    def test_activity_pages(self, db_with_user, factory, mock_bluesky_auth):
+        from models import Activity, get_network_activity
+        db_tables, user = db_with_user
+        shelf = db_tables['bookshelves'].insert(factory.create_bookshelf('did:plc:following1'))
+        start = datetime.now(timezone.utc) - timedelta(hours=1)
+        for i in range(5):
+            db_tables['activities'].insert(Activity(
+                user_did='did:plc:following1', activity_type='bookshelf_created',
+                bookshelf_id=shelf.id, created_at=start + timedelta(minutes=i)
+            ))
+        auth = {'did': user.did}
+
+        first = get_network_activity(auth, db_tables, mock_bluesky_auth, limit=3)
+        second = get_network_activity(auth, db_tables, mock_bluesky_auth, limit=3, cursor=first.next_cursor)
+
+        assert len(first) == 3 and len(second) == 2
+        assert second.next_cursor is None
+        times = [a['created_at'] for a in first + second]
+        assert times == sorted(times, reverse=True)
+        assert first[0]['bookshelf_name'] == shelf.name
+        assert first[0]['user_profile']['handle'] == 'user1.bsky.social'
+
+
+@pytest.mark.integration
+class TestPagedTotals:
+    """Tests for listing totals returned by the page query itself."""
+
+    def test_total_matches_count_functions(self, db_with_user, factory, mock_bluesky_auth):
+        from models import (get_public_shelves_with_stats, get_public_shelves_count, get_mixed_public_shelves,
+                            get_network_activity, get_network_activity_count, Activity)
+        db_tables, user = db_with_user
+        _add_public_shelves(db_tables, factory, user, 7)
+        shelf = db_tables['bookshelves'].insert(factory.create_bookshelf('did:plc:following1'))
+        for _ in range(3):
+            db_tables['activities'].insert(Activity(
+                user_did='did:plc:following1', activity_type='bookshelf_created',
+                bookshelf_id=shelf.id, created_at=datetime.now(timezone.utc)
+            ))
+        auth = {'did': user.did}
+
+        first = get_public_shelves_with_stats(db_tables, limit=3, with_total=True)
+        assert first.total == get_public_shelves_count(db_tables) == 7  # empty shelves are not listed
+        assert get_public_shelves_with_stats(db_tables, limit=3, cursor=first.next_cursor, with_total=True).total == 7
+        assert get_public_shelves_with_stats(db_tables, limit=3).total is None
+
+        mix = get_mixed_public_shelves(db_tables, limit=3, with_total=True)
+        assert mix.total == 7
+        assert get_mixed_public_shelves(db_tables, limit=3, cursor=mix.next_cursor, with_total=True).total == 7
+
+        feed = get_network_activity(auth, db_tables, mock_bluesky_auth, limit=2, with_total=True)
+        assert feed.total == get_network_activity_count(auth, db_tables, mock_bluesky_auth) == 3
+
+    def test_page_and_total_in_one_statement(self, db_with_user, factory):
+        from models import search_shelves
+        db_tables, user = db_with_user
+        _add_public_shelves(db_tables, factory, user, 5)
+
+        with count_queries(db_tables['db']) as statements:
+            page = search_shelves(db_tables, sort_by="name", limit=2, with_total=True)
+        assert page.total == 5 and len(page) == 2
+        assert len(statements) == 1
+
+    def test_page_past_the_end_counts_its_own_listing(self, db_with_user, factory):
+        from models import search_shelves
+        db_tables, user = db_with_user
+        _add_public_shelves(db_tables, factory, user, 5)
+        for name in ("Poetry A", "Poetry B"):
+            shelf = db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name=name))
+            db_tables['books'].insert(factory.create_book(shelf.id, user.did, title=f"{name} book"))
+
+        page = search_shelves(db_tables, query="Poetry", limit=2, offset=10, with_total=True)
+        assert len(page) == 0
+        assert page.total == 2  # the matches, not every public shelf
+
+    def test_large_totals_are_cached(self, db_with_user, factory, monkeypatch):
+        import models
+        db_tables, user = db_with_user
+        _add_public_shelves(db_tables, factory, user, 5)
+        monkeypatch.setattr(models, 'PAGED_TOTAL_CACHE_MIN_ROWS', 3)
+        monkeypatch.setattr(models, '_paged_totals', {})
+
+        first = models.get_public_shelves_with_stats(db_tables, limit=2, with_total=True)
+        db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Late"))
+        with count_queries(db_tables['db']) as statements:
+            second = models.get_public_shelves_with_stats(db_tables, limit=2, with_total=True)
+
+        assert first.total == second.total == 5  # approximate until the cache expires
+        assert "OVER ()" not in statements[0]
@@ -0,0 +1,82 @@
+"""
+Integration tests for the Bluesky profile cache behind the network feed.
+"""
+
+import pytest
+
+
+class ProfileAuth:
+    """BlueskyAuth stand-in that knows a fixed set of profiles and records each fetch."""
+
+    def __init__(self, known, fail=False):
+        self.known = known
+        self.fail = fail
+        self.requests = []
+
+    def get_profiles_batch(self, dids, auth_data, not_found=None):
+        self.requests.append(list(dids))
+        if self.fail:
+            return {}
+        found = {did: {'did': did, 'handle': handle, 'display_name': handle, 'avatar_url': ''}
+                 for did, handle in self.known.items() if did in dids}
+        if not_found is not None:
+            not_found.update(did for did in dids if did not in found)
+        return found
+
+
+@pytest.mark.integration
+class TestProfileCache:
+    """Tests for store_profiles, get_cached_profiles and the get_profiles read-through."""
+
+    def test_fetched_profiles_are_served_from_cache(self, db_tables):
+        from models import get_profiles
+        auth = ProfileAuth({'did:plc:a': 'a.test', 'did:plc:b': 'b.test'})
+
+        first = get_profiles(['did:plc:a', 'did:plc:b'], {}, db_tables, auth)
+        second = get_profiles(['did:plc:b', 'did:plc:a', 'did:plc:a'], {}, db_tables, auth)
+
+        assert first == second
+        assert second['did:plc:a']['handle'] == 'a.test'
+        assert auth.requests == [['did:plc:a', 'did:plc:b']]
+
+    def test_only_misses_are_fetched(self, db_tables):
+        from models import get_profiles, store_profiles
+        store_profiles({'did:plc:a': {'did': 'did:plc:a', 'handle': 'a.test'}}, db_tables)
+        auth = ProfileAuth({'did:plc:b': 'b.test'})
+
+        profiles = get_profiles(['did:plc:a', 'did:plc:b'], {}, db_tables, auth)
+
+        assert set(profiles) == {'did:plc:a', 'did:plc:b'}
+        assert auth.requests == [['did:plc:b']]
+
+    def test_missing_profiles_are_negatively_cached(self, db_tables):
+        from models import get_profiles, get_cached_profiles
+        auth = ProfileAuth({})
+
+        assert get_profiles(['did:plc:deleted'], {}, db_tables, auth) == {}
+        assert get_profiles(['did:plc:deleted'], {}, db_tables, auth) == {}
+        assert auth.requests == [['did:plc:deleted']]
+        assert get_cached_profiles(['did:plc:deleted'], db_tables)[1] == {'did:plc:deleted'}
+
+        db_tables['db'].execute("UPDATE profile_cache SET fetched_at = datetime('now', '-2 hours')")
+        get_profiles(['did:plc:deleted'], {}, db_tables, auth)
+        assert len(auth.requests) == 2
+
+    def test_failed_fetch_is_not_negatively_cached(self, db_tables):
+        from models import get_profiles
+        auth = ProfileAuth({'did:plc:a': 'a.test'}, fail=True)
+
+        assert get_profiles(['did:plc:a'], {}, db_tables, auth) == {}
+        auth.fail = False
+        assert get_profiles(['did:plc:a'], {}, db_tables, auth)['did:plc:a']['handle'] == 'a.test'
+
+    def test_expired_profile_is_refetched_and_kept_if_that_fails(self, db_tables):
+        from models import get_profiles, store_profiles
+        store_profiles({'did:plc:a': {'did': 'did:plc:a', 'handle': 'old.test'}}, db_tables)
+        db_tables['db'].execute("UPDATE profile_cache SET fetched_at = datetime('now', '-2 days')")
+        auth = ProfileAuth({'did:plc:a': 'new.test'}, fail=True)
+
+        assert get_profiles(['did:plc:a'], {}, db_tables, auth)['did:plc:a']['handle'] == 'old.test'
+        auth.fail = False
+        assert get_profiles(['did:plc:a'], {}, db_tables, auth)['did:plc:a']['handle'] == 'new.test'
+        assert len(auth.requests) == 2
@@ -0,0 +1,279 @@
+"""
+Query-plan regression tests for the SQL in models.py.
+
+Every function in models.py that runs SQL is called against a seeded,
+fully migrated database while its statements are recorded. Each recorded
+statement is then run through EXPLAIN QUERY PLAN, and the test fails on a
+full scan of a table or a temp B-tree sort that is not in EXPECTED_PLANS.
+Scans of a query's own subqueries and CTEs, FTS lookups, and sorts of only
+the last ORDER BY term (ties of an index-ordered key) are fine.
+"""
+
+import ast
+import os
+import re
+import pytest
+from datetime import datetime, timezone
+
+MODELS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'models.py')
+
+OWNER = "did:plc:planowner"
+MEMBER = "did:plc:planmember"
+
+
+class StoredGraphAuth:
+    """BlueskyAuth stand-in returning a fixed follow list."""
+
+    def get_following_list(self, auth_data, limit=None):
+        return [OWNER]
+
+    def get_profiles_batch(self, dids, auth_data, not_found=None):
+        return {}
+
+
+# Calls covering every SQL statement in models.py: label -> fn(db_tables, seed).
+# A label's function name is the part before any "[...]".
+def _calls():
+    import models as m
+    auth = {'did': MEMBER}
+    calls = {
+        'check_permission': lambda t, s: m.check_permission(s['shelf'], MEMBER, ['contributor'], t),
+        'can_delete_comment': lambda t, s: m.can_delete_comment(s['comment'], "did:plc:planviewer", t),
+        'get_user_role': lambda t, s: m.get_user_role(s['shelf'], MEMBER, t),
+        'validate_invite': lambda t, s: m.validate_invite("plan-invite", t),
+        'get_books_with_upvotes': lambda t, s: m.get_books_with_upvotes(s['shelf'].id, MEMBER, t),
+        'get_work_votes': lambda t, s: m.get_work_votes(s['book'].id, MEMBER, t),
+        'get_shelf_work': lambda t, s: m.get_shelf_work(s['shelf'].id, 1, t),
+        'log_activity': lambda t, s: m.log_activity(OWNER, 'book_added', t, s['shelf'].id, s['book'].id),
+        'sync_follow_graph': lambda t, s: m.sync_follow_graph(MEMBER, [OWNER, "did:plc:other"], t),
+        'follow_graph_synced_at': lambda t, s: m.follow_graph_synced_at(MEMBER, t),
+        'refresh_follow_graph': lambda t, s: m.refresh_follow_graph(auth, t, StoredGraphAuth()),
+        'refresh_inbox_pull_authors': lambda t, s: m.refresh_inbox_pull_authors(t),
+        'store_profiles': lambda t, s: m.store_profiles({OWNER: {'handle': "planowner.test"}}, t, ["did:plc:gone"]),
+        'get_cached_profiles': lambda t, s: m.get_cached_profiles([OWNER, MEMBER], t),
+        '_inbox_boundary': lambda t, s: m._inbox_boundary(MEMBER, t),
+        'get_network_activity[inbox]': lambda t, s: m.get_network_activity(auth, t, StoredGraphAuth(), use_inbox=True),
+        'get_network_activity[join]': lambda t, s: m.get_network_activity(auth, t, StoredGraphAuth(), use_inbox=False),
+        'get_network_activity_count[inbox]': lambda t, s: m.get_network_activity_count(auth, t, StoredGraphAuth(), use_inbox=True),
+        'get_network_activity_count[join]': lambda t, s: m.get_network_activity_count(auth, t, StoredGraphAuth(), use_inbox=False),
+        'get_shelf_by_slug': lambda t, s: m.get_shelf_by_slug(s['shelf'].slug, t),
+        'get_shelf_version': lambda t, s: m.get_shelf_version(s['shelf'].id, t),
+        'get_explore_version': lambda t, s: m.get_explore_version(t),
+        'get_book_count_for_shelf': lambda t, s: m.get_book_count_for_shelf(s['shelf'].id, t),
+        'get_public_shelves': lambda t, s: m.get_public_shelves(t),
+        'get_public_shelves_count': lambda t, s: m.get_public_shelves_count(t),
+        'search_shelves_count[fts]': lambda t, s: m.search_shelves_count(t, query="plan"),
+        'search_shelves_count[like]': lambda t, s: m.search_shelves_count(t, query="plan", search_mode="like"),
+        'get_user_shelves_count': lambda t, s: m.get_user_shelves_count(MEMBER, t),
+        'get_user_shelves': lambda t, s: m.get_user_shelves(MEMBER, t, with_total=True),
+        'refresh_shelf_stats': lambda t, s: m.refresh_shelf_stats(t, s['shelf'].id),
+        'get_public_shelves_with_stats': lambda t, s: m.get_public_shelves_with_stats(t, with_total=True),
+        'search_shelves[relevance]': lambda t, s: m.search_shelves(t, query="plan", sort_by="relevance"),
+        'search_shelves[like]': lambda t, s: m.search_shelves(t, query="plan", search_mode="like"),
+        'get_recent_community_books': lambda t, s: m.get_recent_community_books(t),
+        'calculate_shelf_activity_score': lambda t, s: m.calculate_shelf_activity_score(s['shelf'].id, t),
+        'refresh_shelf_mix': lambda t, s: m.refresh_shelf_mix(t),
+        '_shelf_mix_generation': lambda t, s: m._shelf_mix_generation(t),
+        'get_mixed_public_shelves': lambda t, s: m.get_mixed_public_shelves(t, with_total=True, seed=7),
+        'get_user_by_handle': lambda t, s: m.get_user_by_handle("planowner.test", t),
+        'get_user_by_did': lambda t, s: m.get_user_by_did(OWNER, t),
+        'get_user_profile_version': lambda t, s: m.get_user_profile_version(OWNER, t),
+        'get_user_public_shelves': lambda t, s: m.get_user_public_shelves(OWNER, t, viewer_did=MEMBER),
+        'get_user_activity': lambda t, s: m.get_user_activity(OWNER, t, viewer_did=MEMBER),
+        'search_users': lambda t, s: m.search_users(t, "plan", viewer_did=MEMBER),
+        'get_book_by_id': lambda t, s: m.get_book_by_id(s['book'].id, t),
+        'get_book_version': lambda t, s: m.get_book_version(s['book'].id, t),
+        'get_book_comments': lambda t, s: m.get_book_comments(s['book'].id, t),
+        'get_book_comments[shelf]': lambda t, s: m.get_book_comments(s['book'].id, t, bookshelf_id=s['shelf'].id),
+        'get_comment_previews': lambda t, s: m.get_comment_previews([s['book'].id], t),
+        'get_book_activity': lambda t, s: m.get_book_activity(s['book'].id, t),
+        'get_book_shelves': lambda t, s: m.get_book_shelves(s['book'].id, t, viewer_did=MEMBER),
+    }
+    for sort_by in m.SHELF_SORT_KEYS:
+        calls[f'search_shelves[{sort_by}]'] = lambda t, s, sort_by=sort_by: m.search_shelves(t, sort_by=sort_by, with_total=True)
+    return calls
+
+
+# Functions that run SQL but are not plan-checked
+NOT_CHECKED = {
+    'safe_execute_query': "runs the SQL of its callers",
+    'paged_query': "runs the SQL of its callers",
+    '_listing_total': "runs the SQL of its callers",
+    '_network_activity_page': "runs the SQL of get_network_activity",
+    'validate_primary_key_setup': "schema check at startup",
+    'setup_database': "schema setup",
+    'apply_migration_scripts': "schema setup",
+    'install_triggers': "schema setup",
+    'rebuild_activity_inboxes': "full rebuild, reads every row by design",
+    'rebuild_works': "full rebuild, reads every row by design",
+    'rebuild_search_index': "full rebuild, reads every row by design",
+}
+
+# Accepted scans and sorts: label -> {plan line pattern: reason}
+_SHELF_STATS_SORT = "sorts by a shelf_stats column; public shelves are read through the privacy index"
+EXPECTED_PLANS = {
+    'get_network_activity[inbox]': {
+        r"USE TEMP B-TREE FOR ORDER BY": "merges the viewer's inbox with pull authors' activity; the inbox is capped "
+                                         "per viewer, and the follow join only reads past its oldest row",
+    },
+    'get_network_activity[join]': {
+        r"USE TEMP B-TREE FOR ORDER BY": "follow join, read for viewers with an empty inbox and with use_inbox=False",
+    },
+    'search_shelves_count[fts]': {
+        r"USE TEMP B-TREE FOR ORDER BY": "FTS match sets are unioned inside IN (...)",
+    },
+    'search_shelves_count[like]': {
+        r"SCAN (bs|b)\b": "substring search reads every shelf and book by design",
+        r"USE TEMP B-TREE": "substring search reads every shelf and book by design",
+    },
+    'search_shelves[like]': {
+        r"SCAN (bs|b)\b": "substring search reads every shelf and book by design",
+        r"USE TEMP B-TREE": "substring search reads every shelf and book by design",
+    },
+    'search_shelves[relevance]': {
+        r"USE TEMP B-TREE FOR (GROUP BY|ORDER BY)": "ranks FTS matches by bm25, which has no index",
+    },
+    'get_user_shelves_count': {
+        r"USE TEMP B-TREE FOR (DISTINCT|ORDER BY)": "UNION of one user's owned and member shelves",
+    },
+    'get_user_shelves': {
+        r"USE TEMP B-TREE FOR (DISTINCT|ORDER BY)": "UNION of one user's owned and member shelves",
+    },
+    'refresh_shelf_mix': {
+        r"SCAN (bs|ss)\b": "periodic job that ranks every public shelf",
+    },
+    '_shelf_mix_generation': {
+        r"SCAN shelf_mix_generation": "holds the current and previous generation only",
+    },
+    'get_mixed_public_shelves': {
+        r"SCAN shelf_mix_generation": "holds the current and previous generation only",
+    },
+    'get_comment_previews': {
+        r"USE TEMP B-TREE FOR ORDER BY": "picks a random preview among each book's oldest comments",
+    },
+    'get_recent_community_books': {
+        r"SCAN b USING INDEX idx_book_added": "walks books newest first and stops at the limit",
+    },
+    'search_users': {
+        r"SCAN u\b": "substring search over users by design",
+        r"USE TEMP B-TREE": "groups each matching user's shelf and activity counts",
+    },
+    'refresh_inbox_pull_authors': {
+        r"SCAN": "periodic job that recounts followers per author",
+        r"USE TEMP B-TREE": "periodic job that recounts followers per author",
+    },
+    'search_shelves[name]': {r"USE TEMP B-TREE FOR ORDER BY": "sorts public shelves by name, which is not indexed"},
+    'search_shelves[book_count]': {r"USE TEMP B-TREE FOR ORDER BY": _SHELF_STATS_SORT},
+    'search_shelves[recently_active]': {r"USE TEMP B-TREE FOR ORDER BY": _SHELF_STATS_SORT},
+    'search_shelves[most_contributors]': {r"USE TEMP B-TREE FOR ORDER BY": _SHELF_STATS_SORT},
+    'search_shelves[most_viewers]': {r"USE TEMP B-TREE FOR ORDER BY": _SHELF_STATS_SORT},
+    'search_shelves[smart_mix]': {r"USE TEMP B-TREE FOR ORDER BY": _SHELF_STATS_SORT},
+}
+
+SKIPPED_STATEMENTS = ("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "CREATE", "DROP")
+
+
+def unexpected_plan_lines(plan: list[tuple], expected: dict) -> list[str]:
+    """Plan lines that scan a table or sort in a temp B-tree and match no expected pattern."""
+    # Subqueries and CTEs appear as CO-ROUTINE/MATERIALIZE nodes; scanning those is fine
+    intermediate = {detail.split(" ", 1)[1] for *_, detail in plan
+                    if detail.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+    problems = []
+    for *_, detail in plan:
+        if detail.startswith("SCAN "):
+            target = detail[5:].split(" ")[0]
+            if (target in intermediate or target.startswith("(subquery-") or "VIRTUAL TABLE" in detail
+                    or target == "CONSTANT"):
+                continue
+        elif not detail.startswith("USE TEMP B-TREE") or detail.endswith("LAST TERM OF ORDER BY"):
+            continue
+        if not any(re.search(pattern, detail) for pattern in expected):
+            problems.append(detail)
+    return problems
+
+
+@pytest.fixture(scope="module")
+def seeded_db(tmp_path_factory):
+    """A fully migrated file database with a little of everything, reads on the main connection."""
+    from models import (setup_database, close_read_pool, User, Bookshelf, Book, Permission,
+                        BookshelfInvite, Comment, log_activity, sync_follow_graph)
+    project_root = os.path.dirname(MODELS_PATH)
+    db_tables = setup_database(str(tmp_path_factory.mktemp("plans") / "plans.db"),
+                               migrations_dir=os.path.join(project_root, 'migrations'))
+    close_read_pool()
+
+    now = datetime.now(timezone.utc)
+    for did, handle in ((OWNER, "planowner.test"), (MEMBER, "planmember.test")):
+        db_tables['users'].insert(User(did=did, handle=handle, display_name=handle, created_at=now))
+    shelf = db_tables['bookshelves'].insert(Bookshelf(
+        name="Plan Shelf", owner_did=OWNER, slug="plan-shelf", description="plans",
+        created_at=now, updated_at=now))
+    book = db_tables['books'].insert(Book(
+        bookshelf_id=shelf.id, title="Plan Book", author="Plan Author", isbn="9780000000002",
+        added_by_did=OWNER, added_at=now))
+    db_tables['permissions'].insert(Permission(
+        bookshelf_id=shelf.id, user_did=MEMBER, role='contributor', granted_by_did=OWNER, granted_at=now))
+    db_tables['bookshelf_invites'].insert(BookshelfInvite(
+        bookshelf_id=shelf.id, invite_code="plan-invite", role='viewer', created_by_did=OWNER, created_at=now))
+    comment = db_tables['comments'].insert(Comment(
+        book_id=book.id, bookshelf_id=shelf.id, user_did=MEMBER, content="plan comment", created_at=now))
+    log_activity(OWNER, 'book_added', db_tables, shelf.id, book.id)
+    sync_follow_graph(MEMBER, [OWNER], db_tables)
+
+    yield db_tables, {'shelf': shelf, 'book': book, 'comment': comment}
+    db_tables['db'].conn.close()
+
+
+def _recorded_statements(db_tables, call, seed) -> dict:
+    """SQL statement -> bindings for every statement call runs on the main connection."""
+    statements = {}
+
+    def tracer(cursor, sql, bindings):
+        if not sql.lstrip().upper().startswith(SKIPPED_STATEMENTS) and 'sqlite_master' not in sql:
+            statements.setdefault(sql, bindings)
+        return True
+
+    db_tables['db'].conn.exec_trace = tracer
+    try:
+        call(db_tables, seed)
+    finally:
+        db_tables['db'].conn.exec_trace = None
+    return statements
+
+
+@pytest.mark.integration
+class TestQueryPlans:
+    """EXPLAIN QUERY PLAN checks for the models.py queries."""
+
+    @pytest.mark.parametrize("label", sorted(_calls()))
+    def test_no_unexpected_scans_or_sorts(self, seeded_db, label):
+        db_tables, seed = seeded_db
+        statements = _recorded_statements(db_tables, _calls()[label], seed)
+        assert statements, f"{label} ran no SQL"
+
+        failures = []
+        for sql, bindings in statements.items():
+            plan = list(db_tables['db'].execute(f"EXPLAIN QUERY PLAN {sql}", bindings))
+            problems = unexpected_plan_lines(plan, EXPECTED_PLANS.get(label, {}))
+            if problems:
+                failures.append(f"{' '.join(sql.split())[:200]}\n    -> {problems}")
+        assert not failures, f"{label}:\n" + "\n".join(failures)
+
+    def test_every_sql_function_is_checked(self):
+        """New functions that run SQL must be added to _calls() (or NOT_CHECKED)."""
+        with open(MODELS_PATH) as f:
+            source = f.read()
+        runs_sql = ("safe_execute_query(", "paged_query(", ".execute(", ".q(", "db_tables['")
+        functions = {
+            node.name for node in ast.parse(source).body
+            if isinstance(node, ast.FunctionDef) and any(k in ast.get_source_segment(source, node) for k in runs_sql)
+        }
+        checked = {label.split("[")[0] for label in _calls()}
+        assert functions - checked - set(NOT_CHECKED) == set()
+
+    def test_detects_table_scans(self):
+        plan = [(2, 0, 0, "SCAN book"), (3, 0, 0, "USE TEMP B-TREE FOR ORDER BY"),
+                (4, 0, 0, "CO-ROUTINE recent"), (5, 0, 0, "SCAN recent"),
+                (6, 0, 0, "USE TEMP B-TREE FOR LAST TERM OF ORDER BY")]
+        assert unexpected_plan_lines(plan, {}) == ["SCAN book", "USE TEMP B-TREE FOR ORDER BY"]
+        assert unexpected_plan_lines(plan, {r"SCAN book": "", r"TEMP B-TREE": ""}) == []
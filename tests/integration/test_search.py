@@ -0,0 +1,122 @@
+"""
+Integration tests for FTS5-backed shelf search.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def searchable_shelves(db_with_user, factory):
+    """Two public shelves: one matching by name, one only through a book."""
+    db_tables, user = db_with_user
+
+    fantasy = db_tables['bookshelves'].insert(factory.create_bookshelf(
+        user.did, name="Fantasy Favourites", description="Dragons and wizards"
+    ))
+    db_tables['books'].insert(factory.create_book(fantasy.id, user.did, title="The Hobbit", author="J.R.R. Tolkien"))
+
+    classics = db_tables['bookshelves'].insert(factory.create_bookshelf(
+        user.did, name="Classics", description="Old books"
+    ))
+    db_tables['books'].insert(factory.create_book(classics.id, user.did, title="Fantastic Voyage", author="Émile Zola"))
+
+    return db_tables, user, fantasy, classics
+
+
+@pytest.mark.unit
+class TestBuildFtsQuery:
+    """Tests for turning user input into FTS5 expressions."""
+
+    def test_prefix_terms(self):
+        from models import build_fts_query
+        assert build_fts_query("Harry Pot") == '"harry"* "pot"*'
+
+    def test_operators_are_neutralised(self):
+        from models import build_fts_query
+        assert build_fts_query('title:"x" OR (y') == '"title"* "x"* "or"* "y"*'
+
+    def test_column_filter(self):
+        from models import build_fts_query
+        assert build_fts_query("tolk", "author") == 'author : ("tolk"*)'
+
+    def test_no_words(self):
+        from models import build_fts_query
+        assert build_fts_query("?!") == ""
+
+
+@pytest.mark.integration
+class TestFullTextShelfSearch:
+    """Tests for search_shelves in fts mode."""
+
+    def test_prefix_match_on_books(self, searchable_shelves):
+        """A prefix of a book author finds the shelf holding it."""
+        from models import search_shelves
+        db_tables, _, fantasy, _ = searchable_shelves
+
+        shelves = search_shelves(db_tables, query="tolk")
+
+        assert [s.id for s in shelves] == [fantasy.id]
+
+    def test_diacritics_are_folded(self, searchable_shelves):
+        """Unaccented input matches accented text."""
+        from models import search_shelves
+        db_tables, _, _, classics = searchable_shelves
+
+        assert [s.id for s in search_shelves(db_tables, query="emile")] == [classics.id]
+
+    def test_total_with_search_parameters(self, searchable_shelves):
+        """with_total counts the matches when the search binds parameters in its CTE."""
+        from models import search_shelves
+        db_tables, _, fantasy, _ = searchable_shelves
+
+        for sort_by in ("relevance", "updated_at"):
+            page = search_shelves(db_tables, query="tolk", sort_by=sort_by, with_total=True)
+            assert [s.id for s in page] == [fantasy.id]
+            assert page.total == 1
+
+    def test_relevance_prefers_shelf_name(self, searchable_shelves):
+        """A shelf-name match outranks a book-title match."""
+        from models import search_shelves, search_shelves_count
+        db_tables, _, fantasy, classics = searchable_shelves
+
+        shelves = search_shelves(db_tables, query="fanta", sort_by="relevance")
+
+        assert [s.id for s in shelves] == [fantasy.id, classics.id]
+        assert search_shelves_count(db_tables, query="fanta") == 2
+
+    def test_index_follows_updates_and_deletes(self, searchable_shelves):
+        """Triggers keep the index in sync with renamed and deleted rows."""
+        from models import search_shelves
+        db_tables, _, fantasy, classics = searchable_shelves
+
+        classics.name = "Nineteenth Century"
+        db_tables['bookshelves'].update(classics)
+        assert [s.id for s in search_shelves(db_tables, query="nineteenth")] == [classics.id]
+        assert search_shelves(db_tables, query="classics") == []
+
+        db_tables['books'].delete_where("bookshelf_id = ?", (fantasy.id,))
+        assert search_shelves(db_tables, query="hobbit") == []
+
+    def test_advanced_book_fields(self, searchable_shelves):
+        """Title and author filters must match the same book."""
+        from models import search_shelves
+        db_tables, _, fantasy, _ = searchable_shelves
+
+        assert [s.id for s in search_shelves(db_tables, book_title="hob", book_author="tolkien")] == [fantasy.id]
+        assert search_shelves(db_tables, book_title="hob", book_author="zola") == []
+
+    def test_like_mode_still_available(self, searchable_shelves):
+        """Substring matching is kept behind search_mode='like'."""
+        from models import search_shelves
+        db_tables, _, fantasy, _ = searchable_shelves
+
+        assert search_shelves(db_tables, query="obbi") == []
+        assert [s.id for s in search_shelves(db_tables, query="obbi", search_mode="like")] == [fantasy.id]
+
+    def test_rebuild_search_index(self, searchable_shelves):
+        """The index can be rebuilt from the content tables."""
+        from models import rebuild_search_index, search_shelves
+        db_tables, _, fantasy, _ = searchable_shelves
+
+        assert rebuild_search_index(db_tables) is True
+        assert [s.id for s in search_shelves(db_tables, query="hobbit")] == [fantasy.id]
@@ -0,0 +1,153 @@
+"""
+Integration tests for the denormalized shelf_stats table.
+
+Covers trigger maintenance on book/permission writes and the listing
+queries that read from it.
+"""
+
+import pytest
+from datetime import datetime, timezone, timedelta
+
+
+def _stats(db_tables, shelf_id):
+    rows = db_tables['db'].q("SELECT * FROM shelf_stats WHERE bookshelf_id = ?", (shelf_id,))
+    return rows[0] if rows else None
+
+
+@pytest.mark.integration
+class TestShelfStatsMaintenance:
+    """Tests that triggers keep shelf_stats in sync with its sources."""
+
+    def test_new_shelf_gets_empty_stats(self, db_with_shelf):
+        """Creating a shelf creates a zeroed stats row."""
+        db_tables, _, shelf = db_with_shelf
+
+        stats = _stats(db_tables, shelf.id)
+
+        assert stats['book_count'] == 0
+        assert stats['recent_covers'] == '[]'
+
+    def test_book_insert_and_delete_update_stats(self, db_with_books, factory):
+        """Book writes update counts and recent covers."""
+        import json
+        db_tables, user, shelf, books = db_with_books
+
+        stats = _stats(db_tables, shelf.id)
+        assert stats['book_count'] == 3
+        assert stats['recent_book_count'] == 3
+        assert len(json.loads(stats['recent_covers'])) == 3
+
+        db_tables['books'].delete(books[0].id)
+
+        stats = _stats(db_tables, shelf.id)
+        assert stats['book_count'] == 2
+        assert books[0].cover_url not in json.loads(stats['recent_covers'])
+
+    def test_recent_covers_limited_to_four_newest(self, db_with_shelf, factory):
+        """Only the four most recently added covers are kept."""
+        import json
+        db_tables, user, shelf = db_with_shelf
+        base = datetime.now(timezone.utc) - timedelta(days=1)
+
+        for i in range(6):
+            db_tables['books'].insert(factory.create_book(
+                shelf.id, user.did, cover_url=f"https://example.com/{i}.jpg",
+                added_at=base + timedelta(minutes=i)
+            ))
+
+        covers = json.loads(_stats(db_tables, shelf.id)['recent_covers'])
+        assert covers == [f"https://example.com/{i}.jpg" for i in (5, 4, 3, 2)]
+
+    def test_permission_writes_update_contributor_count(self, db_with_permissions):
+        """Contributors and members are counted from active permissions."""
+        db_tables, shelf, users = db_with_permissions
+
+        stats = _stats(db_tables, shelf.id)
+        assert stats['contributor_count'] == 2  # contributor + moderator
+        assert stats['member_count'] == 3
+
+        db_tables['permissions'].delete_where("bookshelf_id=? AND user_did=?", (shelf.id, users['contributor'].did))
+
+        stats = _stats(db_tables, shelf.id)
+        assert stats['contributor_count'] == 1
+        assert stats['member_count'] == 2
+
+    def test_shelf_delete_removes_stats(self, db_with_shelf):
+        """Deleting a shelf removes its stats row."""
+        db_tables, _, shelf = db_with_shelf
+
+        db_tables['bookshelves'].delete(shelf.id)
+
+        assert _stats(db_tables, shelf.id) is None
+
+    def test_activity_score_matches_live_calculation(self, db_with_books):
+        """Stored score equals calculate_shelf_activity_score."""
+        from models import calculate_shelf_activity_score, refresh_shelf_stats
+        db_tables, _, shelf, _ = db_with_books
+
+        assert refresh_shelf_stats(db_tables, shelf.id) == 1
+        stored = _stats(db_tables, shelf.id)['activity_score']
+
+        # 3 recent books, 0 contributors, 3 total, brand new shelf
+        expected = 3 * 10 * 0.4 + 3 * 2 * 0.2 + 20 * 0.1
+        assert stored == pytest.approx(expected)
+        assert calculate_shelf_activity_score(shelf.id, db_tables) == pytest.approx(expected)
+
+
+@pytest.mark.integration
+class TestShelfListings:
+    """Tests for listing queries that read shelf_stats."""
+
+    def test_public_shelves_with_stats_skips_empty(self, db_with_books, factory):
+        """Empty shelves are excluded unless include_empty is set."""
+        from models import get_public_shelves_with_stats
+        db_tables, user, shelf, _ = db_with_books
+        db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Empty"))
+
+        shelves = get_public_shelves_with_stats(db_tables, limit=10)
+
+        assert [s.id for s in shelves] == [shelf.id]
+        assert shelves[0].book_count == 3
+        assert len(shelves[0].recent_covers) == 3
+        assert shelves[0].owner.handle == user.handle
+        assert len(get_public_shelves_with_stats(db_tables, limit=10, include_empty=True)) == 2
+
+    def test_search_sorts_by_contributors(self, db_with_permissions, factory):
+        """most_contributors sorts on the stored contributor count."""
+        from models import search_shelves_enhanced
+        db_tables, shelf, users = db_with_permissions
+        owner = users['owner']
+        db_tables['books'].insert(factory.create_book(shelf.id, owner.did))
+        other = db_tables['bookshelves'].insert(factory.create_bookshelf(owner.did, name="Other"))
+        db_tables['books'].insert(factory.create_book(other.id, owner.did))
+
+        shelves = search_shelves_enhanced(db_tables, sort_by="most_contributors", limit=10)
+
+        assert [s.id for s in shelves] == [shelf.id, other.id]
+        assert shelves[0].contributor_count == 2
+
+    def test_search_matches_book_titles(self, db_with_books):
+        """Text search matches books on the shelf and counts agree."""
+        from models import search_shelves, search_shelves_count
+        db_tables, _, shelf, _ = db_with_books
+
+        shelves = search_shelves(db_tables, query="Test Book 2")
+
+        assert [s.id for s in shelves] == [shelf.id]
+        assert search_shelves_count(db_tables, query="Test Book 2") == 1
+        assert search_shelves(db_tables, query="no such title") == []
+
+    def test_mixed_public_shelves_returns_requested_page(self, db_with_user, factory):
+        """Smart mix fills each page from the stats-backed candidates."""
+        from models import get_mixed_public_shelves
+        db_tables, user = db_with_user
+        for i in range(5):
+            s = db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name=f"Shelf {i}"))
+            db_tables['books'].insert(factory.create_book(s.id, user.did))
+
+        first = get_mixed_public_shelves(db_tables, limit=3, offset=0)
+        second = get_mixed_public_shelves(db_tables, limit=3, offset=3)
+
+        assert len(first) == 3
+        assert len(second) == 2
+        assert all(hasattr(s, 'activity_score') for s in first)
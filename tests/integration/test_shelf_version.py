@@ -0,0 +1,177 @@
+"""
+Integration tests for the shelf_version counter.
+
+Triggers bump a shelf's version on every write that changes how its page
+renders, so rendered fragments can be cached under (shelf, version).
+"""
+
+import pytest
+from datetime import datetime, timezone
+
+
+@pytest.mark.integration
+class TestShelfVersion:
+    """Tests that triggers bump shelf_version on the writes a shelf page shows."""
+
+    def test_book_writes_bump_version(self, db_with_shelf, factory):
+        from models import get_shelf_version
+        db_tables, user, shelf = db_with_shelf
+
+        before = get_shelf_version(shelf.id, db_tables)
+        book = db_tables['books'].insert(factory.create_book(shelf.id, user.did))
+        after_insert = get_shelf_version(shelf.id, db_tables)
+        db_tables['books'].update({'id': book.id, 'title': "Retitled"})
+        after_update = get_shelf_version(shelf.id, db_tables)
+        db_tables['books'].delete(book.id)
+
+        assert before < after_insert < after_update < get_shelf_version(shelf.id, db_tables)
+
+    def test_comment_and_shelf_writes_bump_version(self, db_with_books):
+        from models import Comment, get_shelf_version
+        db_tables, user, shelf, books = db_with_books
+
+        before = get_shelf_version(shelf.id, db_tables)
+        db_tables['comments'].insert(Comment(
+            book_id=books[0].id, bookshelf_id=shelf.id, user_did=user.did,
+            content="Great read", created_at=datetime.now(timezone.utc)))
+        after_comment = get_shelf_version(shelf.id, db_tables)
+        db_tables['bookshelves'].update({'id': shelf.id, 'privacy': 'link-only'})
+
+        assert before < after_comment < get_shelf_version(shelf.id, db_tables)
+
+    def test_cover_cache_and_sync_bookkeeping_leave_versions_alone(self, db_with_books):
+        """Columns no page shows don't invalidate the shelf or the all-shelves listings."""
+        from models import ALL_SHELVES_VERSION_ID, get_shelf_version
+        db_tables, _, shelf, books = db_with_books
+
+        before = (get_shelf_version(shelf.id, db_tables), get_shelf_version(ALL_SHELVES_VERSION_ID, db_tables))
+        db_tables['books'].update({'id': books[0].id, 'cached_cover_path': 'covers/1.jpg',
+                                   'cover_cached_at': datetime.now(timezone.utc)})
+        db_tables['bookshelves'].update({'id': shelf.id, 'last_synced': datetime.now(timezone.utc),
+                                         'remote_sync_status': 'synced'})
+
+        assert (get_shelf_version(shelf.id, db_tables), get_shelf_version(ALL_SHELVES_VERSION_ID, db_tables)) == before
+
+    def test_owner_profile_change_bumps_only_real_changes(self, db_with_shelf):
+        """A login that rewrites the same profile leaves cached pages valid."""
+        from models import get_shelf_version
+        db_tables, user, shelf = db_with_shelf
+
+        before = get_shelf_version(shelf.id, db_tables)
+        db_tables['users'].update({'did': user.did, 'display_name': user.display_name,
+                                   'last_login': datetime.now(timezone.utc)})
+        assert get_shelf_version(shelf.id, db_tables) == before
+
+        db_tables['users'].update({'did': user.did, 'display_name': "Renamed"})
+        assert get_shelf_version(shelf.id, db_tables) > before
+
+    def test_deleted_shelf_has_no_version(self, db_with_shelf):
+        from models import get_shelf_version
+        db_tables, _, shelf = db_with_shelf
+
+        db_tables['bookshelves'].delete(shelf.id)
+
+        assert get_shelf_version(shelf.id, db_tables) == 0
+        assert not db_tables['db'].q("SELECT * FROM shelf_version WHERE bookshelf_id = ?", (shelf.id,))
+
+    def test_membership_changes_bump_version(self, db_with_shelf, factory):
+        from models import Permission, get_shelf_version
+        db_tables, user, shelf = db_with_shelf
+        member = db_tables['users'].insert(factory.create_user(handle="member.test"))
+
+        before = get_shelf_version(shelf.id, db_tables)
+        permission = db_tables['permissions'].insert(Permission(
+            bookshelf_id=shelf.id, user_did=member.did, role='viewer', granted_by_did=user.did,
+            granted_at=datetime.now(timezone.utc)))
+        after_grant = get_shelf_version(shelf.id, db_tables)
+        db_tables['permissions'].delete(permission.id)
+
+        assert before < after_grant < get_shelf_version(shelf.id, db_tables)
+
+    def test_any_shelf_write_bumps_all_shelves_version(self, db_with_shelf, factory):
+        """Row 0 moves with every shelf, including new and deleted ones."""
+        from models import ALL_SHELVES_VERSION_ID, get_shelf_version
+        db_tables, user, shelf = db_with_shelf
+        all_shelves = lambda: get_shelf_version(ALL_SHELVES_VERSION_ID, db_tables)
+
+        before = all_shelves()
+        other = db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Other"))
+        assert get_shelf_version(other.id, db_tables) == 1
+        after_create = all_shelves()
+        db_tables['books'].insert(factory.create_book(shelf.id, user.did))
+        after_book = all_shelves()
+        db_tables['bookshelves'].delete(other.id)
+
+        assert before < after_create < after_book < all_shelves()
+
+
+@pytest.mark.integration
+class TestPageVersions:
+    """Tests for the versions the book, profile and explore pages are validated against."""
+
+    def test_book_version_follows_every_shelf_holding_the_work(self, db_with_books, factory):
+        """A comment on the book, or the same work added to another shelf, changes the book page."""
+        from models import Comment, get_book_version
+        db_tables, user, shelf, books = db_with_books
+        book = books[0]
+
+        before = get_book_version(book.id, db_tables)
+        assert get_book_version(book.id, db_tables) == before
+        db_tables['comments'].insert(Comment(
+            book_id=book.id, bookshelf_id=shelf.id, user_did=user.did,
+            content="Loved it", created_at=datetime.now(timezone.utc)))
+        after_comment = get_book_version(book.id, db_tables)
+        assert after_comment != before
+
+        other = db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Other"))
+        db_tables['books'].insert(factory.create_book(other.id, user.did, title=book.title,
+                                                      author=book.author, isbn=book.isbn))
+        after_other_shelf = get_book_version(book.id, db_tables)
+        assert after_other_shelf != after_comment
+        assert after_other_shelf[1] == 2
+
+        db_tables['books'].insert(factory.create_book(other.id, user.did, title="Unrelated"))
+        assert get_book_version(book.id, db_tables) != after_other_shelf
+
+    def test_user_profile_version(self, db_with_books, factory):
+        from models import get_user_profile_version, log_activity
+        db_tables, user, shelf, books = db_with_books
+
+        before = get_user_profile_version(user.did, db_tables)
+        log_activity(user.did, 'book_added', db_tables, shelf.id, books[0].id)
+        after_activity = get_user_profile_version(user.did, db_tables)
+        db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Another"))
+
+        assert before != after_activity != get_user_profile_version(user.did, db_tables)
+        assert get_user_profile_version("did:plc:nobody", db_tables) == (0, 0, 0)
+
+    def test_explore_version(self, db_with_shelf, factory):
+        from models import get_explore_version, refresh_shelf_mix
+        db_tables, user, shelf = db_with_shelf
+
+        before = get_explore_version(db_tables)
+        assert get_explore_version(db_tables) == before
+        db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Newest"))
+        after_shelf = get_explore_version(db_tables)
+        refresh_shelf_mix(db_tables)
+
+        assert before[0] < after_shelf[0]
+        assert after_shelf[1] < get_explore_version(db_tables)[1]
+
+    def test_explore_version_never_ranks(self, db_with_books):
+        """A conditional GET on a stale smart mix reads the stored generation and writes nothing."""
+        from models import get_explore_version, refresh_shelf_mix
+        db_tables = db_with_books[0]
+        assert get_explore_version(db_tables)[1] == 0
+
+        refresh_shelf_mix(db_tables)
+        db_tables['db'].execute("UPDATE shelf_mix_generation SET created_at = datetime('now', '-1 day')")
+        statements = []
+        db_tables['db'].conn.exec_trace = lambda cursor, sql, bindings: statements.append(sql) or True
+        try:
+            version = get_explore_version(db_tables)
+        finally:
+            db_tables['db'].conn.exec_trace = None
+
+        assert version[1] == db_tables['db'].q("SELECT MAX(generation) AS g FROM shelf_mix_generation")[0]['g']
+        assert not any(sql.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE")) for sql in statements)
@@ -0,0 +1,108 @@
+"""
+Integration tests for canonical works and per-shelf vote counts.
+"""
+
+import pytest
+from datetime import datetime, timezone, timedelta
+
+
+def _work_key(db_tables, book_id):
+    rows = db_tables['db'].q(
+        "SELECT w.work_key FROM book_work bw JOIN work w ON w.id = bw.work_id WHERE bw.book_id = ?", (book_id,)
+    )
+    return rows[0]['work_key'] if rows else None
+
+
+@pytest.mark.integration
+class TestWorkAssignment:
+    """Tests that every book row is mapped to a work."""
+
+    def test_isbn10_and_isbn13_share_a_work(self, db_with_shelf, factory):
+        """Hyphenated ISBN-10 and its ISBN-13 normalize to the same key."""
+        db_tables, user, shelf = db_with_shelf
+
+        a = db_tables['books'].insert(factory.create_book(shelf.id, user.did, title="Dune", isbn="0-441-17271-7"))
+        b = db_tables['books'].insert(factory.create_book(shelf.id, user.did, title="Dune (Deluxe)", isbn="9780441172719"))
+
+        assert _work_key(db_tables, a.id) == "isbn:9780441172719"
+        assert _work_key(db_tables, b.id) == "isbn:9780441172719"
+
+    def test_title_author_key_without_isbn(self, db_with_shelf, factory):
+        """Books without a usable ISBN fall back to lower-cased title and author."""
+        db_tables, user, shelf = db_with_shelf
+
+        book = db_tables['books'].insert(factory.create_book(shelf.id, user.did, title=" Emma ", author="Jane Austen", isbn=""))
+
+        assert _work_key(db_tables, book.id) == "text:emma|jane austen"
+
+    def test_updating_isbn_moves_book_to_new_work(self, db_with_shelf, factory):
+        """Editing a book reassigns its work and fixes both shelf_work rows."""
+        db_tables, user, shelf = db_with_shelf
+        book = db_tables['books'].insert(factory.create_book(shelf.id, user.did, title="Emma", author="Jane Austen", isbn=""))
+
+        book.isbn = "9780141439587"
+        db_tables['books'].update(book)
+
+        assert _work_key(db_tables, book.id) == "isbn:9780141439587"
+        assert db_tables['db'].q("SELECT COUNT(*) AS n FROM shelf_work WHERE bookshelf_id = ?", (shelf.id,))[0]['n'] == 1
+
+    def test_rebuild_works(self, db_with_books):
+        """rebuild_works recreates shelf_work from the book table."""
+        from models import rebuild_works
+        db_tables, _, shelf, books = db_with_books
+
+        assert rebuild_works(db_tables) == 3
+        assert _work_key(db_tables, books[0].id) == f"isbn:{books[0].isbn}"
+
+
+@pytest.mark.integration
+class TestShelfWorkVotes:
+    """Tests for vote counts read from shelf_work."""
+
+    def test_votes_grouped_by_work(self, db_with_permissions, factory):
+        """Each member's book row for the same work is one vote; the first adder is kept."""
+        from models import get_books_with_upvotes
+        db_tables, shelf, users = db_with_permissions
+        earlier = datetime.now(timezone.utc) - timedelta(days=1)
+
+        first = db_tables['books'].insert(factory.create_book(
+            shelf.id, users['contributor'].did, title="Dune", isbn="0441172717", added_at=earlier
+        ))
+        db_tables['books'].insert(factory.create_book(shelf.id, users['moderator'].did, title="Dune", isbn="978-0-441-17271-9"))
+        db_tables['books'].insert(factory.create_book(shelf.id, users['moderator'].did, title="Emma", isbn=""))
+
+        books = get_books_with_upvotes(shelf.id, users['moderator'].did, db_tables)
+
+        assert [(b.title, b.upvote_count) for b in books] == [("Dune", 2), ("Emma", 1)]
+        assert books[0].id == first.id
+        assert books[0].added_by_handle == users['contributor'].handle
+        assert books[0].user_has_upvoted is True
+        assert get_books_with_upvotes(shelf.id, users['viewer'].did, db_tables)[0].user_has_upvoted is False
+
+    def test_removing_first_vote_promotes_next_book(self, db_with_permissions, factory):
+        """Deleting the first adder's row keeps the work with the next book as representative."""
+        from models import get_books_with_upvotes, get_work_votes
+        db_tables, shelf, users = db_with_permissions
+        earlier = datetime.now(timezone.utc) - timedelta(days=1)
+        first = db_tables['books'].insert(factory.create_book(shelf.id, users['contributor'].did, title="Dune", isbn="0441172717", added_at=earlier))
+        second = db_tables['books'].insert(factory.create_book(shelf.id, users['moderator'].did, title="Dune", isbn="0441172717"))
+
+        assert get_work_votes(second.id, users['contributor'].did, db_tables)['user_book_id'] == first.id
+
+        db_tables['books'].delete(first.id)
+
+        books = get_books_with_upvotes(shelf.id, None, db_tables)
+        assert [(b.id, b.upvote_count) for b in books] == [(second.id, 1)]
+        assert books[0].added_by_handle == users['moderator'].handle
+
+    def test_book_shelves_match_across_editions(self, db_with_user, factory):
+        """'Also on these shelves' finds the same work under another ISBN form."""
+        from models import get_book_shelves
+        db_tables, user = db_with_user
+        public = db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Public"))
+        private = db_tables['bookshelves'].insert(factory.create_bookshelf(user.did, name="Private", privacy="private"))
+        book = db_tables['books'].insert(factory.create_book(public.id, user.did, title="Dune", isbn="0441172717"))
+        db_tables['books'].insert(factory.create_book(private.id, user.did, title="Dune: 40th", isbn="9780441172719"))
+
+        assert {s.id for s in get_book_shelves(book.id, db_tables, viewer_did=user.did)} == {public.id, private.id}
+        assert [s.id for s in get_book_shelves(book.id, db_tables, viewer_did="did:plc:stranger")] == [public.id]
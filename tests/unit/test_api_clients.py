@@ -4,6 +4,8 @@ Unit tests for API client modules.
 Tests external API interactions with mocked responses.
 """
 
+import time
+
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 from datetime import datetime, timezone
@@ -32,6 +34,95 @@ class TestBookAPIClient:
                 assert field in result
 
 
+class TestBookMetadataCache:
+    """Tests for BookAPIClient's shared metadata cache (upstream calls patched out)."""
+
+    @pytest.fixture
+    def client(self):
+        from bibliome.clients.books import BookAPIClient, book_search_cache, book_isbn_cache
+        book_search_cache.clear()
+        book_isbn_cache.clear()
+        client = BookAPIClient()
+        client._search_google_books = AsyncMock(return_value=[{'title': 'Dune', 'isbn': '9780441013593', 'source': 'google_books'}])
+        client._search_open_library = AsyncMock(return_value=[])
+        return client
+
+    @staticmethod
+    def _isbn_response(items):
+        response = MagicMock()
+        response.json.return_value = {'items': items}
+        return response
+
+    @pytest.mark.asyncio
+    async def test_search_is_cached_by_normalized_query(self, client):
+        first = await client.search_books("Dune  Frank Herbert", max_results=8)
+        second = await client.search_books(" dune frank HERBERT", max_results=8)
+
+        assert first == second
+        assert client._search_google_books.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_search_results_warm_isbn_lookups(self, client):
+        await client.search_books("dune")
+        with patch.object(client.rate_limiter, 'execute_with_backoff', new_callable=AsyncMock) as upstream:
+            details = await client.get_book_details("978-0-441-01359-3")
+
+        assert details['title'] == 'Dune'
+        upstream.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_empty_answers_are_cached_but_failures_are_not(self, client):
+        client._search_google_books.return_value = []
+        assert await client.search_books("no such book") == []
+        assert await client.search_books("no such book") == []
+        assert client._search_open_library.await_count == 1
+
+        client._search_google_books.return_value = None  # request failed
+        await client.search_books("flaky")
+        await client.search_books("flaky")
+        assert client._search_google_books.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_unknown_isbn_is_negatively_cached(self, client):
+        with patch.object(client.rate_limiter, 'execute_with_backoff', new_callable=AsyncMock) as upstream:
+            upstream.return_value = self._isbn_response([])
+            assert await client.get_book_details("0000000000") is None
+            assert await client.get_book_details("0000000000") is None
+
+        assert upstream.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_only_makes_no_requests(self, client):
+        with patch.object(client.rate_limiter, 'execute_with_backoff', new_callable=AsyncMock) as upstream:
+            assert await client.get_book_details("9780000000001", cache_only=True) is None
+            assert await client.search_books("uncached", cache_only=True) == []
+
+        upstream.assert_not_awaited()
+        client._search_google_books.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_lookup(self, client):
+        import asyncio
+        from bibliome.clients.books import book_lookups
+
+        async def slow_response(make_request):
+            await asyncio.sleep(0.01)
+            return self._isbn_response([{'volumeInfo': {'title': 'Dune'}}])
+
+        collapsed = book_lookups.collapsed
+        with patch.object(client.rate_limiter, 'execute_with_backoff', side_effect=slow_response) as upstream:
+            results = await asyncio.gather(*(client.get_book_details("9780441013593") for _ in range(5)))
+
+        assert [book['title'] for book in results] == ['Dune'] * 5
+        assert upstream.await_count == 1
+        assert book_lookups.collapsed - collapsed == 4
+
+    def test_quota_low_when_bucket_nearly_empty(self, client):
+        assert not client.quota_low()
+        client.rate_limiter.base_limiter.tokens = 0
+        assert client.quota_low()
+
+
 class TestBlueskyAuthClient:
     """Tests for BlueskyAuth client (mocked)."""
     
@@ -67,6 +158,51 @@ class TestBlueskyAuthClient:
         assert client.me.did == 'did:plc:testuser123'
 
 
+class TestBlueskyProfileBatch:
+    """Tests for BlueskyAuth.get_profiles_batch chunking."""
+
+    def _auth(self, failing_chunk=None):
+        from bibliome.auth.bluesky import BlueskyAuth
+
+        def get_profiles(params):
+            actors = params['actors']
+            if failing_chunk and failing_chunk in actors:
+                raise ConnectionError("timeout")
+            # Every other DID has no profile
+            return MagicMock(profiles=[
+                MagicMock(did=did, handle=f"{did[-3:]}.test", display_name=None, avatar=None)
+                for did in actors if int(did[-3:]) % 2 == 0
+            ])
+
+        client = MagicMock()
+        client.app.bsky.actor.get_profiles.side_effect = get_profiles
+        auth = BlueskyAuth()
+        auth.get_client_from_session = MagicMock(return_value=client)
+        return auth, client
+
+    def test_chunks_are_fetched_and_merged(self):
+        auth, client = self._auth()
+        dids = [f"did:plc:{i:03d}" for i in range(60)]
+        not_found = set()
+
+        profiles = auth.get_profiles_batch(dids, {}, not_found=not_found)
+
+        assert client.app.bsky.actor.get_profiles.call_count == 3
+        assert len(profiles) == 30
+        assert profiles['did:plc:002']['display_name'] == '002.test'
+        assert not_found == {did for did in dids if did not in profiles}
+
+    def test_failed_chunk_is_not_reported_missing(self):
+        auth, _ = self._auth(failing_chunk="did:plc:030")
+        dids = [f"did:plc:{i:03d}" for i in range(60)]
+        not_found = set()
+
+        profiles = auth.get_profiles_batch(dids, {}, not_found=not_found)
+
+        assert not any("did:plc:025" <= did < "did:plc:050" for did in set(profiles) | not_found)
+        assert len(profiles) == 18
+
+
 class TestATProtoClient:
     """Tests for AT Protocol client operations (mocked)."""
     
@@ -253,6 +389,105 @@ class TestDirectPDSClient:
             assert result['value']['title'] == 'Test Book'
 
 
+class TestDirectPDSRepoRecords:
+    """Tests for DirectPDSClient.get_repo_records over a mocked PDS."""
+
+    PDS = "https://pds.example/xrpc"
+    DID = "did:plc:reader"
+
+    @pytest.fixture
+    def pds(self):
+        """A PDS with two pages of books, one shelf, and a record of requests in flight."""
+        import asyncio
+        import httpx
+        from bibliome.infrastructure import Identity, identity_cache
+
+        identity_cache.store(Identity(self.DID, "reader.example", "https://pds.example", time.time()))
+        state = {'in_flight': 0, 'peak': 0, 'requests': [], 'status': 200}
+        books = [{'uri': f'at://{self.DID}/com.bibliome.book/{i}', 'cid': f'cid{i}',
+                  'value': {'$type': 'com.bibliome.book', 'title': f'Book {i}', 'bookshelfRef': 'at://shelf'}}
+                 for i in range(3)]
+        shelves = [{'uri': f'at://{self.DID}/com.bibliome.bookshelf/s', 'cid': 'cids',
+                    'value': {'$type': 'com.bibliome.bookshelf', 'name': 'Reading'}}]
+
+        async def handler(request):
+            state['in_flight'] += 1
+            state['peak'] = max(state['peak'], state['in_flight'])
+            state['requests'].append(request.url.path.rsplit('/', 1)[-1])
+            await asyncio.sleep(0.01)
+            state['in_flight'] -= 1
+            if state['status'] != 200:
+                return httpx.Response(state['status'], text="<html>Moved</html>")
+            method = request.url.path.rsplit('/', 1)[-1]
+            if method == 'com.atproto.repo.describeRepo':
+                return httpx.Response(200, json={'collections': ['com.bibliome.book', 'com.bibliome.bookshelf']})
+            if request.url.params['collection'] == 'com.bibliome.bookshelf':
+                return httpx.Response(200, json={'records': shelves})
+            if request.url.params.get('cursor') == 'page2':
+                return httpx.Response(200, json={'records': books[2:]})
+            return httpx.Response(200, json={'records': books[:2], 'cursor': 'page2'})
+
+        state['client'] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return state
+
+    @pytest.mark.asyncio
+    async def test_collections_are_paged_concurrently(self, pds):
+        from bibliome.clients.pds import DirectPDSClient
+
+        data = await DirectPDSClient().get_repo_records(
+            self.DID, ["com.bibliome.bookshelf", "com.bibliome.book", "app.bsky.actor.profile"], _client=pds['client']
+        )
+
+        assert data['pds'] == self.PDS
+        assert list(data['collections']) == ["com.bibliome.bookshelf", "com.bibliome.book", "app.bsky.actor.profile"]
+        assert [rec['rkey'] for rec in data['collections']['com.bibliome.book']] == ['0', '1', '2']
+        assert data['collections']['com.bibliome.book'][0]['value'].bookshelfRef == 'at://shelf'
+        assert data['missing'] == ["app.bsky.actor.profile"]
+        assert pds['peak'] == 2  # both collections' first pages at once
+        assert pds['requests'].count('com.atproto.repo.listRecords') == 3
+
+    @pytest.mark.asyncio
+    async def test_non_json_response_is_non_compliant(self, pds):
+        import httpx
+        from bibliome.clients.pds import DirectPDSClient, NonCompliantPDSError
+
+        async def html(request):
+            return httpx.Response(200, text="<html>Welcome to my PDS</html>")
+
+        with pytest.raises(NonCompliantPDSError):
+            await DirectPDSClient().get_repo_records(
+                self.DID, ["com.bibliome.book"], _client=httpx.AsyncClient(transport=httpx.MockTransport(html))
+            )
+
+    @pytest.mark.asyncio
+    async def test_server_errors_are_transient(self, pds):
+        from bibliome.clients.pds import DirectPDSClient, TransientDIDResolutionError
+
+        pds['status'] = 503
+        with pytest.raises(TransientDIDResolutionError):
+            await DirectPDSClient().get_repo_records(self.DID, ["com.bibliome.book"], _client=pds['client'])
+
+
+class TestPDSClientPool:
+    """Tests for the LRU of per-PDS async clients."""
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_client_is_evicted(self):
+        from bibliome.clients.pds import PDSClientPool
+
+        pool = PDSClientPool(max_size=2)
+        a = pool.get_client("https://a.example/xrpc")
+        b = pool.get_client("https://b.example/xrpc")
+        assert pool.get_client("https://a.example/xrpc") is a
+        pool.get_client("https://c.example/xrpc")
+
+        assert len(pool) == 2
+        assert pool.get_client("https://a.example/xrpc") is a
+        assert pool.get_client("https://b.example/xrpc") is not b
+        await pool.aclose()
+        assert a.is_closed
+
+
 class TestAPIErrorHandling:
     """Tests for API error handling."""
     
@@ -0,0 +1,40 @@
+"""Tests for the conditional GET validators."""
+
+import pytest
+
+
+@pytest.mark.unit
+class TestConditionalGet:
+    """Tests for page_etag, etag_matches and validator_headers."""
+
+    def test_etag_is_stable_and_weak(self):
+        """The same parts give the same ETag; any changed part gives another."""
+        from bibliome.infrastructure import page_etag
+
+        etag = page_etag('shelf', 1, 7, 'grid', None)
+
+        assert etag.startswith('W/"') and etag.endswith('"')
+        assert page_etag('shelf', 1, 7, 'grid', None) == etag
+        assert page_etag('shelf', 1, 8, 'grid', None) != etag
+        assert page_etag('shelf', 1, 7, 'grid', 'viewer') != etag
+
+    @pytest.mark.parametrize("header, matches", [
+        (None, False),
+        ('', False),
+        ('*', True),
+        ('W/"abc"', True),
+        ('"abc"', True),
+        ('"old", W/"abc"', True),
+        ('W/"abcd"', False),
+    ])
+    def test_etag_matches(self, header, matches):
+        from bibliome.infrastructure import etag_matches
+
+        assert etag_matches(header, 'W/"abc"') is matches
+
+    def test_logged_in_pages_are_private(self):
+        from bibliome.infrastructure import validator_headers
+
+        assert validator_headers('W/"abc"', private=True)['Cache-Control'] == 'private, no-cache'
+        assert validator_headers('W/"abc"', private=False)['Cache-Control'] == 'no-cache'
+        assert 'HX-Request' in validator_headers('W/"abc"', private=False)['Vary']
@@ -0,0 +1,53 @@
+"""Tests for the in-process HTML fragment cache."""
+
+import pytest
+
+
+@pytest.mark.unit
+class TestFragmentCache:
+    """Tests for FragmentCache LRU behaviour and counters."""
+
+    def test_evicts_least_recently_used(self):
+        """Past max_entries, the entry read least recently is dropped."""
+        from bibliome.infrastructure import FragmentCache
+
+        cache = FragmentCache("test", max_entries=2)
+        cache.put("a", "<a>")
+        cache.put("b", "<b>")
+        assert cache.get("a") == "<a>"
+        cache.put("c", "<c>")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "<a>"
+        assert cache.get("c") == "<c>"
+        assert len(cache) == 2
+        assert cache.stats()['evictions'] == 1
+
+    def test_get_or_render_renders_once(self):
+        """A miss renders and stores; later lookups of the same key are hits."""
+        from bibliome.infrastructure import FragmentCache
+
+        cache = FragmentCache("test")
+        renders = []
+        render = lambda: renders.append(1) or "<div>shelf</div>"
+
+        for _ in range(3):
+            assert cache.get_or_render((1, 5, 'grid', 'anonymous'), render) == "<div>shelf</div>"
+        cache.get_or_render((1, 6, 'grid', 'anonymous'), render)
+
+        assert len(renders) == 2
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['entries']) == (2, 2, 2)
+        assert stats['hit_rate'] == 50.0
+
+    def test_clear_keeps_counters(self):
+        from bibliome.infrastructure import FragmentCache
+
+        cache = FragmentCache("test")
+        cache.put("a", "<a>")
+        cache.get("a")
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.get("a") is None
+        assert cache.stats()['hits'] == 1
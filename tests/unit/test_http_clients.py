@@ -0,0 +1,75 @@
+"""Tests for the process-wide pooled HTTP client registry."""
+
+import asyncio
+
+import httpx
+import pytest
+
+
+@pytest.mark.unit
+class TestHttpClientRegistry:
+    """Tests for get_http_client, close_http_clients and per-host limits."""
+
+    @pytest.mark.asyncio
+    async def test_same_name_shares_one_client(self):
+        from bibliome.infrastructure import get_http_client, close_http_clients
+
+        books = get_http_client("test_books")
+        assert get_http_client("test_books") is books
+        assert get_http_client("test_covers") is not books
+
+        await close_http_clients(["test_books"])
+        assert books.is_closed
+        assert get_http_client("test_books") is not books
+        await close_http_clients()
+
+    def test_clients_are_per_event_loop(self):
+        from bibliome.infrastructure import get_http_client, close_http_clients
+
+        async def use():
+            return get_http_client("test_loop")
+
+        first = asyncio.run(use())
+        second = asyncio.run(use())
+        assert first is not second
+
+        async def close():
+            await close_http_clients()
+        asyncio.run(close())
+
+    @pytest.mark.asyncio
+    async def test_requests_per_host_are_limited(self):
+        from bibliome.infrastructure import get_http_client, close_http_clients
+
+        in_flight = {}
+        peak = {}
+
+        async def handler(request):
+            host = request.url.host
+            in_flight[host] = in_flight.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), in_flight[host])
+            await asyncio.sleep(0.01)
+            in_flight[host] -= 1
+            # Streamed like a real transport's response, so the slot is held until the body is read
+            return httpx.Response(200, stream=httpx.ByteStream(host.encode()))
+
+        client = get_http_client("test_limits", max_per_host=2, transport=httpx.MockTransport(handler))
+        urls = [f"https://{host}/cover.jpg" for host in ("covers.openlibrary.org", "books.google.com") for _ in range(6)]
+        responses = await asyncio.gather(*(client.get(url) for url in urls))
+
+        assert all(response.status_code == 200 for response in responses)
+        assert peak == {"covers.openlibrary.org": 2, "books.google.com": 2}
+        await close_http_clients()
+
+    @pytest.mark.asyncio
+    async def test_failed_request_releases_its_slot(self):
+        from bibliome.infrastructure import get_http_client, close_http_clients
+
+        def handler(request):
+            raise httpx.ConnectError("refused", request=request)
+
+        client = get_http_client("test_errors", max_per_host=1, transport=httpx.MockTransport(handler))
+        for _ in range(3):
+            with pytest.raises(httpx.ConnectError):
+                await asyncio.wait_for(client.get("https://pds.example/xrpc/_health"), timeout=1)
+        await close_http_clients()
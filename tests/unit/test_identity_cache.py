@@ -0,0 +1,132 @@
+"""Tests for the shared DID -> handle / PDS identity cache and the resolvers reading through it."""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+
+PLC_DOC = {
+    'id': 'did:plc:reader',
+    'alsoKnownAs': ['at://Reader.example'],
+    'service': [{'id': '#atproto_pds', 'type': 'AtprotoPersonalDataServer', 'serviceEndpoint': 'https://pds.example/'}],
+}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from bibliome.infrastructure import IdentityCache
+    return IdentityCache(path=str(tmp_path / "shared_cache.db"))
+
+
+@pytest.mark.unit
+class TestIdentityCache:
+    """Tests for IdentityCache lookups, TTL and invalidation."""
+
+    def test_identity_from_doc(self):
+        from bibliome.infrastructure import identity_from_doc
+
+        identity = identity_from_doc('did:plc:reader', PLC_DOC)
+        assert (identity.handle, identity.pds_endpoint) == ('reader.example', 'https://pds.example')
+
+        bare = identity_from_doc('did:plc:bare', {'id': 'did:plc:bare'})
+        assert (bare.handle, bare.pds_endpoint) == (None, None)
+
+    def test_lookup_by_did(self, cache):
+        from bibliome.infrastructure import identity_from_doc
+
+        cache.store(identity_from_doc('did:plc:reader', PLC_DOC))
+
+        assert cache.get('did:plc:reader').pds_endpoint == 'https://pds.example'
+        assert cache.get_many(['did:plc:reader', 'did:plc:other']).keys() == {'did:plc:reader'}
+
+    def test_expired_entries_are_misses(self, cache):
+        from bibliome.infrastructure import Identity
+
+        cache.store(Identity('did:plc:old', 'old.example', 'https://pds.example', time.time() - cache.ttl - 1))
+
+        assert cache.get('did:plc:old') is None
+
+    def test_invalidate_is_seen_by_other_processes(self, cache):
+        from bibliome.infrastructure import IdentityCache, identity_from_doc
+
+        cache.store(identity_from_doc('did:plc:reader', PLC_DOC))
+        ingester = IdentityCache(path=cache.path)
+
+        assert ingester.invalidate('did:plc:reader') is True
+        assert ingester.invalidate('did:plc:unknown') is False
+        assert cache.get('did:plc:reader') is None
+
+
+@pytest.mark.unit
+class TestResolversReadThrough:
+    """Tests for DirectPDSClient and OAuthClient resolving through the identity cache."""
+
+    @pytest.fixture
+    def resolver(self):
+        """AsyncIdResolver stand-in serving PLC_DOC for any DID."""
+        resolver = SimpleNamespace(did=MagicMock(), handle=MagicMock())
+        resolver.did.resolve = AsyncMock(side_effect=lambda did: dict(PLC_DOC, id=did))
+        resolver.handle.resolve = AsyncMock(return_value='did:plc:reader')
+        return resolver
+
+    @pytest.mark.asyncio
+    async def test_pds_resolution_is_cached(self, resolver):
+        from bibliome.clients.pds import DirectPDSClient
+        from bibliome.infrastructure import identity_cache
+
+        identity_cache.invalidate('did:plc:reader')
+        client = DirectPDSClient()
+        with patch.object(client, '_id_resolver', return_value=resolver):
+            first = await client._resolve_did_and_pds('did:plc:reader')
+            by_handle = await client._resolve_did_and_pds('reader.example')
+
+        assert first == by_handle == ('did:plc:reader', 'https://pds.example/xrpc')
+        assert resolver.did.resolve.await_count == 1
+        resolver.handle.resolve.assert_awaited_once_with('reader.example')
+
+    @pytest.mark.asyncio
+    async def test_cached_handle_claim_is_not_trusted(self, resolver):
+        from bibliome.clients.pds import DirectPDSClient
+        from bibliome.infrastructure import Identity, identity_cache
+
+        # Any DID document can list any handle in alsoKnownAs
+        identity_cache.store(Identity('did:plc:impostor', 'reader.example', 'https://evil.example', time.time()))
+        client = DirectPDSClient()
+        with patch.object(client, '_id_resolver', return_value=resolver):
+            did, pds = await client._resolve_did_and_pds('reader.example')
+
+        assert (did, pds) == ('did:plc:reader', 'https://pds.example/xrpc')
+        identity_cache.invalidate('did:plc:impostor')
+
+    @pytest.mark.asyncio
+    async def test_refresh_identities_fetches_only_misses(self, resolver):
+        from bibliome.clients.pds import DirectPDSClient
+        from bibliome.infrastructure import Identity, identity_cache
+
+        identity_cache.store(Identity('did:plc:known', 'known.example', 'https://pds.example', time.time()))
+        for did in ('did:plc:a', 'did:plc:b'):
+            identity_cache.invalidate(did)
+        client = DirectPDSClient()
+        with patch.object(client, '_id_resolver', return_value=resolver):
+            refreshed = await client.refresh_identities(['did:plc:known', 'did:plc:a', 'did:plc:b', 'did:plc:a'])
+
+        assert refreshed == 2
+        assert sorted(call.args[0] for call in resolver.did.resolve.await_args_list) == ['did:plc:a', 'did:plc:b']
+        assert identity_cache.get('did:plc:b').handle == 'reader.example'
+
+    def test_oauth_did_document_is_cached(self):
+        from bibliome.auth.oauth import OAuthClient
+        from bibliome.infrastructure import identity_cache
+
+        identity_cache.invalidate('did:plc:reader')
+        oauth = OAuthClient('https://bibliome.example/client-metadata.json', 'https://bibliome.example/callback')
+        response = MagicMock()
+        response.json.return_value = PLC_DOC
+        oauth.http_client = MagicMock()
+        oauth.http_client.get.return_value = response
+
+        assert oauth._resolve_did_document('did:plc:reader') == {'did': 'did:plc:reader', 'pds': 'https://pds.example'}
+        assert oauth._resolve_did_document('did:plc:reader') == {'did': 'did:plc:reader', 'pds': 'https://pds.example'}
+        assert oauth.http_client.get.call_count == 1
@@ -6,6 +6,7 @@ for all bookshelf operations.
 """
 
 import pytest
+import sqlite3
 from datetime import datetime, timezone, timedelta
 
 
@@ -574,3 +575,80 @@ class TestGetUserRole:
         role = get_user_role(shelf, None, db_tables)
         
         assert role is None
+
+
+# ============================================================================
+# Test PermissionContext
+# ============================================================================
+
+class TestPermissionContext:
+    """Tests for the request-scoped PermissionContext resolver."""
+    
+    CHECKS = ['can_view_bookshelf', 'can_add_books', 'can_vote_books', 'can_remove_books',
+              'can_edit_bookshelf', 'can_manage_members', 'can_generate_invites',
+              'can_delete_shelf', 'can_comment_on_books']
+    
+    @pytest.mark.unit
+    @pytest.mark.parametrize("privacy", ['public', 'link-only', 'private'])
+    def test_matches_module_functions(self, db_with_permissions, privacy):
+        """Every check agrees with the per-call permission functions for every role."""
+        import models
+        from models import PermissionContext
+        
+        db_tables, shelf, users = db_with_permissions
+        shelf.privacy = privacy
+        viewers = [None, "did:plc:stranger"] + [user.did for user in users.values()]
+        
+        for viewer in viewers:
+            perms = PermissionContext(viewer, db_tables)
+            for check in self.CHECKS:
+                expected = getattr(models, check)(shelf, viewer, db_tables)
+                assert getattr(perms, check)(shelf) == expected, (viewer, check)
+            assert perms.role(shelf) == models.get_user_role(shelf, viewer, db_tables)
+    
+    @pytest.mark.unit
+    def test_loads_many_shelves_in_one_query(self, db_with_permissions, factory):
+        """load() fetches roles for all shelves at once; later checks hit no queries."""
+        from models import PermissionContext
+        
+        db_tables, shelf, users = db_with_permissions
+        other = db_tables['bookshelves'].insert(factory.create_bookshelf(users['owner'].did, name="Other"))
+        
+        statements = []
+        db_tables['db'].conn.exec_trace = lambda cursor, sql, bindings: statements.append(sql) or True
+        try:
+            perms = PermissionContext(users['moderator'].did, db_tables).load([shelf, other])
+            assert perms.can_edit_bookshelf(shelf) is True
+            assert perms.can_edit_bookshelf(other) is False
+            assert perms.can_view_bookshelf(shelf) is True
+        finally:
+            db_tables['db'].conn.exec_trace = None
+        
+        assert len(statements) == 1
+    
+    @pytest.mark.unit
+    def test_tier(self, db_with_permissions):
+        """Viewers who can't vote share the 'reader' tier; voters are told apart by role."""
+        from models import PermissionContext
+        
+        db_tables, shelf, users = db_with_permissions
+        viewers = [None, "did:plc:stranger", users['viewer'].did, users['contributor'].did, users['owner'].did]
+        tiers = [PermissionContext(viewer, db_tables).tier(shelf) for viewer in viewers]
+        
+        assert tiers == ['anonymous', 'reader', 'reader', 'contributor', 'owner']
+        shelf.self_join = True
+        assert PermissionContext("did:plc:stranger", db_tables).tier(shelf) == 'self-join'
+    
+    @pytest.mark.unit
+    def test_load_error_is_logged_and_denies(self, db_with_permissions, caplog):
+        """A failed role lookup denies, is logged, and is retried on the next check."""
+        from unittest.mock import patch
+        from models import PermissionContext
+        
+        db_tables, shelf, users = db_with_permissions
+        perms = PermissionContext(users['moderator'].did, db_tables)
+        with patch('models.safe_execute_query', side_effect=sqlite3.OperationalError("disk I/O error")):
+            assert perms.can_edit_bookshelf(shelf) is False
+        assert "disk I/O error" in caplog.text
+        
+        assert perms.can_edit_bookshelf(shelf) is True
@@ -0,0 +1,259 @@
+"""Tests for the read-only connection pool and safe_execute_query."""
+
+import pytest
+import threading
+import time
+import sqlite3
+import tempfile
+import os
+from unittest.mock import MagicMock
+
+
+@pytest.fixture
+def db_path():
+    """A WAL-mode database file with a small books table."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'test.db')
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT)")
+        conn.executemany("INSERT INTO books (title) VALUES (?)", [(f"Book {i}",) for i in range(100)])
+        conn.commit()
+        conn.close()
+        yield path
+
+
+@pytest.fixture(autouse=True)
+def reset_read_pool():
+    """Drop the global read pool after each test."""
+    yield
+    from models import close_read_pool
+    close_read_pool()
+
+
+@pytest.mark.unit
+class TestReadConnectionPool:
+    """Tests for the ReadConnectionPool class."""
+
+    def test_connections_are_read_only(self, db_path):
+        from bibliome.infrastructure import ReadConnectionPool
+        pool = ReadConnectionPool(db_path)
+
+        with pool.connection() as conn:
+            assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO books (title) VALUES ('nope')")
+        pool.close()
+
+    def test_checkouts_are_exclusive_and_reused(self, db_path):
+        from bibliome.infrastructure import ReadConnectionPool
+        pool = ReadConnectionPool(db_path, size=3)
+
+        first, second = pool.acquire(), pool.acquire()
+        assert first is not second
+        pool.release(first)
+        assert pool.acquire() is first
+        assert pool.stats()['open'] == 2
+        pool.close()
+
+    def test_exhausted_pool_times_out(self, db_path):
+        from bibliome.infrastructure import ReadConnectionPool, ReadPoolTimeout
+        pool = ReadConnectionPool(db_path, size=1, timeout=0.05)
+
+        held = pool.acquire()
+        with pytest.raises(ReadPoolTimeout):
+            pool.acquire()
+        pool.release(held)
+
+        stats = pool.stats()
+        assert stats['timeouts'] == 1
+        assert stats['checkouts'] == 1
+        pool.close()
+
+    def test_waiting_checkout_is_measured(self, db_path):
+        from bibliome.infrastructure import ReadConnectionPool
+        pool = ReadConnectionPool(db_path, size=1)
+        held = pool.acquire()
+
+        threading.Timer(0.05, pool.release, args=(held,)).start()
+        pool.release(pool.acquire())
+
+        assert pool.stats()['wait_ms_max'] >= 40
+        pool.close()
+
+    def test_execute_returns_dicts(self, db_path):
+        from bibliome.infrastructure import ReadConnectionPool
+        pool = ReadConnectionPool(db_path)
+
+        rows = pool.execute("SELECT id, title FROM books WHERE id <= ? ORDER BY id", (2,))
+        assert rows == [{'id': 1, 'title': 'Book 0'}, {'id': 2, 'title': 'Book 1'}]
+        assert pool.execute("SELECT * FROM books WHERE id = ?", (999,)) == []
+        pool.close()
+
+
+@pytest.mark.unit
+class TestObjectRows:
+    """Tests for the object_rows row factory."""
+
+    def test_builds_objects_by_column_name(self, db_path):
+        from dataclasses import dataclass
+        from bibliome.infrastructure import ReadConnectionPool, object_rows
+
+        @dataclass(slots=True)
+        class TitleRow:
+            title: str = ""
+            id: int = None
+            shelf: str = "none"
+
+        pool = ReadConnectionPool(db_path)
+        rows = pool.execute("SELECT id, title, 'extra' AS ignored FROM books WHERE id <= 2 ORDER BY id",
+                            row_factory=object_rows(TitleRow))
+
+        assert rows == [TitleRow("Book 0", 1), TitleRow("Book 1", 2)]
+        assert rows[0].shelf == "none"
+        pool.close()
+
+@pytest.mark.unit
+class TestSafeExecuteQuery:
+    """Tests for the safe_execute_query function."""
+
+    def test_reads_through_pool(self, db_path):
+        from models import safe_execute_query, configure_read_pool
+        pool = configure_read_pool(db_path)
+
+        results = safe_execute_query(None, "SELECT * FROM books ORDER BY id LIMIT 2")
+
+        assert [r['title'] for r in results] == ["Book 0", "Book 1"]
+        assert pool.stats()['checkouts'] == 1
+
+    def test_sees_committed_writes(self, db_path):
+        from models import safe_execute_query, configure_read_pool
+        configure_read_pool(db_path)
+        writer = sqlite3.connect(db_path)
+        writer.execute("INSERT INTO books (title) VALUES ('New')")
+        writer.commit()
+        writer.close()
+
+        assert safe_execute_query(None, "SELECT COUNT(*) AS n FROM books")[0]['n'] == 101
+
+    def test_falls_back_to_given_connection(self, db_path):
+        from models import safe_execute_query, get_read_pool
+        assert get_read_pool() is None
+        conn = sqlite3.connect(db_path)
+
+        assert len(safe_execute_query(conn, "SELECT * FROM books LIMIT 3")) == 3
+        assert safe_execute_query(conn, "SELECT * FROM books WHERE id = ?", (999,)) == []
+        conn.close()
+
+    def test_row_factory_on_apsw_connection(self, db_tables):
+        from models import safe_execute_query, tuple_rows
+        columns, rows = safe_execute_query(db_tables['db'], "SELECT 1 AS a, 2 AS b", row_factory=tuple_rows)
+        assert columns == ('a', 'b') and rows == [(1, 2)]
+
+    def test_empty_result_on_apsw_connection(self, db_tables):
+        """apsw completes a statement with no rows during execute(); that is an empty result."""
+        from models import safe_execute_query
+        assert safe_execute_query(db_tables['db'], "SELECT * FROM user WHERE did = ?", ("did:plc:nobody",)) == []
+
+    def test_errors_are_raised_without_retrying(self):
+        from models import safe_execute_query
+        mock_db = MagicMock()
+        mock_db.execute.side_effect = sqlite3.OperationalError("database is locked")
+
+        started = time.perf_counter()
+        with pytest.raises(sqlite3.OperationalError):
+            safe_execute_query(mock_db, "SELECT 1")
+
+        assert mock_db.execute.call_count == 1
+        assert time.perf_counter() - started < 0.1
+
+
+@pytest.mark.unit
+class TestConcurrentAccess:
+    """Tests for concurrent database access through the pool."""
+
+    def test_concurrent_reads_and_writes(self, db_path):
+        from models import safe_execute_query, configure_read_pool
+        pool = configure_read_pool(db_path)
+        results = []
+        errors = []
+
+        def reader():
+            try:
+                for _ in range(20):
+                    results.append(len(safe_execute_query(None, "SELECT * FROM books ORDER BY id LIMIT 10")))
+            except Exception as e:
+                errors.append(f"Read error: {e}")
+
+        def writer():
+            try:
+                conn = sqlite3.connect(db_path, timeout=30)
+                for i in range(10):
+                    conn.execute("INSERT INTO books (title) VALUES (?)", (f"Written {i}",))
+                    conn.commit()
+                conn.close()
+            except Exception as e:
+                errors.append(f"Write error: {e}")
+
+        threads = [threading.Thread(target=reader) for _ in range(12)] + [threading.Thread(target=writer)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert results == [10] * 240
+        assert pool.stats()['open'] <= pool.size
+
+
+    def test_more_requests_than_connections(self, db_path, monkeypatch):
+        """Requests that wait on slow upstream calls between reads don't hold a connection meanwhile."""
+        import models
+        from models import safe_execute_query, configure_read_pool
+        monkeypatch.setattr(models, 'READ_POOL_SIZE', 2)
+        monkeypatch.setattr(models, 'READ_POOL_TIMEOUT', 0.5)
+        pool = configure_read_pool(db_path)
+        errors = []
+
+        def request():
+            try:
+                safe_execute_query(None, "SELECT * FROM books WHERE id = ?", (1,))
+                time.sleep(0.2)  # an outbound API call
+                safe_execute_query(None, "SELECT COUNT(*) AS n FROM books")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=request) for _ in range(pool.size * 8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert pool.stats()['timeouts'] == 0
+        assert pool.stats()['open'] <= pool.size
+
+
+@pytest.mark.unit
+class TestReadPoolInitialization:
+    """Tests for read pool setup in setup_database."""
+
+    def test_no_pool_for_memory_database(self, db_path):
+        from models import setup_database, configure_read_pool, get_read_pool
+        configure_read_pool(db_path)
+
+        setup_database(memory=True)
+
+        assert get_read_pool() is None
+
+    def test_pool_opened_for_file_database(self):
+        from models import setup_database, get_read_pool, safe_execute_query
+        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_tables = setup_database(os.path.join(tmpdir, 'bibliome.db'),
+                                       migrations_dir=os.path.join(project_root, 'migrations'))
+            assert get_read_pool() is not None
+            assert safe_execute_query(db_tables['db'], "SELECT COUNT(*) AS n FROM user")[0]['n'] == 0
+            get_read_pool().close()
+            db_tables['db'].conn.close()
@@ -0,0 +1,67 @@
+"""Tests for AsyncRepository, the async wrapper around the data layer."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+
+@pytest.mark.unit
+class TestAsyncRepository:
+    """Tests for the AsyncRepository table helpers and executors."""
+
+    async def test_get_missing_row_returns_none(self, db_tables):
+        from bibliome.services import AsyncRepository
+        repo = AsyncRepository(db_tables)
+
+        assert await repo.get('users', 'did:plc:nobody') is None
+
+    async def test_insert_update_find_round_trip(self, db_tables):
+        from bibliome.services import AsyncRepository
+        repo = AsyncRepository(db_tables)
+
+        await repo.insert('users', did='did:plc:repo', handle='repo.bsky.social')
+        await repo.update('users', {'display_name': 'Repo User'}, 'did:plc:repo')
+
+        user = await repo.get('users', 'did:plc:repo')
+        assert user.display_name == 'Repo User'
+        found = await repo.find('users', 'handle=?', ('repo.bsky.social',))
+        assert [u.did for u in found] == ['did:plc:repo']
+
+    async def test_query_returns_dicts(self, db_with_user):
+        from bibliome.services import AsyncRepository
+        db_tables, test_user = db_with_user
+        repo = AsyncRepository(db_tables)
+
+        rows = await repo.query("SELECT did, handle FROM user WHERE did = ?", (test_user.did,))
+
+        assert rows == [{'did': test_user.did, 'handle': test_user.handle}]
+
+    async def test_writes_share_one_writer_thread(self, db_tables):
+        from bibliome.services import AsyncRepository
+        repo = AsyncRepository(db_tables)
+
+        names = await asyncio.gather(*(repo.write(lambda: threading.current_thread().name) for _ in range(5)))
+        queued = repo.write_nowait(lambda: threading.current_thread().name)
+
+        assert all(name.startswith('db-write') for name in names)
+        assert len(set(names)) == 1
+        assert queued.result(timeout=5) == names[0]
+
+    async def test_slow_read_does_not_block_event_loop(self, db_tables):
+        from bibliome.services import AsyncRepository
+        repo = AsyncRepository(db_tables)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await repo.read(time.sleep, 0.2)
+        task.cancel()
+
+        assert ticks >= 5
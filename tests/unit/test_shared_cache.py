@@ -0,0 +1,89 @@
+"""Tests for the SQLite-file cache shared between processes."""
+
+import time
+
+import pytest
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "shared_cache.db")
+
+
+@pytest.mark.unit
+class TestSharedCache:
+    """Tests for SharedCache get/set, TTLs, eviction and sharing through the file."""
+
+    def test_values_are_shared_through_the_file(self, cache_path):
+        """A second instance on the same file (as another process would open) sees the writes."""
+        from bibliome.infrastructure import SharedCache
+
+        web = SharedCache("pds_endpoints", path=cache_path)
+        scanner = SharedCache("pds_endpoints", path=cache_path)
+        web.set("did:plc:a", ["did:plc:a", "https://pds.example/xrpc"])
+
+        assert scanner.get("did:plc:a") == ["did:plc:a", "https://pds.example/xrpc"]
+        assert scanner.get("did:plc:b") is None
+        assert (scanner.hits, scanner.misses) == (1, 1)
+
+    def test_namespaces_are_separate(self, cache_path):
+        from bibliome.infrastructure import SharedCache
+
+        SharedCache("following", path=cache_path).set("did:plc:a", ["did:plc:b"])
+        assert SharedCache("pds_endpoints", path=cache_path).get("did:plc:a") is None
+
+    def test_get_many_skips_missing_and_expired(self, cache_path):
+        from bibliome.infrastructure import SharedCache
+
+        cache = SharedCache("test", path=cache_path)
+        cache.set_many({("isbn", "1"): {"title": "A"}, ("isbn", "2"): None})
+        cache.set(("isbn", "3"), {"title": "C"}, ttl=0.01)
+        time.sleep(0.02)
+
+        assert cache.get_many([("isbn", "1"), ("isbn", "2"), ("isbn", "3"), ("isbn", "4")]) == {
+            ("isbn", "1"): {"title": "A"},
+            ("isbn", "2"): None,
+        }
+
+    def test_least_recently_read_entries_are_evicted(self, cache_path):
+        from bibliome.infrastructure import SharedCache
+
+        cache = SharedCache("test", max_entries=10, path=cache_path)
+        cache.set_many({f"old{i}": i for i in range(10)})
+        time.sleep(0.01)
+        cache.get("old0")
+        cache.set_many({f"new{i}": i for i in range(60)})
+
+        assert len(cache) == 10
+        assert cache.get("old0") is None
+        assert cache.get("new59") == 59
+        assert cache.stats()['evictions'] == 60
+
+    def test_unusable_file_is_a_miss(self, tmp_path):
+        from bibliome.infrastructure import SharedCache
+
+        (tmp_path / "not_a_dir").write_text("")
+        cache = SharedCache("test", path=str(tmp_path / "not_a_dir" / "cache.db"))
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+
+@pytest.mark.unit
+class TestSharedCached:
+    """Tests for the shared_cached decorator."""
+
+    def test_results_are_cached_unless_rejected(self, cache_path):
+        from bibliome.infrastructure import SharedCache, shared_cached
+
+        calls = []
+
+        @shared_cached(SharedCache("following", path=cache_path), key=lambda did: did, store_if=bool)
+        def follows(did):
+            calls.append(did)
+            return [] if did == "did:plc:failing" else ["did:plc:x"]
+
+        assert follows("did:plc:a") == follows("did:plc:a") == ["did:plc:x"]
+        follows("did:plc:failing")
+        follows("did:plc:failing")
+
+        assert calls == ["did:plc:a", "did:plc:failing", "did:plc:failing"]
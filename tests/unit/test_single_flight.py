@@ -0,0 +1,108 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+    """Tests for SingleFlight.do (coroutines) and SingleFlight.call (threads)."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_result(self):
+        from bibliome.infrastructure import SingleFlight
+
+        flight = SingleFlight("test")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"did": "did:plc:a"}
+
+        results = await asyncio.gather(*(flight.do("did:plc:a", fetch) for _ in range(5)))
+
+        assert results == [{"did": "did:plc:a"}] * 5
+        assert len(calls) == 1
+        stats = flight.stats()
+        assert (stats['hits'], stats['misses'], stats['in_flight']) == (4, 1, 0)
+
+    @pytest.mark.asyncio
+    async def test_different_keys_and_later_calls_run_separately(self):
+        from bibliome.infrastructure import SingleFlight
+
+        flight = SingleFlight("test")
+        calls = []
+
+        async def fetch(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key
+
+        assert await asyncio.gather(flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b"))) == ["a", "b"]
+        assert await flight.do("a", lambda: fetch("a")) == "a"
+        assert calls == ["a", "b", "a"]
+
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        from bibliome.infrastructure import SingleFlight
+
+        flight = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("PDS unavailable")
+
+        results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.stats()['misses'] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_leader(self):
+        from bibliome.infrastructure import SingleFlight
+
+        flight = SingleFlight("test")
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leader = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+
+        assert await leader == "done"
+        assert waiter.cancelled()
+
+    def test_threads_share_one_call(self):
+        from bibliome.infrastructure import SingleFlight
+
+        flight = SingleFlight("test")
+        calls = []
+        start = threading.Barrier(6)
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return ["did:plc:b"]
+
+        def follow(results):
+            start.wait()
+            results.append(flight.call("did:plc:a", fetch))
+
+        results = []
+        threads = [threading.Thread(target=follow, args=(results,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [["did:plc:b"]] * 6
+        assert len(calls) == 1
+        assert flight.stats()['hits'] == 5
@@ -0,0 +1,106 @@
+"""Tests for the stale-while-revalidate page cache."""
+
+import threading
+import time
+
+import pytest
+
+
+@pytest.mark.unit
+class TestStaleWhileRevalidateCache:
+    """Tests for StaleWhileRevalidateCache freshness, refresh hand-out and coalescing."""
+
+    def test_fresh_entry_is_computed_once(self):
+        from bibliome.infrastructure import StaleWhileRevalidateCache
+
+        cache = StaleWhileRevalidateCache("test", ttl=60)
+        computes = []
+        compute = lambda: computes.append(1) or "<main>landing</main>"
+
+        for _ in range(3):
+            page, refresh = cache.get_or_compute(('landing',), compute)
+            assert page.value == "<main>landing</main>"
+            assert refresh is None
+
+        assert len(computes) == 1
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['stale_hits']) == (2, 1, 0)
+
+    def test_stale_entry_is_served_and_refreshed_once(self):
+        """Past ttl the old value is returned at once; only the first caller gets the refresh."""
+        from bibliome.infrastructure import StaleWhileRevalidateCache
+
+        cache = StaleWhileRevalidateCache("test", ttl=0.01, max_stale=60)
+        values = iter(["v1", "v2"])
+        compute = lambda: next(values)
+        cache.get_or_compute('k', compute)
+        time.sleep(0.02)
+
+        page, refresh = cache.get_or_compute('k', compute)
+        _, second_refresh = cache.get_or_compute('k', compute)
+        assert page.value == "v1"
+        assert refresh is not None and second_refresh is None
+
+        refresh()
+        page, refresh = cache.get_or_compute('k', compute)
+        assert page.value == "v2"
+        assert refresh is None
+        assert cache.stats()['refreshes'] == 1
+
+    def test_failed_refresh_keeps_stale_value(self):
+        from bibliome.infrastructure import StaleWhileRevalidateCache
+
+        cache = StaleWhileRevalidateCache("test", ttl=0.01, max_stale=60)
+        cache.get_or_compute('k', lambda: "v1")
+        time.sleep(0.02)
+
+        def broken():
+            raise RuntimeError("database is locked")
+
+        _, refresh = cache.get_or_compute('k', broken)
+        refresh()
+        page, refresh = cache.get_or_compute('k', broken)
+
+        assert page.value == "v1"
+        assert refresh is not None  # the next visitor retries
+        assert cache.stats()['refresh_errors'] == 1
+
+    def test_expired_entry_is_recomputed_inline(self):
+        """Past ttl + max_stale the old value is no longer served."""
+        from bibliome.infrastructure import StaleWhileRevalidateCache
+
+        cache = StaleWhileRevalidateCache("test", ttl=0.01, max_stale=0.01)
+        first, _ = cache.get_or_compute('k', lambda: "v1")
+        time.sleep(0.03)
+        page, refresh = cache.get_or_compute('k', lambda: "v2")
+
+        assert page.value == "v2"
+        assert page.version > first.version
+        assert refresh is None
+
+    def test_concurrent_misses_compute_once(self):
+        """A herd of callers on a cold key waits for one computation."""
+        from bibliome.infrastructure import StaleWhileRevalidateCache
+
+        cache = StaleWhileRevalidateCache("test", ttl=60)
+        computes = []
+        start = threading.Barrier(8)
+
+        def compute():
+            computes.append(1)
+            time.sleep(0.05)
+            return "<main>explore</main>"
+
+        def visit(results):
+            start.wait()
+            results.append(cache.get_or_compute(('explore', 3), compute)[0].value)
+
+        results = []
+        threads = [threading.Thread(target=visit, args=(results,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(computes) == 1
+        assert results == ["<main>explore</main>"] * 8